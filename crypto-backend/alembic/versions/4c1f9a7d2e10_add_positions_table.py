@@ -0,0 +1,92 @@
+"""add_positions_table
+
+Revision ID: 4c1f9a7d2e10
+Revises: 730bb323edf7
+Create Date: 2025-09-02 10:12:45.318204
+
+Per-user position ledger maintained alongside the trades table. Existing
+trades are replayed into it here, so holdings (and the achievement counters
+seeded from it in c5a8e2f4b913) are correct as soon as the upgrade finishes.
+`python rebuild_positions.py` re-derives it later if it ever drifts.
+"""
+from itertools import groupby
+from operator import attrgetter
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.position_service import LEDGER_FIELDS, PositionService
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1f9a7d2e10'
+down_revision: Union[str, Sequence[str], None] = '730bb323edf7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Create the positions table."""
+    op.create_table('positions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('coin_symbol', sa.String(length=10), nullable=False),
+        sa.Column('quantity', sa.Numeric(precision=20, scale=8), nullable=False, server_default='0'),
+        sa.Column('cost_basis', sa.Numeric(precision=20, scale=8), nullable=False, server_default='0'),
+        sa.Column('realized_pnl', sa.Numeric(precision=20, scale=8), nullable=False, server_default='0'),
+        sa.Column('total_spent', sa.Numeric(precision=20, scale=8), nullable=False, server_default='0'),
+        sa.Column('total_received', sa.Numeric(precision=20, scale=8), nullable=False, server_default='0'),
+        sa.Column('trade_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'coin_symbol', name='uq_positions_user_coin')
+    )
+    
+    # Create indexes for positions
+    op.create_index(op.f('ix_positions_id'), 'positions', ['id'], unique=False)
+    op.create_index(op.f('ix_positions_user_id'), 'positions', ['user_id'], unique=False)
+    
+    backfill_positions(op.get_bind())
+
+def backfill_positions(bind, batch_size: int = 1000) -> int:
+    """Replay every trade into positions with the same accounting as PositionService.rebuild_all_positions"""
+    trades = sa.table('trades',
+        sa.column('id', sa.Integer()),
+        sa.column('user_id', sa.Integer()),
+        sa.column('coin_symbol', sa.String()),
+        sa.column('trade_type', sa.String()),
+        sa.column('quantity', sa.Numeric(20, 8)),
+        sa.column('price_at_trade', sa.Numeric(20, 8)),
+        sa.column('timestamp', sa.DateTime())
+    )
+    positions = sa.table('positions',
+        sa.column('user_id', sa.Integer()),
+        sa.column('coin_symbol', sa.String()),
+        *(sa.column(field, sa.Integer() if field == 'trade_count' else sa.Numeric(20, 8)) for field in LEDGER_FIELDS)
+    )
+    # trade_type holds the enum name ('BUY'); lower-cased it compares equal to TradeType
+    rows = bind.execute(sa.select(
+        trades.c.user_id, trades.c.coin_symbol, sa.func.lower(trades.c.trade_type).label('trade_type'),
+        trades.c.quantity, trades.c.price_at_trade
+    ).order_by(trades.c.user_id, trades.c.timestamp, trades.c.id))
+    
+    inserted = 0
+    batch = []
+    for _, user_trades in groupby(rows, key=attrgetter('user_id')):
+        for (user_id, coin_symbol), position in PositionService.replay_trades(user_trades).items():
+            values = {field: getattr(position, field) for field in LEDGER_FIELDS}
+            batch.append({'user_id': user_id, 'coin_symbol': coin_symbol, **values})
+        if len(batch) >= batch_size:
+            bind.execute(positions.insert(), batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        bind.execute(positions.insert(), batch)
+        inserted += len(batch)
+    return inserted
+
+def downgrade() -> None:
+    """Drop the positions table."""
+    op.drop_index(op.f('ix_positions_user_id'), table_name='positions')
+    op.drop_index(op.f('ix_positions_id'), table_name='positions')
+    op.drop_table('positions')
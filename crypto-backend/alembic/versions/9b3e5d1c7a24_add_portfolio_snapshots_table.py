@@ -0,0 +1,45 @@
+"""add_portfolio_snapshots_table
+
+Revision ID: 9b3e5d1c7a24
+Revises: 4c1f9a7d2e10
+Create Date: 2025-09-04 09:31:12.604418
+
+Hourly per-user portfolio valuations, used as the baseline for daily,
+weekly and monthly leaderboards.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e5d1c7a24'
+down_revision: Union[str, Sequence[str], None] = '4c1f9a7d2e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Create the portfolio_snapshots table."""
+    op.create_table('portfolio_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('taken_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('total_portfolio_value', sa.Numeric(precision=20, scale=8), nullable=False),
+        sa.Column('total_invested', sa.Numeric(precision=20, scale=8), nullable=False),
+        sa.Column('total_profit_loss', sa.Numeric(precision=20, scale=8), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'taken_at', name='uq_portfolio_snapshots_user_taken_at')
+    )
+    
+    # Create indexes for portfolio_snapshots
+    op.create_index(op.f('ix_portfolio_snapshots_id'), 'portfolio_snapshots', ['id'], unique=False)
+    op.create_index(op.f('ix_portfolio_snapshots_user_id'), 'portfolio_snapshots', ['user_id'], unique=False)
+    op.create_index(op.f('ix_portfolio_snapshots_taken_at'), 'portfolio_snapshots', ['taken_at'], unique=False)
+
+def downgrade() -> None:
+    """Drop the portfolio_snapshots table."""
+    op.drop_index(op.f('ix_portfolio_snapshots_taken_at'), table_name='portfolio_snapshots')
+    op.drop_index(op.f('ix_portfolio_snapshots_user_id'), table_name='portfolio_snapshots')
+    op.drop_index(op.f('ix_portfolio_snapshots_id'), table_name='portfolio_snapshots')
+    op.drop_table('portfolio_snapshots')
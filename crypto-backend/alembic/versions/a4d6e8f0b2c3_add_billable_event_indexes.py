@@ -0,0 +1,35 @@
+"""add_billable_event_indexes
+
+Revision ID: a4d6e8f0b2c3
+Revises: f3b9c1d7e2a4
+Create Date: 2025-09-09 16:05:12.874021
+
+Per-user indexes for the invoice lookup, which resolves an order id, payment
+id or row id against a user's purchases and wallet transactions in one query.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d6e8f0b2c3'
+down_revision: Union[str, Sequence[str], None] = 'f3b9c1d7e2a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Create the per-user order/payment id indexes on purchases and wallet_transactions."""
+    op.create_index('ix_purchases_user_created', 'purchases', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_purchases_user_order', 'purchases', ['user_id', 'razorpay_order_id'], unique=False)
+    op.create_index('ix_purchases_user_payment', 'purchases', ['user_id', 'razorpay_payment_id'], unique=False)
+    op.create_index('ix_wallet_transactions_user_order', 'wallet_transactions', ['user_id', 'order_id'], unique=False)
+    op.create_index('ix_wallet_transactions_user_payment', 'wallet_transactions', ['user_id', 'payment_id'], unique=False)
+
+def downgrade() -> None:
+    """Drop the billable event indexes."""
+    op.drop_index('ix_wallet_transactions_user_payment', table_name='wallet_transactions')
+    op.drop_index('ix_wallet_transactions_user_order', table_name='wallet_transactions')
+    op.drop_index('ix_purchases_user_payment', table_name='purchases')
+    op.drop_index('ix_purchases_user_order', table_name='purchases')
+    op.drop_index('ix_purchases_user_created', table_name='purchases')
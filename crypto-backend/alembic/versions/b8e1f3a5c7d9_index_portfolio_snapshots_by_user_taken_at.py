@@ -0,0 +1,32 @@
+"""index_portfolio_snapshots_by_user_taken_at
+
+Revision ID: b8e1f3a5c7d9
+Revises: a4d6e8f0b2c3
+Create Date: 2025-09-11 10:42:37.215903
+
+Replaces the (user_id, taken_at) unique constraint with a named unique index.
+Period leaderboards look up each user's baseline snapshot through it. It
+also covers user_id lookups, so the single-column index is dropped.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e1f3a5c7d9'
+down_revision: Union[str, Sequence[str], None] = 'a4d6e8f0b2c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Create the (user_id, taken_at) unique index and drop what it replaces."""
+    op.create_index('ix_portfolio_snapshots_user_taken_at', 'portfolio_snapshots', ['user_id', 'taken_at'], unique=True)
+    op.drop_constraint('uq_portfolio_snapshots_user_taken_at', 'portfolio_snapshots', type_='unique')
+    op.drop_index(op.f('ix_portfolio_snapshots_user_id'), table_name='portfolio_snapshots')
+
+def downgrade() -> None:
+    """Restore the unique constraint and the user_id index."""
+    op.create_index(op.f('ix_portfolio_snapshots_user_id'), 'portfolio_snapshots', ['user_id'], unique=False)
+    op.create_unique_constraint('uq_portfolio_snapshots_user_taken_at', 'portfolio_snapshots', ['user_id', 'taken_at'])
+    op.drop_index('ix_portfolio_snapshots_user_taken_at', table_name='portfolio_snapshots')
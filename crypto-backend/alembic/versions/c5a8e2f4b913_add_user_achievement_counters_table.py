@@ -0,0 +1,53 @@
+"""add_user_achievement_counters_table
+
+Revision ID: c5a8e2f4b913
+Revises: 9b3e5d1c7a24
+Create Date: 2025-09-06 14:02:37.552190
+
+Per-user trade counters maintained by trade events and read by the
+achievement evaluator. Existing users are backfilled from the positions
+ledger.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a8e2f4b913'
+down_revision: Union[str, Sequence[str], None] = '9b3e5d1c7a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Create the user_achievement_counters table and backfill it from positions."""
+    op.create_table('user_achievement_counters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('trade_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('trade_volume', sa.Numeric(precision=20, scale=8), nullable=False, server_default='0'),
+        sa.Column('coins_held', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', name='uq_user_achievement_counters_user')
+    )
+
+    # Create indexes for user_achievement_counters
+    op.create_index(op.f('ix_user_achievement_counters_id'), 'user_achievement_counters', ['id'], unique=False)
+
+    # Backfill from the position ledger
+    op.execute("""
+        INSERT INTO user_achievement_counters (user_id, trade_count, trade_volume, coins_held)
+        SELECT user_id,
+               SUM(trade_count),
+               SUM(total_spent + total_received),
+               SUM(CASE WHEN quantity > 0 THEN 1 ELSE 0 END)
+        FROM positions
+        GROUP BY user_id
+    """)
+
+def downgrade() -> None:
+    """Drop the user_achievement_counters table."""
+    op.drop_index(op.f('ix_user_achievement_counters_id'), table_name='user_achievement_counters')
+    op.drop_table('user_achievement_counters')
@@ -0,0 +1,32 @@
+"""add_job_leases_table
+
+Revision ID: d2f4a6c8e0b1
+Revises: b8e1f3a5c7d9
+Create Date: 2025-09-11 15:08:53.490127
+
+One row per singleton background job, naming the worker that runs it until
+the lease expires.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f4a6c8e0b1'
+down_revision: Union[str, Sequence[str], None] = 'b8e1f3a5c7d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Create the job_leases table."""
+    op.create_table('job_leases',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('holder', sa.String(length=32), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+def downgrade() -> None:
+    """Drop the job_leases table."""
+    op.drop_table('job_leases')
@@ -0,0 +1,53 @@
+"""add_post_trade_jobs_table
+
+Revision ID: e7d2b4f6a815
+Revises: c5a8e2f4b913
+Create Date: 2025-09-08 10:17:44.208316
+
+Durable queue of leaderboard and achievement follow-ups, one row per
+trade, written in the trade's own transaction.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7d2b4f6a815'
+down_revision: Union[str, Sequence[str], None] = 'c5a8e2f4b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Create the post_trade_jobs table."""
+    op.create_table('post_trade_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('trade_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('claim_token', sa.String(length=32), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['trade_id'], ['trades.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('trade_id', name='uq_post_trade_jobs_trade')
+    )
+    
+    # Create indexes for post_trade_jobs
+    op.create_index(op.f('ix_post_trade_jobs_id'), 'post_trade_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_post_trade_jobs_user_id'), 'post_trade_jobs', ['user_id'], unique=False)
+    op.create_index(op.f('ix_post_trade_jobs_claim_token'), 'post_trade_jobs', ['claim_token'], unique=False)
+    op.create_index('ix_post_trade_jobs_status_next_attempt', 'post_trade_jobs', ['status', 'next_attempt_at'], unique=False)
+
+def downgrade() -> None:
+    """Drop the post_trade_jobs table."""
+    op.drop_index('ix_post_trade_jobs_status_next_attempt', table_name='post_trade_jobs')
+    op.drop_index(op.f('ix_post_trade_jobs_claim_token'), table_name='post_trade_jobs')
+    op.drop_index(op.f('ix_post_trade_jobs_user_id'), table_name='post_trade_jobs')
+    op.drop_index(op.f('ix_post_trade_jobs_id'), table_name='post_trade_jobs')
+    op.drop_table('post_trade_jobs')
@@ -0,0 +1,33 @@
+"""add_trade_and_wallet_transaction_indexes
+
+Revision ID: f3b9c1d7e2a4
+Revises: e7d2b4f6a815
+Create Date: 2025-09-08 10:21:44.306518
+
+Composite indexes for the hot trade and wallet transaction queries: per-user
+history ordered by time, per-user coin/type lookups and today's trade stats.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9c1d7e2a4'
+down_revision: Union[str, Sequence[str], None] = 'e7d2b4f6a815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    """Create composite indexes on trades and wallet_transactions."""
+    op.create_index('ix_trades_user_timestamp', 'trades', ['user_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_trades_user_symbol_type', 'trades', ['user_id', 'coin_symbol', 'trade_type'], unique=False)
+    op.create_index('ix_trades_timestamp_user', 'trades', ['timestamp', 'user_id'], unique=False)
+    op.create_index('ix_wallet_transactions_user_created', 'wallet_transactions', ['user_id', 'created_at', 'id'], unique=False)
+
+def downgrade() -> None:
+    """Drop the composite indexes."""
+    op.drop_index('ix_wallet_transactions_user_created', table_name='wallet_transactions')
+    op.drop_index('ix_trades_timestamp_user', table_name='trades')
+    op.drop_index('ix_trades_user_symbol_type', table_name='trades')
+    op.drop_index('ix_trades_user_timestamp', table_name='trades')
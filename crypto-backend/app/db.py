@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 from dotenv import load_dotenv
@@ -68,6 +69,42 @@ except Exception as e:
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) if engine else None
 Base = declarative_base()
 
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg / aiosqlite)"""
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite" + url[url.index(":"):]
+    if url.startswith(("postgres://", "postgresql://", "postgresql+psycopg2://")):
+        url = "postgresql+asyncpg" + url[url.index(":"):]
+        # asyncpg takes ssl= rather than libpq's sslmode=
+        return url.replace("sslmode=", "ssl=")
+    return url
+
+# Async engine for the async route handlers; queries no longer block the event loop
+try:
+    ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+    if ASYNC_DATABASE_URL.startswith("sqlite"):
+        async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    else:
+        async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_pre_ping=True,
+            pool_recycle=300,
+            pool_timeout=20,
+            max_overflow=10,
+            pool_size=5
+        )
+    print("Async database engine created successfully")
+except Exception as e:
+    print(f"Error creating async database engine: {e}")
+    if ENVIRONMENT == "production":
+        raise
+    async_engine = None
+
+# expire_on_commit=False: attributes stay readable after commit without another round trip
+AsyncSessionLocal = sessionmaker(
+    async_engine, class_=AsyncSession, autocommit=False, autoflush=False, expire_on_commit=False
+) if async_engine else None
+
 # Dependency to get database session
 def get_database():
     if not SessionLocal:
@@ -113,6 +150,18 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Async database dependency for FastAPI routes.
+    
+    Services stay synchronous: run them with `await db.run_sync(...)`, which executes
+    their queries on the async driver without blocking the event loop.
+    """
+    if not AsyncSessionLocal:
+        raise Exception("Async database connection not available")
+    
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def get_database_info():
     """Get database connection information for debugging"""
     try:
@@ -150,3 +199,11 @@ def get_database_info():
             "error": str(e),
             "message": "Failed to get database information"
         }
+
+def dialect_insert(session, model):
+    """INSERT for the session's dialect, so on_conflict_do_nothing/do_update are available (Postgres and SQLite)"""
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
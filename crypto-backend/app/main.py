@@ -1,15 +1,50 @@
 import warnings
 import os
 import subprocess
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.routes import auth, trade, leaderboard, achievement, purchase, currency, wallet, invoice, chatbot
+from app.routes import auth, trade, leaderboard, achievement, purchase, currency, wallet, invoice, chatbot, prices
+from app.services.price_service import price_service
+from app.services.price_broadcaster import price_broadcaster
+from app.services.leaderboard_service import leaderboard_job, portfolio_snapshot_job
+from app.services.catalog import catalog, load_catalog
+from app.services.post_trade_queue import post_trade_queue, post_trade_purge_job
+from app.services.invoice_renderer import invoice_renderer
+from app.services.openai_client import openai_client
+from app.services.chat_context import chat_context_cache
+from app.services.response_cache import reply_cache
+from app.services.trade_service import add_trade_listener
 
 # Suppress deprecation warnings for production
 warnings.filterwarnings("ignore", category=DeprecationWarning, module="pkg_resources")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background services on startup and stop them on shutdown"""
+    load_catalog()
+    price_service.add_price_listener(price_broadcaster.publish)
+    price_service.add_price_listener(reply_cache.on_prices)
+    add_trade_listener(chat_context_cache.on_trade)
+    post_trade_queue.start()
+    post_trade_purge_job.start()
+    openai_client.start()
+    if os.getenv("PRICE_POLLER_ENABLED", "true").lower() == "true":
+        price_service.start_poller()
+    if os.getenv("LEADERBOARD_JOB_ENABLED", "true").lower() == "true":
+        leaderboard_job.start()
+        portfolio_snapshot_job.start()
+    yield
+    await portfolio_snapshot_job.stop()
+    await leaderboard_job.stop()
+    await price_service.stop_poller()
+    await post_trade_purge_job.stop()
+    await post_trade_queue.stop()
+    invoice_renderer.shutdown()
+    await openai_client.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware configuration (allow all origins, no credentials)
 app.add_middleware(
@@ -61,6 +96,11 @@ async def chatbot_options():
     """Handle preflight CORS request for chatbot"""
     return {"message": "Chatbot CORS preflight OK"}
 
+@app.options("/api/chatbot/stream")
+async def chatbot_stream_options():
+    """Handle preflight CORS request for the chatbot stream"""
+    return {"message": "Chatbot stream CORS preflight OK"}
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(trade.router)
@@ -71,6 +111,7 @@ app.include_router(currency.router)
 app.include_router(wallet.router)
 app.include_router(invoice.router)
 app.include_router(chatbot.router)
+app.include_router(prices.router)
 
 @app.get("/")
 def read_root():
@@ -492,6 +533,7 @@ def fix_achievement_enums():
         
         db.commit()
         db.close()
+        catalog.invalidate()
         
         return {
             "message": "Achievement tables recreated with correct enum values",
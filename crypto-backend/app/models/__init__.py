@@ -2,8 +2,12 @@ from .user import User
 from .trade import Trade
 from .leaderboard import LeaderboardEntry
 from .purchase import DemoCoinPackage, Purchase
-from .achievement import Achievement, UserAchievement
+from .achievement import Achievement, UserAchievement, UserAchievementCounters
 from .wallet import Wallet
 from .wallet_transaction import WalletTransaction
+from .position import Position
+from .portfolio_snapshot import PortfolioSnapshot
+from .post_trade_job import PostTradeJob
+from .job_lease import JobLease
 
-__all__ = ["User", "Trade", "LeaderboardEntry", "DemoCoinPackage", "Purchase", "Achievement", "UserAchievement", "Wallet", "WalletTransaction"] 
\ No newline at end of file
+__all__ = ["User", "Trade", "LeaderboardEntry", "DemoCoinPackage", "Purchase", "Achievement", "UserAchievement", "UserAchievementCounters", "Wallet", "WalletTransaction", "Position", "PortfolioSnapshot", "PostTradeJob", "JobLease"] 
\ No newline at end of file
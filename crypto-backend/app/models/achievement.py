@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Boolean, Text, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db import Base
@@ -79,4 +79,26 @@ class UserLoginStreak(Base):
     user = relationship("User", back_populates="login_streak")
     
     def __repr__(self):
-        return f"<UserLoginStreak(user_id={self.user_id}, current_streak={self.current_streak}, longest_streak={self.longest_streak})>" 
\ No newline at end of file
+        return f"<UserLoginStreak(user_id={self.user_id}, current_streak={self.current_streak}, longest_streak={self.longest_streak})>" 
+
+class UserAchievementCounters(Base):
+    __tablename__ = "user_achievement_counters"
+    __table_args__ = (
+        UniqueConstraint("user_id", name="uq_user_achievement_counters_user"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    
+    # Running totals updated by trade events, read by the achievement evaluator
+    trade_count = Column(Integer, default=0, nullable=False)
+    trade_volume = Column(Numeric(20, 8), default=0, nullable=False)  # Sum of total_cost over all trades
+    coins_held = Column(Integer, default=0, nullable=False)  # Distinct coins with a positive position
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationship
+    user = relationship("User", back_populates="achievement_counters")
+    
+    def __repr__(self):
+        return f"<UserAchievementCounters(user_id={self.user_id}, trades={self.trade_count}, volume={self.trade_volume}, coins_held={self.coins_held})>"
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime
+from app.db import Base
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+
+    name = Column(String(64), primary_key=True)  # Background job name, e.g. 'leaderboard-recompute'
+    holder = Column(String(32), nullable=False)  # Worker process currently running the job
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<JobLease(name={self.name}, holder={self.holder}, expires_at={self.expires_at})>"
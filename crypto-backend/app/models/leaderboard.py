@@ -7,7 +7,7 @@ class LeaderboardEntry(Base):
     __tablename__ = "leaderboard_entries"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True, index=True)
     username = Column(String, nullable=False)  # Denormalized for faster queries
     
     # Portfolio metrics
@@ -28,8 +28,8 @@ class LeaderboardEntry(Base):
     win_rate_percent = Column(Numeric(10, 4), default=0.0)
     
     # Ranking
-    global_rank = Column(Integer, nullable=True)
-    weekly_rank = Column(Integer, nullable=True)
+    global_rank = Column(Integer, nullable=True, index=True)
+    weekly_rank = Column(Integer, nullable=True, index=True)
     
     # Timestamps
     last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, DateTime, Numeric, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db import Base
+
+class PortfolioSnapshot(Base):
+    __tablename__ = "portfolio_snapshots"
+    __table_args__ = (
+        # One row per user per hour; also serves the per-user baseline lookup of the period leaderboards
+        Index("ix_portfolio_snapshots_user_taken_at", "user_id", "taken_at", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    taken_at = Column(DateTime(timezone=True), nullable=False, index=True)  # Start of the snapshot bucket (hour)
+    total_portfolio_value = Column(Numeric(20, 8), nullable=False)
+    total_invested = Column(Numeric(20, 8), nullable=False)
+    total_profit_loss = Column(Numeric(20, 8), nullable=False)
+    
+    # Relationship to user
+    user = relationship("User", back_populates="portfolio_snapshots")
+    
+    def __repr__(self):
+        return f"<PortfolioSnapshot(user_id={self.user_id}, taken_at={self.taken_at}, value={self.total_portfolio_value})>"
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.db import Base
+
+class Position(Base):
+    __tablename__ = "positions"
+    __table_args__ = (
+        UniqueConstraint("user_id", "coin_symbol", name="uq_positions_user_coin"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    coin_symbol = Column(String(10), nullable=False)
+    quantity = Column(Numeric(20, 8), default=0, nullable=False)  # Coins currently held
+    cost_basis = Column(Numeric(20, 8), default=0, nullable=False)  # Average-cost basis of the coins held
+    realized_pnl = Column(Numeric(20, 8), default=0, nullable=False)  # Profit/loss locked in by sells
+    total_spent = Column(Numeric(20, 8), default=0, nullable=False)  # Lifetime cost of all buys
+    total_received = Column(Numeric(20, 8), default=0, nullable=False)  # Lifetime proceeds of all sells
+    trade_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationship to user
+    user = relationship("User", back_populates="positions")
+    
+    def __repr__(self):
+        return f"<Position(user_id={self.user_id}, coin={self.coin_symbol}, quantity={self.quantity}, cost_basis={self.cost_basis})>"
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, UniqueConstraint, Index
+from datetime import datetime, timezone
+from app.db import Base
+
+def utcnow() -> datetime:
+    """The job timestamps are timezone-aware UTC, matching their DateTime(timezone=True) columns"""
+    return datetime.now(timezone.utc)
+
+class PostTradeJob(Base):
+    __tablename__ = "post_trade_jobs"
+    __table_args__ = (
+        UniqueConstraint("trade_id", name="uq_post_trade_jobs_trade"),
+        Index("ix_post_trade_jobs_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    trade_id = Column(Integer, ForeignKey("trades.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="pending")  # 'pending', 'running', 'done', 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    claim_token = Column(String(32), nullable=True, index=True)  # Set by the worker that claimed the job
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<PostTradeJob(trade_id={self.trade_id}, user_id={self.user_id}, status={self.status}, attempts={self.attempts})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Text, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db import Base
@@ -31,6 +31,12 @@ class DemoCoinPackage(Base):
 
 class Purchase(Base):
     __tablename__ = "purchases"
+    __table_args__ = (
+        # Invoice list and lookups by order/payment id within one user's purchases
+        Index("ix_purchases_user_created", "user_id", "created_at"),
+        Index("ix_purchases_user_order", "user_id", "razorpay_order_id"),
+        Index("ix_purchases_user_payment", "user_id", "razorpay_payment_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
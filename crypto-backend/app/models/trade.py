@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db import Base
@@ -10,6 +10,14 @@ class TradeType(str, enum.Enum):
 
 class Trade(Base):
     __tablename__ = "trades"
+    __table_args__ = (
+        # History, chatbot recent trades and position replay: user_id = ? ORDER BY timestamp, id
+        Index("ix_trades_user_timestamp", "user_id", "timestamp", "id"),
+        # Per-coin buys/sells of one user
+        Index("ix_trades_user_symbol_type", "user_id", "coin_symbol", "trade_type"),
+        # Trades today / active traders today (covers user_id)
+        Index("ix_trades_timestamp_user", "timestamp", "user_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -43,9 +43,16 @@ class User(Base):
     # Relationship to achievements
     user_achievements = relationship("UserAchievement", back_populates="user")
     login_streak = relationship("UserLoginStreak", back_populates="user", uselist=False)
+    achievement_counters = relationship("UserAchievementCounters", back_populates="user", uselist=False)
     
     # Relationship to wallet
     wallet = relationship("Wallet", back_populates="user", uselist=False)
     
     # Relationship to wallet transactions
-    wallet_transactions = relationship("WalletTransaction", back_populates="user") 
\ No newline at end of file
+    wallet_transactions = relationship("WalletTransaction", back_populates="user")
+    
+    # Relationship to per-coin positions
+    positions = relationship("Position", back_populates="user")
+    
+    # Relationship to periodic portfolio snapshots
+    portfolio_snapshots = relationship("PortfolioSnapshot", back_populates="user") 
\ No newline at end of file
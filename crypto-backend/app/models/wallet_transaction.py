@@ -1,10 +1,17 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
 
 class WalletTransaction(Base):
     __tablename__ = "wallet_transactions"
+    __table_args__ = (
+        # Transaction history: user_id = ? ORDER BY created_at, id
+        Index("ix_wallet_transactions_user_created", "user_id", "created_at", "id"),
+        # Invoice lookup by Razorpay order or payment id
+        Index("ix_wallet_transactions_user_order", "user_id", "order_id"),
+        Index("ix_wallet_transactions_user_payment", "user_id", "payment_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
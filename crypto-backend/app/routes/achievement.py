@@ -3,9 +3,10 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.auth import get_current_user
-from app.db import SessionLocal
+from app.db import get_db
 from app.models.user import User
 from app.services.achievement_service import AchievementService
+from app.services.catalog import catalog
 from app.schemas.achievement import (
     AchievementResponse,
     UserAchievementResponse,
@@ -17,13 +18,6 @@ from app.schemas.achievement import (
 
 router = APIRouter(prefix="/achievements", tags=["achievements"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/", response_model=List[AchievementResponse])
 async def get_all_achievements(
     db: Session = Depends(get_db)
@@ -41,85 +35,6 @@ async def get_user_achievements(
 ):
     """Get current user's achievement progress"""
     try:
-        # First, check if achievements table exists and setup if needed
-        from sqlalchemy import text
-        
-        # Reset any failed transaction
-        try:
-            db.rollback()
-        except:
-            pass
-        
-        try:
-            db.execute(text("SELECT 1 FROM achievements LIMIT 1"))
-        except Exception:
-            print("Achievements table doesn't exist, setting up database...")
-            # Call the setup endpoint logic directly
-            try:
-                # Create achievements table
-                db.execute(text("""
-                    CREATE TABLE IF NOT EXISTS achievements (
-                        id SERIAL PRIMARY KEY,
-                        name VARCHAR(255) NOT NULL,
-                        description TEXT NOT NULL,
-                        type VARCHAR(50) NOT NULL,
-                        icon VARCHAR(255) NOT NULL,
-                        requirement_value NUMERIC(20, 8) NOT NULL,
-                        requirement_type VARCHAR(50) NOT NULL,
-                        reward_coins NUMERIC(20, 8) NOT NULL DEFAULT 0,
-                        reward_title VARCHAR(255),
-                        is_active BOOLEAN NOT NULL DEFAULT true,
-                        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-                    )
-                """))
-                
-                # Create user_achievements table
-                db.execute(text("""
-                    CREATE TABLE IF NOT EXISTS user_achievements (
-                        id SERIAL PRIMARY KEY,
-                        user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                        achievement_id INTEGER NOT NULL REFERENCES achievements(id) ON DELETE CASCADE,
-                        current_progress NUMERIC(20, 8) NOT NULL DEFAULT 0,
-                        is_completed BOOLEAN NOT NULL DEFAULT false,
-                        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                        completed_at TIMESTAMP WITH TIME ZONE
-                    )
-                """))
-                
-                # Create user_login_streaks table
-                db.execute(text("""
-                    CREATE TABLE IF NOT EXISTS user_login_streaks (
-                        id SERIAL PRIMARY KEY,
-                        user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                        current_streak INTEGER NOT NULL DEFAULT 0,
-                        longest_streak INTEGER NOT NULL DEFAULT 0,
-                        last_login_date TIMESTAMP WITH TIME ZONE,
-                        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                        updated_at TIMESTAMP WITH TIME ZONE
-                    )
-                """))
-                
-                # Insert default achievements if table is empty
-                result = db.execute(text("SELECT COUNT(*) FROM achievements")).scalar()
-                if result == 0:
-                    db.execute(text("""
-                        INSERT INTO achievements (name, description, type, icon, requirement_value, requirement_type, reward_coins, reward_title, is_active) VALUES
-                        ('First Trade', 'Complete your first trade', 'trading_milestone', '🎯', 1, 'trades', 1000, 'Trader', true),
-                        ('Profit Master', 'Make 10% profit on a trade', 'profit_achievement', '💰', 10, 'profit_percent', 2000, 'Profit Hunter', true),
-                        ('Diversifier', 'Hold 5 different cryptocurrencies', 'diversification', '📊', 5, 'coins_held', 1500, 'Diversifier', true),
-                        ('Login Streak', 'Login for 7 consecutive days', 'login_streak', '🔥', 7, 'days_streak', 3000, 'Loyal Trader', true),
-                        ('Volume Trader', 'Trade 1000 coins in total', 'volume_reward', '📈', 1000, 'volume', 5000, 'Volume Master', true)
-                    """))
-                
-                db.commit()
-                print("Database setup completed successfully")
-            except Exception as setup_error:
-                print(f"Error setting up database: {setup_error}")
-                try:
-                    db.rollback()
-                except:
-                    pass
-        
         achievement_service = AchievementService(db)
         
         # Initialize achievements for user if not exists
@@ -262,6 +177,7 @@ async def initialize_achievements(
         """))
         
         db.commit()
+        catalog.invalidate()
         return {"message": "Achievements initialized successfully"}
     except Exception as e:
         try:
@@ -345,6 +261,7 @@ async def setup_achievement_database(
             """))
         
         db.commit()
+        catalog.invalidate()
         return {"message": "Achievement database setup completed successfully"}
     except Exception as e:
         try:
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from app.auth import get_password_hash, verify_password, create_access_token, get_current_user
-from app.db import SessionLocal
+from app.auth import (
+    get_password_hash, verify_password, get_password_hash_async, verify_password_async,
+    create_access_token, get_current_user, principal_cache, password_hasher
+)
+from app.db import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, ForgotPasswordRequest, ResetPasswordRequest
 from app.services.achievement_service import AchievementService
+from app.services.password_hasher import PasswordHasherBusy
 import secrets
 import smtplib
 from email.mime.text import MIMEText
@@ -14,12 +18,12 @@ import os
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
 # In-memory storage for reset tokens (in production, use Redis or database)
 reset_tokens = {}
@@ -153,6 +157,9 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         print(f"Registration successful, returning response: {response_data}")
         return response_data
         
+    except PasswordHasherBusy:
+        db.rollback()
+        raise hasher_busy()
     except Exception as e:
         print(f"Registration error: {e}")
         db.rollback()
@@ -177,7 +184,8 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        if not verify_password(login_data.password, user.hashed_password):
+        valid, new_hash = await verify_password_async(login_data.password, user.hashed_password)
+        if not valid:
             print(f"Invalid password for user: {user.username}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -185,6 +193,11 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        # Hash was made with a different bcrypt cost: store the upgraded one
+        if new_hash:
+            user.hashed_password = new_hash
+            db.commit()
+        
         print(f"User authenticated successfully: {user.username}")
         
         # Update login streak (don't let this fail the login)
@@ -247,6 +260,8 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
+    except PasswordHasherBusy:
+        raise hasher_busy()
     except Exception as e:
         print(f"Login error: {e}")
         # Ensure we rollback on any unexpected errors
@@ -314,8 +329,12 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
         )
     
     # Update password
-    user.hashed_password = get_password_hash(request.new_password)
+    try:
+        user.hashed_password = await get_password_hash_async(request.new_password)
+    except PasswordHasherBusy:
+        raise hasher_busy()
     db.commit()
+    principal_cache.invalidate(user.id)
     
     # Remove used token
     del reset_tokens[request.reset_token]
@@ -394,6 +413,8 @@ def update_profile(
         
         db.commit()
         db.refresh(current_user)
+        # The token subject is the email, so it may no longer resolve to this user
+        principal_cache.invalidate(current_user.id)
         
         return {"message": "Profile updated successfully"}
     except Exception as e:
@@ -430,12 +451,15 @@ def change_password(
         # Hash and update new password
         current_user.hashed_password = get_password_hash(new_password)
         db.commit()
+        principal_cache.invalidate(current_user.id)
         
         return {"message": "Password changed successfully"}
     except Exception as e:
         db.rollback()
         if isinstance(e, HTTPException):
             raise e
+        if isinstance(e, PasswordHasherBusy):
+            raise hasher_busy()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to change password: {str(e)}"
@@ -480,6 +504,11 @@ def update_trading_settings(
             detail=f"Failed to update trading settings: {str(e)}"
         )
 
+@router.get("/hasher/stats")
+async def password_hasher_stats():
+    """Get queue depth and throughput counters for the password hashing pool"""
+    return password_hasher.get_stats()
+
 @router.get("/test")
 def test_auth():
     return {"message": "Auth routes are working!"} 
\ No newline at end of file
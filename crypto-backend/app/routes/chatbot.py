@@ -1,17 +1,21 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, List
 import logging
-import httpx
-import os
-import re
+import json
 from decimal import Decimal
-from app.db import SessionLocal
+from app.db import get_db
 from app.models.user import User
-from app.models.trade import Trade
+from app.models.trade import TradeType
 from app.models.wallet import Wallet
-from app.services.price_service import CoinGeckoService
+from app.services.price_service import price_service
+from app.services.trade_service import TradeService
+from app.services.chat_intents import classify, is_context_free, normalize_message
+from app.services.chat_context import chat_context_cache
+from app.services.openai_client import openai_client, OpenAIClient, OpenAIError
+from app.services.response_cache import reply_cache, completion_cache
 from app.auth import get_current_user as auth_get_current_user
 from sqlalchemy.orm import Session
 
@@ -28,21 +32,60 @@ class ChatResponse(BaseModel):
     reply: str
     status: str = "success"
 
-# Initialize price service
-price_service = CoinGeckoService()
+COACH_SYSTEM_PROMPT = """You are an expert crypto trading COACH and mentor with access to the user's real portfolio data. Your primary role is to EDUCATE and GUIDE users to become better traders.
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+**Your core mission:**
+- Analyze user's balance and portfolio holdings to provide personalized coaching
+- Teach trading concepts through their actual portfolio data
+- Provide educational tips and learning recommendations
+- Help users understand risk management and portfolio optimization
+- Guide users to make informed decisions based on their current situation
+
+**Your coaching approach:**
+- Always analyze their current balance and holdings first
+- Explain WHY certain strategies work based on their portfolio
+- Provide educational insights about their trading patterns
+- Suggest learning opportunities based on their current holdings
+- Help them understand market dynamics through their portfolio
+
+**Response style:**
+- Be educational and mentoring-focused
+- Use **bold** for important numbers and crypto symbols
+- Explain concepts clearly for learning
+- Always reference their actual balance and holdings
+- Provide actionable learning steps
+- Be encouraging and supportive
+
+**Format examples:**
+- Crypto symbols: **BTC**, **ETH**, **SOL**
+- Prices: **$50,000**, **$3,500**
+- Percentages: **+2.5%**, **-1.2%**
+- User balance: **$2,144,111** (use their actual balance)
+
+**Key coaching rules:**
+- Always start by analyzing their current portfolio situation
+- Explain trading concepts using their actual data
+- Provide educational insights about their holdings
+- Suggest learning opportunities based on their portfolio
+- Help them understand risk management with their balance
+- Guide them to make informed decisions, don't just execute trades"""
+COACH_SYSTEM_MESSAGE = {"role": "system", "content": COACH_SYSTEM_PROMPT}
+
+# Context for questions answered once for everyone (cached completions): nothing user-specific
+SHARED_COACHING_CONTEXT = "COACHING LEVEL: any | General question, answered the same way for every user; their portfolio is not known | MISSION: Provide educational coaching, not just trading advice. Help user learn and improve their trading skills."
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+BITCOIN_BASICS_REPLY = "**Bitcoin (BTC)** - The original cryptocurrency!\n\n**Key facts:**\n• **Digital gold** - Store of value\n• **Limited supply** - Only 21M coins\n• **High volatility** - Big gains, big risks\n\n**Trading tip:** Start with small amounts to learn!"
+
+NO_API_KEY_REPLY = "I'm here to help with your crypto trading questions! However, I'm currently unable to access advanced AI features. Please ask me about trading strategies, portfolio management, or platform navigation."
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
     """Get current user using real webapp authentication - connects to actual user data"""
     try:
         # Use the real webapp authentication system
-        user = auth_get_current_user(credentials)
+        user = auth_get_current_user(credentials, db)
         
         # Log current user info
         logger.info(f"Chatbot using real user: {user.id} ({user.username})")
@@ -56,86 +99,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
 async def fetch_user_portfolio_data(user_id: int, db: Session):
     """Fetch user's portfolio and trade history"""
     try:
-        # Get user's wallet balance
-        wallet = db.query(Wallet).filter(Wallet.user_id == user_id).first()
-        balance = float(wallet.balance) if wallet else 0.0
-        
-        # Debug logging
-        logger.info(f"Portfolio fetch for user {user_id}: wallet={wallet}, balance={balance}")
-        if wallet:
-            logger.info(f"Wallet details: user_id={wallet.user_id}, balance={wallet.balance}")
-        
-        # Get user's trades
-        trades = db.query(Trade).filter(Trade.user_id == user_id).order_by(Trade.timestamp.desc()).limit(10).all()
-        
-        # Calculate portfolio holdings
-        holdings = {}
-        for trade in trades:
-            symbol = trade.coin_symbol
-            if symbol not in holdings:
-                holdings[symbol] = {"quantity": 0, "total_cost": 0}
-            
-            if trade.trade_type.value == "buy":
-                holdings[symbol]["quantity"] += float(trade.quantity)
-                holdings[symbol]["total_cost"] += float(trade.quantity * trade.price_at_trade)
-            else:  # sell
-                if holdings[symbol]["quantity"] > 0:
-                    cost_reduction = (float(trade.quantity) / holdings[symbol]["quantity"]) * holdings[symbol]["total_cost"]
-                    holdings[symbol]["total_cost"] -= cost_reduction
-                holdings[symbol]["quantity"] -= float(trade.quantity)
-        
-        # Filter positive holdings and add current prices
-        positive_holdings = {}
-        for symbol, data in holdings.items():
-            if data["quantity"] > 0:
-                # Try to get current price for this symbol
-                try:
-                    from app.services.price_service import CoinGeckoService
-                    price_service = CoinGeckoService()
-                    current_price_data = await price_service.get_price(symbol)
-                    if current_price_data:
-                        data["current_price"] = float(current_price_data.price_usd)
-                        data["price_change_24h"] = float(getattr(current_price_data, 'price_change_percentage_24h', 0))
-                        logger.info(f"Successfully fetched price for {symbol}: ${data['current_price']}")
-                    else:
-                        data["current_price"] = 0.0
-                        data["price_change_24h"] = 0.0
-                        logger.warning(f"No price data returned for {symbol}")
-                except Exception as e:
-                    logger.error(f"Error fetching current price for {symbol}: {e}")
-                    data["current_price"] = 0.0
-                    data["price_change_24h"] = 0.0
-                
-                positive_holdings[symbol] = data
-        
-        # Format recent trades with profit/loss calculation
-        recent_trades = []
-        for trade in trades[:5]:  # Last 5 trades
-            trade_data = {
-                "type": trade.trade_type.value,
-                "coin": trade.coin_symbol,
-                "quantity": float(trade.quantity),
-                "price": float(trade.price_at_trade),
-                "date": trade.timestamp.isoformat() if trade.timestamp else "Unknown"
-            }
-            
-            # Calculate profit/loss if we have current price
-            if trade.coin_symbol in positive_holdings:
-                current_price = positive_holdings[trade.coin_symbol].get("current_price", 0)
-                if current_price > 0:
-                    if trade.trade_type.value == "buy":
-                        trade_data["profit_loss"] = (current_price - float(trade.price_at_trade)) * float(trade.quantity)
-                    else:  # sell
-                        trade_data["profit_loss"] = (float(trade.price_at_trade) - current_price) * float(trade.quantity)
-            
-            recent_trades.append(trade_data)
-        
-        return {
-            "balance": balance,
-            "holdings": positive_holdings,
-            "recent_trades": recent_trades,
-            "total_trades": len(trades)
-        }
+        return (await chat_context_cache.get(user_id, db)).portfolio
     except Exception as e:
         logger.error(f"Error fetching portfolio data: {e}")
         return {
@@ -145,26 +109,24 @@ async def fetch_user_portfolio_data(user_id: int, db: Session):
             "total_trades": 0
         }
 
+def change_percent(price) -> float:
+    """24h change in percent of a PriceResponse"""
+    return float(price.price_change_percentage_24h or 0)
+
 async def fetch_market_data():
     """Fetch current market data for top cryptocurrencies"""
     try:
         # Get prices for top coins
         top_coins = ["BTC", "ETH", "BNB", "XRP", "ADA", "SOL", "DOGE", "AVAX", "DOT", "MATIC"]
-        market_data = {}
+        prices = await price_service.get_market_snapshot(top_coins)
         
-        for coin in top_coins:
-            try:
-                price_response = await price_service.get_price(coin)
-                if price_response:
-                    market_data[coin] = {
-                        "price": float(price_response.price_usd),
-                        "change_24h": float(price_response.price_change_percentage_24h)
-                    }
-            except Exception as e:
-                logger.warning(f"Could not fetch price for {coin}: {e}")
-                continue
-        
-        return market_data
+        return {
+            coin: {
+                "price": float(price_response.price_usd),
+                "change_24h": change_percent(price_response)
+            }
+            for coin, price_response in prices.items()
+        }
     except Exception as e:
         logger.error(f"Error fetching market data: {e}")
         return {}
@@ -221,65 +183,6 @@ async def simulate_trade(entry_price: float, exit_price: float, position_size: f
         logger.error(f"Error simulating trade: {e}")
         return {}
 
-def extract_trade_parameters(message: str) -> Optional[Dict[str, float]]:
-    """Extract trade parameters from user message using regex"""
-    try:
-        # Common patterns for trade simulation requests
-        patterns = {
-            'entry_price': [
-                r'entry[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'buy[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'enter[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'entry[:\s]*price[:\s]*\$?([0-9,]+\.?[0-9]*)'
-            ],
-            'exit_price': [
-                r'exit[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'sell[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'target[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'exit[:\s]*price[:\s]*\$?([0-9,]+\.?[0-9]*)'
-            ],
-            'position_size': [
-                r'position[:\s]*size[:\s]*([0-9,]+\.?[0-9]*)',
-                r'amount[:\s]*([0-9,]+\.?[0-9]*)',
-                r'quantity[:\s]*([0-9,]+\.?[0-9]*)',
-                r'([0-9,]+\.?[0-9]*)\s*(?:btc|bitcoin|eth|ethereum|coins?|tokens?)'
-            ],
-            'leverage': [
-                r'leverage[:\s]*([0-9]+\.?[0-9]*)x?',
-                r'([0-9]+\.?[0-9]*)x\s*leverage',
-                r'([0-9]+\.?[0-9]*)x'
-            ]
-        }
-        
-        extracted = {}
-        message_lower = message.lower()
-        
-        for param, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                match = re.search(pattern, message_lower)
-                if match:
-                    value_str = match.group(1).replace(',', '')
-                    try:
-                        extracted[param] = float(value_str)
-                        break
-                    except ValueError:
-                        continue
-        
-        # If we have at least entry and exit prices, we can simulate
-        if 'entry_price' in extracted and 'exit_price' in extracted:
-            # Set defaults for missing parameters
-            if 'position_size' not in extracted:
-                extracted['position_size'] = 1.0  # Default to 1 unit
-            if 'leverage' not in extracted:
-                extracted['leverage'] = 1.0  # Default to no leverage
-            
-            return extracted
-        
-        return None
-    except Exception as e:
-        logger.error(f"Error extracting trade parameters: {e}")
-        return None
-
 def format_trade_simulation_result(result: Dict[str, Any]) -> str:
     """Format trade simulation result into conversational text"""
     if not result:
@@ -389,60 +292,6 @@ async def calculate_position_size(account_balance: float, risk_percentage: float
         logger.error(f"Error calculating position size: {e}")
         return {}
 
-def extract_position_sizing_parameters(message: str) -> Optional[Dict[str, float]]:
-    """Extract position sizing parameters from user message"""
-    try:
-        patterns = {
-            'account_balance': [
-                r'balance[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'account[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'portfolio[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'capital[:\s]*\$?([0-9,]+\.?[0-9]*)'
-            ],
-            'risk_percentage': [
-                r'risk[:\s]*([0-9]+\.?[0-9]*)\s*%?',
-                r'([0-9]+\.?[0-9]*)\s*%\s*risk',
-                r'risk[:\s]*percentage[:\s]*([0-9]+\.?[0-9]*)',
-                r'([0-9]+\.?[0-9]*)\s*percent[:\s]*risk'
-            ],
-            'entry_price': [
-                r'entry[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'buy[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'enter[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'entry[:\s]*price[:\s]*\$?([0-9,]+\.?[0-9]*)'
-            ],
-            'stop_loss_price': [
-                r'stop[:\s]*loss[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'stop[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'sl[:\s]*\$?([0-9,]+\.?[0-9]*)',
-                r'stop[:\s]*loss[:\s]*price[:\s]*\$?([0-9,]+\.?[0-9]*)'
-            ]
-        }
-        
-        extracted = {}
-        message_lower = message.lower()
-        
-        for param, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                match = re.search(pattern, message_lower)
-                if match:
-                    value_str = match.group(1).replace(',', '')
-                    try:
-                        extracted[param] = float(value_str)
-                        break
-                    except ValueError:
-                        continue
-        
-        # Check if we have all required parameters
-        required_params = ['account_balance', 'risk_percentage', 'entry_price', 'stop_loss_price']
-        if all(param in extracted for param in required_params):
-            return extracted
-        
-        return None
-    except Exception as e:
-        logger.error(f"Error extracting position sizing parameters: {e}")
-        return None
-
 def format_position_sizing_result(result: Dict[str, Any]) -> str:
     """Format position sizing result into beginner-friendly explanation"""
     if not result:
@@ -609,50 +458,11 @@ def format_journal_summary(journal_data: Dict[str, Any]) -> str:
     
     return summary
 
-def extract_journal_parameters(message: str) -> bool:
-    """Check if the message is a journal entry/reflection"""
-    try:
-        message_lower = message.lower()
-        
-        # Strong indicators of journaling (must contain these)
-        strong_journal_indicators = [
-            'i bought', 'i sold', 'i traded', 'i learned', 'i realized', 'i felt',
-            'my trade', 'today i', 'yesterday i', 'this week i', 'i was',
-            'journal', 'reflection', 'reflecting'
-        ]
-        
-        # Check for strong indicators first
-        if any(indicator in message_lower for indicator in strong_journal_indicators):
-            return True
-        
-        # Check for combination of keywords that suggest reflection
-        emotion_words = ['felt', 'feeling', 'excited', 'nervous', 'confident', 'worried', 'happy', 'sad', 'frustrated', 'proud', 'anxious', 'calm']
-        trade_words = ['bought', 'sold', 'traded', 'trade', 'bitcoin', 'btc', 'ethereum', 'eth']
-        learning_words = ['learned', 'lesson', 'realize', 'understand', 'know', 'discover', 'insight', 'takeaway']
-        
-        # Must have at least 2 categories and be a substantial message
-        categories_found = 0
-        if any(word in message_lower for word in emotion_words):
-            categories_found += 1
-        if any(word in message_lower for word in trade_words):
-            categories_found += 1
-        if any(word in message_lower for word in learning_words):
-            categories_found += 1
-        
-        # If we have 2+ categories and message is substantial, likely a journal entry
-        if categories_found >= 2 and len(message) > 80:
-            return True
-        
-        return False
-    except Exception as e:
-        logger.error(f"Error extracting journal parameters: {e}")
-        return False
-
 async def get_onboarding_status(user_id: int, db: Session) -> Dict[str, Any]:
     """Get user's onboarding progress"""
     try:
         # Check if user has made any trades
-        trades_count = db.query(Trade).filter(Trade.user_id == user_id).count()
+        trades_count = (await chat_context_cache.get(user_id, db)).trades_count
         
         # Check if user has any journal entries (we'll store this in a simple way)
         # For now, we'll use a simple approach - in production, you'd have a proper journal table
@@ -680,32 +490,24 @@ async def get_onboarding_status(user_id: int, db: Session) -> Dict[str, Any]:
 async def analyze_portfolio_for_coaching(user_id: int, db: Session) -> Dict[str, Any]:
     """Comprehensive portfolio analysis for coaching purposes"""
     try:
-        # Get user's portfolio data
-        portfolio_data = await fetch_user_portfolio_data(user_id, db)
-        
-        # Get user's wallet
-        wallet = db.query(Wallet).filter(Wallet.user_id == user_id).first()
-        balance = float(wallet.balance) if wallet else 0.0
-        
-        # Get all user's trades for analysis
-        all_trades = db.query(Trade).filter(Trade.user_id == user_id).order_by(Trade.timestamp.desc()).all()
+        # Wallet, holdings and trade totals come from the shared chat context
+        context = await chat_context_cache.get(user_id, db)
+        portfolio_data = context.portfolio
+        balance = context.balance
+        trade_stats = context.trade_stats
         
         # Analyze trading patterns
+        total_trades = trade_stats["total_trades"]
         trading_analysis = {
-            "total_trades": len(all_trades),
-            "buy_trades": len([t for t in all_trades if t.trade_type.value == "buy"]),
-            "sell_trades": len([t for t in all_trades if t.trade_type.value == "sell"]),
-            "unique_coins_traded": len(set([t.coin_symbol for t in all_trades])),
-            "avg_trade_size": 0,
-            "total_volume": 0,
-            "trading_frequency": "new" if len(all_trades) < 3 else "active" if len(all_trades) < 10 else "experienced"
+            "total_trades": total_trades,
+            "buy_trades": trade_stats["buy_trades"],
+            "sell_trades": trade_stats["sell_trades"],
+            "unique_coins_traded": trade_stats["unique_coins_traded"],
+            "avg_trade_size": trade_stats["total_volume"] / total_trades if total_trades else 0,
+            "total_volume": trade_stats["total_volume"],
+            "trading_frequency": "new" if total_trades < 3 else "active" if total_trades < 10 else "experienced"
         }
         
-        if all_trades:
-            total_volume = sum(float(t.quantity * t.price_at_trade) for t in all_trades)
-            trading_analysis["total_volume"] = total_volume
-            trading_analysis["avg_trade_size"] = total_volume / len(all_trades)
-        
         # Analyze current holdings
         holdings_analysis = {
             "diversification_score": 0,
@@ -1089,89 +891,284 @@ I'm here to help you with:
 
 What would you like to work on today?"""
 
-async def call_openai_api(user_message: str, context: str):
-    """Call OpenAI API with user message and context"""
-    try:
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        if not openai_api_key:
-            logger.warning("OpenAI API key not found, using fallback response")
-            return "I'm here to help with your crypto trading questions! However, I'm currently unable to access advanced AI features. Please ask me about trading strategies, portfolio management, or platform navigation."
-        
-        system_prompt = """You are an expert crypto trading COACH and mentor with access to the user's real portfolio data. Your primary role is to EDUCATE and GUIDE users to become better traders.
+def onboarding_reply(onboarding_status: Dict[str, Any], intent) -> str:
+    """Onboarding guidance; the same for every user at the same step, so it is cached"""
+    step = onboarding_status.get("onboarding_step", "welcome")
+    is_new_user = onboarding_status.get("is_new_user", True)
+    trades_count = onboarding_status.get("trades_count", 0)
+    key = ("onboarding", step, is_new_user, trades_count, intent.params["first_trade"], intent.params["risk_management"])
+    reply = reply_cache.get(key)
+    if reply is not None:
+        return reply
 
-**Your core mission:**
-- Analyze user's balance and portfolio holdings to provide personalized coaching
-- Teach trading concepts through their actual portfolio data
-- Provide educational tips and learning recommendations
-- Help users understand risk management and portfolio optimization
-- Guide users to make informed decisions based on their current situation
+    reply = format_onboarding_response(onboarding_status, "")
+    
+    # Add specific guidance based on user's message
+    if intent.params["first_trade"]:
+        reply += f"\n\n🎯 **Step-by-Step First Trade Guide:**\n"
+        reply += f"1. Go to the Trading page\n"
+        reply += f"2. Select Bitcoin (BTC) - it's the most stable for beginners\n"
+        reply += f"3. Choose a small amount (like $100-500)\n"
+        reply += f"4. Set a stop loss at 5-10% below entry price\n"
+        reply += f"5. Click 'Buy' and watch your trade\n"
+        reply += f"6. Come back and journal about your experience!\n\n"
+        reply += f"Need help with any of these steps? Just ask!"
+    
+    elif intent.params["risk_management"]:
+        reply += f"\n\n🛡️ **Risk Management Basics:**\n"
+        reply += f"• Never risk more than 1-2% of your account per trade\n"
+        reply += f"• Always set stop losses to limit losses\n"
+        reply += f"• Use position sizing to control risk\n"
+        reply += f"• Start small and learn before increasing size\n\n"
+        reply += f"Want me to calculate a safe position size for you? Just tell me your account balance and risk tolerance!"
+    
+    reply_cache.put(key, reply)
+    return reply
 
-**Your coaching approach:**
-- Always analyze their current balance and holdings first
-- Explain WHY certain strategies work based on their portfolio
-- Provide educational insights about their trading patterns
-- Suggest learning opportunities based on their current holdings
-- Help them understand market dynamics through their portfolio
+async def bitcoin_reply() -> str:
+    """Bitcoin explainer with the live price; cached until BTC's price is refreshed"""
+    key = ("explain_bitcoin",)
+    reply = reply_cache.get(key)
+    if reply is not None:
+        return reply
+    btc_price = await price_service.get_price("BTC")
+    if not btc_price:
+        return BITCOIN_BASICS_REPLY
+    reply = f"**Bitcoin (BTC)** - The king of crypto!\n\n**Current Price:** **${btc_price.price_usd:,.2f}** ({change_percent(btc_price):+.2f}%)\n\n**Why Bitcoin?**\n• **Store of value** - Digital gold\n• **Limited supply** - Only 21M will ever exist\n• **Institutional adoption** - Major companies buying\n\n**Trading tip:** Perfect for long-term holds!"
+    reply_cache.put(key, reply, tags=["BTC"])
+    return reply
 
-**Response style:**
-- Be educational and mentoring-focused
-- Use **bold** for important numbers and crypto symbols
-- Explain concepts clearly for learning
-- Always reference their actual balance and holdings
-- Provide actionable learning steps
-- Be encouraging and supportive
+def market_stage(portfolio_data: Dict[str, Any]) -> str:
+    """The only part of the user's portfolio the market overview depends on"""
+    if portfolio_data.get("holdings"):
+        return "holding"
+    return "funded" if portfolio_data.get("balance", 0) > 0 else "unfunded"
 
-**Format examples:**
-- Crypto symbols: **BTC**, **ETH**, **SOL**
-- Prices: **$50,000**, **$3,500**
-- Percentages: **+2.5%**, **-1.2%**
-- User balance: **$2,144,111** (use their actual balance)
+async def market_overview_reply(stage: str) -> str:
+    """Market overview for BTC, ETH and SOL plus a learning path for the user's stage.
 
-**Key coaching rules:**
-- Always start by analyzing their current portfolio situation
-- Explain trading concepts using their actual data
-- Provide educational insights about their holdings
-- Suggest learning opportunities based on their portfolio
-- Help them understand risk management with their balance
-- Guide them to make informed decisions, don't just execute trades"""
-        
-        user_prompt = f"""User: {user_message}
+    Cached per stage until any of the three prices is refreshed.
+    """
+    key = ("market_analysis", stage)
+    reply = reply_cache.get(key)
+    if reply is not None:
+        return reply
+
+    # Get current prices for top cryptos, fetched together
+    prices = await price_service.get_market_snapshot(["BTC", "ETH", "SOL"])
+    btc_price, eth_price, sol_price = prices.get("BTC"), prices.get("ETH"), prices.get("SOL")
+    
+    # Start with educational approach
+    recommendations = ["**🎓 Crypto Education & Market Analysis:**\n"]
+    
+    if btc_price:
+        btc_trend = "📈" if change_percent(btc_price) > 0 else "📉"
+        recommendations.append(f"**Bitcoin (BTC):** ${btc_price.price_usd:,.0f} {btc_trend} {change_percent(btc_price):+.2f}%")
+        recommendations.append("• **What it is:** Digital gold, store of value")
+        recommendations.append("• **Why it matters:** Limited supply (21M), institutional adoption")
+        recommendations.append("• **Learning opportunity:** Study long-term value investing")
+        recommendations.append("• **Risk level:** Lower volatility, good for beginners")
+    
+    if eth_price:
+        eth_trend = "📈" if change_percent(eth_price) > 0 else "📉"
+        recommendations.append(f"\n**Ethereum (ETH):** ${eth_price.price_usd:,.0f} {eth_trend} {change_percent(eth_price):+.2f}%")
+        recommendations.append("• **What it is:** Smart contract platform, DeFi leader")
+        recommendations.append("• **Why it matters:** Powers decentralized applications")
+        recommendations.append("• **Learning opportunity:** Understand DeFi and Web3")
+        recommendations.append("• **Risk level:** Higher volatility, more complex")
+    
+    if sol_price:
+        sol_trend = "📈" if change_percent(sol_price) > 0 else "📉"
+        recommendations.append(f"\n**Solana (SOL):** ${sol_price.price_usd:,.0f} {sol_trend} {change_percent(sol_price):+.2f}%")
+        recommendations.append("• **What it is:** Fast blockchain for DeFi and NFTs")
+        recommendations.append("• **Why it matters:** Low fees, high speed")
+        recommendations.append("• **Learning opportunity:** Explore NFT and DeFi ecosystems")
+        recommendations.append("• **Risk level:** Higher volatility, newer technology")
+    
+    # Personalized learning recommendations based on their situation
+    recommendations.append(f"\n**🎯 Personalized Learning Path:**")
+    
+    if stage == "funded":
+        recommendations.append("• **You're ready to start!** Begin with small amounts")
+        recommendations.append("• **Learning focus:** Understand each crypto's purpose")
+        recommendations.append("• **Start with:** $100-500 in one coin to learn")
+    elif stage == "holding":
+        recommendations.append("• **You're already investing!** Focus on understanding your holdings")
+        recommendations.append("• **Learning focus:** Portfolio optimization and risk management")
+        recommendations.append("• **Next step:** Analyze your current positions")
+    else:
+        recommendations.append("• **Start with education** before investing")
+        recommendations.append("• **Learning focus:** Crypto fundamentals and market dynamics")
+        recommendations.append("• **Next step:** Top up your wallet when ready")
+    
+    # Educational approach to recommendations
+    recommendations.append(f"\n**📚 Educational Approach:**")
+    recommendations.append("• **Don't just buy** - understand what you're investing in")
+    recommendations.append("• **Start small** - learn with amounts you can afford to lose")
+    recommendations.append("• **Diversify gradually** - don't put everything in one coin")
+    recommendations.append("• **Learn continuously** - crypto markets evolve rapidly")
+    
+    recommendations.append(f"\n**💡 Ready to learn more?** Ask me to analyze your portfolio or explain specific concepts!")
+    
+    reply = "\n".join(recommendations)
+    # An overview missing a coin's price is not kept; the next message tries again
+    if btc_price and eth_price and sol_price:
+        reply_cache.put(key, reply, tags=["BTC", "ETH", "SOL"])
+    return reply
+
+def shared_completion_key(user_message: str):
+    """Cache key for a language model answer every user can share, or None.
+
+    Only with the completion cache enabled, and only for messages that say
+    nothing about the user; those are answered without their portfolio.
+    """
+    if completion_cache.enabled and is_context_free(user_message):
+        return (openai_client.model, normalize_message(user_message))
+    return None
+
+async def build_coaching_context(user_id: int, db: Session) -> str:
+    """Portfolio, trading and market summary the language model coaches from"""
+    # Fetch user's portfolio and trade data
+    portfolio_data = await fetch_user_portfolio_data(user_id, db)
+    
+    # Build comprehensive coaching context for intelligent responses
+    context_parts = []
+    
+    # User portfolio context for coaching
+    balance = portfolio_data.get("balance", 0)
+    holdings = portfolio_data.get("holdings", {})
+    recent_trades = portfolio_data.get("recent_trades", [])
+    
+    # Determine user's coaching level
+    total_trades = len(recent_trades)
+    if total_trades < 3:
+        coaching_level = "beginner"
+    elif total_trades < 10:
+        coaching_level = "intermediate"
+    else:
+        coaching_level = "advanced"
+    
+    context_parts.append(f"COACHING LEVEL: {coaching_level}")
+    
+    if balance > 0:
+        context_parts.append(f"User has ${balance:,.0f} available balance")
+        if holdings:
+            holdings_list = []
+            total_value = 0
+            for coin, data in holdings.items():
+                quantity = data.get("quantity", 0)
+                current_price = data.get("current_price", 0)
+                value = quantity * current_price
+                total_value += value
+                holdings_list.append(f"{coin}: {quantity:.4f} coins (${value:,.0f})")
+            
+            context_parts.append(f"Portfolio: {len(holdings)} coins, total value ${total_value:,.0f}")
+            context_parts.append(f"Holdings: {', '.join(holdings_list)}")
+            
+            # Add coaching insights about their portfolio
+            if len(holdings) == 1:
+                context_parts.append("PORTFOLIO INSIGHT: User is concentrated in one asset - teach about diversification")
+            elif len(holdings) <= 3:
+                context_parts.append("PORTFOLIO INSIGHT: User has moderate diversification - suggest optimization")
+            else:
+                context_parts.append("PORTFOLIO INSIGHT: User has good diversification - focus on advanced strategies")
+        else:
+            context_parts.append("No current holdings - ready to start trading")
+            context_parts.append("COACHING FOCUS: Teach basics and help with first investment")
+    else:
+        context_parts.append("New user with no balance - needs to top up wallet")
+        context_parts.append("COACHING FOCUS: Education first, trading later")
+    
+    # Recent trading activity for coaching insights
+    if recent_trades:
+        context_parts.append(f"Recent activity: {len(recent_trades)} trades")
+        profitable_trades = sum(1 for trade in recent_trades if trade.get('profit_loss', 0) > 0)
+        if len(recent_trades) > 0:
+            win_rate = (profitable_trades / len(recent_trades)) * 100
+            context_parts.append(f"Trading performance: {win_rate:.1f}% win rate")
+            
+            # Add coaching insights about trading performance
+            if win_rate > 70:
+                context_parts.append("TRADING INSIGHT: User has good performance - focus on scaling and optimization")
+            elif win_rate > 50:
+                context_parts.append("TRADING INSIGHT: User has decent performance - focus on consistency and risk management")
+            else:
+                context_parts.append("TRADING INSIGHT: User needs to improve performance - focus on education and strategy")
+    
+    # Market context for educational opportunities
+    try:
+        prices = await price_service.get_market_snapshot(["BTC", "ETH"])
+        for coin, price in prices.items():
+            context_parts.append(f"{coin}: ${price.price_usd:,.0f} ({change_percent(price):+.1f}%)")
+    except:
+        pass
+    
+    # Add coaching mission
+    context_parts.append("MISSION: Provide educational coaching, not just trading advice. Help user learn and improve their trading skills.")
+    
+    return " | ".join(context_parts)
+
+def coaching_messages(user_message: str, context: str) -> List[Dict[str, str]]:
+    """Completion request messages; the system prompt is the same for every chat"""
+    user_prompt = f"""User: {user_message}
         
         Context: {context}
         
         Respond quickly and concisely.provide a helpful response based on the user's portfolio and current market."""
+    return [COACH_SYSTEM_MESSAGE, {"role": "user", "content": user_prompt}]
+
+async def call_openai_api(user_message: str, context: str, cache_key=None):
+    """Call OpenAI API with user message and context; with a cache_key, repeats are answered from the completion cache"""
+    try:
+        if not openai_client.api_key:
+            logger.warning("OpenAI API key not found, using fallback response")
+            return NO_API_KEY_REPLY
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {openai_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4",
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "max_tokens": 500,
-                    "temperature": 0.7,
-                    "stream": False
-                },
-                timeout=10.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data["choices"][0]["message"]["content"].strip()
-            else:
-                logger.error(f"OpenAI API error: {response.status_code} - {response.text}")
-                return "I'm having trouble processing your request right now. Please try again in a moment."
-                
+        if cache_key is None:
+            return await openai_client.complete(coaching_messages(user_message, context))
+        return await completion_cache.get_or_compute(
+            cache_key, lambda: openai_client.complete(coaching_messages(user_message, context))
+        )
+    
+    except OpenAIError as e:
+        logger.error(f"OpenAI API error: {e}")
+        return "I'm having trouble processing your request right now. Please try again in a moment."
     except Exception as e:
         logger.error(f"Error calling OpenAI API: {e}")
         return "I'm experiencing technical difficulties. Please try again later or contact support if the issue persists."
 
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """One server-sent event; JSON keeps newlines in the text from ending the event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def iter_events(events: List[str]) -> AsyncIterator[str]:
+    for event in events:
+        yield event
+
+async def stream_coaching_reply(user_message: str, context: str, client: OpenAIClient = openai_client,
+                                cache_key=None) -> AsyncIterator[str]:
+    """Relay the completion to the browser as SSE "delta" events, then a "done" event.
+
+    With a cache_key, a completed reply is also stored in the completion cache.
+    """
+    if not client.api_key:
+        logger.warning("OpenAI API key not found, using fallback response")
+        yield sse_event({"delta": NO_API_KEY_REPLY})
+        yield sse_event({}, "done")
+        return
+    deltas = []
+    try:
+        async for delta in client.stream(coaching_messages(user_message, context)):
+            deltas.append(delta)
+            yield sse_event({"delta": delta})
+        if cache_key is not None:
+            completion_cache.put(cache_key, "".join(deltas).strip())
+    except Exception as e:
+        logger.error(f"Error streaming OpenAI reply: {e}")
+        yield sse_event({"message": "I'm having trouble processing your request right now. Please try again in a moment."}, "error")
+    yield sse_event({}, "done")
+
 @router.post("/api/chatbot", response_model=ChatResponse)
 async def chatbot_endpoint(
     message_data: ChatMessage,
@@ -1187,26 +1184,16 @@ async def chatbot_endpoint(
         # Get user's onboarding status
         onboarding_status = await get_onboarding_status(user.id, db)
         
+        # Route the message once; the branches below handle one intent each
+        intent = classify(user_message)
+        
         # Check if user wants to buy crypto - ACT AS TRADING AGENT
-        if any(keyword in user_message.lower() for keyword in ['buy', 'purchase', 'get bitcoin', 'get btc', 'buy bitcoin', 'buy btc', 'buy ethereum', 'buy eth', 'buy solana', 'buy sol']):
+        if intent.name == "buy":
             try:
-                # Extract amount from message (default to $100 if not specified)
-                amount_match = re.search(r'\$?(\d+(?:\.\d+)?)', user_message)
-                amount_usd = float(amount_match.group(1)) if amount_match else 100.0
-                
-                # Detect which cryptocurrency to buy
-                crypto_symbol = "BTC"  # Default to Bitcoin
-                crypto_name = "Bitcoin"
-                
-                if any(coin in user_message.lower() for coin in ['ethereum', 'eth']):
-                    crypto_symbol = "ETH"
-                    crypto_name = "Ethereum"
-                elif any(coin in user_message.lower() for coin in ['solana', 'sol']):
-                    crypto_symbol = "SOL"
-                    crypto_name = "Solana"
-                elif any(coin in user_message.lower() for coin in ['bitcoin', 'btc']):
-                    crypto_symbol = "BTC"
-                    crypto_name = "Bitcoin"
+                # Amount defaults to $100 if not specified, coin to Bitcoin
+                amount_usd = intent.params["amount_usd"]
+                crypto_symbol = intent.params["symbol"]
+                crypto_name = intent.params["name"]
                 
                 # Get current crypto price
                 logger.info(f"Attempting to get price for {crypto_symbol}")
@@ -1222,7 +1209,7 @@ async def chatbot_endpoint(
                     fallback_price = fallback_prices.get(crypto_symbol, 100.0)
                     crypto_price = type('PriceResponse', (), {
                         'price_usd': fallback_price,
-                        'change_24h_percent': 0.0
+                        'price_change_percentage_24h': 0.0
                     })()
                     logger.warning(f"Using fallback price for {crypto_symbol}: ${fallback_price} (API failed)")
                 
@@ -1234,37 +1221,21 @@ async def chatbot_endpoint(
                 if not user_wallet or user_wallet.balance < amount_usd:
                     return ChatResponse(reply=f"❌ **Insufficient balance!**\n\nYou need ${amount_usd:.2f} but only have ${user_wallet.balance if user_wallet else 0:.2f}.\n\n💡 **Top up your wallet first!**")
                 
-                # Execute the actual buy order by creating trade directly
-                from app.models.trade import Trade
-                from decimal import Decimal
-                from datetime import datetime
-                
-                # Create the trade record directly
-                new_trade = Trade(
-                    user_id=user.id,
-                    coin_symbol=crypto_symbol,
-                    trade_type="buy",
-                    quantity=Decimal(str(crypto_amount)),
-                    price_at_trade=Decimal(str(crypto_price.price_usd)),
-                    total_cost=Decimal(str(amount_usd))
+                # Execute the buy through the same single-transaction pipeline as /trade/buy
+                new_trade, _, _ = TradeService(db).execute(
+                    user.id,
+                    crypto_symbol,
+                    TradeType.BUY,
+                    Decimal(str(crypto_amount)),
+                    Decimal(str(crypto_price.price_usd))
                 )
                 
-                # Add to database
-                db.add(new_trade)
-                db.commit()
-                db.refresh(new_trade)
-                
-                # Update user's wallet balance
-                if user_wallet:
-                    user_wallet.balance -= Decimal(str(amount_usd))
-                    db.commit()
-                
                 if new_trade:
                     reply = f"✅ **{crypto_name} Purchase Executed!**\n\n"
                     reply += f"**Amount:** ${amount_usd:.2f}\n"
                     reply += f"**{crypto_name} Received:** {crypto_amount:.8f} {crypto_symbol}\n"
                     reply += f"**Price:** ${crypto_price.price_usd:,.2f}\n"
-                    reply += f"**24h Change:** {crypto_price.change_24h_percent:+.2f}%\n\n"
+                    reply += f"**24h Change:** {change_percent(crypto_price):+.2f}%\n\n"
                     reply += f"🎉 **Your {crypto_name} is now in your portfolio!**"
                 else:
                     reply = f"❌ **Purchase failed!** Please try again or contact support."
@@ -1277,7 +1248,7 @@ async def chatbot_endpoint(
                 return ChatResponse(reply=f"❌ **Purchase failed!** Error: {str(e)}")
 
         # Check if user is writing a journal entry/reflection
-        if extract_journal_parameters(user_message):
+        if intent.name == "journal":
             # Create journal entry
             journal_data = await create_journal_entry(user_message, user.id, db)
             if journal_data:
@@ -1294,8 +1265,8 @@ async def chatbot_endpoint(
                 return ChatResponse(reply=reply)
         
         # Check if user is asking for position sizing (check this first)
-        position_params = extract_position_sizing_parameters(user_message)
-        if position_params:
+        if intent.name == "position_sizing":
+            position_params = intent.params
             # Calculate safe position size
             position_result = await calculate_position_size(
                 position_params['account_balance'],
@@ -1321,7 +1292,7 @@ async def chatbot_endpoint(
         portfolio_data = await fetch_user_portfolio_data(user.id, db)
         
         # Quick responses for common questions (faster than API calls)
-        if any(keyword in user_message.lower() for keyword in ['hello', 'hi', 'hey']):
+        if intent.name == "greeting":
             balance = portfolio_data.get("balance", 0)
             holdings = portfolio_data.get("holdings", {})
             
@@ -1332,18 +1303,13 @@ async def chatbot_endpoint(
             else:
                 return ChatResponse(reply="🚀 **Welcome to Crypto Trading Education!**\n\nI'm your personal trading coach. Let me help you learn the fundamentals before you start trading!\n\n**📚 What would you like to learn?**\n• **Crypto basics** - Understand different cryptocurrencies\n• **Trading fundamentals** - Learn how markets work\n• **Risk management** - Protect your capital\n• **Portfolio strategy** - Build a solid foundation")
         
-        if any(keyword in user_message.lower() for keyword in ['what is bitcoin', 'what is btc', 'explain bitcoin']):
-            # Get current BTC price
+        if intent.name == "explain_bitcoin":
             try:
-                btc_price = await price_service.get_price("BTC")
-                if btc_price:
-                    return ChatResponse(reply=f"**Bitcoin (BTC)** - The king of crypto!\n\n**Current Price:** **${btc_price.price_usd:,.2f}** ({btc_price.change_24h_percent:+.2f}%)\n\n**Why Bitcoin?**\n• **Store of value** - Digital gold\n• **Limited supply** - Only 21M will ever exist\n• **Institutional adoption** - Major companies buying\n\n**Trading tip:** Perfect for long-term holds!")
-                else:
-                    return ChatResponse(reply="**Bitcoin (BTC)** - The original cryptocurrency!\n\n**Key facts:**\n• **Digital gold** - Store of value\n• **Limited supply** - Only 21M coins\n• **High volatility** - Big gains, big risks\n\n**Trading tip:** Start with small amounts to learn!")
+                return ChatResponse(reply=await bitcoin_reply())
             except:
-                return ChatResponse(reply="**Bitcoin (BTC)** - The original cryptocurrency!\n\n**Key facts:**\n• **Digital gold** - Store of value\n• **Limited supply** - Only 21M coins\n• **High volatility** - Big gains, big risks\n\n**Trading tip:** Start with small amounts to learn!")
+                return ChatResponse(reply=BITCOIN_BASICS_REPLY)
         
-        if any(keyword in user_message.lower() for keyword in ['how to buy', 'how to trade', 'how to start trading']):
+        if intent.name == "how_to_trade":
             balance = portfolio_data.get("balance", 0)
             if balance > 0:
                 return ChatResponse(reply=f"**Ready to trade with ${balance:,.2f}!**\n\n**Quick Start:**\n1. **Choose crypto** - BTC, ETH, SOL available\n2. **Set amount** - Start with $100-500\n3. **Place order** - I can execute it for you!\n\n**Just say:** \"Buy $200 of Bitcoin\" and I'll do it!")
@@ -1351,7 +1317,7 @@ async def chatbot_endpoint(
                 return ChatResponse(reply="**How to start trading:**\n\n1. **Top up wallet** - Add funds first\n2. **Choose crypto** - BTC, ETH, SOL available\n3. **Set amount** - Start with $100-500\n4. **Place order** - Use trading page\n\n**💡 Tip:** Start with $100-500 to learn!")
         
         # Add more specific question handling
-        if any(keyword in user_message.lower() for keyword in ['what should i buy', 'what crypto to buy', 'recommendations']):
+        if intent.name == "recommendation":
             balance = portfolio_data.get("balance", 0)
             holdings = portfolio_data.get("holdings", {})
             
@@ -1363,91 +1329,30 @@ async def chatbot_endpoint(
             else:
                 return ChatResponse(reply="**First, fund your account!**\n\n**Recommended starting amount:** $500-1000\n\n**Then I'll recommend:**\n• **Bitcoin** - 50% (stability)\n• **Ethereum** - 30% (growth)\n• **Solana** - 20% (potential)\n\n**Top up your wallet and ask again!**")
         
-        if any(keyword in user_message.lower() for keyword in ['when to sell', 'when to buy', 'timing', 'market timing']):
+        if intent.name == "timing":
             return ChatResponse(reply="**Market Timing Strategy:**\n\n**🟢 When to BUY:**\n• **Dips:** 5-10% below recent highs\n• **Support levels:** Previous resistance becomes support\n• **Fear:** When everyone's selling (contrarian)\n\n**🔴 When to SELL:**\n• **Take profits:** 20-50% gains\n• **Stop losses:** 5-10% below entry\n• **Greed:** When everyone's buying (contrarian)\n\n**💡 Pro tip:** Don't try to time perfectly - DCA works better!\n\n**What's your current situation?**")
         
-        if any(keyword in user_message.lower() for keyword in ['risk management', 'how to protect', 'stop loss']):
+        if intent.name == "risk_management":
             balance = portfolio_data.get("balance", 0)
             return ChatResponse(reply=f"**Risk Management Rules:**\n\n**🛡️ Position Sizing:**\n• **Never risk more than 2-5% per trade**\n• **With ${balance:,.2f}:** Max $1,000-2,500 per trade\n\n**📉 Stop Losses:**\n• **Set at 5-10% below entry**\n• **Protects your capital**\n• **Emotional discipline**\n\n**📊 Diversification:**\n• **Spread across 3-5 assets**\n• **Don't put all eggs in one basket**\n• **Rebalance monthly**\n\n**🎯 Risk-Reward:**\n• **Aim for 2:1 or 3:1 ratios**\n• **Risk $100 to make $200-300**\n\n**Want me to calculate your position size?**")
         
-        if any(keyword in user_message.lower() for keyword in ['help', 'what can you do', 'commands']):
+        if intent.name == "help":
             return ChatResponse(reply="**I can help you with:**\n\n**💰 Trading:**\n• \"Buy $200 of Bitcoin\"\n• \"What should I buy?\"\n• \"When to sell?\"\n\n**📊 Analysis:**\n• \"Analyze my portfolio\"\n• \"Risk management\"\n• \"Market timing\"\n\n**🎓 Education:**\n• \"What is Bitcoin?\"\n• \"How to start trading?\"\n• \"Explain Ethereum\"\n\n**Just ask me anything about crypto trading!**")
         
         # If it's a question but not handled above, provide a helpful response
-        if '?' in user_message or any(word in user_message.lower() for word in ['what', 'how', 'why', 'when', 'where', 'which']):
+        if intent.name == "question":
             return ChatResponse(reply="**I'd be happy to help with that!**\n\n**Can you be more specific?** For example:\n• \"What is Bitcoin?\"\n• \"How do I buy crypto?\"\n• \"When should I sell?\"\n• \"What's my portfolio worth?\"\n\n**Or just ask me to analyze your portfolio!**")
 
         # Market analysis and crypto education
-        if any(keyword in user_message.lower() for keyword in ['best crypto', 'which crypto', 'what to buy', 'market analysis', 'crypto recommendation', 'best investment', 'learn about crypto', 'crypto education']):
+        if intent.name == "market_analysis":
             try:
-                # Get current prices for top cryptos
-                btc_price = await price_service.get_price("BTC")
-                eth_price = await price_service.get_price("ETH")
-                sol_price = await price_service.get_price("SOL")
-                
-                balance = portfolio_data.get("balance", 0)
-                holdings = portfolio_data.get("holdings", {})
-                
-                # Start with educational approach
-                recommendations = ["**🎓 Crypto Education & Market Analysis:**\n"]
-                
-                if btc_price:
-                    btc_trend = "📈" if btc_price.change_24h_percent > 0 else "📉"
-                    recommendations.append(f"**Bitcoin (BTC):** ${btc_price.price_usd:,.0f} {btc_trend} {btc_price.change_24h_percent:+.2f}%")
-                    recommendations.append("• **What it is:** Digital gold, store of value")
-                    recommendations.append("• **Why it matters:** Limited supply (21M), institutional adoption")
-                    recommendations.append("• **Learning opportunity:** Study long-term value investing")
-                    recommendations.append("• **Risk level:** Lower volatility, good for beginners")
-                
-                if eth_price:
-                    eth_trend = "📈" if eth_price.change_24h_percent > 0 else "📉"
-                    recommendations.append(f"\n**Ethereum (ETH):** ${eth_price.price_usd:,.0f} {eth_trend} {eth_price.change_24h_percent:+.2f}%")
-                    recommendations.append("• **What it is:** Smart contract platform, DeFi leader")
-                    recommendations.append("• **Why it matters:** Powers decentralized applications")
-                    recommendations.append("• **Learning opportunity:** Understand DeFi and Web3")
-                    recommendations.append("• **Risk level:** Higher volatility, more complex")
-                
-                if sol_price:
-                    sol_trend = "📈" if sol_price.change_24h_percent > 0 else "📉"
-                    recommendations.append(f"\n**Solana (SOL):** ${sol_price.price_usd:,.0f} {sol_trend} {sol_price.change_24h_percent:+.2f}%")
-                    recommendations.append("• **What it is:** Fast blockchain for DeFi and NFTs")
-                    recommendations.append("• **Why it matters:** Low fees, high speed")
-                    recommendations.append("• **Learning opportunity:** Explore NFT and DeFi ecosystems")
-                    recommendations.append("• **Risk level:** Higher volatility, newer technology")
-                
-                # Personalized learning recommendations based on their situation
-                recommendations.append(f"\n**🎯 Personalized Learning Path:**")
-                
-                if balance > 0 and not holdings:
-                    recommendations.append("• **You're ready to start!** Begin with small amounts")
-                    recommendations.append("• **Learning focus:** Understand each crypto's purpose")
-                    recommendations.append("• **Start with:** $100-500 in one coin to learn")
-                elif holdings:
-                    recommendations.append("• **You're already investing!** Focus on understanding your holdings")
-                    recommendations.append("• **Learning focus:** Portfolio optimization and risk management")
-                    recommendations.append("• **Next step:** Analyze your current positions")
-                else:
-                    recommendations.append("• **Start with education** before investing")
-                    recommendations.append("• **Learning focus:** Crypto fundamentals and market dynamics")
-                    recommendations.append("• **Next step:** Top up your wallet when ready")
-                
-                # Educational approach to recommendations
-                recommendations.append(f"\n**📚 Educational Approach:**")
-                recommendations.append("• **Don't just buy** - understand what you're investing in")
-                recommendations.append("• **Start small** - learn with amounts you can afford to lose")
-                recommendations.append("• **Diversify gradually** - don't put everything in one coin")
-                recommendations.append("• **Learn continuously** - crypto markets evolve rapidly")
-                
-                recommendations.append(f"\n**💡 Ready to learn more?** Ask me to analyze your portfolio or explain specific concepts!")
-                
-                return ChatResponse(reply="\n".join(recommendations))
-                
+                return ChatResponse(reply=await market_overview_reply(market_stage(portfolio_data)))
             except Exception as e:
                 logger.error(f"Error getting market analysis: {e}")
                 return ChatResponse(reply="**🎓 Crypto Education:**\n\n**Top Learning Opportunities:**\n• **Bitcoin (BTC)** - Digital gold, store of value\n• **Ethereum (ETH)** - Smart contracts, DeFi leader\n• **Solana (SOL)** - Fast, cheap transactions\n\n**💡 Learning tip:** Start by understanding what each crypto does, not just their prices!")
         
         # Portfolio analysis requests - Now with comprehensive coaching
-        if any(keyword in user_message.lower() for keyword in ['analyze my portfolio', 'portfolio analysis', 'analyze portfolio', 'portfolio review', 'my portfolio', 'portfolio performance', 'coach me', 'help me learn', 'trading coach', 'mentor me']):
+        if intent.name == "portfolio_coaching":
             try:
                 # Get comprehensive coaching analysis
                 coaching_analysis = await analyze_portfolio_for_coaching(user.id, db)
@@ -1463,36 +1368,17 @@ async def chatbot_endpoint(
                 return ChatResponse(reply="❌ **Unable to analyze your portfolio right now.** Please try again later.")
         
         # Check if user is asking for onboarding help (only for specific onboarding messages)
-        if any(keyword in user_message.lower() for keyword in ['help me', 'guide me', 'mentor', 'onboarding', 'new to trading', 'first trade', 'start trading', 'begin trading', 'how to start', 'i am new', 'beginner', 'getting started']):
+        if intent.name == "onboarding":
             
             # Provide onboarding guidance
-            reply = format_onboarding_response(onboarding_status, user_message)
-            
-            # Add specific guidance based on user's message
-            if 'first trade' in user_message.lower() or 'make trade' in user_message.lower():
-                reply += f"\n\n🎯 **Step-by-Step First Trade Guide:**\n"
-                reply += f"1. Go to the Trading page\n"
-                reply += f"2. Select Bitcoin (BTC) - it's the most stable for beginners\n"
-                reply += f"3. Choose a small amount (like $100-500)\n"
-                reply += f"4. Set a stop loss at 5-10% below entry price\n"
-                reply += f"5. Click 'Buy' and watch your trade\n"
-                reply += f"6. Come back and journal about your experience!\n\n"
-                reply += f"Need help with any of these steps? Just ask!"
-            
-            elif 'risk management' in user_message.lower():
-                reply += f"\n\n🛡️ **Risk Management Basics:**\n"
-                reply += f"• Never risk more than 1-2% of your account per trade\n"
-                reply += f"• Always set stop losses to limit losses\n"
-                reply += f"• Use position sizing to control risk\n"
-                reply += f"• Start small and learn before increasing size\n\n"
-                reply += f"Want me to calculate a safe position size for you? Just tell me your account balance and risk tolerance!"
+            reply = onboarding_reply(onboarding_status, intent)
             
             logger.info(f"Onboarding guidance provided for user {user.id}: {user_message[:50]}...")
             return ChatResponse(reply=reply)
         
         # Check if user is asking for trade simulation
-        trade_params = extract_trade_parameters(user_message)
-        if trade_params:
+        if intent.name == "trade_simulation":
+            trade_params = intent.params
             # Simulate the trade
             simulation_result = await simulate_trade(
                 trade_params['entry_price'],
@@ -1531,94 +1417,15 @@ async def chatbot_endpoint(
                 return ChatResponse(reply=reply)
         
         # Regular chatbot flow for non-simulation requests
-        # Fetch user's portfolio and trade data
-        portfolio_data = await fetch_user_portfolio_data(user.id, db)
-        
-        # Fetch current market data
-        market_data = await fetch_market_data()
-        
-        # Build comprehensive coaching context for intelligent responses
-        context_parts = []
-        
-        # User portfolio context for coaching
-        balance = portfolio_data.get("balance", 0)
-        holdings = portfolio_data.get("holdings", {})
-        recent_trades = portfolio_data.get("recent_trades", [])
-        
-        # Determine user's coaching level
-        total_trades = len(recent_trades)
-        if total_trades < 3:
-            coaching_level = "beginner"
-        elif total_trades < 10:
-            coaching_level = "intermediate"
-        else:
-            coaching_level = "advanced"
-        
-        context_parts.append(f"COACHING LEVEL: {coaching_level}")
-        
-        if balance > 0:
-            context_parts.append(f"User has ${balance:,.0f} available balance")
-            if holdings:
-                holdings_list = []
-                total_value = 0
-                for coin, data in holdings.items():
-                    quantity = data.get("quantity", 0)
-                    current_price = data.get("current_price", 0)
-                    value = quantity * current_price
-                    total_value += value
-                    holdings_list.append(f"{coin}: {quantity:.4f} coins (${value:,.0f})")
-                
-                context_parts.append(f"Portfolio: {len(holdings)} coins, total value ${total_value:,.0f}")
-                context_parts.append(f"Holdings: {', '.join(holdings_list)}")
-                
-                # Add coaching insights about their portfolio
-                if len(holdings) == 1:
-                    context_parts.append("PORTFOLIO INSIGHT: User is concentrated in one asset - teach about diversification")
-                elif len(holdings) <= 3:
-                    context_parts.append("PORTFOLIO INSIGHT: User has moderate diversification - suggest optimization")
-                else:
-                    context_parts.append("PORTFOLIO INSIGHT: User has good diversification - focus on advanced strategies")
-            else:
-                context_parts.append("No current holdings - ready to start trading")
-                context_parts.append("COACHING FOCUS: Teach basics and help with first investment")
+        cache_key = shared_completion_key(user_message)
+        if cache_key is not None:
+            # Nothing about the user in the question, so nothing about them in the prompt
+            reply = await call_openai_api(user_message, SHARED_COACHING_CONTEXT, cache_key)
         else:
-            context_parts.append("New user with no balance - needs to top up wallet")
-            context_parts.append("COACHING FOCUS: Education first, trading later")
-        
-        # Recent trading activity for coaching insights
-        if recent_trades:
-            context_parts.append(f"Recent activity: {len(recent_trades)} trades")
-            profitable_trades = sum(1 for trade in recent_trades if trade.get('profit_loss', 0) > 0)
-            if len(recent_trades) > 0:
-                win_rate = (profitable_trades / len(recent_trades)) * 100
-                context_parts.append(f"Trading performance: {win_rate:.1f}% win rate")
-                
-                # Add coaching insights about trading performance
-                if win_rate > 70:
-                    context_parts.append("TRADING INSIGHT: User has good performance - focus on scaling and optimization")
-                elif win_rate > 50:
-                    context_parts.append("TRADING INSIGHT: User has decent performance - focus on consistency and risk management")
-                else:
-                    context_parts.append("TRADING INSIGHT: User needs to improve performance - focus on education and strategy")
-        
-        # Market context for educational opportunities
-        try:
-            btc_price = await price_service.get_price("BTC")
-            eth_price = await price_service.get_price("ETH")
-            if btc_price:
-                context_parts.append(f"BTC: ${btc_price.price_usd:,.0f} ({btc_price.change_24h_percent:+.1f}%)")
-            if eth_price:
-                context_parts.append(f"ETH: ${eth_price.price_usd:,.0f} ({eth_price.change_24h_percent:+.1f}%)")
-        except:
-            pass
-        
-        # Add coaching mission
-        context_parts.append("MISSION: Provide educational coaching, not just trading advice. Help user learn and improve their trading skills.")
-        
-        context = " | ".join(context_parts)
-        
-        # Call OpenAI API
-        reply = await call_openai_api(user_message, context)
+            context = await build_coaching_context(user.id, db)
+            
+            # Call OpenAI API
+            reply = await call_openai_api(user_message, context)
         
         logger.info(f"Chatbot response generated for user {user.id}: {user_message[:50]}...")
         
@@ -1628,6 +1435,53 @@ async def chatbot_endpoint(
         logger.error(f"Error in chatbot endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/api/chatbot/stream")
+async def chatbot_stream(
+    message_data: ChatMessage,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Chatbot reply as server-sent events: "delta" events with text, then "done".
+    Language model replies are relayed token by token; every other reply is
+    ready at once and arrives as a single delta.
+    """
+    user_message = message_data.message.strip()
+    cache_key = shared_completion_key(user_message)
+    if classify(user_message).name != "general":
+        response = await chatbot_endpoint(message_data, user, db)
+        events = iter_events([sse_event({"delta": response.reply}), sse_event({}, "done")])
+    elif cache_key is not None:
+        cached = completion_cache.get(cache_key)
+        if cached is not None:
+            events = iter_events([sse_event({"delta": cached}), sse_event({}, "done")])
+        else:
+            events = stream_coaching_reply(user_message, SHARED_COACHING_CONTEXT, cache_key=cache_key)
+    else:
+        # Built before streaming starts: the request's session is gone once the body is being sent
+        context = await build_coaching_context(user.id, db)
+        events = stream_coaching_reply(user_message, context)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/api/chatbot/llm/stats")
+async def chatbot_llm_stats():
+    """Completion concurrency, queue time and failure counters"""
+    return openai_client.get_stats()
+
+@router.get("/api/chatbot/context/stats")
+async def chatbot_context_stats():
+    """Per-user chat context cache hits, misses and invalidations"""
+    return chat_context_cache.get_stats()
+
+@router.get("/api/chatbot/cache/stats")
+async def chatbot_cache_stats():
+    """Hit rates of the formatted reply cache and the shared completion cache"""
+    return {"replies": reply_cache.get_stats(), "completions": completion_cache.get_stats()}
+
 @router.get("/api/chatbot/health")
 async def chatbot_health():
     """
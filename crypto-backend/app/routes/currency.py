@@ -4,7 +4,7 @@ from decimal import Decimal
 from typing import Dict, List
 from pydantic import BaseModel
 
-from app.db import SessionLocal
+from app.db import get_db
 from app.models.user import User
 from app.auth import get_current_user
 from app.services.currency_service import currency_service
@@ -14,13 +14,6 @@ router = APIRouter(prefix="/currency", tags=["currency"])
 class CurrencyPreference(BaseModel):
     currency: str
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/rates")
 def get_exchange_rates():
     """Get current exchange rates for all supported currencies"""
@@ -1,19 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response, Body
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 import os
 from datetime import datetime
-import uuid
 from pydantic import BaseModel
 
 from app.auth import get_current_user
-from app.db import SessionLocal
+from app.db import get_db
 from app.models.user import User
-from app.models.purchase import Purchase, DemoCoinPackage
 from app.schemas.invoice import InvoiceData, InvoiceResponse
-from app.services.invoice_service import InvoiceService
-from app.models.wallet_transaction import WalletTransaction
+from app.services.invoice_renderer import invoice_renderer, invoice_filename, invoice_owner
+from app.services.catalog import catalog
+from app.services.billable_events import (
+    PURCHASE,
+    WALLET_TRANSACTION,
+    find_billable_event,
+    list_billable_events,
+    decode_event_cursor,
+    invoice_number
+)
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/invoice", tags=["invoice"])
 
@@ -22,13 +29,6 @@ class InvoiceRequest(BaseModel):
     order_id: Optional[str] = None
     transaction_id: Optional[int] = None
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/generate", response_model=InvoiceResponse)
 async def generate_invoice(
     request: InvoiceRequest = Body(...),
@@ -45,105 +45,63 @@ async def generate_invoice(
         print(f"   - Order ID: {request.order_id}")
         print(f"   - Payment ID: {request.payment_id}")
         
-        purchase = None
+        # One indexed query over this user's purchases and paid wallet transactions
+        event = find_billable_event(db, current_user.id, request.order_id, request.payment_id, request.transaction_id)
+        print(f"   - Found billable event: {event}")
 
-        # Try to find purchase by order_id first (for new payments)
-        if request.order_id:
-            print(f"🔍 Searching for purchase by order_id: {request.order_id}")
-            purchase = db.query(Purchase).filter(
-                Purchase.razorpay_order_id == request.order_id,
-                Purchase.user_id == current_user.id
-            ).first()
-            print(f"   - Found purchase by order_id: {purchase}")
-
-        # If not found and we have transaction_id, try to find by transaction ID
-        if not purchase and request.transaction_id:
-            print(f"🔍 Searching for purchase by transaction_id: {request.transaction_id}")
-            purchase = db.query(Purchase).filter(
-                Purchase.id == request.transaction_id,
-                Purchase.user_id == current_user.id
-            ).first()
-            print(f"   - Found purchase by transaction_id: {purchase}")
+        purchase = None
+        source = event.source if event else PURCHASE
+        if event and event.source == WALLET_TRANSACTION:
+            # Create a virtual purchase record from the wallet transaction
+            print(f"🔍 Creating virtual purchase from wallet transaction")
             
-            # Also check all purchases for this user
-            all_purchases = db.query(Purchase).filter(
-                Purchase.user_id == current_user.id
-            ).all()
-            print(f"🔍 All purchases for user {current_user.id}:")
-            for p in all_purchases:
-                print(f"   - Purchase ID: {p.id}, Amount: {p.amount}, Status: {p.status}")
-
-        # If still not found, try to find any completed purchase for this user
-        if not purchase:
-            print(f"🔍 Searching for any completed purchase for user: {current_user.id}")
-            purchase = db.query(Purchase).filter(
-                Purchase.user_id == current_user.id,
-                Purchase.status == "completed"
-            ).order_by(Purchase.created_at.desc()).first()
-            print(f"   - Found any completed purchase: {purchase}")
+            # Map package IDs to their actual frontend prices (base + GST)
+            package_prices = {
+                'crypto-crumbs': {'base': 10.0, 'total': 12.0},      # ₹10 base + ₹2 GST = ₹12
+                'rookie-pack': {'base': 20.0, 'total': 23.0},        # ₹20 base + ₹3 GST = ₹23
+                'lambo-baron': {'base': 50.0, 'total': 55.0},        # ₹50 base + ₹5 GST = ₹55
+                'ramen-bubble': {'base': 100.0, 'total': 110.0},     # ₹100 base + ₹10 GST = ₹110
+                'digi-dynasty': {'base': 250.0, 'total': 265.0},     # ₹250 base + ₹15 GST = ₹265
+                'block-mogul': {'base': 500.0, 'total': 525.0},      # ₹500 base + ₹25 GST = ₹525
+                'satoshi-vault': {'base': 1000.0, 'total': 1050.0},  # ₹1000 base + ₹50 GST = ₹1050
+            }
             
-            # Debug: Show ALL purchases in the database
-            all_purchases_all_users = db.query(Purchase).all()
-            print(f"🔍 ALL purchases in database (all users):")
-            for p in all_purchases_all_users:
-                print(f"   - Purchase ID: {p.id}, User ID: {p.user_id}, Amount: {p.amount}, Status: {p.status}")
+            # Get the actual INR amounts for this package
+            package_info = package_prices.get(event.package_code, {'base': 0.0, 'total': 0.0})
+            base_amount = package_info['base']
+            total_amount = package_info['total']
             
-            # Debug: Show ALL wallet transactions in the database
-            all_wallet_transactions = db.query(WalletTransaction).all()
-            print(f"🔍 ALL wallet transactions in database (all users):")
-            for wt in all_wallet_transactions:
-                print(f"   - Transaction ID: {wt.id}, User ID: {wt.user_id}, Amount: {wt.amount}, Status: {wt.status}, Type: {wt.transaction_type}")
+            if base_amount == 0.0:
+                # If package not found, use a default calculation
+                base_amount = float(event.amount) / 10000  # Rough estimate
+                total_amount = base_amount * 1.18  # Add 18% GST
             
-            # If no purchase found, try to find a wallet transaction
-            if not purchase:
-                print(f"🔍 Searching for wallet transaction with ID: {request.transaction_id}")
-                wallet_transaction = db.query(WalletTransaction).filter(
-                    WalletTransaction.id == request.transaction_id,
-                    WalletTransaction.user_id == current_user.id,
-                    WalletTransaction.status == "completed"
-                ).first()
-                print(f"   - Found wallet transaction: {wallet_transaction}")
-                
-                if wallet_transaction:
-                    # Create a virtual purchase record from the wallet transaction
-                    print(f"🔍 Creating virtual purchase from wallet transaction")
-                    
-                                    # Map package IDs to their actual frontend prices (base + GST)
-                package_prices = {
-                    'crypto-crumbs': {'base': 10.0, 'total': 12.0},      # ₹10 base + ₹2 GST = ₹12
-                    'rookie-pack': {'base': 20.0, 'total': 23.0},        # ₹20 base + ₹3 GST = ₹23
-                    'lambo-baron': {'base': 50.0, 'total': 55.0},        # ₹50 base + ₹5 GST = ₹55
-                    'ramen-bubble': {'base': 100.0, 'total': 110.0},     # ₹100 base + ₹10 GST = ₹110
-                    'digi-dynasty': {'base': 250.0, 'total': 265.0},     # ₹250 base + ₹15 GST = ₹265
-                    'block-mogul': {'base': 500.0, 'total': 525.0},      # ₹500 base + ₹25 GST = ₹525
-                    'satoshi-vault': {'base': 1000.0, 'total': 1050.0},  # ₹1000 base + ₹50 GST = ₹1050
-                }
-                
-                # Get the actual INR amounts for this package
-                package_info = package_prices.get(wallet_transaction.package_id, {'base': 0.0, 'total': 0.0})
-                base_amount = package_info['base']
-                total_amount = package_info['total']
-                
-                if base_amount == 0.0:
-                    # If package not found, use a default calculation
-                    base_amount = float(wallet_transaction.amount) / 10000  # Rough estimate
-                    total_amount = base_amount * 1.18  # Add 18% GST
-                
-                purchase = type('obj', (object,), {
-                    'id': wallet_transaction.id,
-                    'user_id': wallet_transaction.user_id,
-                    'amount': total_amount,  # Use total amount (checkoutPrice)
-                    'status': wallet_transaction.status,
-                    'razorpay_order_id': wallet_transaction.order_id or f"WT_{wallet_transaction.id}",
-                    'razorpay_payment_id': wallet_transaction.payment_id or f"PAY_{wallet_transaction.id}",
-                    'created_at': wallet_transaction.created_at,
-                    'package_id': wallet_transaction.package_id or 'wallet_topup',
-                    'coins_received': float(wallet_transaction.amount),  # USD amount
-                    'base_price': base_amount,  # Store base price separately
-                    'gst_amount': total_amount - base_amount  # Store GST amount separately
-                })()
-                print(f"   - Virtual purchase created: {purchase}")
-                print(f"   - Package: {wallet_transaction.package_id}, Base: ₹{base_amount}, Total: ₹{total_amount}")
+            purchase = type('obj', (object,), {
+                'id': event.source_id,
+                'user_id': current_user.id,
+                'amount': total_amount,  # Use total amount (checkoutPrice)
+                'status': event.status,
+                'razorpay_order_id': event.order_id or f"WT_{event.source_id}",
+                'razorpay_payment_id': event.payment_id or f"PAY_{event.source_id}",
+                'created_at': event.created_at,
+                'package_id': event.package_code or 'wallet_topup',
+                'coins_received': float(event.amount),  # USD amount
+                'base_price': base_amount,  # Store base price separately
+                'gst_amount': total_amount - base_amount  # Store GST amount separately
+            })()
+            print(f"   - Package: {event.package_code}, Base: ₹{base_amount}, Total: ₹{total_amount}")
+        elif event:
+            purchase = type('obj', (object,), {
+                'id': event.source_id,
+                'user_id': current_user.id,
+                'amount': event.amount,
+                'status': event.status,
+                'razorpay_order_id': event.order_id,
+                'razorpay_payment_id': event.payment_id,
+                'created_at': event.created_at,
+                'package_id': event.package_id,
+                'coins_received': event.coins_received
+            })()
 
         if not purchase:
             print(f"❌ No purchase found for user {current_user.id}")
@@ -163,10 +121,8 @@ async def generate_invoice(
         if purchase.package_id:
             # Handle both integer package IDs (from Purchase) and string package IDs (from WalletTransaction)
             if isinstance(purchase.package_id, int):
-                # Integer package ID - query DemoCoinPackage table
-                package = db.query(DemoCoinPackage).filter(
-                    DemoCoinPackage.id == purchase.package_id
-                ).first()
+                # Integer package ID - look up the cached DemoCoinPackage catalog
+                package = catalog.package(purchase.package_id, db)
             else:
                 # String package ID - create virtual package object for wallet transactions
                 print(f"🔍 Creating virtual package for string package_id: {purchase.package_id}")
@@ -192,17 +148,18 @@ async def generate_invoice(
                 })()
                 print(f"   - Virtual package created: {package}")
         
-        # Generate invoice number
-        invoice_number = f"INV-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+        # Invoice number and date come from the purchase so every render of it is identical
+        invoice_date = purchase.created_at or datetime.now()
+        number = invoice_number(source, purchase.id, purchase.created_at)
         
-        # Use actual payment_id and order_id if available, otherwise generate them
-        payment_id = request.payment_id or purchase.razorpay_payment_id or f"PAY-{purchase.id}"
-        order_id = request.order_id or purchase.razorpay_order_id or f"ORD-{purchase.id}"
+        # Use the stored payment_id and order_id if available, otherwise the request's or generated ones
+        payment_id = purchase.razorpay_payment_id or request.payment_id or f"PAY-{purchase.id}"
+        order_id = purchase.razorpay_order_id or request.order_id or f"ORD-{purchase.id}"
         
         # Prepare invoice data
         invoice_data = {
-            "invoice_number": invoice_number,
-            "date": datetime.now().strftime("%Y-%m-%d"),
+            "invoice_number": number,
+            "date": invoice_date.strftime("%Y-%m-%d"),
             "customer_name": current_user.username,
             "customer_email": current_user.email,
             "amount_paid": float(purchase.amount),
@@ -244,19 +201,9 @@ async def generate_invoice(
             "total_amount": float(purchase.amount)
         })
         
-        # Generate PDF invoice
-        invoice_service = InvoiceService()
-        
-        # Create invoices directory if it doesn't exist
-        invoices_dir = "invoices"
-        os.makedirs(invoices_dir, exist_ok=True)
-        
-        # Generate unique filename
-        filename = f"invoice_{invoice_number}_{current_user.id}_{int(datetime.now().timestamp())}.pdf"
-        file_path = os.path.join(invoices_dir, filename)
-        
-        # Save invoice to file
-        invoice_service.save_invoice_to_file(invoice_data, file_path)
+        # Render the PDF once per billable event and template version; later requests reuse the file
+        filename = invoice_filename(current_user.id, source, purchase.id)
+        await invoice_renderer.get_or_render(filename, invoice_data)
         
         return InvoiceResponse(
             success=True,
@@ -265,6 +212,8 @@ async def generate_invoice(
             pdf_url=f"/invoice/download/{filename}"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error generating invoice: {e}")
         raise HTTPException(
@@ -275,32 +224,43 @@ async def generate_invoice(
 @router.get("/download/{filename}")
 async def download_invoice(
     filename: str,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    """Download generated invoice PDF"""
+    """Download generated invoice PDF (supports If-None-Match)"""
     try:
         # Validate filename format for security
-        if not filename.startswith("invoice_") or not filename.endswith(".pdf"):
+        if not filename.startswith("invoice_") or not filename.endswith(".pdf") or os.path.basename(filename) != filename:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid filename format"
             )
         
-        # Check if file exists
-        file_path = os.path.join("invoices", filename)
-        if not os.path.exists(file_path):
+        # Check if file exists and belongs to the caller
+        file_path = invoice_renderer.path(filename)
+        if invoice_owner(filename) != current_user.id or not os.path.exists(file_path):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Invoice file not found"
             )
         
+        # Stored invoices never change, so the browser's copy is reused while the ETag matches
+        etag = invoice_renderer.etag(file_path)
+        headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
         # Return file for download
         return FileResponse(
             path=file_path,
             filename=filename,
-            media_type="application/pdf"
+            media_type="application/pdf",
+            headers=headers
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error downloading invoice: {e}")
         raise HTTPException(
@@ -308,37 +268,49 @@ async def download_invoice(
             detail=f"Failed to download invoice: {str(e)}"
         )
 
+@router.get("/renderer/stats")
+async def invoice_renderer_stats():
+    """Get render and reuse counters for stored invoice PDFs"""
+    return invoice_renderer.get_stats()
+
 @router.get("/list")
 async def list_user_invoices(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List all invoices for the current user"""
+    """List the user's invoices (completed purchases and paid wallet transactions), newest first"""
+    try:
+        event_cursor = decode_event_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    
     try:
-        # Get all completed purchases for the user
-        purchases = db.query(Purchase).filter(
-            Purchase.user_id == current_user.id,
-            Purchase.status == "completed"
-        ).order_by(Purchase.created_at.desc()).all()
+        events, next_cursor = list_billable_events(db, current_user.id, event_cursor, limit)
         
         invoices = []
-        for purchase in purchases:
-            # Generate invoice number for display
-            invoice_number = f"INV-{purchase.created_at.strftime('%Y%m%d')}-{str(purchase.id).zfill(6)}"
-            
+        for event in events:
+            if event.source == WALLET_TRANSACTION:
+                package_name = event.package_code.replace('-', ' ').title() if event.package_code else "Direct Top-up"
+            else:
+                package_name = "Package Purchase" if event.package_id else "Direct Top-up"
             invoices.append({
-                "invoice_number": invoice_number,
-                "date": purchase.created_at.strftime("%Y-%m-%d"),
-                "amount": float(purchase.amount),
-                "order_id": purchase.razorpay_order_id,
-                "payment_id": purchase.razorpay_payment_id,
-                "package_name": "Direct Top-up" if not purchase.package_id else "Package Purchase",
-                "coins_received": int(purchase.coins_received) if purchase.coins_received else 0
+                "invoice_number": invoice_number(event.source, event.source_id, event.created_at),
+                "date": event.created_at.strftime("%Y-%m-%d") if event.created_at else None,
+                "amount": float(event.amount),
+                "order_id": event.order_id,
+                "payment_id": event.payment_id,
+                "package_name": package_name,
+                "coins_received": int(event.coins_received) if event.coins_received else 0,
+                "source": "purchase" if event.source == PURCHASE else "wallet_transaction",
+                "transaction_id": event.source_id
             })
         
         return {
             "success": True,
-            "invoices": invoices
+            "invoices": invoices,
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -1,40 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from app.auth import get_current_user
-from app.db import SessionLocal
+from app.auth import get_current_user_async
+from app.db import get_async_db
 from app.models.user import User
 from app.models.leaderboard import LeaderboardEntry
 from app.services.leaderboard_service import LeaderboardService
+from app.services.price_service import get_multiple_crypto_prices
 from app.schemas.leaderboard import (
     LeaderboardEntryResponse,
     GlobalLeaderboardResponse,
     WeeklyLeaderboardResponse,
+    PeriodLeaderboardResponse,
     LeaderboardStatsResponse
 )
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def count_users(db: AsyncSession) -> int:
+    return await db.scalar(select(func.count(User.id)))
 
 @router.get("/global", response_model=GlobalLeaderboardResponse)
 async def get_global_leaderboard(
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get global leaderboard ranked by overall portfolio performance"""
     
-    leaderboard_service = LeaderboardService(db)
-    
-    # Get global leaderboard entries with real data
-    entries = await leaderboard_service.get_global_leaderboard(limit=limit)
+    # Read ranked entries from the materialized leaderboard (recomputed in the background)
+    entries = await db.run_sync(lambda session: LeaderboardService(session).get_global_leaderboard(limit=limit))
     
     # Convert to response format
     leaderboard_entries = [
@@ -43,25 +41,23 @@ async def get_global_leaderboard(
     ]
     
     # Get total users count
-    total_users = db.query(User).count()
+    total_users = await count_users(db)
     
     return GlobalLeaderboardResponse(
         total_users=total_users,
         leaderboard=leaderboard_entries,
-        last_updated=datetime.utcnow()
+        last_updated=max((entry.last_updated for entry in leaderboard_entries), default=datetime.utcnow())
     )
 
 @router.get("/weekly", response_model=WeeklyLeaderboardResponse)
 async def get_weekly_leaderboard(
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get weekly leaderboard ranked by this week's performance"""
-    
-    leaderboard_service = LeaderboardService(db)
+    """Get weekly leaderboard ranked by performance since Monday's snapshot"""
     
     # Get weekly leaderboard entries
-    entries = await leaderboard_service.get_weekly_leaderboard(limit=limit)
+    entries = await db.run_sync(lambda session: LeaderboardService(session).get_weekly_leaderboard(limit=limit))
     
     # Convert to response format
     leaderboard_entries = [
@@ -70,78 +66,108 @@ async def get_weekly_leaderboard(
     ]
     
     # Get total users count
-    total_users = db.query(User).count()
+    total_users = await count_users(db)
     
     return WeeklyLeaderboardResponse(
         total_users=total_users,
-        week_start=datetime.utcnow(),
-        week_end=datetime.utcnow(),
+        week_start=LeaderboardService.get_period_start("weekly"),
+        week_end=LeaderboardService.get_period_end("weekly"),
         leaderboard=leaderboard_entries
     )
 
+@router.get("/daily", response_model=PeriodLeaderboardResponse)
+async def get_daily_leaderboard(
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get daily leaderboard ranked by performance since today's first snapshot"""
+    return await get_period_leaderboard("daily", limit, db)
+
+@router.get("/monthly", response_model=PeriodLeaderboardResponse)
+async def get_monthly_leaderboard(
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get monthly leaderboard ranked by performance since the start of the month"""
+    return await get_period_leaderboard("monthly", limit, db)
+
+async def get_period_leaderboard(period: str, limit: int, db: AsyncSession) -> PeriodLeaderboardResponse:
+    entries = await db.run_sync(lambda session: LeaderboardService(session).get_period_leaderboard(period, limit=limit))
+    
+    return PeriodLeaderboardResponse(
+        period=period,
+        total_users=await count_users(db),
+        period_start=LeaderboardService.get_period_start(period),
+        period_end=LeaderboardService.get_period_end(period),
+        leaderboard=[LeaderboardEntryResponse(**entry) for entry in entries]
+    )
+
+def _award_rank_xp(db: Session, user_id: int) -> dict:
+    """Read the user's ranks and grant the rank-up XP; runs on the async session's sync view"""
+    # Already in the session's identity map when loaded by get_current_user_async
+    current_user = db.get(User, user_id)
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    # Get user's ranks directly from database (with fallback for missing table)
+    try:
+        entry = db.query(LeaderboardEntry).filter(LeaderboardEntry.user_id == current_user.id).first()
+        global_rank = entry.global_rank if entry else 1
+        weekly_rank = entry.weekly_rank if entry else 1
+    except Exception as e:
+        print(f"Leaderboard table not available: {e}")
+        # Fallback to default ranks if table doesn't exist
+        db.rollback()
+        global_rank = 1
+        weekly_rank = 1
+
+    # XP system: Leaderboard rank up (+100 XP, only for new highest rank)
+    if current_user.xp_best_rank is None or global_rank < current_user.xp_best_rank:
+        current_user.xp += 100
+        def xp_needed(level):
+            return 100 + (level - 1) * 50
+        while current_user.xp >= xp_needed(current_user.level):
+            current_user.xp -= xp_needed(current_user.level)
+            current_user.level += 1
+        current_user.xp_best_rank = global_rank
+        db.commit()
+    
+    return {
+        "global_rank": global_rank,
+        "weekly_rank": weekly_rank,
+        "user_id": current_user.id
+    }
+
 @router.get("/my-rank")
 async def get_my_rank(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's rank in global and weekly leaderboards"""
     
+    user_id = current_user.id if current_user else 0
     try:
-        # Get current user from database to ensure it's attached to this session
-        current_user = db.query(User).filter(User.id == current_user.id).first()
-        if not current_user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        # Get user's ranks directly from database (with fallback for missing table)
-        try:
-            entry = db.query(LeaderboardEntry).filter(LeaderboardEntry.user_id == current_user.id).first()
-            global_rank = entry.global_rank if entry else 1
-            weekly_rank = entry.weekly_rank if entry else 1
-        except Exception as e:
-            print(f"Leaderboard table not available: {e}")
-            # Fallback to default ranks if table doesn't exist
-            global_rank = 1
-            weekly_rank = 1
-
-        # XP system: Leaderboard rank up (+100 XP, only for new highest rank)
-        if current_user.xp_best_rank is None or global_rank < current_user.xp_best_rank:
-            current_user.xp += 100
-            def xp_needed(level):
-                return 100 + (level - 1) * 50
-            while current_user.xp >= xp_needed(current_user.level):
-                current_user.xp -= xp_needed(current_user.level)
-                current_user.level += 1
-            current_user.xp_best_rank = global_rank
-            db.commit()
-            db.refresh(current_user)
-        
-        return {
-            "global_rank": global_rank,
-            "weekly_rank": weekly_rank,
-            "user_id": current_user.id
-        }
+        return await db.run_sync(_award_rank_xp, user_id)
     except Exception as e:
         print(f"Error in get_my_rank: {e}")
         # Return default values if there's an error
         return {
             "global_rank": 1,
             "weekly_rank": 1,
-            "user_id": current_user.id if current_user else 0
+            "user_id": user_id
         }
 
 @router.get("/stats", response_model=LeaderboardStatsResponse)
 async def get_leaderboard_stats(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get overall leaderboard statistics"""
     
-    leaderboard_service = LeaderboardService(db)
-    
     # Get comprehensive stats
-    stats = await leaderboard_service.get_leaderboard_stats()
+    stats = await db.run_sync(lambda session: LeaderboardService(session).get_leaderboard_stats())
     
     return LeaderboardStatsResponse(
         total_traders=stats.get('total_traders', 0),
@@ -156,18 +182,18 @@ async def get_leaderboard_stats(
 
 @router.post("/update-rankings")
 async def update_rankings(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update leaderboard rankings (admin only or automated)"""
     
-    leaderboard_service = LeaderboardService(db)
-    
     try:
-        # Update all rankings
-        leaderboard_service.update_all_rankings()
+        # Fetch prices between the two DB round trips so no connection is held during the upstream call
+        symbols = await db.run_sync(lambda session: LeaderboardService(session).get_held_symbols())
+        prices = await get_multiple_crypto_prices(symbols)
+        ranked = await db.run_sync(lambda session: LeaderboardService(session).recompute_rankings(prices))
         
-        return {"message": "Rankings updated successfully"}
+        return {"message": "Rankings updated successfully", "ranked_users": ranked}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -177,15 +203,14 @@ async def update_rankings(
 @router.get("/user-rank/{user_id}")
 async def get_user_rank(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get specific user's rank information"""
     
-    leaderboard_service = LeaderboardService(db)
-    
     # Get user's ranks
-    global_rank = leaderboard_service.get_user_global_rank(user_id)
-    weekly_rank = leaderboard_service.get_user_weekly_rank(user_id)
+    entry = await db.scalar(select(LeaderboardEntry).where(LeaderboardEntry.user_id == user_id))
+    global_rank = entry.global_rank if entry else None
+    weekly_rank = entry.weekly_rank if entry else None
     
     return {
         "user_id": user_id,
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import json
+import logging
+
+from app.services.price_broadcaster import price_broadcaster
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["prices"])
+
+# Idle clients get a heartbeat so proxies keep the connection open
+HEARTBEAT_SECONDS = 15.0
+
+
+def parse_symbols(symbols: Optional[str]):
+    """Parse a comma-separated symbol list from the query string"""
+    return symbols.split(",") if symbols else None
+
+
+@router.websocket("/ws/prices")
+async def price_websocket(websocket: WebSocket, symbols: Optional[str] = None):
+    """Push price deltas over a WebSocket.
+
+    Clients may change their subset with {"action": "subscribe", "symbols": [...]}
+    (an empty list means every symbol).
+    """
+    await websocket.accept()
+    subscription = price_broadcaster.subscribe(parse_symbols(symbols))
+
+    async def receive_commands():
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except WebSocketDisconnect:
+                return
+            except ValueError:
+                continue  # Ignore malformed client messages
+            if isinstance(message, dict) and message.get("action") == "subscribe":
+                price_broadcaster.update_symbols(subscription, message.get("symbols"))
+
+    receiver = asyncio.create_task(receive_commands())
+    try:
+        while not receiver.done():
+            next_batch = asyncio.create_task(subscription.next_batch(HEARTBEAT_SECONDS))
+            await asyncio.wait({next_batch, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_batch.done():
+                next_batch.cancel()
+                break
+            batch = next_batch.result()
+            if batch:
+                await websocket.send_json({"type": "prices", "data": list(batch.values())})
+            else:
+                await websocket.send_json({"type": "heartbeat"})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Price WebSocket error: {e}")
+    finally:
+        receiver.cancel()
+        price_broadcaster.unsubscribe(subscription)
+
+
+@router.get("/prices/stream")
+async def price_event_stream(request: Request, symbols: Optional[str] = None):
+    """Push price deltas as Server-Sent Events"""
+    subscription = price_broadcaster.subscribe(parse_symbols(symbols))
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                batch = await subscription.next_batch(HEARTBEAT_SECONDS)
+                if batch:
+                    yield f"event: prices\ndata: {json.dumps(list(batch.values()))}\n\n"
+                else:
+                    yield ": heartbeat\n\n"
+        finally:
+            price_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/prices/stream/stats")
+async def price_stream_stats():
+    """Get subscriber and tick counts for the price stream"""
+    return price_broadcaster.get_stats()
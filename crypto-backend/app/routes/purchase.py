@@ -10,9 +10,9 @@ import json
 import time
 
 from app.auth import get_current_user
-from app.db import SessionLocal
+from app.db import get_db
 from app.models.user import User
-from app.models.purchase import DemoCoinPackage, Purchase
+from app.models.purchase import Purchase
 from app.schemas.purchase import (
     PackageResponse,
     PurchaseResponse,
@@ -22,6 +22,7 @@ from app.schemas.purchase import (
     DirectTopupRequest
 )
 from app.services.wallet_service import WalletService
+from app.services.catalog import catalog
 
 router = APIRouter(prefix="/purchases", tags=["purchases"])
 
@@ -31,18 +32,10 @@ RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "NPN4XO7rYHETmevYRTUu0UWO
 
 client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/packages", response_model=List[PackageResponse])
 async def get_packages(db: Session = Depends(get_db)):
     """Get all available coin packages"""
-    packages = db.query(DemoCoinPackage).filter(DemoCoinPackage.is_active == True).all()
-    return packages
+    return catalog.packages(db)
 
 @router.get("/history", response_model=List[PurchaseResponse])
 async def get_purchase_history(
@@ -63,7 +56,7 @@ async def create_order(
 ):
     """Create a Razorpay order for a package"""
     # Get package
-    package = db.query(DemoCoinPackage).filter(DemoCoinPackage.id == request.package_id).first()
+    package = catalog.package(request.package_id, db)
     if not package:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -271,7 +264,7 @@ async def verify_payment(
         purchase.razorpay_payment_id = razorpay_payment_id
         
         # Get package details
-        package = db.query(DemoCoinPackage).filter(DemoCoinPackage.id == purchase.package_id).first()
+        package = catalog.package(purchase.package_id, db)
         if package:
             # Calculate coins with bonus
             base_coins = package.coins_per_inr * purchase.amount
@@ -355,7 +348,7 @@ async def razorpay_webhook(request: Request, db: Session = Depends(get_db)):
             
             if purchase and purchase.status == "pending":
                 # Get package details
-                package = db.query(DemoCoinPackage).filter(DemoCoinPackage.id == purchase.package_id).first()
+                package = catalog.package(purchase.package_id, db)
                 if package:
                     # Calculate coins with bonus
                     base_coins = package.coins_per_inr * purchase.amount
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
-from typing import List
+from typing import List, Optional
 from datetime import datetime
+import logging
 
-from app.auth import get_current_user
-from app.db import SessionLocal
+from app.auth import get_current_user_async
+from app.db import get_async_db
 from app.models.user import User
 from app.models.trade import Trade
 from app.models.trade import TradeType as ModelTradeType
@@ -13,23 +17,22 @@ from app.schemas.trade import (
     TradeRequest, 
     TradeResponse, 
     TradeConfirmation, 
+    TradeHistoryPage,
     PriceResponse, 
     PortfolioResponse, 
     PortfolioHolding
 )
-from app.services.price_service import get_crypto_price, get_multiple_crypto_prices, get_supported_coins
-from app.services.leaderboard_service import LeaderboardService
-from app.services.achievement_service import AchievementService
+from app.services.price_service import price_service, get_crypto_price, get_multiple_crypto_prices, get_supported_coins
 from app.services.wallet_service import WalletService
+from app.services.position_service import PositionService
+from app.services.trade_service import TradeService
+from app.services.post_trade_queue import post_trade_queue
+from app.services.pagination import decode_cursor, newest_first, split_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.history_export import ExportFormat, stream_export, export_response_headers
 
-router = APIRouter(prefix="/trade", tags=["trading"])
+logger = logging.getLogger(__name__)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter(prefix="/trade", tags=["trading"])
 
 @router.get("/supported-coins", response_model=List[str])
 async def get_supported_coins_endpoint():
@@ -40,12 +43,10 @@ async def get_supported_coins_endpoint():
 async def get_all_prices():
     """Get current prices for ALL supported cryptocurrencies (comprehensive list)"""
     try:
-        from app.services.price_service import price_service, get_supported_coins
-        
         # Get all supported coins
         all_coins = get_supported_coins()
         
-        # Fetch prices for all coins (this will use caching and rate limiting)
+        # Read prices for all coins from the poller-maintained in-memory snapshot
         price_responses = await price_service.get_multiple_prices(all_coins)
         
         # Format response for frontend
@@ -127,7 +128,6 @@ async def get_multiple_prices():
     """Get current prices for all supported cryptocurrencies with improved error handling"""
     try:
         # Get all supported coins from the price service
-        from app.services.price_service import price_service, get_supported_coins
         all_supported_coins = get_supported_coins()
         
         # For performance, we'll fetch prices in batches to avoid rate limits
@@ -168,18 +168,15 @@ async def get_multiple_prices():
         
     except Exception as e:
         print(f"Error in get_multiple_prices endpoint: {e}")
-        # Return fallback data from price service
-        from app.services.price_service import CoinGeckoService
-        price_service = CoinGeckoService()
-        
+        # Return recent prices from the shared price cache
         fallback_prices = []
         for i, coin_symbol in enumerate(get_supported_coins()[:10], 1):
-            fallback_price = price_service.FALLBACK_PRICES.get(coin_symbol, 0)
+            fallback_price = await price_service._get_dynamic_fallback_price(coin_symbol)
             fallback_prices.append({
                 "id": i,
                 "symbol": coin_symbol,
                 "name": get_coin_name(coin_symbol),
-                "price": float(fallback_price),
+                "price": float(fallback_price.price_usd) if fallback_price else 0.0,
                 "change_24h": 0.0,  # Fallback doesn't have 24h change
                 "change_24h_percent": 0.0,
                 "last_updated": datetime.utcnow().isoformat()
@@ -216,7 +213,6 @@ def get_coin_name(symbol):
 @router.get("/price/{coin_symbol}", response_model=PriceResponse)
 async def get_coin_price(coin_symbol: str):
     """Get current price for a cryptocurrency"""
-    from app.services.price_service import price_service
     
     coin_symbol_upper = coin_symbol.upper()
     
@@ -236,22 +232,31 @@ async def get_coin_price(coin_symbol: str):
     
     return price_response
 
+async def _run_trade(db: AsyncSession, user_id: int, coin_symbol: str, trade_type: ModelTradeType,
+                     quantity: Decimal, price: Decimal):
+    """Execute a trade in one transaction; leaderboard and achievements update after the response"""
+    try:
+        return await db.run_sync(
+            lambda session: TradeService(session).execute(user_id, coin_symbol, trade_type, quantity, price)
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Trade execution failed: {str(e)}"
+        )
+
 @router.post("/buy")
 async def buy_crypto(
     trade_request: TradeRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Buy cryptocurrency with DemoCoins"""
     
-    # Get current user from database to ensure it's attached to this session
-    current_user = db.query(User).filter(User.id == current_user.id).first()
-    if not current_user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     # Validate coin symbol
     coin_symbol = trade_request.coin_symbol.upper()
     if coin_symbol not in get_supported_coins():
@@ -268,70 +273,17 @@ async def buy_crypto(
             detail=f"Unable to fetch current price for {coin_symbol}"
         )
     
-    # Calculate total cost
-    total_cost = trade_request.quantity * current_price
-    
-    # Check wallet balance using new wallet system
-    wallet_service = WalletService(db)
-    wallet = wallet_service.get_or_create_wallet(current_user.id)
-    
-    if wallet.balance < total_cost:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient balance. Required: {total_cost}, Available: {wallet.balance}"
-        )
-    
-    # Deduct from wallet
-    wallet_result = wallet_service.deduct_from_wallet(current_user.id, total_cost)
-    
-    # Create trade record
-    trade = Trade(
-        user_id=current_user.id,
-        coin_symbol=coin_symbol,
-        trade_type=ModelTradeType.BUY,
-        quantity=trade_request.quantity,
-        price_at_trade=current_price,
-        total_cost=total_cost
+    trade, user, wallet_result = await _run_trade(
+        db, current_user.id, coin_symbol, ModelTradeType.BUY, trade_request.quantity, current_price
     )
     
-    # Save to database
-    db.add(trade)
-    db.commit()
-    db.refresh(trade)
-
-    # XP system: Grant XP for trading
-    def xp_needed(level):
-        return 100 + (level - 1) * 50
-    current_user.xp += 25  # +25 XP for making a trade
-    while current_user.xp >= xp_needed(current_user.level):
-        current_user.xp -= xp_needed(current_user.level)
-        current_user.level += 1
-    db.commit()
-    db.refresh(current_user)
-    
-    # Update leaderboard entry for user
-    try:
-        leaderboard_service = LeaderboardService(db)
-        await leaderboard_service.update_user_leaderboard_entry(current_user)
-    except Exception as e:
-        # Log error but don't fail the trade
-        print(f"Error updating leaderboard: {e}")
-    
-    # Check and award achievements
-    try:
-        achievement_service = AchievementService(db)
-        await achievement_service.check_and_award_achievements(current_user)
-    except Exception as e:
-        # Log error but don't fail the trade
-        print(f"Error checking achievements: {e}")
-    
     return {
         "success": True,
         "trade_id": trade.id,
         "coin_symbol": coin_symbol,
         "quantity": float(trade_request.quantity),
         "price": float(current_price),
-        "total_cost": float(total_cost),
+        "total_cost": float(trade.total_cost),
         "new_balance": float(wallet_result['new_balance']),
         "message": f"Successfully bought {trade_request.quantity} {coin_symbol} at ${current_price} each"
     }
@@ -339,8 +291,8 @@ async def buy_crypto(
 @router.post("/sell", response_model=TradeConfirmation)
 async def sell_crypto(
     trade_request: TradeRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Sell cryptocurrency for DemoCoins"""
     
@@ -352,38 +304,6 @@ async def sell_crypto(
             detail=f"Unsupported coin symbol: {coin_symbol}"
         )
     
-    # Get current user from database to ensure it's attached to this session
-    current_user = db.query(User).filter(User.id == current_user.id).first()
-    if not current_user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    # Calculate current holdings for this coin
-    buys = db.query(Trade).filter(
-        Trade.user_id == current_user.id,
-        Trade.coin_symbol == coin_symbol,
-        Trade.trade_type == ModelTradeType.BUY
-    ).all()
-    
-    sells = db.query(Trade).filter(
-        Trade.user_id == current_user.id,
-        Trade.coin_symbol == coin_symbol,
-        Trade.trade_type == ModelTradeType.SELL
-    ).all()
-    
-    total_bought = sum(trade.quantity for trade in buys)
-    total_sold = sum(trade.quantity for trade in sells)
-    current_holdings = total_bought - total_sold
-    
-    # Check if user has enough coins to sell
-    if current_holdings < trade_request.quantity:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient {coin_symbol} balance. Required: {trade_request.quantity}, Available: {current_holdings}"
-        )
-    
     # Get current price
     current_price = await get_crypto_price(coin_symbol)
     if not current_price:
@@ -392,54 +312,10 @@ async def sell_crypto(
             detail=f"Unable to fetch current price for {coin_symbol}"
         )
     
-    # Calculate total value
-    total_value = trade_request.quantity * current_price
-    
-    # Add to wallet using new wallet system
-    wallet_service = WalletService(db)
-    wallet_result = wallet_service.top_up_wallet(current_user.id, total_value)
-    
-    # Create trade record
-    trade = Trade(
-        user_id=current_user.id,
-        coin_symbol=coin_symbol,
-        trade_type=ModelTradeType.SELL,
-        quantity=trade_request.quantity,
-        price_at_trade=current_price,
-        total_cost=total_value
+    trade, user, wallet_result = await _run_trade(
+        db, current_user.id, coin_symbol, ModelTradeType.SELL, trade_request.quantity, current_price
     )
     
-    # Save to database
-    db.add(trade)
-    db.commit()
-    db.refresh(trade)
-
-    # XP system: Grant XP for trading
-    def xp_needed(level):
-        return 100 + (level - 1) * 50
-    current_user.xp += 25  # +25 XP for making a trade
-    while current_user.xp >= xp_needed(current_user.level):
-        current_user.xp -= xp_needed(current_user.level)
-        current_user.level += 1
-    db.commit()
-    db.refresh(current_user)
-    
-    # Update leaderboard entry for user
-    try:
-        leaderboard_service = LeaderboardService(db)
-        await leaderboard_service.update_user_leaderboard_entry(current_user)
-    except Exception as e:
-        # Log error but don't fail the trade
-        print(f"Error updating leaderboard: {e}")
-    
-    # Check and award achievements
-    try:
-        achievement_service = AchievementService(db)
-        await achievement_service.check_and_award_achievements(current_user)
-    except Exception as e:
-        # Log error but don't fail the trade
-        print(f"Error checking achievements: {e}")
-    
     return TradeConfirmation(
         trade=trade,
         new_balance=wallet_result['new_balance'],
@@ -448,93 +324,56 @@ async def sell_crypto(
 
 @router.get("/portfolio", response_model=PortfolioResponse)
 async def get_portfolio(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's portfolio with holdings and performance"""
     try:
-        # Always calculate portfolio from real trades - no more virtual data
+        # Portfolio is built from the position ledger - no more virtual data
         print(f"Calculating portfolio for user: {current_user.username} (ID: {current_user.id})")
         
-        # Get user's trades
-        trades = db.query(Trade).filter(Trade.user_id == current_user.id).all()
-        print(f"Found {len(trades)} trades for user {current_user.username}")
+        # Open positions are maintained incrementally as trades are written
+        positions, wallet = await db.run_sync(lambda session: (
+            PositionService(session).get_positions(current_user.id),
+            WalletService(session).get_or_create_wallet(current_user.id)
+        ))
+        print(f"Found {len(positions)} open positions for user {current_user.username}")
         
-        # Calculate portfolio from trades
-        holdings = {}
-        total_cost = 0
+        # Read all current prices in one batch
+        current_prices = await get_multiple_crypto_prices([position.coin_symbol for position in positions])
         
-        # Calculate portfolio from trades
-        holdings = {}
-        total_cost = 0
+        portfolio_holdings = []
+        total_value = Decimal('0')
+        total_cost = Decimal('0')
         
-        for trade in trades:
-            symbol = trade.coin_symbol
-            if symbol not in holdings:
-                holdings[symbol] = {
-                    "quantity": 0,
-                    "total_cost": 0,
-                    "trades": []
-                }
+        for position in positions:
+            current_price = current_prices.get(position.coin_symbol)
+            if current_price is None:
+                print(f"Error getting price for {position.coin_symbol}: no price available")
+                continue
             
-            if trade.trade_type == ModelTradeType.BUY:
-                holdings[symbol]["quantity"] += trade.quantity
-                holdings[symbol]["total_cost"] += trade.quantity * trade.price_at_trade
-                total_cost += trade.quantity * trade.price_at_trade
-            else:  # SELL
-                # Calculate cost basis reduction proportionally BEFORE reducing quantity
-                if holdings[symbol]["quantity"] > 0:
-                    cost_reduction = (trade.quantity / holdings[symbol]["quantity"]) * holdings[symbol]["total_cost"]
-                    holdings[symbol]["total_cost"] -= cost_reduction
-                    total_cost -= cost_reduction
-                
-                holdings[symbol]["quantity"] -= trade.quantity
+            current_value = position.quantity * current_price
+            total_value += current_value
+            total_cost += position.cost_basis
             
-            holdings[symbol]["trades"].append(trade)
-        
-        # Get current prices and calculate portfolio value
-        portfolio_holdings = []
-        total_value = 0
-        
-        print(f"Processing {len(holdings)} holdings for portfolio calculation")
-        
-        for symbol, holding in holdings.items():
-            if holding["quantity"] > 0:  # Only include positive holdings
-                try:
-                    print(f"Processing {symbol}: quantity={holding['quantity']}, total_cost={holding['total_cost']}")
-                    current_price = await get_crypto_price(symbol)
-                    current_value = holding["quantity"] * current_price
-                    total_value += current_value
-                    
-                    pnl = current_value - holding["total_cost"]
-                    pnl_percentage = (pnl / holding["total_cost"] * 100) if holding["total_cost"] > 0 else Decimal('0')
-                    
-                    portfolio_holding = PortfolioHolding(
-                        coin_symbol=symbol,
-                        quantity=holding["quantity"],
-                        current_price=current_price,
-                        current_value=current_value,
-                        avg_buy_price=holding["total_cost"] / holding["quantity"] if holding["quantity"] > 0 else Decimal('0'),
-                        total_invested=holding["total_cost"],
-                        profit_loss=pnl,
-                        profit_loss_percent=pnl_percentage
-                    )
-                    
-                    portfolio_holdings.append(portfolio_holding)
-                    print(f"Added {symbol} to portfolio: current_price=${current_price}, current_value=${current_value}, pnl=${pnl}")
-                    
-                except Exception as e:
-                    print(f"Error getting price for {symbol}: {e}")
-                    continue
+            pnl = current_value - position.cost_basis
+            pnl_percentage = (pnl / position.cost_basis * 100) if position.cost_basis > 0 else Decimal('0')
+            
+            portfolio_holdings.append(PortfolioHolding(
+                coin_symbol=position.coin_symbol,
+                quantity=position.quantity,
+                current_price=current_price,
+                current_value=current_value,
+                avg_buy_price=position.cost_basis / position.quantity,
+                total_invested=position.cost_basis,
+                profit_loss=pnl,
+                profit_loss_percent=pnl_percentage
+            ))
         
         # Calculate total P&L
         total_pnl = total_value - total_cost
         total_pnl_percentage = (total_pnl / total_cost * 100) if total_cost > 0 else Decimal('0')
         
-        # Get wallet balance
-        wallet_service = WalletService(db)
-        wallet = wallet_service.get_or_create_wallet(current_user.id)
-        
         return PortfolioResponse(
             wallet_balance=wallet.balance,
             total_portfolio_value=total_value,
@@ -554,8 +393,8 @@ async def get_portfolio(
 @router.post("/", response_model=TradeConfirmation)
 async def execute_trade(
     trade_request: TradeRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Execute a trade (buy or sell) using the new wallet system"""
     
@@ -568,7 +407,6 @@ async def execute_trade(
         )
     
     # Get FRESH current price from CoinGecko for trading (bypass cache)
-    from app.services.price_service import price_service
     current_price_response = await price_service.get_fresh_price_for_trading(coin_symbol)
     if not current_price_response:
         raise HTTPException(
@@ -587,143 +425,83 @@ async def execute_trade(
             detail=f"Price data is too old ({price_age_seconds:.0f} seconds). Please refresh and try again."
         )
     
-    # Initialize services
-    wallet_service = WalletService(db)
-    leaderboard_service = LeaderboardService(db)
-    achievement_service = AchievementService(db)
+    trade_type = ModelTradeType(trade_request.trade_type.value)
+    trade, user, wallet_result = await _run_trade(
+        db, current_user.id, coin_symbol, trade_type, trade_request.quantity, current_price
+    )
     
-    try:
-        if trade_request.trade_type == ModelTradeType.BUY:
-            # BUY operation
-            total_cost = trade_request.quantity * current_price
-            
-            # Check wallet balance
-            wallet = wallet_service.get_or_create_wallet(current_user.id)
-            if wallet.balance < total_cost:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient balance. Required: {total_cost}, Available: {wallet.balance}"
-                )
-            
-            # Deduct from wallet
-            wallet_result = wallet_service.deduct_from_wallet(current_user.id, total_cost)
-            
-            # Create trade record
-            trade = Trade(
-                user_id=current_user.id,
-                coin_symbol=coin_symbol,
-                trade_type=ModelTradeType.BUY,
-                quantity=trade_request.quantity,
-                price_at_trade=current_price,
-                total_cost=total_cost
-            )
-            
-            db.add(trade)
-            db.commit()
-            db.refresh(trade)
-            
-            message = f"Successfully bought {trade_request.quantity} {coin_symbol} at ${current_price} each"
-            
-        else:
-            # SELL operation
-            # Calculate current holdings for this coin
-            buys = db.query(Trade).filter(
-                Trade.user_id == current_user.id,
-                Trade.coin_symbol == coin_symbol,
-                Trade.trade_type == ModelTradeType.BUY
-            ).all()
-            
-            sells = db.query(Trade).filter(
-                Trade.user_id == current_user.id,
-                Trade.coin_symbol == coin_symbol,
-                Trade.trade_type == ModelTradeType.SELL
-            ).all()
-            
-            total_bought = sum(trade.quantity for trade in buys)
-            total_sold = sum(trade.quantity for trade in sells)
-            current_holdings = total_bought - total_sold
-            
-            # Check if user has enough coins to sell
-            if current_holdings < trade_request.quantity:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient {coin_symbol} balance. Required: {trade_request.quantity}, Available: {current_holdings}"
-                )
-            
-            # Calculate total value
-            total_value = trade_request.quantity * current_price
-            
-            # Add to wallet
-            wallet_result = wallet_service.top_up_wallet(current_user.id, total_value)
-            
-            # Create trade record
-            trade = Trade(
-                user_id=current_user.id,
-                coin_symbol=coin_symbol,
-                trade_type=ModelTradeType.SELL,
-                quantity=trade_request.quantity,
-                price_at_trade=current_price,
-                total_cost=total_value
-            )
-            
-            db.add(trade)
-            db.commit()
-            db.refresh(trade)
-            
-            message = f"Successfully sold {trade_request.quantity} {coin_symbol} at ${current_price} each"
-        
-        # XP system: Grant XP for trading
-        def xp_needed(level):
-            return 100 + (level - 1) * 50
-        
-        # Get current user from database to ensure it's attached to this session
-        current_user = db.query(User).filter(User.id == current_user.id).first()
-        if current_user:
-            current_user.xp += 25  # +25 XP for making a trade
-            while current_user.xp >= xp_needed(current_user.level):
-                current_user.xp -= xp_needed(current_user.level)
-                current_user.level += 1
-            db.commit()
-            db.refresh(current_user)
-        
-        # Update leaderboard entry for user
-        try:
-            await leaderboard_service.update_user_leaderboard_entry(current_user)
-        except Exception as e:
-            print(f"Error updating leaderboard: {e}")
-        
-        # Check and award achievements
-        try:
-            await achievement_service.check_and_award_achievements(current_user)
-        except Exception as e:
-            print(f"Error checking achievements: {e}")
-        
-        return TradeConfirmation(
-            trade=trade,
-            new_balance=wallet_result['new_balance'],
-            message=message
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Trade execution failed: {str(e)}"
-        )
+    action = "bought" if trade_type == ModelTradeType.BUY else "sold"
+    return TradeConfirmation(
+        trade=trade,
+        new_balance=wallet_result['new_balance'],
+        message=f"Successfully {action} {trade_request.quantity} {coin_symbol} at ${current_price} each"
+    )
 
-@router.get("/history", response_model=List[TradeResponse])
+TRADE_EXPORT_COLUMNS = [
+    ("id", lambda trade: trade.id),
+    ("timestamp", lambda trade: trade.timestamp),
+    ("coin_symbol", lambda trade: trade.coin_symbol),
+    ("trade_type", lambda trade: trade.trade_type),
+    ("quantity", lambda trade: trade.quantity),
+    ("price_at_trade", lambda trade: trade.price_at_trade),
+    ("total_cost", lambda trade: trade.total_cost),
+]
+
+def _filter_trades(stmt, coin_symbol: Optional[str], trade_type: Optional[ModelTradeType],
+                   since: Optional[datetime], until: Optional[datetime]):
+    """Apply the history/export query filters in SQL"""
+    if coin_symbol:
+        stmt = stmt.where(Trade.coin_symbol == coin_symbol.upper())
+    if trade_type:
+        stmt = stmt.where(Trade.trade_type == trade_type)
+    if since:
+        stmt = stmt.where(Trade.timestamp >= since)
+    if until:
+        stmt = stmt.where(Trade.timestamp < until)
+    return stmt
+
+@router.get("/history", response_model=TradeHistoryPage)
 async def get_trade_history(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    coin_symbol: Optional[str] = None,
+    trade_type: Optional[ModelTradeType] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get user's trade history"""
-    trades = db.query(Trade).filter(
-        Trade.user_id == current_user.id
-    ).order_by(Trade.timestamp.desc()).all()
-    
-    return [TradeResponse.from_orm(trade) for trade in trades]
+    """Get user's trade history, newest first, one page at a time"""
+    try:
+        cursor_id = decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    stmt = _filter_trades(select(Trade), coin_symbol, trade_type, since, until)
+    result = await db.execute(newest_first(stmt, Trade, "timestamp", "user_id", current_user.id, cursor_id, limit))
+    trades, next_cursor = split_page(result.scalars().all(), limit)
+    return TradeHistoryPage(
+        trades=[TradeResponse.from_orm(trade) for trade in trades],
+        next_cursor=next_cursor
+    )
+
+@router.get("/history/export")
+async def export_trade_history(
+    format: ExportFormat = ExportFormat.CSV,
+    coin_symbol: Optional[str] = None,
+    trade_type: Optional[ModelTradeType] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user_async)
+):
+    """Download the user's full trade history as CSV or NDJSON, oldest first, streamed in batches"""
+    stmt = _filter_trades(select(Trade).where(Trade.user_id == current_user.id), coin_symbol, trade_type, since, until)
+    stmt = stmt.order_by(Trade.timestamp, Trade.id)
+    return StreamingResponse(
+        stream_export(stmt, TRADE_EXPORT_COLUMNS, format),
+        media_type=format.media_type,
+        headers=export_response_headers("trades", format)
+    )
 
 @router.get("/api-status")
 async def get_api_status():
@@ -733,4 +511,9 @@ async def get_api_status():
         return status
     except Exception as e:
         logger.error(f"Error getting API status: {e}")
-        raise HTTPException(status_code=500, detail="Failed to get API status") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to get API status")
+
+@router.get("/post-trade/stats")
+async def get_post_trade_stats():
+    """Get queue depth, lag and retry counters for post-trade leaderboard and achievement updates"""
+    return await post_trade_queue.get_stats()
@@ -1,17 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
 from datetime import datetime
+from typing import Optional
 import razorpay
 import os
 import hmac
 import hashlib
 
-from app.auth import get_current_user
-from app.db import SessionLocal
+from app.auth import get_current_user_async
+from app.db import get_async_db
 from app.models.user import User
 from app.models.wallet_transaction import WalletTransaction
 from app.services.wallet_service import WalletService
+from app.services.pagination import decode_cursor, newest_first, split_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.history_export import ExportFormat, stream_export, export_response_headers
 from app.schemas.wallet import (
     WalletResponse,
     WalletUpdateRequest,
@@ -58,22 +63,14 @@ try:
 except Exception:
     phonepe_client = None
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/", response_model=WalletResponse)
 async def get_wallet(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's wallet information"""
     
-    wallet_service = WalletService(db)
-    wallet = wallet_service.get_or_create_wallet(current_user.id)
+    wallet = await db.run_sync(lambda session: WalletService(session).get_or_create_wallet(current_user.id))
     
     return WalletResponse(
         id=wallet.id,
@@ -85,28 +82,27 @@ async def get_wallet(
 
 @router.get("/summary")
 async def get_wallet_summary(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get comprehensive wallet summary"""
     
-    wallet_service = WalletService(db)
-    summary = wallet_service.get_wallet_summary(current_user.id)
+    summary = await db.run_sync(lambda session: WalletService(session).get_wallet_summary(current_user.id))
     
     return summary
 
 @router.post("/top-up", response_model=WalletTransactionResponse)
 async def top_up_wallet(
     top_up_request: WalletTopUpRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Top up wallet with specified amount"""
     
-    wallet_service = WalletService(db)
-    
     try:
-        result = wallet_service.top_up_wallet(current_user.id, top_up_request.amount)
+        result = await db.run_sync(
+            lambda session: WalletService(session).top_up_wallet(current_user.id, top_up_request.amount)
+        )
         
         return WalletTransactionResponse(
             success=result['success'],
@@ -125,8 +121,8 @@ async def top_up_wallet(
 @router.post("/direct-topup")
 async def direct_topup(
     amount_inr: float,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Direct top-up with INR amount - converts to demo coins"""
     
@@ -140,10 +136,8 @@ async def direct_topup(
     COINS_PER_RUPEE = 50
     coins_to_add = Decimal(str(amount_inr * COINS_PER_RUPEE))
     
-    wallet_service = WalletService(db)
-    
     try:
-        result = wallet_service.top_up_wallet(current_user.id, coins_to_add)
+        result = await db.run_sync(lambda session: WalletService(session).top_up_wallet(current_user.id, coins_to_add))
         
         return {
             "success": True,
@@ -164,19 +158,17 @@ async def direct_topup(
 @router.post("/update", response_model=WalletTransactionResponse)
 async def update_wallet_balance(
     update_request: WalletUpdateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update wallet balance (add or subtract)"""
     
-    wallet_service = WalletService(db)
-    
     try:
-        result = wallet_service.update_balance(
+        result = await db.run_sync(lambda session: WalletService(session).update_balance(
             current_user.id, 
             update_request.amount, 
             update_request.operation
-        )
+        ))
         
         return WalletTransactionResponse(
             success=result['success'],
@@ -195,15 +187,13 @@ async def update_wallet_balance(
 @router.post("/deduct", response_model=WalletTransactionResponse)
 async def deduct_from_wallet(
     amount: Decimal,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Deduct amount from wallet"""
     
-    wallet_service = WalletService(db)
-    
     try:
-        result = wallet_service.deduct_from_wallet(current_user.id, amount)
+        result = await db.run_sync(lambda session: WalletService(session).deduct_from_wallet(current_user.id, amount))
         
         return WalletTransactionResponse(
             success=result['success'],
@@ -222,15 +212,13 @@ async def deduct_from_wallet(
 @router.post("/reset")
 async def reset_wallet(
     new_balance: Decimal = Decimal('100000.0'),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reset wallet to initial balance (admin function)"""
     
-    wallet_service = WalletService(db)
-    
     try:
-        result = wallet_service.reset_wallet(current_user.id, new_balance)
+        result = await db.run_sync(lambda session: WalletService(session).reset_wallet(current_user.id, new_balance))
         
         return {
             "success": True,
@@ -246,13 +234,12 @@ async def reset_wallet(
 
 @router.get("/balance")
 async def get_balance(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current wallet balance (simple endpoint)"""
     
-    wallet_service = WalletService(db)
-    wallet = wallet_service.get_or_create_wallet(current_user.id)
+    wallet = await db.run_sync(lambda session: WalletService(session).get_or_create_wallet(current_user.id))
     
     return {
         "balance": wallet.balance,
@@ -263,8 +250,8 @@ async def get_balance(
 @router.post("/create-topup-order")
 async def create_wallet_topup_order(
     request: WalletTopUpOrderRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a Razorpay order for wallet top-up"""
     
@@ -330,8 +317,8 @@ async def create_wallet_topup_order(
 @router.post("/create-topup-order-phonepe")
 async def create_wallet_topup_order_phonepe(
     request: PhonePeTopUpOrderRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a PhonePe Pay Page order and return redirect URL."""
     if phonepe_client is None:
@@ -367,8 +354,8 @@ async def create_wallet_topup_order_phonepe(
 @router.post("/verify-topup-payment")
 async def verify_wallet_topup_payment(
     request: WalletTopUpVerifyRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify Razorpay payment and top up wallet"""
     
@@ -435,8 +422,9 @@ async def verify_wallet_topup_payment(
             # Direct top-up (custom amount)
             game_usd_amount = request.amount * 500  # Default: ₹1 = 500 USD
         
-        wallet_service = WalletService(db)
-        result = wallet_service.top_up_wallet(current_user.id, Decimal(str(game_usd_amount)))
+        result = await db.run_sync(
+            lambda session: WalletService(session).top_up_wallet(current_user.id, Decimal(str(game_usd_amount)))
+        )
         
         # Store the transaction in the database
         transaction = WalletTransaction(
@@ -452,8 +440,8 @@ async def verify_wallet_topup_payment(
         )
         
         db.add(transaction)
-        db.commit()
-        db.refresh(transaction)
+        await db.commit()
+        await db.refresh(transaction)
         
         return {
             "success": True,
@@ -474,18 +462,56 @@ async def verify_wallet_topup_payment(
             detail=f"Payment verification failed: {str(e)}"
         )
 
+TRANSACTION_EXPORT_COLUMNS = [
+    ("id", lambda tx: tx.id),
+    ("timestamp", lambda tx: tx.created_at),
+    ("type", lambda tx: tx.transaction_type),
+    ("amount", lambda tx: tx.amount),
+    ("currency", lambda tx: tx.currency),
+    ("status", lambda tx: tx.status),
+    ("payment_id", lambda tx: tx.payment_id),
+    ("order_id", lambda tx: tx.order_id),
+    ("package_id", lambda tx: tx.package_id),
+    ("description", lambda tx: tx.description),
+]
+
+def _filter_transactions(stmt, transaction_type: Optional[str], transaction_status: Optional[str],
+                         since: Optional[datetime], until: Optional[datetime]):
+    """Apply the transactions/export query filters in SQL"""
+    if transaction_type:
+        stmt = stmt.where(WalletTransaction.transaction_type == transaction_type)
+    if transaction_status:
+        stmt = stmt.where(WalletTransaction.status == transaction_status)
+    if since:
+        stmt = stmt.where(WalletTransaction.created_at >= since)
+    if until:
+        stmt = stmt.where(WalletTransaction.created_at < until)
+    return stmt
+
 @router.get("/transactions")
 async def get_wallet_transactions(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    transaction_status: Optional[str] = Query(None, alias="status"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get user's wallet transaction history"""
+    """Get user's wallet transaction history, newest first, one page at a time"""
+    try:
+        cursor_id = decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
     
     try:
-        # Query wallet transactions for the current user
-        transactions = db.query(WalletTransaction).filter(
-            WalletTransaction.user_id == current_user.id
-        ).order_by(WalletTransaction.created_at.desc()).all()
+        # Query one page of wallet transactions for the current user
+        stmt = _filter_transactions(select(WalletTransaction), transaction_type, transaction_status, since, until)
+        result = await db.execute(
+            newest_first(stmt, WalletTransaction, "created_at", "user_id", current_user.id, cursor_id, limit)
+        )
+        transactions, next_cursor = split_page(result.scalars().all(), limit)
         
         # Convert to response format
         transaction_list = []
@@ -506,7 +532,8 @@ async def get_wallet_transactions(
         return {
             "success": True,
             "data": transaction_list,
-            "count": len(transaction_list)
+            "count": len(transaction_list),
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
@@ -515,11 +542,31 @@ async def get_wallet_transactions(
             detail=f"Failed to fetch transactions: {str(e)}"
         ) 
 
+@router.get("/transactions/export")
+async def export_wallet_transactions(
+    format: ExportFormat = ExportFormat.CSV,
+    transaction_type: Optional[str] = None,
+    transaction_status: Optional[str] = Query(None, alias="status"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user_async)
+):
+    """Download the user's full wallet transaction history as CSV or NDJSON, oldest first, streamed in batches"""
+    stmt = _filter_transactions(
+        select(WalletTransaction).where(WalletTransaction.user_id == current_user.id),
+        transaction_type, transaction_status, since, until
+    ).order_by(WalletTransaction.created_at, WalletTransaction.id)
+    return StreamingResponse(
+        stream_export(stmt, TRANSACTION_EXPORT_COLUMNS, format),
+        media_type=format.media_type,
+        headers=export_response_headers("wallet-transactions", format)
+    )
+
 @router.post("/verify-topup-payment-phonepe")
 async def verify_wallet_topup_payment_phonepe(
     request: PhonePeTopUpVerifyRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify PhonePe transaction using status API and credit wallet."""
     if phonepe_client is None:
@@ -549,8 +596,9 @@ async def verify_wallet_topup_payment_phonepe(
         else:
             game_usd_amount = request.amount * 500
 
-        wallet_service = WalletService(db)
-        result = wallet_service.top_up_wallet(current_user.id, Decimal(str(game_usd_amount)))
+        result = await db.run_sync(
+            lambda session: WalletService(session).top_up_wallet(current_user.id, Decimal(str(game_usd_amount)))
+        )
 
         # Extract a payment id if present
         payment_id = request.merchant_transaction_id
@@ -577,8 +625,8 @@ async def verify_wallet_topup_payment_phonepe(
         )
 
         db.add(transaction)
-        db.commit()
-        db.refresh(transaction)
+        await db.commit()
+        await db.refresh(transaction)
 
         return {
             "success": True,
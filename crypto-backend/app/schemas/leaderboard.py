@@ -29,6 +29,11 @@ class LeaderboardEntryResponse(BaseModel):
     global_rank: Optional[int] = None
     weekly_rank: Optional[int] = None
     
+    # Change since the start of the requested window (daily/weekly/monthly boards only)
+    period_rank: Optional[int] = None
+    period_profit_loss: Optional[Decimal] = None
+    period_profit_loss_percent: Optional[Decimal] = None
+    
     # Timestamps
     last_updated: datetime
     week_start: Optional[datetime] = None
@@ -49,6 +54,14 @@ class WeeklyLeaderboardResponse(BaseModel):
     week_end: datetime
     leaderboard: List[LeaderboardEntryResponse]
 
+class PeriodLeaderboardResponse(BaseModel):
+    """Response model for daily and monthly leaderboards"""
+    period: str
+    total_users: int
+    period_start: datetime
+    period_end: datetime
+    leaderboard: List[LeaderboardEntryResponse]
+
 class LeaderboardStatsResponse(BaseModel):
     """Response model for leaderboard statistics"""
     total_traders: int
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 class TradeType(str, Enum):
@@ -25,6 +25,10 @@ class TradeResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class TradeHistoryPage(BaseModel):
+    trades: List[TradeResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page; None on the last page
+
 class TradeConfirmation(BaseModel):
     trade: TradeResponse
     new_balance: Decimal
@@ -1,14 +1,28 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Tuple
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy import func, and_, or_, desc, case
 
 from app.models.user import User
 from app.models.trade import Trade, TradeType
 from app.models.leaderboard import LeaderboardEntry
-from app.models.achievement import Achievement, UserAchievement, UserLoginStreak, AchievementType
+from app.models.position import Position
+from app.models.achievement import Achievement, UserAchievement, UserLoginStreak, UserAchievementCounters, AchievementType
 from app.schemas.achievement import AchievementRewardResponse, UserAchievementSummary
+from app.services.catalog import catalog
+from app.services.position_service import PositionService
+
+# Achievement types measured against the per-user trade counters
+COUNTER_ACHIEVEMENT_TYPES = {
+    AchievementType.TRADING_MILESTONE.value,
+    AchievementType.VOLUME_REWARD.value,
+    AchievementType.DIVERSIFICATION.value,
+}
+# Types a trade event can complete, and every type
+TRADE_ACHIEVEMENT_TYPES = COUNTER_ACHIEVEMENT_TYPES | {AchievementType.PROFIT_ACHIEVEMENT.value}
+ALL_ACHIEVEMENT_TYPES = TRADE_ACHIEVEMENT_TYPES | {AchievementType.LOGIN_STREAK.value}
 
 class AchievementService:
     """Service for managing achievements and user progress"""
@@ -153,6 +167,7 @@ class AchievementService:
             
             try:
                 self.db.commit()
+                catalog.invalidate()
             except Exception:
                 self.db.rollback()
                 
@@ -160,60 +175,45 @@ class AchievementService:
             # If everything fails, just return
             pass
     
-    def get_all_achievements(self) -> List[Achievement]:
-        """Get all active achievements"""
+    def seed_default_achievements(self):
+        """Insert the default achievements if the table is empty (run at startup)"""
+        if self.db.query(Achievement.id).first():
+            return
+        
+        print("No achievements found, inserting defaults...")
         try:
-            # Reset any failed transaction
+            from sqlalchemy import text
+            
+            # Insert default achievements directly
+            self.db.execute(text("""
+                INSERT INTO achievements (name, description, type, icon, requirement_value, requirement_type, reward_coins, reward_title, is_active) VALUES
+                ('First Trade', 'Complete your first trade', 'trading_milestone', '🎯', 1, 'trades', 1000, 'Trader', true),
+                ('Trading Novice', 'Complete 10 trades', 'trading_milestone', '📈', 10, 'trades', 2000, 'Novice Trader', true),
+                ('Active Trader', 'Complete 50 trades', 'trading_milestone', '🚀', 50, 'trades', 5000, 'Active Trader', true),
+                ('Expert Trader', 'Complete 100 trades', 'trading_milestone', '💎', 100, 'trades', 10000, 'Expert Trader', true),
+                ('First Profit', 'Achieve your first profitable trade', 'profit_achievement', '💰', 0.01, 'profit_percentage', 1500, 'Profit Maker', true),
+                ('Rising Star', 'Achieve 5% portfolio profit', 'profit_achievement', '⭐', 5, 'profit_percentage', 3000, 'Rising Star', true),
+                ('Profit Master', 'Achieve 25% portfolio profit', 'profit_achievement', '🏆', 25, 'profit_percentage', 7500, 'Profit Master', true),
+                ('Diversified Portfolio', 'Hold 5 different cryptocurrencies', 'diversification', '🎨', 5, 'coins_held', 2000, 'Diversifier', true),
+                ('Login Streak', 'Login for 7 consecutive days', 'login_streak', '🔥', 7, 'days_streak', 1000, 'Loyal Trader', true),
+                ('High Volume', 'Trade over 100,000 DemoCoins in value', 'volume_reward', '📊', 100000, 'volume', 3000, 'Volume Trader', true),
+                ('Whale Trader', 'Trade over 1,000,000 DemoCoins in value', 'volume_reward', '🐋', 1000000, 'volume', 10000, 'Whale Trader', true)
+            """))
+            
+            self.db.commit()
+            catalog.invalidate()
+            print("Default achievements inserted successfully")
+        except Exception as init_error:
+            print(f"Error initializing achievements: {init_error}")
             try:
                 self.db.rollback()
             except:
                 pass
-            
-            achievements = self.db.query(Achievement).filter(
-                Achievement.is_active == True
-            ).all()
-            
-            print(f"Found {len(achievements)} achievements in database")
-            
-            # If no achievements exist, try to initialize default ones
-            if not achievements:
-                print("No achievements found, trying to initialize...")
-                try:
-                    from sqlalchemy import text
-                    
-                    # Insert default achievements directly
-                    self.db.execute(text("""
-                        INSERT INTO achievements (name, description, type, icon, requirement_value, requirement_type, reward_coins, reward_title, is_active) VALUES
-                        ('First Trade', 'Complete your first trade', 'trading_milestone', '🎯', 1, 'trades', 1000, 'Trader', true),
-                        ('Trading Novice', 'Complete 10 trades', 'trading_milestone', '📈', 10, 'trades', 2000, 'Novice Trader', true),
-                        ('Active Trader', 'Complete 50 trades', 'trading_milestone', '🚀', 50, 'trades', 5000, 'Active Trader', true),
-                        ('Expert Trader', 'Complete 100 trades', 'trading_milestone', '💎', 100, 'trades', 10000, 'Expert Trader', true),
-                        ('First Profit', 'Achieve your first profitable trade', 'profit_achievement', '💰', 0.01, 'profit_percentage', 1500, 'Profit Maker', true),
-                        ('Rising Star', 'Achieve 5% portfolio profit', 'profit_achievement', '⭐', 5, 'profit_percentage', 3000, 'Rising Star', true),
-                        ('Profit Master', 'Achieve 25% portfolio profit', 'profit_achievement', '🏆', 25, 'profit_percentage', 7500, 'Profit Master', true),
-                        ('Diversified Portfolio', 'Hold 5 different cryptocurrencies', 'diversification', '🎨', 5, 'coins_held', 2000, 'Diversifier', true),
-                        ('Login Streak', 'Login for 7 consecutive days', 'login_streak', '🔥', 7, 'days_streak', 1000, 'Loyal Trader', true),
-                        ('High Volume', 'Trade over 100,000 DemoCoins in value', 'volume_reward', '📊', 100000, 'volume', 3000, 'Volume Trader', true),
-                        ('Whale Trader', 'Trade over 1,000,000 DemoCoins in value', 'volume_reward', '🐋', 1000000, 'volume', 10000, 'Whale Trader', true)
-                    """))
-                    
-                    self.db.commit()
-                    print("Default achievements inserted successfully")
-                    
-                    # Get achievements again
-                    achievements = self.db.query(Achievement).filter(
-                        Achievement.is_active == True
-                    ).all()
-                    print(f"Now found {len(achievements)} achievements")
-                except Exception as init_error:
-                    print(f"Error initializing achievements: {init_error}")
-                    try:
-                        self.db.rollback()
-                        
-                    except:
-                        pass
-            
-            return achievements
+    
+    def get_all_achievements(self) -> List[Achievement]:
+        """Get all active achievements from the catalog cache"""
+        try:
+            return catalog.achievements(self.db)
         except Exception as e:
             print(f"Error in get_all_achievements: {e}")
             # Return empty list if there's an error
@@ -238,31 +238,24 @@ class AchievementService:
             achievements = self.get_all_achievements()
             print(f"Found {len(achievements)} achievements to initialize")
             
+            # One query for the achievements this user already tracks
+            existing_ids = {
+                achievement_id for (achievement_id,) in self.db.query(UserAchievement.achievement_id).filter(
+                    UserAchievement.user_id == user.id
+                )
+            }
+            
             initialized_count = 0
             for achievement in achievements:
-                try:
-                    # Check if user already has this achievement
-                    existing = self.db.query(UserAchievement).filter(
-                        and_(
-                            UserAchievement.user_id == user.id,
-                            UserAchievement.achievement_id == achievement.id
-                        )
-                    ).first()
-                    
-                    if not existing:
-                        user_achievement = UserAchievement(
-                            user_id=user.id,
-                            achievement_id=achievement.id,
-                            current_progress=0,
-                            is_completed=False
-                        )
-                        self.db.add(user_achievement)
-                        initialized_count += 1
-                        print(f"Initialized achievement {achievement.name} for user {user.id}")
-                except Exception as e:
-                    print(f"Error initializing achievement {achievement.name}: {e}")
-                    # Skip this achievement if there's an error
-                    continue
+                if achievement.id not in existing_ids:
+                    user_achievement = UserAchievement(
+                        user_id=user.id,
+                        achievement_id=achievement.id,
+                        current_progress=0,
+                        is_completed=False
+                    )
+                    self.db.add(user_achievement)
+                    initialized_count += 1
             
             # Initialize login streak
             try:
@@ -301,28 +294,32 @@ class AchievementService:
     
     async def check_and_award_achievements(self, user: User) -> List[AchievementRewardResponse]:
         """Check all achievements and award any newly completed ones"""
-        rewards = []
-        
-        # Initialize user achievements if not exists
-        self.initialize_user_achievements(user)
-        
-        # Check trading milestones
-        trading_rewards = await self._check_trading_milestones(user)
-        rewards.extend(trading_rewards)
-        
-        # Check profit achievements
-        profit_rewards = await self._check_profit_achievements(user)
-        rewards.extend(profit_rewards)
-        
-        # Check diversification achievements
-        diversification_rewards = await self._check_diversification_achievements(user)
-        rewards.extend(diversification_rewards)
-        
-        # Check volume achievements
-        volume_rewards = await self._check_volume_achievements(user)
-        rewards.extend(volume_rewards)
-        
-        return rewards
+        return await self._evaluate(user, ALL_ACHIEVEMENT_TYPES)
+    
+    async def evaluate_trade_achievements(self, user: User) -> List[AchievementRewardResponse]:
+        """Check the achievements a trade can complete and award any newly completed ones"""
+        return await self._evaluate(user, TRADE_ACHIEVEMENT_TYPES)
+    
+    def record_trade(self, trade: Trade, position: Position) -> UserAchievementCounters:
+        """Apply a new trade to the user's achievement counters.
+        
+        `position` is the trade's position after PositionService.apply_trade. Does not
+        commit: the caller commits the trade row, position and counters together.
+        """
+        counters = self._get_counters(trade.user_id)
+        if not counters:
+            # First counted trade: seed from the ledger, which includes this trade once flushed
+            self.db.flush()
+            return self._seed_counters(trade.user_id)
+        
+        quantity = Decimal(trade.quantity)
+        held_after = Decimal(position.quantity)
+        held_before = held_after - quantity if trade.trade_type == TradeType.BUY else held_after + quantity
+        
+        counters.trade_count += 1
+        counters.trade_volume = Decimal(counters.trade_volume) + Decimal(trade.total_cost)
+        counters.coins_held += int(held_after > 0) - int(held_before > 0)
+        return counters
     
     async def update_login_streak(self, user: User) -> Optional[AchievementRewardResponse]:
         """Update login streak and check for streak achievements"""
@@ -361,194 +358,126 @@ class AchievementService:
                 login_streak.longest_streak = 1
                 login_streak.last_login_date = now
         
-        self.db.commit()
-        
-        # Check for streak achievements
-        return await self._check_login_streak_achievements(user)
+        # The streak update and any award are committed together
+        rewards = await self._evaluate(user, (AchievementType.LOGIN_STREAK.value,), login_streak=login_streak)
+        return rewards[0] if rewards else None
     
-    async def _check_trading_milestones(self, user: User) -> List[AchievementRewardResponse]:
-        """Check trading milestone achievements"""
-        rewards = []
+    async def _evaluate(self, user: User, types, login_streak: Optional[UserLoginStreak] = None) -> List[AchievementRewardResponse]:
+        """Compare the user's open achievements of the given types with their progress.
         
-        # Get total trades count
-        total_trades = self.db.query(Trade).filter(Trade.user_id == user.id).count()
+        Progress is recorded and every award applied in a single commit.
+        """
+        open_achievements = self._load_open_achievements(user.id, types)
         
-        # Get trading milestone achievements
-        trading_achievements = self.db.query(Achievement).filter(
-            Achievement.type == "trading_milestone"
-        ).all()
+        profit_percent = None
+        if _needs_profit(open_achievements):
+            from app.services.leaderboard_service import LeaderboardService
+            performance = await LeaderboardService(self.db).calculate_user_portfolio_performance(user)
+            profit_percent = _profit_percent(performance)
         
-        for achievement in trading_achievements:
-            user_achievement = self.db.query(UserAchievement).filter(
-                and_(
-                    UserAchievement.user_id == user.id,
-                    UserAchievement.achievement_id == achievement.id
-                )
-            ).first()
-            
-            if user_achievement and not user_achievement.is_completed:
-                user_achievement.current_progress = total_trades
-                
-                if total_trades >= achievement.requirement_value:
-                    reward = self._award_achievement(user, achievement, user_achievement)
-                    if reward:
-                        rewards.append(reward)
-        
-        return rewards
+        return self._apply_progress(user, open_achievements, profit_percent, login_streak)
     
-    async def _check_profit_achievements(self, user: User) -> List[AchievementRewardResponse]:
-        """Check profit achievement milestones"""
+    def _apply_progress(self, user: User, open_achievements: List[Tuple[Achievement, UserAchievement]],
+                        profit_percent: Optional[Decimal] = None,
+                        login_streak: Optional[UserLoginStreak] = None) -> List[AchievementRewardResponse]:
+        """Record progress on the open achievements, award the completed ones and commit"""
         rewards = []
         
-        # Calculate current profit percentage
-        from app.services.leaderboard_service import LeaderboardService
-        leaderboard_service = LeaderboardService(self.db)
-        performance = await leaderboard_service.calculate_user_portfolio_performance(user)
-        
-        current_profit_percent = float(performance.get('portfolio_performance_percent', 0))
-        
-        # Get profit achievements
-        profit_achievements = self.db.query(Achievement).filter(
-            Achievement.type == "profit_achievement"
-        ).all()
-        
-        for achievement in profit_achievements:
-            user_achievement = self.db.query(UserAchievement).filter(
-                and_(
-                    UserAchievement.user_id == user.id,
-                    UserAchievement.achievement_id == achievement.id
-                )
-            ).first()
-            
-            if user_achievement and not user_achievement.is_completed:
-                user_achievement.current_progress = current_profit_percent
+        if open_achievements:
+            progress = self._progress(user, {achievement.type for achievement, _ in open_achievements}, profit_percent, login_streak)
+            for achievement, user_achievement in open_achievements:
+                value = progress.get(achievement.type)
+                if value is None:
+                    continue
                 
-                if current_profit_percent >= float(achievement.requirement_value):
-                    reward = self._award_achievement(user, achievement, user_achievement)
-                    if reward:
-                        rewards.append(reward)
+                user_achievement.current_progress = value
+                if value >= achievement.requirement_value:
+                    rewards.append(self._award_achievement(user, achievement, user_achievement))
         
+        self.db.commit()
         return rewards
     
-    async def _check_diversification_achievements(self, user: User) -> List[AchievementRewardResponse]:
-        """Check diversification achievements"""
-        rewards = []
-        
-        # Calculate current holdings diversity
-        trades = self.db.query(Trade).filter(Trade.user_id == user.id).all()
-        
-        holdings_data = {}
-        for trade in trades:
-            coin = trade.coin_symbol
-            if coin not in holdings_data:
-                holdings_data[coin] = {
-                    'total_bought': Decimal('0'),
-                    'total_sold': Decimal('0')
-                }
-            
-            if trade.trade_type == TradeType.BUY:
-                holdings_data[coin]['total_bought'] += trade.quantity
-            else:
-                holdings_data[coin]['total_sold'] += trade.quantity
-        
-        # Count coins with positive holdings
-        coins_held = 0
-        for coin, data in holdings_data.items():
-            net_quantity = data['total_bought'] - data['total_sold']
-            if net_quantity > 0:
-                coins_held += 1
-        
-        # Get diversification achievements
-        diversification_achievements = self.db.query(Achievement).filter(
-            Achievement.type == "diversification"
-        ).all()
+    def _load_open_achievements(self, user_id: int, types) -> List[Tuple[Achievement, UserAchievement]]:
+        """Load a user's incomplete achievements of the given types.
+        
+        Definitions come from the catalog and progress rows from one query; rows missing for
+        this user (new users, newly added achievements) are created.
+        """
+        achievements = [achievement for achievement in catalog.achievements(self.db) if achievement.type in types]
+        if not achievements:
+            return []
         
-        for achievement in diversification_achievements:
-            user_achievement = self.db.query(UserAchievement).filter(
-                and_(
-                    UserAchievement.user_id == user.id,
-                    UserAchievement.achievement_id == achievement.id
+        user_achievements = {
+            user_achievement.achievement_id: user_achievement
+            for user_achievement in self.db.query(UserAchievement).filter(
+                UserAchievement.user_id == user_id,
+                UserAchievement.achievement_id.in_([achievement.id for achievement in achievements])
+            )
+        }
+        open_achievements = []
+        for achievement in achievements:
+            user_achievement = user_achievements.get(achievement.id)
+            if user_achievement is None:
+                user_achievement = UserAchievement(
+                    user_id=user_id,
+                    achievement_id=achievement.id,
+                    current_progress=0,
+                    is_completed=False
                 )
-            ).first()
-            
-            if user_achievement and not user_achievement.is_completed:
-                user_achievement.current_progress = coins_held
-                
-                if coins_held >= achievement.requirement_value:
-                    reward = self._award_achievement(user, achievement, user_achievement)
-                    if reward:
-                        rewards.append(reward)
-        
-        return rewards
+                self.db.add(user_achievement)
+            elif user_achievement.is_completed:
+                continue
+            open_achievements.append((achievement, user_achievement))
+        return open_achievements
     
-    async def _check_volume_achievements(self, user: User) -> List[AchievementRewardResponse]:
-        """Check volume trading achievements"""
-        rewards = []
-        
-        # Calculate total trading volume
-        trades = self.db.query(Trade).filter(Trade.user_id == user.id).all()
-        total_volume = sum(trade.total_cost for trade in trades)
-        
-        # Get volume achievements
-        volume_achievements = self.db.query(Achievement).filter(
-            Achievement.type == "volume_reward"
-        ).all()
+    def _progress(self, user: User, types, profit_percent: Optional[Decimal] = None,
+                  login_streak: Optional[UserLoginStreak] = None) -> Dict[str, Decimal]:
+        """Current progress for each achievement type, reading only what those types need"""
+        progress = {}
+        
+        if types & COUNTER_ACHIEVEMENT_TYPES:
+            counters = self._get_counters(user.id) or self._seed_counters(user.id)
+            progress[AchievementType.TRADING_MILESTONE.value] = Decimal(counters.trade_count)
+            progress[AchievementType.VOLUME_REWARD.value] = Decimal(counters.trade_volume)
+            progress[AchievementType.DIVERSIFICATION.value] = Decimal(counters.coins_held)
+        
+        if AchievementType.LOGIN_STREAK.value in types:
+            if login_streak is None:
+                login_streak = self.db.query(UserLoginStreak).filter(
+                    UserLoginStreak.user_id == user.id
+                ).first()
+            if login_streak:
+                progress[AchievementType.LOGIN_STREAK.value] = Decimal(login_streak.current_streak)
         
-        for achievement in volume_achievements:
-            user_achievement = self.db.query(UserAchievement).filter(
-                and_(
-                    UserAchievement.user_id == user.id,
-                    UserAchievement.achievement_id == achievement.id
-                )
-            ).first()
-            
-            if user_achievement and not user_achievement.is_completed:
-                user_achievement.current_progress = total_volume
-                
-                if total_volume >= achievement.requirement_value:
-                    reward = self._award_achievement(user, achievement, user_achievement)
-                    if reward:
-                        rewards.append(reward)
+        if profit_percent is not None:
+            progress[AchievementType.PROFIT_ACHIEVEMENT.value] = profit_percent
         
-        return rewards
+        return progress
     
-    async def _check_login_streak_achievements(self, user: User) -> Optional[AchievementRewardResponse]:
-        """Check login streak achievements"""
-        login_streak = self.db.query(UserLoginStreak).filter(
-            UserLoginStreak.user_id == user.id
+    def _get_counters(self, user_id: int) -> Optional[UserAchievementCounters]:
+        return self.db.query(UserAchievementCounters).filter(
+            UserAchievementCounters.user_id == user_id
         ).first()
-        
-        if not login_streak:
-            return None
-        
-        # Get login streak achievements
-        streak_achievements = self.db.query(Achievement).filter(
-            Achievement.type == "login_streak"
-        ).all()
-        
-        for achievement in streak_achievements:
-            user_achievement = self.db.query(UserAchievement).filter(
-                and_(
-                    UserAchievement.user_id == user.id,
-                    UserAchievement.achievement_id == achievement.id
-                )
-            ).first()
-            
-            if user_achievement and not user_achievement.is_completed:
-                user_achievement.current_progress = login_streak.current_streak
-                
-                if login_streak.current_streak >= achievement.requirement_value:
-                    reward = self._award_achievement(user, achievement, user_achievement)
-                    if reward:
-                        return reward
-        
-        return None
     
-    def _award_achievement(self, user: User, achievement: Achievement, user_achievement: UserAchievement) -> Optional[AchievementRewardResponse]:
-        """Award an achievement to a user"""
-        if user_achievement.is_completed:
-            return None
-        
+    def _seed_counters(self, user_id: int) -> UserAchievementCounters:
+        """Create a user's counters from the position ledger (caller commits)"""
+        trade_count, trade_volume, coins_held = self.db.query(
+            func.coalesce(func.sum(Position.trade_count), 0),
+            func.coalesce(func.sum(Position.total_spent + Position.total_received), 0),
+            func.coalesce(func.sum(case((Position.quantity > 0, 1), else_=0)), 0)
+        ).filter(Position.user_id == user_id).one()
+        
+        counters = UserAchievementCounters(
+            user_id=user_id,
+            trade_count=int(trade_count),
+            trade_volume=Decimal(str(trade_volume)),
+            coins_held=int(coins_held)
+        )
+        self.db.add(counters)
+        return counters
+    
+    def _award_achievement(self, user: User, achievement: Achievement, user_achievement: UserAchievement) -> AchievementRewardResponse:
+        """Award an achievement to a user (committed by the caller)"""
         # Mark as completed
         user_achievement.is_completed = True
         user_achievement.completed_at = datetime.utcnow()
@@ -557,8 +486,6 @@ class AchievementService:
         if achievement.reward_coins > 0:
             user.demo_balance += achievement.reward_coins
         
-        self.db.commit()
-        
         return AchievementRewardResponse(
             achievement_id=achievement.id,
             name=achievement.name,
@@ -586,7 +513,7 @@ class AchievementService:
             
             for ua in user_achievements:
                 try:
-                    achievement = ua.achievement
+                    achievement = catalog.achievement(ua.achievement_id, self.db)
                     progress_percentage = min(100, (float(ua.current_progress) / float(achievement.requirement_value)) * 100)
                     
                     if ua.is_completed:
@@ -756,4 +683,29 @@ class AchievementService:
             'rarest_achievement': rarest_achievement,
             'average_completion_rate': average_completion_rate,
             'total_rewards_distributed': total_rewards
-        } 
\ No newline at end of file
+        } 
+
+
+def _needs_profit(open_achievements: List[Tuple[Achievement, UserAchievement]]) -> bool:
+    """Profit achievements need a priced portfolio; only value it while one is open"""
+    return any(achievement.type == AchievementType.PROFIT_ACHIEVEMENT.value for achievement, _ in open_achievements)
+
+def _profit_percent(performance: Dict) -> Decimal:
+    return Decimal(str(performance.get('portfolio_performance_percent', 0)))
+
+async def evaluate_trade_achievements_async(db: AsyncSession, user: User) -> List[AchievementRewardResponse]:
+    """evaluate_trade_achievements for an AsyncSession: queries run on the async driver, prices are awaited in between"""
+    from app.services.leaderboard_service import LeaderboardService
+    
+    open_achievements = await db.run_sync(
+        lambda session: AchievementService(session)._load_open_achievements(user.id, TRADE_ACHIEVEMENT_TYPES)
+    )
+    
+    profit_percent = None
+    if _needs_profit(open_achievements):
+        positions = await db.run_sync(lambda session: PositionService(session).get_positions(user.id, open_only=False))
+        profit_percent = _profit_percent(await LeaderboardService.value_positions(user.id, positions))
+    
+    return await db.run_sync(
+        lambda session: AchievementService(session)._apply_progress(user, open_achievements, profit_percent)
+    )
@@ -0,0 +1,121 @@
+from sqlalchemy import select, union_all, literal, null, cast, case, or_, tuple_, Integer, String
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from app.models.purchase import Purchase
+from app.models.wallet_transaction import WalletTransaction
+
+# Wallet transactions that were paid for and get an invoice
+BILLABLE_TRANSACTION_TYPES = ("topup", "package", "premium")
+
+PURCHASE = "p"
+WALLET_TRANSACTION = "w"
+
+def _events(user_id: int, purchase_filter=None, transaction_filter=None, name: str = "billable_events"):
+    """One user's purchases and paid wallet transactions as a single set of rows.
+
+    Every branch is restricted to the user (and any extra filter) before the
+    UNION, so each side is an index lookup on its own table.
+    """
+    purchases = select(
+        literal(PURCHASE).label("source"),
+        Purchase.id.label("source_id"),
+        Purchase.razorpay_order_id.label("order_id"),
+        Purchase.razorpay_payment_id.label("payment_id"),
+        Purchase.amount.label("amount"),
+        Purchase.coins_received.label("coins_received"),
+        Purchase.package_id.label("package_id"),
+        cast(null(), String).label("package_code"),
+        Purchase.status.label("status"),
+        Purchase.created_at.label("created_at")
+    ).where(Purchase.user_id == user_id)
+    transactions = select(
+        literal(WALLET_TRANSACTION).label("source"),
+        WalletTransaction.id.label("source_id"),
+        WalletTransaction.order_id.label("order_id"),
+        WalletTransaction.payment_id.label("payment_id"),
+        WalletTransaction.amount.label("amount"),
+        WalletTransaction.amount.label("coins_received"),
+        cast(null(), Integer).label("package_id"),
+        WalletTransaction.package_id.label("package_code"),
+        WalletTransaction.status.label("status"),
+        WalletTransaction.created_at.label("created_at")
+    ).where(
+        WalletTransaction.user_id == user_id,
+        WalletTransaction.transaction_type.in_(BILLABLE_TRANSACTION_TYPES)
+    )
+    if purchase_filter is not None:
+        purchases = purchases.where(purchase_filter)
+    if transaction_filter is not None:
+        transactions = transactions.where(transaction_filter)
+    return union_all(purchases, transactions).subquery(name)
+
+def find_billable_event(db: Session, user_id: int, order_id: Optional[str] = None,
+                        payment_id: Optional[str] = None, transaction_id: Optional[int] = None):
+    """Resolve an invoice request to one of the user's purchases or wallet transactions.
+
+    Matches on order id, then payment id, then row id (a bare transaction id is a
+    wallet transaction id first, as the wallet page sends them). With no
+    identifiers, returns the user's latest completed event. One query either way.
+    """
+    purchase_matches, transaction_matches = [], []
+    if order_id:
+        purchase_matches.append(Purchase.razorpay_order_id == order_id)
+        transaction_matches.append(WalletTransaction.order_id == order_id)
+    if payment_id:
+        purchase_matches.append(Purchase.razorpay_payment_id == payment_id)
+        transaction_matches.append(WalletTransaction.payment_id == payment_id)
+    if transaction_id:
+        purchase_matches.append(Purchase.id == transaction_id)
+        transaction_matches.append(WalletTransaction.id == transaction_id)
+
+    if not purchase_matches:
+        events = _events(user_id, Purchase.status == "completed", WalletTransaction.status == "completed")
+        return db.execute(select(events).order_by(events.c.created_at.desc()).limit(1)).first()
+
+    events = _events(user_id, or_(*purchase_matches), or_(*transaction_matches))
+    order = []
+    priority = [(events.c.order_id == order_id, 0)] if order_id else []
+    if payment_id:
+        priority.append((events.c.payment_id == payment_id, 1))
+    if priority:
+        order.append(case(*priority, else_=2))
+    order += [events.c.source.desc(), events.c.created_at.desc()]
+    return db.execute(select(events).order_by(*order).limit(1)).first()
+
+def decode_event_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Cursors name the last event of the previous page, e.g. "p42"; raises ValueError if malformed"""
+    if not cursor:
+        return None
+    source, source_id = cursor[:1], int(cursor[1:])
+    if source not in (PURCHASE, WALLET_TRANSACTION) or source_id <= 0:
+        raise ValueError("invalid cursor")
+    return source, source_id
+
+def list_billable_events(db: Session, user_id: int, cursor: Optional[Tuple[str, int]], limit: int) -> Tuple[List, Optional[str]]:
+    """One page of the user's completed events, newest first, keyset on (created_at, source, id)"""
+    completed = (Purchase.status == "completed", WalletTransaction.status == "completed")
+    events = _events(user_id, *completed)
+    stmt = select(events)
+    if cursor:
+        last = _events(user_id, *completed, name="cursor_event")
+        last_time = select(last.c.created_at).where(
+            last.c.source == cursor[0], last.c.source_id == cursor[1]
+        ).scalar_subquery()
+        stmt = stmt.where(
+            tuple_(events.c.created_at, events.c.source, events.c.source_id) < tuple_(last_time, cursor[0], cursor[1])
+        )
+    rows = db.execute(stmt.order_by(
+        events.c.created_at.desc(), events.c.source.desc(), events.c.source_id.desc()
+    ).limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, f"{rows[-1].source}{rows[-1].source_id}"
+    return rows, None
+
+def invoice_number(source: str, source_id: int, created_at: Optional[datetime]) -> str:
+    """Stable invoice number for a billable event"""
+    date = (created_at or datetime.now()).strftime('%Y%m%d')
+    prefix = "W" if source == WALLET_TRANSACTION else ""
+    return f"INV-{date}-{prefix}{str(source_id).zfill(6)}"
@@ -0,0 +1,114 @@
+from sqlalchemy.orm import Session
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+import os
+import threading
+import time
+
+from app.db import SessionLocal
+from app.models.achievement import Achievement
+from app.models.purchase import DemoCoinPackage
+
+# Upper bound on how stale another worker's catalog can be after an admin write
+CATALOG_MAX_AGE_SECONDS = float(os.getenv("CATALOG_MAX_AGE_SECONDS", "300"))
+
+class CatalogCache:
+    """In-process copy of the near-static achievements and demo_coin_packages tables.
+
+    Rows are held as read-only column snapshots, and every read returns fresh transient
+    copies, so a caller that changes one never changes the cache or another request's
+    copy. Writers call invalidate() after their commit; it bumps `version` and the next
+    read reloads both tables.
+    """
+
+    def __init__(self, max_age_seconds: float = CATALOG_MAX_AGE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+        self.version = 0
+        self._loaded_version = None
+        self._loaded_at = 0.0
+        self._achievements: Dict[int, Mapping] = {}
+        self._packages: Dict[int, Mapping] = {}
+        self._lock = threading.Lock()
+
+    def achievements(self, db: Optional[Session] = None) -> List[Achievement]:
+        """Active achievements, in id order"""
+        self._ensure_loaded(db)
+        return [Achievement(**values) for values in self._achievements.values() if values['is_active']]
+
+    def achievement(self, achievement_id: int, db: Optional[Session] = None) -> Optional[Achievement]:
+        """Any achievement by id, active or not"""
+        self._ensure_loaded(db)
+        values = self._achievements.get(achievement_id)
+        return Achievement(**values) if values else None
+
+    def packages(self, db: Optional[Session] = None) -> List[DemoCoinPackage]:
+        """Active demo-coin packages, in id order"""
+        self._ensure_loaded(db)
+        return [DemoCoinPackage(**values) for values in self._packages.values() if values['is_active']]
+
+    def package(self, package_id: int, db: Optional[Session] = None) -> Optional[DemoCoinPackage]:
+        """Any demo-coin package by id, active or not"""
+        self._ensure_loaded(db)
+        values = self._packages.get(package_id)
+        return DemoCoinPackage(**values) if values else None
+
+    def invalidate(self):
+        """Drop the loaded catalog; call after committing a write to either table"""
+        with self._lock:
+            self.version += 1
+
+    def load(self, db: Optional[Session] = None):
+        """(Re)load both tables, using `db` or a short-lived session of our own"""
+        with self._lock:
+            self._load(db)
+
+    def _ensure_loaded(self, db: Optional[Session]):
+        if self._is_stale():
+            with self._lock:
+                # Another request may have reloaded while we waited
+                if self._is_stale():
+                    self._load(db)
+
+    def _is_stale(self) -> bool:
+        return self._loaded_version != self.version or time.monotonic() - self._loaded_at > self.max_age_seconds
+
+    def _load(self, db: Optional[Session]):
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+        try:
+            version = self.version
+            achievements = db.query(Achievement).order_by(Achievement.id).all()
+            packages = db.query(DemoCoinPackage).order_by(DemoCoinPackage.id).all()
+            self._achievements = {achievement.id: self._snapshot(achievement) for achievement in achievements}
+            self._packages = {package.id: self._snapshot(package) for package in packages}
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+        finally:
+            if own_session:
+                db.close()
+
+    @staticmethod
+    def _snapshot(row) -> Mapping:
+        """Read-only copy of a row's column values, detached from any session"""
+        return MappingProxyType({column.key: getattr(row, column.key) for column in row.__table__.columns})
+
+catalog = CatalogCache()
+
+def load_catalog():
+    """Seed the default achievements if the table is empty and load the catalog.
+
+    Run once at startup so no request pays for seeding or catalog queries.
+    """
+    from app.services.achievement_service import AchievementService
+
+    db = SessionLocal()
+    try:
+        AchievementService(db).seed_default_achievements()
+        catalog.load(db)
+        print(f"Catalog loaded: {len(catalog.achievements())} achievements, {len(catalog.packages())} packages")
+    except Exception as e:
+        # Not fatal: the catalog loads on first use instead
+        print(f"Error loading catalog: {e}")
+    finally:
+        db.close()
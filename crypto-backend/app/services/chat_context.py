@@ -0,0 +1,169 @@
+from sqlalchemy import func, case, distinct
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+import logging
+import os
+import time
+
+from app.models.trade import Trade, TradeType
+from app.models.wallet import Wallet
+from app.services.position_service import PositionService
+from app.services.price_service import price_service
+from app.services.trade_service import TradeExecuted
+
+logger = logging.getLogger(__name__)
+
+CHAT_CONTEXT_TTL_SECONDS = float(os.getenv("CHAT_CONTEXT_TTL_SECONDS", "30"))
+CHAT_CONTEXT_MAX_USERS = int(os.getenv("CHAT_CONTEXT_MAX_USERS", "10000"))
+# The chatbot has always looked at the last 10 trades and shown the last 5
+RECENT_TRADES = 10
+RECENT_TRADES_SHOWN = 5
+
+class ChatContext:
+    """Everything the chatbot knows about one user, loaded together.
+
+    Shared between requests while it is fresh, so treat it as read-only.
+    """
+
+    def __init__(self, user_id: int, balance: float, holdings: Dict[str, dict],
+                 recent_trades: List[dict], recent_trade_count: int, trade_stats: Dict[str, Any]):
+        self.user_id = user_id
+        self.balance = balance
+        self.holdings = holdings
+        self.recent_trades = recent_trades
+        self.recent_trade_count = recent_trade_count
+        self.trade_stats = trade_stats
+        self.loaded_at = time.monotonic()
+
+    @property
+    def trades_count(self) -> int:
+        return self.trade_stats["total_trades"]
+
+    @property
+    def portfolio(self) -> Dict[str, Any]:
+        """Balance, holdings and recent trades in the shape the chatbot formatters use"""
+        return {
+            "balance": self.balance,
+            "holdings": self.holdings,
+            "recent_trades": self.recent_trades,
+            "total_trades": self.recent_trade_count
+        }
+
+async def load_chat_context(user_id: int, db: Session) -> ChatContext:
+    """Load wallet, open positions, recent trades, trade totals and prices in one pass.
+
+    Four indexed queries and one market snapshot for all held coins,
+    however many coins the user holds.
+    """
+    balance = db.query(Wallet.balance).filter(Wallet.user_id == user_id).scalar()
+    positions = PositionService(db).get_positions(user_id)
+    trades = db.query(Trade).filter(Trade.user_id == user_id).order_by(
+        Trade.timestamp.desc(), Trade.id.desc()
+    ).limit(RECENT_TRADES).all()
+    total, buys, coins, volume = db.query(
+        func.count(Trade.id),
+        func.coalesce(func.sum(case((Trade.trade_type == TradeType.BUY, 1), else_=0)), 0),
+        func.count(distinct(Trade.coin_symbol)),
+        func.coalesce(func.sum(Trade.quantity * Trade.price_at_trade), 0)
+    ).filter(Trade.user_id == user_id).one()
+
+    prices = await price_service.get_market_snapshot([position.coin_symbol for position in positions]) if positions else {}
+
+    holdings = {}
+    for position in positions:
+        price = prices.get(position.coin_symbol)
+        if not price:
+            logger.warning(f"No price data returned for {position.coin_symbol}")
+        holdings[position.coin_symbol] = {
+            "quantity": float(position.quantity),
+            "total_cost": float(position.cost_basis),
+            "current_price": float(price.price_usd) if price else 0.0,
+            "price_change_24h": float(getattr(price, 'price_change_percentage_24h', 0)) if price else 0.0
+        }
+
+    recent_trades = []
+    for trade in trades[:RECENT_TRADES_SHOWN]:
+        trade_data = {
+            "type": trade.trade_type.value,
+            "coin": trade.coin_symbol,
+            "quantity": float(trade.quantity),
+            "price": float(trade.price_at_trade),
+            "date": trade.timestamp.isoformat() if trade.timestamp else "Unknown"
+        }
+        current_price = holdings.get(trade.coin_symbol, {}).get("current_price", 0)
+        if current_price > 0:
+            if trade.trade_type.value == "buy":
+                trade_data["profit_loss"] = (current_price - float(trade.price_at_trade)) * float(trade.quantity)
+            else:
+                trade_data["profit_loss"] = (float(trade.price_at_trade) - current_price) * float(trade.quantity)
+        recent_trades.append(trade_data)
+
+    return ChatContext(
+        user_id=user_id,
+        balance=float(balance) if balance is not None else 0.0,
+        holdings=holdings,
+        recent_trades=recent_trades,
+        recent_trade_count=len(trades),
+        trade_stats={
+            "total_trades": total,
+            "buy_trades": int(buys),
+            "sell_trades": total - int(buys),
+            "unique_coins_traded": coins,
+            "total_volume": float(volume)
+        }
+    )
+
+class ChatContextCache:
+    """Per-user ChatContext memo: one load serves every intent of a message and
+    the messages that follow it for `ttl_seconds`.
+
+    A trade by the user drops their entry (trade listener), so the next message
+    sees the new balance and holdings. Trades made through another worker are
+    picked up when the entry expires.
+    """
+
+    def __init__(self, ttl_seconds: float = CHAT_CONTEXT_TTL_SECONDS, max_users: int = CHAT_CONTEXT_MAX_USERS):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._entries: Dict[int, ChatContext] = {}
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: int, db: Session) -> ChatContext:
+        context = self._entries.get(user_id)
+        if context and time.monotonic() - context.loaded_at < self.ttl_seconds:
+            self.hits += 1
+            return context
+        self.misses += 1
+        invalidations = self._invalidations
+        context = await load_chat_context(user_id, db)
+        # A trade committed while we were loading may not be in what we read
+        if invalidations == self._invalidations:
+            self._entries.pop(user_id, None)
+            self._entries[user_id] = context
+            while len(self._entries) > self.max_users:
+                del self._entries[next(iter(self._entries))]
+        return context
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Forget one user's context, or everyone's"""
+        self._invalidations += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    def on_trade(self, event: TradeExecuted):
+        self.invalidate(event.user_id)
+
+    def get_stats(self) -> dict:
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "users": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self._invalidations
+        }
+
+chat_context_cache = ChatContextCache()
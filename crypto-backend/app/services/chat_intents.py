@@ -0,0 +1,240 @@
+import re
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+# Intents in routing order: the first one a message matches wins. Keyword
+# intents match on substrings of the lower-cased message, as the chatbot always has.
+KEYWORD_INTENTS: List[Tuple[str, List[str]]] = [
+    ("greeting", ['hello', 'hi', 'hey']),
+    ("explain_bitcoin", ['what is bitcoin', 'what is btc', 'explain bitcoin']),
+    ("how_to_trade", ['how to buy', 'how to trade', 'how to start trading']),
+    ("recommendation", ['what should i buy', 'what crypto to buy', 'recommendations']),
+    ("timing", ['when to sell', 'when to buy', 'timing', 'market timing']),
+    ("risk_management", ['risk management', 'how to protect', 'stop loss']),
+    ("help", ['help', 'what can you do', 'commands']),
+    ("question", ['?', 'what', 'how', 'why', 'when', 'where', 'which']),
+    ("market_analysis", ['best crypto', 'which crypto', 'what to buy', 'market analysis', 'crypto recommendation',
+                         'best investment', 'learn about crypto', 'crypto education']),
+    ("portfolio_coaching", ['analyze my portfolio', 'portfolio analysis', 'analyze portfolio', 'portfolio review',
+                            'my portfolio', 'portfolio performance', 'coach me', 'help me learn', 'trading coach',
+                            'mentor me']),
+    ("onboarding", ['help me', 'guide me', 'mentor', 'onboarding', 'new to trading', 'first trade', 'start trading',
+                    'begin trading', 'how to start', 'i am new', 'beginner', 'getting started']),
+]
+
+# Checked before everything else, including the journal and position sizing intents
+BUY_KEYWORDS = ['buy', 'purchase', 'get bitcoin', 'get btc', 'buy bitcoin', 'buy btc', 'buy ethereum', 'buy eth',
+                'buy solana', 'buy sol']
+BUY_COINS = [("ETH", "Ethereum", ['ethereum', 'eth']), ("SOL", "Solana", ['solana', 'sol'])]
+DEFAULT_BUY_USD = 100.0
+BUY_AMOUNT = re.compile(r'\$?(?P<value>\d+(?:\.\d+)?)')
+
+JOURNAL_STRONG = ['i bought', 'i sold', 'i traded', 'i learned', 'i realized', 'i felt', 'my trade', 'today i',
+                  'yesterday i', 'this week i', 'i was', 'journal', 'reflection', 'reflecting']
+JOURNAL_CATEGORIES = {
+    "emotion": ['felt', 'feeling', 'excited', 'nervous', 'confident', 'worried', 'happy', 'sad', 'frustrated',
+                'proud', 'anxious', 'calm'],
+    "trade": ['bought', 'sold', 'traded', 'trade', 'bitcoin', 'btc', 'ethereum', 'eth'],
+    "learning": ['learned', 'lesson', 'realize', 'understand', 'know', 'discover', 'insight', 'takeaway'],
+}
+# Without a strong indicator, a reflection needs two categories and some length
+JOURNAL_MIN_LENGTH = 80
+
+ONBOARDING_FLAGS = {
+    "first_trade": ['first trade', 'make trade'],
+    "risk_management": ['risk management'],
+}
+
+AMOUNT = r'(?P<value>[0-9,]+\.?[0-9]*)'
+NUMBER = r'(?P<value>[0-9]+\.?[0-9]*)'
+
+# Tried in order per parameter; the first pattern found anywhere in the message wins
+PARAMETER_PATTERNS: Dict[str, List[str]] = {
+    'entry_price': [
+        r'entry[:\s]*\$?{amount}',
+        r'buy[:\s]*at[:\s]*\$?{amount}',
+        r'enter[:\s]*at[:\s]*\$?{amount}',
+        r'entry[:\s]*price[:\s]*\$?{amount}'
+    ],
+    'exit_price': [
+        r'exit[:\s]*\$?{amount}',
+        r'sell[:\s]*at[:\s]*\$?{amount}',
+        r'target[:\s]*\$?{amount}',
+        r'exit[:\s]*price[:\s]*\$?{amount}'
+    ],
+    'position_size': [
+        r'position[:\s]*size[:\s]*{amount}',
+        r'amount[:\s]*{amount}',
+        r'quantity[:\s]*{amount}',
+        r'{amount}\s*(?:btc|bitcoin|eth|ethereum|coins?|tokens?)'
+    ],
+    'leverage': [
+        r'leverage[:\s]*{number}x?',
+        r'{number}x\s*leverage',
+        r'{number}x'
+    ],
+    'account_balance': [
+        r'balance[:\s]*\$?{amount}',
+        r'account[:\s]*\$?{amount}',
+        r'portfolio[:\s]*\$?{amount}',
+        r'capital[:\s]*\$?{amount}'
+    ],
+    'risk_percentage': [
+        r'risk[:\s]*{number}\s*%?',
+        r'{number}\s*%\s*risk',
+        r'risk[:\s]*percentage[:\s]*{number}',
+        r'{number}\s*percent[:\s]*risk'
+    ],
+    'stop_loss_price': [
+        r'stop[:\s]*loss[:\s]*\$?{amount}',
+        r'stop[:\s]*at[:\s]*\$?{amount}',
+        r'sl[:\s]*\$?{amount}',
+        r'stop[:\s]*loss[:\s]*price[:\s]*\$?{amount}'
+    ]
+}
+# Every entry_price pattern starts with one of these; both position sizing and
+# trade simulation need an entry price, so without one no parameter is looked for
+ENTRY_WORDS = ['entry', 'buy', 'enter']
+
+POSITION_SIZING_PARAMS = ['account_balance', 'risk_percentage', 'entry_price', 'stop_loss_price']
+
+# A message naming the user or their account needs their portfolio to be answered
+PERSONAL = re.compile(r"\b(?:i|i'm|i've|i'd|im|me|my|mine|myself|portfolio|balance|holdings?|wallet|positions?)\b")
+NON_WORD = re.compile(r"[^\w$%'.]+")
+
+class Intent:
+    """What a chat message asks for, and the numbers it carries"""
+
+    def __init__(self, name: str, params: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.params = params or {}
+
+    def __eq__(self, other):
+        return isinstance(other, Intent) and (self.name, self.params) == (other.name, other.params)
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, {self.params!r})"
+
+def _trie_pattern(words) -> str:
+    """Alternation of `words` shaped as a trie, longest match first.
+
+    A flat `a|b|c` alternation retries every word at every position; with shared
+    prefixes factored out, each position costs one branch per character read.
+    """
+    root: Dict[str, dict] = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # A word ending here is also matched by its longer continuations, so try those first
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(root)
+
+def _features() -> Dict[str, List[str]]:
+    """Everything the router needs to know about a message, as keyword lists"""
+    features = {"buy": BUY_KEYWORDS, "journal_strong": JOURNAL_STRONG, "entry": ENTRY_WORDS}
+    features.update((f"coin_{symbol}", words) for symbol, _, words in BUY_COINS)
+    features.update((f"journal_{category}", words) for category, words in JOURNAL_CATEGORIES.items())
+    features.update(KEYWORD_INTENTS)
+    features.update((f"flag_{flag}", words) for flag, words in ONBOARDING_FLAGS.items())
+    return features
+
+def _build() -> Tuple["re.Pattern", Dict[str, FrozenSet[str]]]:
+    by_word: Dict[str, set] = {}
+    for feature, words in _features().items():
+        for word in words:
+            by_word.setdefault(word, set()).add(feature)
+    # The scan reports the longest keyword starting at each position; the shorter
+    # keywords starting there are its prefixes, so each match carries their features too
+    closure = {
+        word: frozenset().union(*(by_word[prefix] for prefix in by_word if word.startswith(prefix)))
+        for word in by_word
+    }
+    # Zero-width, so keywords inside or overlapping other keywords are all seen
+    return re.compile(f"(?=({_trie_pattern(by_word)}))"), closure
+
+# Compiled once at import: one scan of the message finds every keyword feature
+KEYWORD_PATTERN, KEYWORD_FEATURES = _build()
+PARAMETERS = {
+    param: [re.compile(pattern.format(amount=AMOUNT, number=NUMBER)) for pattern in patterns]
+    for param, patterns in PARAMETER_PATTERNS.items()
+}
+
+def _parameters(message_lower: str) -> Dict[str, float]:
+    extracted = {}
+    for param, patterns in PARAMETERS.items():
+        for pattern in patterns:
+            match = pattern.search(message_lower)
+            if match:
+                try:
+                    extracted[param] = float(match.group("value").replace(',', ''))
+                    break
+                except ValueError:
+                    continue
+    return extracted
+
+def classify(message: str) -> Intent:
+    """Route a chat message to one intent and extract its parameters.
+
+    One scan finds every keyword; intents are then checked in the chatbot's
+    routing order: buy, journal, position sizing, the keyword intents, then trade
+    simulation. Anything else is "general" and goes to the language model.
+    """
+    message_lower = message.lower()
+    found = set()
+    for word in set(KEYWORD_PATTERN.findall(message_lower)):
+        found |= KEYWORD_FEATURES[word]
+
+    if "buy" in found:
+        symbol, name = "BTC", "Bitcoin"
+        for coin_symbol, coin_name, _ in BUY_COINS:
+            if f"coin_{coin_symbol}" in found:
+                symbol, name = coin_symbol, coin_name
+                break
+        amount = BUY_AMOUNT.search(message_lower)
+        return Intent("buy", {
+            "amount_usd": float(amount.group("value")) if amount else DEFAULT_BUY_USD,
+            "symbol": symbol,
+            "name": name
+        })
+
+    categories = sum(f"journal_{category}" in found for category in JOURNAL_CATEGORIES)
+    if "journal_strong" in found or (categories >= 2 and len(message) > JOURNAL_MIN_LENGTH):
+        return Intent("journal")
+
+    extracted = _parameters(message_lower) if "entry" in found else {}
+    if all(param in extracted for param in POSITION_SIZING_PARAMS):
+        return Intent("position_sizing", {param: extracted[param] for param in POSITION_SIZING_PARAMS})
+
+    for name, _ in KEYWORD_INTENTS:
+        if name in found:
+            params = {}
+            if name == "onboarding":
+                params = {flag: f"flag_{flag}" in found for flag in ONBOARDING_FLAGS}
+            return Intent(name, params)
+
+    if 'entry_price' in extracted and 'exit_price' in extracted:
+        return Intent("trade_simulation", {
+            'entry_price': extracted['entry_price'],
+            'exit_price': extracted['exit_price'],
+            'position_size': extracted.get('position_size', 1.0),
+            'leverage': extracted.get('leverage', 1.0)
+        })
+
+    return Intent("general")
+
+def normalize_message(message: str) -> str:
+    """Lower-case, single-spaced, without punctuation or trailing dots: the same
+    question asked twice normalizes to the same text"""
+    return NON_WORD.sub(" ", message.lower()).strip(" .")
+
+def is_context_free(message: str) -> bool:
+    """Whether the message can be answered without knowing who asks it"""
+    return not PERSONAL.search(message.lower())
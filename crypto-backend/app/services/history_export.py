@@ -0,0 +1,71 @@
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import AsyncIterator, Callable, List, Tuple
+import csv
+import io
+import json
+
+from app.db import AsyncSessionLocal
+
+EXPORT_BATCH_SIZE = 1000
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+    @property
+    def media_type(self) -> str:
+        return "text/csv" if self is ExportFormat.CSV else "application/x-ndjson"
+
+Columns = List[Tuple[str, Callable]]
+
+def _value(value):
+    """JSON/CSV friendly value; Decimals stay exact as strings"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _csv_chunk(rows, columns: Columns, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow([name for name, _ in columns])
+    writer.writerows([_value(get(row)) for _, get in columns] for row in rows)
+    return buffer.getvalue()
+
+def _ndjson_chunk(rows, columns: Columns) -> str:
+    return "".join(
+        json.dumps({name: _value(get(row)) for name, get in columns}) + "\n"
+        for row in rows
+    )
+
+async def stream_export(stmt, columns: Columns, export_format: ExportFormat,
+                        batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    """Yield `stmt`'s rows as CSV or NDJSON, one chunk per batch.
+
+    Rows come from a server-side cursor (yield_per), so only one batch is held in
+    memory however many rows the export has. The generator opens its own session:
+    it runs after the route has returned and its request session is gone.
+    """
+    header = export_format is ExportFormat.CSV
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        async for rows in result.scalars().partitions():
+            if export_format is ExportFormat.CSV:
+                yield _csv_chunk(rows, columns, header)
+                header = False
+            else:
+                yield _ndjson_chunk(rows, columns)
+    if header:
+        # No rows: a CSV export still gets its header line
+        yield _csv_chunk([], columns, True)
+
+def export_response_headers(prefix: str, export_format: ExportFormat) -> dict:
+    """Download headers; X-Accel-Buffering keeps proxies from buffering the whole export"""
+    filename = f"{prefix}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{export_format.value}"
+    return {"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"}
@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+
+from app.services.invoice_service import INVOICE_TEMPLATE_VERSION, render_invoice_pdf
+
+logger = logging.getLogger(__name__)
+
+INVOICES_DIR = os.getenv("INVOICES_DIR", "invoices")
+INVOICE_RENDER_WORKERS = int(os.getenv("INVOICE_RENDER_WORKERS", "1"))
+
+def invoice_filename(user_id: int, source: str, source_id: int) -> str:
+    """Stored name of an invoice: owner, billable event and template version.
+
+    `source` is "p" for purchases and "w" for wallet transactions. The owner comes
+    first so downloads can be checked against the caller.
+    """
+    return f"invoice_{user_id}_{source}{source_id}_v{INVOICE_TEMPLATE_VERSION}.pdf"
+
+def invoice_owner(filename: str) -> Optional[int]:
+    """User id an invoice file belongs to, for both stored and older timestamped names"""
+    parts = filename[:-len(".pdf")].split("_")
+    try:
+        if len(parts) == 4 and parts[3].startswith("v"):
+            return int(parts[1])  # invoice_{user}_{source}{id}_v{version}
+        if len(parts) == 4:
+            return int(parts[2])  # invoice_{number}_{user}_{timestamp}
+    except ValueError:
+        pass
+    return None
+
+class InvoiceRenderer:
+    """Renders invoice PDFs once, in worker processes, and keeps them on disk.
+
+    ReportLab holds the GIL for the whole render, so it runs in a process pool
+    rather than on the event loop. Each invoice is stored under its owner, billable
+    event and template version; later requests are served from that file, and
+    concurrent requests for one invoice share a single render.
+    """
+
+    def __init__(self, directory: str = INVOICES_DIR, max_workers: int = INVOICE_RENDER_WORKERS):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._rendering: Dict[str, asyncio.Future] = {}
+        self._etags: Dict[str, Tuple[float, str]] = {}
+        self.rendered = 0
+        self.hits = 0
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    async def get_or_render(self, filename: str, invoice_data: Dict[str, Any]) -> str:
+        """Return the stored invoice's path, rendering it first if needed"""
+        path = self.path(filename)
+        if os.path.exists(path):
+            self.hits += 1
+            return path
+        if filename not in self._rendering:
+            self._rendering[filename] = asyncio.ensure_future(self._render(path, invoice_data))
+            self._rendering[filename].add_done_callback(lambda _: self._rendering.pop(filename, None))
+        return await asyncio.shield(self._rendering[filename])
+
+    async def _render(self, path: str, invoice_data: Dict[str, Any]) -> str:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        pdf = await asyncio.get_running_loop().run_in_executor(self.executor, render_invoice_pdf, invoice_data)
+        os.makedirs(self.directory, exist_ok=True)
+        # Write then rename so a concurrent reader never sees half a file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(pdf)
+        os.replace(temp_path, path)
+        self.rendered += 1
+        logger.info(f"Rendered invoice {os.path.basename(path)} ({len(pdf)} bytes)")
+        return path
+
+    def etag(self, path: str) -> str:
+        """Strong ETag from the file's content, remembered until the file changes"""
+        mtime = os.path.getmtime(path)
+        cached = self._etags.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "rb") as f:
+            etag = f'"{hashlib.sha256(f.read()).hexdigest()[:32]}"'
+        self._etags[path] = (mtime, etag)
+        return etag
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "template_version": INVOICE_TEMPLATE_VERSION,
+            "rendering": len(self._rendering),
+            "rendered": self.rendered,
+            "hits": self.hits
+        }
+
+invoice_renderer = InvoiceRenderer()
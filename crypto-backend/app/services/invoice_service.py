@@ -9,6 +9,10 @@ import os
 from datetime import datetime
 from typing import Dict, Any
 
+# Part of every stored invoice's name; bump it when the layout below changes so
+# invoices are rendered again with the new template
+INVOICE_TEMPLATE_VERSION = 1
+
 class InvoiceService:
     """Service for generating PDF invoices"""
     
@@ -65,8 +69,9 @@ class InvoiceService:
         # Create PDF buffer
         buffer = BytesIO()
         
-        # Create PDF document
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        # Create PDF document; invariant output (no creation date or random ID) so
+        # the same invoice data always renders to the same bytes
+        doc = SimpleDocTemplate(buffer, pagesize=A4, invariant=True)
         story = []
         
         # Add content to story
@@ -285,3 +290,15 @@ class InvoiceService:
         except Exception as e:
             print(f"Error saving invoice to file: {e}")
             raise e
+
+_process_invoice_service = None
+
+def render_invoice_pdf(invoice_data: Dict[str, Any]) -> bytes:
+    """Render an invoice to PDF bytes; the entry point for render worker processes.
+
+    The InvoiceService (and its stylesheet) is built once per process.
+    """
+    global _process_invoice_service
+    if _process_invoice_service is None:
+        _process_invoice_service = InvoiceService()
+    return _process_invoice_service.generate_invoice_pdf(invoice_data).getvalue()
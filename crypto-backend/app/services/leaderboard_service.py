@@ -1,13 +1,31 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Tuple
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy import func, and_, or_, desc, case, distinct, select, update, literal, Numeric, DateTime
+from sqlalchemy.orm import aliased
+import asyncio
+import logging
+import os
 
 from app.models.user import User
 from app.models.trade import Trade, TradeType
 from app.models.leaderboard import LeaderboardEntry
+from app.models.position import Position
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.db import SessionLocal, dialect_insert
 from app.services.price_service import get_multiple_crypto_prices
+from app.services.position_service import PositionService
+from app.services.portfolio_valuation import INITIAL_BALANCE, PositionArrays, empty_valuation, from_units, value_portfolios
+from app.services.scheduler import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+# Leaderboard windows ranked by P&L change since the snapshot at the window start
+PERIODS = ("daily", "weekly", "monthly")
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("PORTFOLIO_SNAPSHOT_RETENTION_DAYS", "45"))
+MONEY = Numeric(20, 8)
 
 class LeaderboardService:
     """Service for calculating and managing leaderboard rankings"""
@@ -15,48 +33,89 @@ class LeaderboardService:
     def __init__(self, db: Session):
         self.db = db
     
-    async def get_global_leaderboard(self, limit: int = 100) -> List[Dict]:
-        """Get global leaderboard entries with real data"""
-        # Get all users with their calculated performance
-        users = self.db.query(User).all()
+    def get_global_leaderboard(self, limit: int = 100) -> List[Dict]:
+        """Get global leaderboard entries from the materialized leaderboard table"""
+        entries = self.db.query(LeaderboardEntry).filter(
+            LeaderboardEntry.global_rank.isnot(None)
+        ).order_by(LeaderboardEntry.global_rank).limit(limit).all()
+        return [self._entry_to_dict(entry) for entry in entries]
+    
+    def get_weekly_leaderboard(self, limit: int = 100) -> List[Dict]:
+        """Get leaderboard entries ranked by performance since the start of the week"""
+        return self.get_period_leaderboard("weekly", limit=limit)
+    
+    def get_period_leaderboard(self, period: str, limit: int = 100) -> List[Dict]:
+        """Get leaderboard entries ranked by P&L change since the start of a daily, weekly or monthly window"""
+        rows = self._period_ranking_query(period).limit(limit).all()
+        leaderboard = []
+        for entry, period_profit_loss, period_profit_loss_percent, period_rank in rows:
+            values = self._entry_to_dict(entry)
+            values['weekly_rank'] = period_rank if period == "weekly" else entry.weekly_rank
+            values['period_rank'] = period_rank
+            values['period_profit_loss'] = Decimal(str(period_profit_loss or 0))
+            values['period_profit_loss_percent'] = Decimal(str(period_profit_loss_percent or 0)).quantize(Decimal('0.0001'))
+            leaderboard.append(values)
+        return leaderboard
+    
+    def _period_ranking_query(self, period: str, entity=LeaderboardEntry):
+        """Rank current valuations against each user's snapshot at the window start.
         
-        leaderboard_entries = []
-        for user in users:
-            # Calculate real performance for each user
-            performance = await self.calculate_user_portfolio_performance(user)
-            
-            entry = {
-                'user_id': user.id,
-                'username': user.username,
-                'total_portfolio_value': performance['total_portfolio_value'],
-                'total_invested': performance['total_invested'],
-                'total_profit_loss': performance['total_profit_loss'],
-                'total_profit_loss_percent': performance['total_profit_loss_percent'],
-                'current_demo_balance': user.demo_balance,
-                'initial_balance': Decimal('100000'),
-                'portfolio_performance_percent': performance['portfolio_performance_percent'],
-                'total_trades': performance['total_trades'],
-                'winning_trades': performance['winning_trades'],
-                'losing_trades': performance['losing_trades'],
-                'win_rate_percent': performance['win_rate_percent'],
-                'last_updated': datetime.utcnow(),
-                'week_start': self._get_week_start()
-            }
-            leaderboard_entries.append(entry)
+        The baseline is the latest snapshot at or before the start, or the first one
+        inside the window for users who joined since; users with no snapshot start from 0.
+        """
+        start = self.get_period_start(period)
+        earlier, baseline = aliased(PortfolioSnapshot), aliased(PortfolioSnapshot)
         
-        # Sort by portfolio performance (highest first)
-        leaderboard_entries.sort(key=lambda x: x['portfolio_performance_percent'], reverse=True)
+        def baseline_bound(bound, *window):
+            # One seek per user on ix_portfolio_snapshots_user_taken_at
+            return select(bound(earlier.taken_at)).where(
+                earlier.user_id == LeaderboardEntry.user_id, *window
+            ).correlate(LeaderboardEntry).scalar_subquery()
         
-        # Add ranks
-        for i, entry in enumerate(leaderboard_entries[:limit], 1):
-            entry['global_rank'] = i
-            entry['weekly_rank'] = i  # For now, same as global
+        baseline_taken_at = func.coalesce(
+            baseline_bound(func.max, earlier.taken_at <= start),
+            baseline_bound(func.min, earlier.taken_at > start)
+        )
         
-        return leaderboard_entries[:limit]
+        # Period return is measured against the account equity at the window start
+        start_profit_loss = func.coalesce(baseline.total_profit_loss, 0)
+        period_profit_loss = LeaderboardEntry.total_profit_loss - start_profit_loss
+        period_profit_loss_percent = func.coalesce(
+            period_profit_loss * 100 / func.nullif(INITIAL_BALANCE + start_profit_loss, 0), 0
+        )
+        period_rank = func.row_number().over(order_by=(
+            period_profit_loss_percent.desc(),
+            LeaderboardEntry.user_id
+        ))
+        return self.db.query(
+            entity,
+            period_profit_loss.label('period_profit_loss'),
+            period_profit_loss_percent.label('period_profit_loss_percent'),
+            period_rank.label('period_rank')
+        ).select_from(LeaderboardEntry).outerjoin(
+            baseline, and_(baseline.user_id == LeaderboardEntry.user_id, baseline.taken_at == baseline_taken_at)
+        ).order_by(period_profit_loss_percent.desc(), LeaderboardEntry.user_id)
     
-    async def get_weekly_leaderboard(self, limit: int = 100) -> List[Dict]:
-        """Get weekly leaderboard entries"""
-        return await self.get_global_leaderboard(limit)
+    def _entry_to_dict(self, entry: LeaderboardEntry) -> Dict:
+        return {
+            'user_id': entry.user_id,
+            'username': entry.username,
+            'total_portfolio_value': entry.total_portfolio_value,
+            'total_invested': entry.total_invested,
+            'total_profit_loss': entry.total_profit_loss,
+            'total_profit_loss_percent': entry.total_profit_loss_percent,
+            'current_demo_balance': entry.current_demo_balance,
+            'initial_balance': entry.initial_balance,
+            'portfolio_performance_percent': entry.portfolio_performance_percent,
+            'total_trades': entry.total_trades or 0,
+            'winning_trades': entry.winning_trades or 0,
+            'losing_trades': entry.losing_trades or 0,
+            'win_rate_percent': entry.win_rate_percent or Decimal('0'),
+            'global_rank': entry.global_rank,
+            'weekly_rank': entry.weekly_rank,
+            'last_updated': entry.last_updated or datetime.utcnow(),
+            'week_start': entry.week_start
+        }
     
     def get_user_global_rank(self, user_id: int) -> Optional[int]:
         """Get user's global rank"""
@@ -72,36 +131,36 @@ class LeaderboardService:
         ).first()
         return entry.weekly_rank if entry else None
     
-    async def get_leaderboard_stats(self) -> Dict:
+    def get_leaderboard_stats(self) -> Dict:
         """Get leaderboard statistics with real data"""
         total_users = self.db.query(User).count()
         
-        # Get today's trades
-        today = datetime.utcnow().date()
-        trades_today = self.db.query(Trade).filter(
-            func.date(Trade.timestamp) == today
-        ).count()
+        # Get today's trades (a range on the raw column so ix_trades_timestamp_user is used)
+        today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        trades_today = self.db.query(func.count(Trade.id)).filter(
+            Trade.timestamp >= today_start
+        ).scalar()
         
         # Get unique users who traded today
-        active_today = self.db.query(Trade.user_id).filter(
-            func.date(Trade.timestamp) == today
-        ).distinct().count()
+        active_today = self.db.query(func.count(distinct(Trade.user_id))).filter(
+            Trade.timestamp >= today_start
+        ).scalar()
         
-        # Get top performer from leaderboard
-        top_leaderboard = await self.get_global_leaderboard(limit=1)
-        top_performer = top_leaderboard[0] if top_leaderboard else {
+        # Top performer and average come from the materialized leaderboard
+        top_entry = self.db.query(LeaderboardEntry).filter(
+            LeaderboardEntry.global_rank == 1
+        ).first()
+        top_performer = {
+            'username': top_entry.username,
+            'portfolio_performance_percent': top_entry.portfolio_performance_percent
+        } if top_entry else {
             'username': 'No traders yet',
             'portfolio_performance_percent': Decimal('0')
         }
         
-        # Calculate average portfolio value
-        all_users = self.db.query(User).all()
-        total_portfolio_value = Decimal('0')
-        for user in all_users:
-            performance = await self.calculate_user_portfolio_performance(user)
-            total_portfolio_value += performance['total_portfolio_value']
-        
-        avg_portfolio_value = total_portfolio_value / len(all_users) if all_users else Decimal('0')
+        avg_portfolio_value = self.db.query(
+            func.avg(LeaderboardEntry.total_portfolio_value)
+        ).scalar() or Decimal('0')
         
         return {
             'total_traders': total_users,
@@ -114,119 +173,24 @@ class LeaderboardService:
             'total_trades_today': trades_today
         }
     
-    def update_all_rankings(self):
-        """Update all leaderboard rankings"""
-        # This would update the rankings in a real implementation
-        pass
-
     async def calculate_user_portfolio_performance(self, user: User) -> Dict:
         """Calculate comprehensive portfolio performance for a user"""
         
-        # Get all user trades
-        trades = self.db.query(Trade).filter(Trade.user_id == user.id).all()
-        
-        if not trades:
-            return {
-                'total_portfolio_value': Decimal('0'),
-                'total_invested': Decimal('0'),
-                'total_profit_loss': Decimal('0'),
-                'total_profit_loss_percent': Decimal('0'),
-                'portfolio_performance_percent': Decimal('0'),
-                'total_trades': 0,
-                'winning_trades': 0,
-                'losing_trades': 0,
-                'win_rate_percent': Decimal('0')
-            }
-        
-        # Calculate holdings by coin (same logic as portfolio endpoint)
-        holdings_data = {}
-        
-        for trade in trades:
-            coin = trade.coin_symbol
-            if coin not in holdings_data:
-                holdings_data[coin] = {
-                    'total_bought': Decimal('0'),
-                    'total_sold': Decimal('0'),
-                    'total_spent': Decimal('0'),
-                    'total_received': Decimal('0')
-                }
-            
-            if trade.trade_type == TradeType.BUY:
-                holdings_data[coin]['total_bought'] += trade.quantity
-                holdings_data[coin]['total_spent'] += trade.quantity * trade.price_at_trade
-            else:
-                holdings_data[coin]['total_sold'] += trade.quantity
-                holdings_data[coin]['total_received'] += trade.quantity * trade.price_at_trade
-        
-        # Get current prices for all coins
-        coin_symbols = list(holdings_data.keys())
-        if not coin_symbols:
-            return {
-                'total_portfolio_value': Decimal('0'),
-                'total_invested': Decimal('0'),
-                'total_profit_loss': Decimal('0'),
-                'total_profit_loss_percent': Decimal('0'),
-                'portfolio_performance_percent': Decimal('0'),
-                'total_trades': len(trades),
-                'winning_trades': 0,
-                'losing_trades': 0,
-                'win_rate_percent': Decimal('0')
-            }
-        
-        current_prices = await get_multiple_crypto_prices(coin_symbols)
-        
-        total_portfolio_value = Decimal('0')
-        total_invested = Decimal('0')
-        total_received = Decimal('0')
-        winning_trades = 0
-        losing_trades = 0
-        
-        for coin, data in holdings_data.items():
-            current_holding = data['total_bought'] - data['total_sold']
-            
-            if current_holding > 0:
-                current_price = Decimal(str(current_prices.get(coin, 0)))
-                total_portfolio_value += current_holding * current_price
-            
-            total_invested += data['total_spent']
-            total_received += data['total_received']
-            
-            # Calculate win/loss for this coin
-            if data['total_sold'] > 0:
-                avg_buy_price = data['total_spent'] / data['total_bought'] if data['total_bought'] > 0 else Decimal('0')
-                avg_sell_price = data['total_received'] / data['total_sold']
-                
-                if avg_sell_price > avg_buy_price:
-                    winning_trades += 1
-                else:
-                    losing_trades += 1
-        
-        # Add cash back from sales
-        total_portfolio_value += total_received
-        
-        # Calculate metrics
-        total_profit_loss = total_portfolio_value - total_invested
-        total_profit_loss_percent = (total_profit_loss / total_invested * 100) if total_invested > 0 else Decimal('0')
-        
-        # Portfolio performance relative to initial balance
-        initial_balance = Decimal('100000')  # Default initial balance
-        portfolio_performance_percent = ((total_portfolio_value - initial_balance) / initial_balance * 100) if initial_balance > 0 else Decimal('0')
+        # Per-coin totals come from the position ledger instead of a trade rescan
+        positions = PositionService(self.db).get_positions(user.id, open_only=False)
+        return await self.value_positions(user.id, positions)
+    
+    @staticmethod
+    async def value_positions(user_id: int, positions: List[Position]) -> Dict:
+        """Value one user's positions at current prices (no database access)"""
+        if not positions:
+            return empty_valuation()
         
-        # Win rate
-        total_trade_positions = winning_trades + losing_trades
-        win_rate_percent = (Decimal(winning_trades) / total_trade_positions * 100) if total_trade_positions > 0 else Decimal('0')
+        # Get current prices for the coins still held
+        held_symbols = [position.coin_symbol for position in positions if position.quantity > 0]
+        current_prices = await get_multiple_crypto_prices(held_symbols) if held_symbols else {}
         
-        return {
-            'total_portfolio_value': total_portfolio_value,
-            'total_invested': total_invested,
-            'total_profit_loss': total_profit_loss,
-            'total_profit_loss_percent': total_profit_loss_percent,
-            'portfolio_performance_percent': portfolio_performance_percent,
-            'total_trades': len(trades),
-            'winning_trades': winning_trades,
-            'losing_trades': losing_trades,
-            'win_rate_percent': win_rate_percent
-        }
+        return value_portfolios(PositionArrays.from_positions(positions), current_prices).for_user(user_id)
     
     async def update_user_leaderboard_entry(self, user: User) -> Optional[LeaderboardEntry]:
         """Update or create leaderboard entry for a user"""
@@ -234,50 +198,43 @@ class LeaderboardService:
         try:
             # Calculate performance metrics
             performance = await self.calculate_user_portfolio_performance(user)
-            
-            # Find existing entry or create new one
-            entry = self.db.query(LeaderboardEntry).filter(
-                LeaderboardEntry.user_id == user.id
-            ).first()
-            
-            if not entry:
-                entry = LeaderboardEntry(
-                    user_id=user.id,
-                    username=user.username,
-                    total_portfolio_value=performance['total_portfolio_value'],
-                    total_invested=performance['total_invested'],
-                    total_profit_loss=performance['total_profit_loss'],
-                    total_profit_loss_percent=performance['total_profit_loss_percent'],
-                    current_demo_balance=user.demo_balance,
-                    initial_balance=Decimal('100000'),
-                    portfolio_performance_percent=performance['portfolio_performance_percent'],
-                    total_trades=performance['total_trades'],
-                    winning_trades=performance['winning_trades'],
-                    losing_trades=performance['losing_trades'],
-                    win_rate_percent=performance['win_rate_percent']
-                )
-                self.db.add(entry)
-            else:
-                # Update existing entry
-                entry.username = user.username
-                entry.total_portfolio_value = performance['total_portfolio_value']
-                entry.total_invested = performance['total_invested']
-                entry.total_profit_loss = performance['total_profit_loss']
-                entry.total_profit_loss_percent = performance['total_profit_loss_percent']
-                entry.current_demo_balance = user.demo_balance
-                entry.initial_balance = Decimal('100000')
-                entry.portfolio_performance_percent = performance['portfolio_performance_percent']
-                entry.total_trades = performance['total_trades']
-                entry.winning_trades = performance['winning_trades']
-                entry.losing_trades = performance['losing_trades']
-                entry.win_rate_percent = performance['win_rate_percent']
-                entry.last_updated = datetime.utcnow()
-            
+        except Exception as e:
+            logger.error(f"Error updating leaderboard entry for user {user.id}: {e}")
+            return None
+        
+        return self.save_user_leaderboard_entry(user, performance)
+    
+    def save_user_leaderboard_entry(self, user: User, performance: Dict) -> Optional[LeaderboardEntry]:
+        """Upsert a user's valued performance into their leaderboard entry and commit"""
+        
+        values = {
+            'user_id': user.id,
+            'username': user.username,
+            'total_portfolio_value': performance['total_portfolio_value'],
+            'total_invested': performance['total_invested'],
+            'total_profit_loss': performance['total_profit_loss'],
+            'total_profit_loss_percent': performance['total_profit_loss_percent'],
+            'current_demo_balance': user.demo_balance,
+            'initial_balance': INITIAL_BALANCE,
+            'portfolio_performance_percent': performance['portfolio_performance_percent'],
+            'total_trades': performance['total_trades'],
+            'winning_trades': performance['winning_trades'],
+            'losing_trades': performance['losing_trades'],
+            'win_rate_percent': performance['win_rate_percent'],
+            'last_updated': datetime.utcnow()
+        }
+        try:
+            # One statement on the unique user_id: a concurrent first write for the same user updates instead of failing
+            insert = dialect_insert(self.db, LeaderboardEntry).values(values)
+            self.db.execute(insert.on_conflict_do_update(
+                index_elements=['user_id'],
+                set_={name: insert.excluded[name] for name in values if name != 'user_id'}
+            ))
             self.db.commit()
-            return entry
+            return self.get_user_rank(user.id)
             
         except Exception as e:
-            print(f"Error updating leaderboard entry for user {user.id}: {e}")
+            logger.error(f"Error updating leaderboard entry for user {user.id}: {e}")
             try:
                 self.db.rollback()
             except:
@@ -286,45 +243,212 @@ class LeaderboardService:
     
     def _get_week_start(self) -> datetime:
         """Get the start of the current week (Monday)"""
-        today = datetime.utcnow().date()
-        days_since_monday = today.weekday()
-        week_start = today - timedelta(days=days_since_monday)
-        return datetime.combine(week_start, datetime.min.time())
+        return self.get_period_start("weekly")
+    
+    @staticmethod
+    def get_period_start(period: str, now: Optional[datetime] = None) -> datetime:
+        """Get the start of the current day, week (Monday) or month"""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown leaderboard period: {period}")
+        today = (now or datetime.utcnow()).date()
+        if period == "weekly":
+            today -= timedelta(days=today.weekday())
+        elif period == "monthly":
+            today = today.replace(day=1)
+        return datetime.combine(today, datetime.min.time())
+    
+    @classmethod
+    def get_period_end(cls, period: str, now: Optional[datetime] = None) -> datetime:
+        """Get the end (exclusive) of the current day, week or month"""
+        start = cls.get_period_start(period, now)
+        if period == "daily":
+            return start + timedelta(days=1)
+        if period == "weekly":
+            return start + timedelta(days=7)
+        return (start + timedelta(days=32)).replace(day=1)
+    
+    def get_held_symbols(self) -> List[str]:
+        """Get every coin currently held by any user"""
+        rows = self.db.query(Position.coin_symbol).filter(Position.quantity > 0).distinct().all()
+        return [row[0] for row in rows]
     
     async def update_all_rankings(self):
         """Update global and weekly rankings for all users"""
+        prices = await get_multiple_crypto_prices(self.get_held_symbols())
+        return self.recompute_rankings(prices)
+    
+    def recompute_rankings(self, prices: Dict[str, Decimal]) -> int:
+        """Rebuild every leaderboard entry and rank from positions and one price snapshot.
         
-        # Get all users with trades
-        users_with_trades = self.db.query(User).join(Trade).distinct().all()
+        Totals are aggregated and upserted by one INSERT ... SELECT, and both ranks are
+        written by one UPDATE ... FROM a window query, so no row passes through Python.
+        """
+        self._upsert_entries(prices)
         
-        # Update leaderboard entries for all users
-        entries = []
-        for user in users_with_trades:
-            entry = await self.update_user_leaderboard_entry(user)
-            if entry:
-                entries.append(entry)
+        ranks = self._period_ranking_query("weekly", LeaderboardEntry.id).add_columns(
+            func.row_number().over(order_by=(
+                LeaderboardEntry.portfolio_performance_percent.desc(),
+                LeaderboardEntry.total_profit_loss.desc(),
+                LeaderboardEntry.user_id
+            )).label('global_rank')
+        ).order_by(None).subquery()
+        ranked = self.db.execute(
+            update(LeaderboardEntry.__table__).where(LeaderboardEntry.id == ranks.c.id).values(
+                global_rank=ranks.c.global_rank,
+                weekly_rank=ranks.c.period_rank
+            )
+        ).rowcount
+        self.db.commit()
+        return ranked
+    
+    def _upsert_entries(self, prices: Dict[str, Decimal]):
+        """Aggregate every user's positions at `prices` straight into their leaderboard entry"""
+        # Value holdings in SQL by mapping symbols to the snapshot prices; unknown coins are worth 0
+        price_of = case(
+            {symbol: literal(Decimal(str(price)), MONEY) for symbol, price in prices.items()},
+            value=Position.coin_symbol,
+            else_=0
+        ) if prices else 0
+        closed = Position.total_received > 0
         
-        # Sort by portfolio performance for global ranking
-        entries.sort(key=lambda x: x.portfolio_performance_percent, reverse=True)
+        def total(value):
+            return func.coalesce(func.sum(value), 0)
         
-        # Update global ranks
-        for i, entry in enumerate(entries, 1):
-            entry.global_rank = i
+        holdings_value = total(case((Position.quantity > 0, Position.quantity * price_of), else_=0))
+        invested = total(Position.total_spent)
+        received = total(Position.total_received)
+        trades = total(Position.trade_count)
+        wins = total(case((and_(closed, Position.realized_pnl > 0), 1), else_=0))
+        losses = total(case((and_(closed, Position.realized_pnl <= 0), 1), else_=0))
+        portfolio_value = holdings_value + received
+        profit_loss = portfolio_value - invested
+        initial_balance = literal(INITIAL_BALANCE, MONEY)
         
-        # Sort by weekly performance (using same metric for now)
-        # In a real implementation, this would be weekly-specific performance
-        entries.sort(key=lambda x: x.total_profit_loss_percent, reverse=True)
+        def percent(numerator, denominator, when):
+            # SQLAlchemy compiles / as true division on both dialects, even for integer sums
+            return case((when, numerator * 100 / denominator), else_=0)
         
-        # Update weekly ranks
-        week_start = self._get_week_start()
-        for i, entry in enumerate(entries, 1):
-            entry.weekly_rank = i
-            entry.week_start = week_start
+        columns = {
+            'user_id': User.id,
+            'username': User.username,
+            'total_portfolio_value': portfolio_value,
+            'total_invested': invested,
+            'total_profit_loss': profit_loss,
+            'total_profit_loss_percent': percent(profit_loss, invested, invested > 0),
+            'current_demo_balance': User.demo_balance,
+            'initial_balance': initial_balance,
+            'portfolio_performance_percent': percent(portfolio_value - initial_balance, initial_balance, trades > 0),
+            'total_trades': trades,
+            'winning_trades': wins,
+            'losing_trades': losses,
+            'win_rate_percent': percent(wins, wins + losses, wins + losses > 0),
+            'last_updated': literal(datetime.utcnow(), DateTime),
+            'week_start': literal(self._get_week_start(), DateTime)
+        }
+        totals = select(*(value.label(name) for name, value in columns.items())).select_from(User).outerjoin(
+            Position, Position.user_id == User.id
+        ).group_by(User.id, User.username, User.demo_balance)
         
-        self.db.commit()
+        # Upsert on the unique user_id: an entry another worker or a trade wrote meanwhile is updated, not duplicated
+        insert = dialect_insert(self.db, LeaderboardEntry).from_select(list(columns), totals)
+        self.db.execute(insert.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={name: insert.excluded[name] for name in columns if name != 'user_id'}
+        ))
     
     def get_user_rank(self, user_id: int) -> Optional[LeaderboardEntry]:
         """Get leaderboard entry for a specific user"""
         return self.db.query(LeaderboardEntry).filter(
             LeaderboardEntry.user_id == user_id
-        ).first() 
\ No newline at end of file
+        ).first()
+    
+    def snapshot_portfolios(self, prices: Dict[str, Decimal], taken_at: Optional[datetime] = None) -> int:
+        """Write one snapshot row per user with positions for the current hour and prune old rows.
+        
+        Rows already written for the hour are kept, so a restart or a second worker
+        cannot move a period baseline once it is recorded.
+        """
+        taken_at = (taken_at or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+        valuation = value_portfolios(PositionArrays.load(self.db), prices)
+        
+        self.db.query(PortfolioSnapshot).filter(
+            PortfolioSnapshot.taken_at < taken_at - timedelta(days=SNAPSHOT_RETENTION_DAYS)
+        ).delete(synchronize_session=False)
+        if len(valuation):
+            self.db.execute(
+                dialect_insert(self.db, PortfolioSnapshot).on_conflict_do_nothing(
+                    index_elements=['user_id', 'taken_at']
+                ),
+                [
+                    {
+                        'user_id': int(user_id),
+                        'taken_at': taken_at,
+                        'total_portfolio_value': from_units(valuation.total_portfolio_value[row]),
+                        'total_invested': from_units(valuation.total_invested[row]),
+                        'total_profit_loss': from_units(valuation.total_profit_loss[row])
+                    }
+                    for row, user_id in enumerate(valuation.user_ids)
+                ]
+            )
+        self.db.commit()
+        return len(valuation)
+
+
+async def update_user_leaderboard_entry_async(db: AsyncSession, user: User) -> Optional[LeaderboardEntry]:
+    """update_user_leaderboard_entry for an AsyncSession: queries run on the async driver, prices are awaited in between"""
+    positions = await db.run_sync(lambda session: PositionService(session).get_positions(user.id, open_only=False))
+    performance = await LeaderboardService.value_positions(user.id, positions)
+    return await db.run_sync(lambda session: LeaderboardService(session).save_user_leaderboard_entry(user, performance))
+
+
+async def run_with_held_prices(work):
+    """Run `work(service, prices)` on a worker thread with its own session.
+    
+    All session work stays on that one thread. The prices for the held coins are
+    fetched on the event loop in between, after the symbol read has committed, so
+    no transaction is open during the upstream call.
+    """
+    loop = asyncio.get_running_loop()
+    
+    def run():
+        db = SessionLocal()
+        try:
+            leaderboard_service = LeaderboardService(db)
+            symbols = leaderboard_service.get_held_symbols()
+            db.commit()
+            prices = asyncio.run_coroutine_threadsafe(get_multiple_crypto_prices(symbols), loop).result()
+            return work(leaderboard_service, prices)
+        finally:
+            db.close()
+    
+    return await asyncio.to_thread(run)
+
+
+async def refresh_leaderboard():
+    """Recompute the materialized leaderboard from one batched price snapshot"""
+    ranked = await run_with_held_prices(LeaderboardService.recompute_rankings)
+    logger.info(f"Leaderboard recomputed for {ranked} users")
+
+# Background job that keeps leaderboard ranks fresh, run by one worker at a time
+leaderboard_job = PeriodicJob(
+    "leaderboard-recompute",
+    float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "60")),
+    refresh_leaderboard,
+    initial_delay=5,
+    exclusive=True
+)
+
+
+async def take_portfolio_snapshots():
+    """Snapshot every user's portfolio value for the period leaderboards"""
+    written = await run_with_held_prices(LeaderboardService.snapshot_portfolios)
+    logger.info(f"Portfolio snapshots written for {written} users")
+
+# Background job that records the baselines for daily, weekly and monthly rankings, run by one worker at a time
+portfolio_snapshot_job = PeriodicJob(
+    "portfolio-snapshot",
+    float(os.getenv("PORTFOLIO_SNAPSHOT_SECONDS", "3600")),
+    take_portfolio_snapshots,
+    initial_delay=30,
+    exclusive=True
+)
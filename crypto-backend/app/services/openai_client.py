@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+
+class OpenAIError(Exception):
+    """The completions API failed or answered with an error status"""
+
+class OpenAIClient:
+    """Chat completions over one long-lived, pooled HTTP client.
+
+    The client is opened at startup and reused, so a chat message no longer pays
+    for a new TCP and TLS connection. At most `max_concurrency` completions run at
+    once; the rest wait their turn, and the time spent waiting is recorded.
+    """
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, api_key: Optional[str] = None,
+                 model: str = OPENAI_MODEL, max_concurrency: int = OPENAI_MAX_CONCURRENCY,
+                 timeout: float = OPENAI_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self._api_key = api_key
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.client: Optional[httpx.AsyncClient] = None
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or os.getenv("OPENAI_API_KEY")
+
+    def start(self):
+        """Open the pooled client; called from the app lifespan"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(max_keepalive_connections=self.max_concurrency,
+                                    max_connections=self.max_concurrency)
+            )
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    @asynccontextmanager
+    async def _slot(self):
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - queued_at
+        self.queue_seconds_total += waited
+        self.queue_seconds_max = max(self.queue_seconds_max, waited)
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            yield waited
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def _request(self, messages: List[Dict[str, str]], stream: bool, max_tokens: int, temperature: float) -> dict:
+        return {
+            "headers": {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            "json": {
+                "model": self.model,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "stream": stream
+            }
+        }
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int = 500, temperature: float = 0.7) -> str:
+        """The whole completion as one string; raises OpenAIError on failure"""
+        async with self._slot():
+            try:
+                response = await self.start().post(
+                    "/chat/completions", **self._request(messages, False, max_tokens, temperature)
+                )
+            except httpx.HTTPError as e:
+                self.failures += 1
+                raise OpenAIError(f"Request failed: {e}") from e
+            if response.status_code != 200:
+                self.failures += 1
+                raise OpenAIError(f"{response.status_code} - {response.text}")
+            return response.json()["choices"][0]["message"]["content"].strip()
+
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int = 500,
+                     temperature: float = 0.7) -> AsyncIterator[str]:
+        """Yield the completion's text as it is generated; raises OpenAIError on failure.
+
+        The concurrency slot is held until the stream ends or the caller stops
+        reading (e.g. the browser disconnects).
+        """
+        async with self._slot():
+            try:
+                async with self.start().stream(
+                    "POST", "/chat/completions", **self._request(messages, True, max_tokens, temperature)
+                ) as response:
+                    if response.status_code != 200:
+                        body = await response.aread()
+                        raise OpenAIError(f"{response.status_code} - {body.decode(errors='replace')}")
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                        if delta:
+                            yield delta
+            except OpenAIError:
+                self.failures += 1
+                raise
+            except httpx.HTTPError as e:
+                self.failures += 1
+                raise OpenAIError(f"Stream failed: {e}") from e
+
+    def get_stats(self) -> dict:
+        return {
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_queue_ms": round(self.queue_seconds_total / self.requests * 1000, 2) if self.requests else 0.0,
+            "max_queue_ms": round(self.queue_seconds_max * 1000, 2)
+        }
+
+openai_client = OpenAIClient()
@@ -0,0 +1,41 @@
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import aliased
+from typing import List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Cursors are the id of the last row of the previous page; raises ValueError if malformed"""
+    if not cursor:
+        return None
+    cursor_id = int(cursor)
+    if cursor_id <= 0:
+        raise ValueError("cursor must be positive")
+    return cursor_id
+
+def newest_first(stmt, model, time_attr: str, owner_attr: str, owner_id: int, cursor_id: Optional[int], limit: int):
+    """Keyset page over (time, id) descending for one owner's rows.
+
+    The cursor row's time is read back from the table rather than carried in the
+    cursor, so the comparison always uses the stored value (SQLite keeps timestamps
+    as text in more than one format). Fetches limit + 1 rows to tell whether
+    there is a next page; pass the rows to split_page().
+    """
+    time_column = getattr(model, time_attr)
+    stmt = stmt.where(getattr(model, owner_attr) == owner_id)
+    if cursor_id is not None:
+        last = aliased(model)
+        last_time = select(getattr(last, time_attr)).where(
+            last.id == cursor_id, getattr(last, owner_attr) == owner_id
+        ).scalar_subquery()
+        # Row value comparison, so the (owner, time, id) index seeks straight to the cursor
+        stmt = stmt.where(tuple_(time_column, model.id) < tuple_(last_time, cursor_id))
+    return stmt.order_by(time_column.desc(), model.id.desc()).limit(limit + 1)
+
+def split_page(rows: List, limit: int) -> Tuple[List, Optional[str]]:
+    """Trim the extra row fetched by newest_first() and return (rows, next_cursor)"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, str(rows[-1].id)
+    return rows, None
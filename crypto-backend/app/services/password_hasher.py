@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from passlib.context import CryptContext
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503"""
+
+class PasswordHasher:
+    """Runs bcrypt hashing and verification on a bounded pool of worker threads.
+
+    bcrypt releases the GIL while it works, so the workers hash in parallel and the
+    event loop is never blocked. At most `max_workers` hashes run at once and at most
+    `max_queue` more wait for a worker; anything beyond that is rejected with
+    PasswordHasherBusy instead of piling up behind a login burst.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int, max_queue: int):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def _submit(self, func: Callable, *args) -> Future:
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise PasswordHasherBusy(f"Password hashing queue is full ({self.queued} waiting)")
+            self.queued += 1
+        return self.executor.submit(self._run, func, *args)
+
+    def _run(self, func: Callable, *args):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def _verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        valid, new_hash = self.context.verify_and_update(password, hashed_password)
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    async def hash(self, password: str) -> str:
+        """Hash a password without blocking the event loop"""
+        return await asyncio.wrap_future(self._submit(self.context.hash, password))
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also return a new hash if the stored one uses an outdated cost"""
+        return await asyncio.wrap_future(self._submit(self._verify_and_update, password, hashed_password))
+
+    def hash_blocking(self, password: str) -> str:
+        """hash() for sync code running in a threadpool; still bounded by the pool"""
+        return self._submit(self.context.hash, password).result()
+
+    def verify_blocking(self, password: str, hashed_password: str) -> bool:
+        """Verify a password from sync code running in a threadpool"""
+        return self._submit(self.context.verify, password, hashed_password).result()
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "rounds": self.context.to_dict().get("bcrypt__default_rounds")
+        }
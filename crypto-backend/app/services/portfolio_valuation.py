@@ -0,0 +1,201 @@
+from sqlalchemy.orm import Session
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+from app.models.position import Position
+
+# Money is Numeric(20, 8): held as int64 counts of 1e-8 so sums stay exact. Quantities are also
+# counts of 1e-8, but as Python ints: meme coins are held by the hundred billion, past int64 in
+# those units. Prices are counts of 1e-18 so sub-satoshi quotes keep their digits
+PRICE_SCALE = 10 ** 18
+PERCENT_PLACES = Decimal('0.0001')
+INITIAL_BALANCE = Decimal('100000')
+
+_POSITION_COLUMNS = (
+    Position.user_id,
+    Position.coin_symbol,
+    Position.quantity,
+    Position.cost_basis,
+    Position.total_spent,
+    Position.total_received,
+    Position.realized_pnl,
+    Position.trade_count
+)
+
+
+def to_units(value) -> int:
+    """Convert a Decimal money value to integer 1e-8 units"""
+    return int(Decimal(value or 0).scaleb(8).to_integral_value())
+
+
+def from_units(units) -> Decimal:
+    """Convert integer 1e-8 units back to an exact Decimal"""
+    return Decimal(int(units)).scaleb(-8)
+
+
+def to_price_units(price) -> int:
+    """Convert a quoted price to integer 1e-18 units"""
+    return int(Decimal(str(price or 0)).scaleb(18).to_integral_value())
+
+
+def divide_rounded(numerators: np.ndarray, denominator: int) -> np.ndarray:
+    """Divide non-negative integers and round half to even, as Decimal quantize does"""
+    quotient, remainder = numerators // denominator, numerators % denominator
+    round_up = (2 * remainder > denominator) | ((2 * remainder == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def to_percent(value) -> Decimal:
+    return Decimal(repr(float(value))).quantize(PERCENT_PLACES)
+
+
+class PositionArrays:
+    """Columnar view of position rows, sorted by user"""
+
+    def __init__(self, rows: Sequence[tuple]):
+        rows = sorted(rows, key=lambda row: row[0])
+        self.symbols: List[str] = sorted({row[1] for row in rows})
+        coin_lookup = {symbol: index for index, symbol in enumerate(self.symbols)}
+
+        position_user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        self.user_ids, self.user_index = np.unique(position_user_ids, return_inverse=True)
+        self.coin_index = np.fromiter((coin_lookup[row[1]] for row in rows), dtype=np.int64, count=len(rows))
+        self.quantity = np.array([to_units(row[2]) for row in rows], dtype=object)
+        self.cost_basis = self._units(rows, 3)
+        self.total_spent = self._units(rows, 4)
+        self.total_received = self._units(rows, 5)
+        self.realized_pnl = self._units(rows, 6)
+        self.trade_count = np.fromiter((row[7] or 0 for row in rows), dtype=np.int64, count=len(rows))
+
+        # Start offset of each user's run of positions, for np.add.reduceat
+        self.user_starts = np.flatnonzero(np.r_[True, np.diff(self.user_index) != 0]) if rows else np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def _units(rows: Sequence[tuple], column: int) -> np.ndarray:
+        return np.fromiter((to_units(row[column]) for row in rows), dtype=np.int64, count=len(rows))
+
+    def __len__(self) -> int:
+        return len(self.coin_index)
+
+    @classmethod
+    def from_positions(cls, positions: Iterable[Position]) -> "PositionArrays":
+        """Build arrays from already-loaded Position objects"""
+        return cls([
+            (p.user_id, p.coin_symbol, p.quantity, p.cost_basis, p.total_spent,
+             p.total_received, p.realized_pnl, p.trade_count)
+            for p in positions
+        ])
+
+    @classmethod
+    def load(cls, db: Session, user_ids: Optional[Iterable[int]] = None) -> "PositionArrays":
+        """Load positions for all users (or the given users) in one query"""
+        query = db.query(*_POSITION_COLUMNS)
+        if user_ids is not None:
+            query = query.filter(Position.user_id.in_(list(user_ids)))
+        return cls(query.all())
+
+
+class PortfolioValuation:
+    """Per-user portfolio metrics, one array element per user"""
+
+    def __init__(self, positions: PositionArrays, prices: Dict[str, Decimal]):
+        self.user_ids = positions.user_ids
+        self._row_of = {int(user_id): row for row, user_id in enumerate(self.user_ids)}
+
+        # Price vector aligned with the coin index; unknown coins are worth 0
+        price_vector = np.array([to_price_units(prices.get(symbol, 0)) for symbol in positions.symbols], dtype=object)
+
+        held = (positions.quantity > 0).astype(bool)
+        # quantity * price is exact in integers; each position's value is rounded once to
+        # 1e-8 units, then summed exactly. A value past int64 raises instead of wrapping
+        position_value = np.where(held, positions.quantity * price_vector[positions.coin_index], 0)
+        position_value_units = divide_rounded(position_value, PRICE_SCALE).astype(np.int64)
+        closed = positions.total_received > 0
+
+        def per_user(values: np.ndarray) -> np.ndarray:
+            if not len(positions):
+                return np.zeros(0, dtype=np.int64)
+            return np.add.reduceat(values.astype(np.int64), positions.user_starts)
+
+        self.holdings_value = per_user(position_value_units)
+        self.open_cost_basis = per_user(np.where(held, positions.cost_basis, 0))
+        self.total_invested = per_user(positions.total_spent)
+        self.total_received = per_user(positions.total_received)
+        self.realized_pnl = per_user(positions.realized_pnl)
+        self.total_trades = per_user(positions.trade_count)
+        # A coin counts as a win when its sells realized a profit over average cost
+        self.winning_trades = per_user(closed & (positions.realized_pnl > 0))
+        self.losing_trades = per_user(closed & (positions.realized_pnl <= 0))
+
+        # Sale proceeds count towards the portfolio value
+        self.total_portfolio_value = self.holdings_value + self.total_received
+        self.total_profit_loss = self.total_portfolio_value - self.total_invested
+        self.unrealized_pnl = self.holdings_value - self.open_cost_basis
+
+        initial_units = to_units(INITIAL_BALANCE)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.total_profit_loss_percent = np.where(
+                self.total_invested > 0, self.total_profit_loss / self.total_invested * 100, 0.0)
+            self.portfolio_performance_percent = np.where(
+                self.total_trades > 0, (self.total_portfolio_value - initial_units) / initial_units * 100, 0.0)
+            closed_positions = self.winning_trades + self.losing_trades
+            self.win_rate_percent = np.where(
+                closed_positions > 0, self.winning_trades / closed_positions * 100, 0.0)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def _row_to_dict(self, row: int) -> Dict:
+        return {
+            'total_portfolio_value': from_units(self.total_portfolio_value[row]),
+            'holdings_value': from_units(self.holdings_value[row]),
+            'total_invested': from_units(self.total_invested[row]),
+            'total_received': from_units(self.total_received[row]),
+            'total_profit_loss': from_units(self.total_profit_loss[row]),
+            'total_profit_loss_percent': to_percent(self.total_profit_loss_percent[row]),
+            'portfolio_performance_percent': to_percent(self.portfolio_performance_percent[row]),
+            'open_cost_basis': from_units(self.open_cost_basis[row]),
+            'unrealized_pnl': from_units(self.unrealized_pnl[row]),
+            'realized_pnl': from_units(self.realized_pnl[row]),
+            'total_trades': int(self.total_trades[row]),
+            'winning_trades': int(self.winning_trades[row]),
+            'losing_trades': int(self.losing_trades[row]),
+            'win_rate_percent': to_percent(self.win_rate_percent[row])
+        }
+
+    def for_user(self, user_id: int) -> Dict:
+        """Get one user's metrics as Decimals; users without positions get zeros"""
+        row = self._row_of.get(user_id)
+        if row is None:
+            return empty_valuation()
+        return self._row_to_dict(row)
+
+    def by_user(self) -> Dict[int, Dict]:
+        """Get every valued user's metrics as Decimals"""
+        return {int(user_id): self._row_to_dict(row) for row, user_id in enumerate(self.user_ids)}
+
+
+def empty_valuation() -> Dict:
+    """Metrics for a user with no positions"""
+    return {
+        'total_portfolio_value': Decimal('0'),
+        'holdings_value': Decimal('0'),
+        'total_invested': Decimal('0'),
+        'total_received': Decimal('0'),
+        'total_profit_loss': Decimal('0'),
+        'total_profit_loss_percent': Decimal('0'),
+        'portfolio_performance_percent': Decimal('0'),
+        'open_cost_basis': Decimal('0'),
+        'unrealized_pnl': Decimal('0'),
+        'realized_pnl': Decimal('0'),
+        'total_trades': 0,
+        'winning_trades': 0,
+        'losing_trades': 0,
+        'win_rate_percent': Decimal('0')
+    }
+
+
+def value_portfolios(positions: PositionArrays, prices: Dict[str, Decimal]) -> PortfolioValuation:
+    """Value every user's positions against one price snapshot"""
+    return PortfolioValuation(positions, prices)
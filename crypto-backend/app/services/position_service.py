@@ -0,0 +1,169 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from app.models.position import Position
+from app.models.trade import Trade, TradeType
+from app.models.user import User
+
+ZERO = Decimal('0')
+# Columns derived from the trades, copied onto existing rows by a rebuild
+LEDGER_FIELDS = ('quantity', 'cost_basis', 'realized_pnl', 'total_spent', 'total_received', 'trade_count')
+
+class PositionService:
+    """Service for the per-user position ledger kept in step with the trades table"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_position(self, user_id: int, coin_symbol: str) -> Optional[Position]:
+        """Get a user's position in one coin"""
+        return self.db.query(Position).filter(
+            Position.user_id == user_id,
+            Position.coin_symbol == coin_symbol.upper()
+        ).first()
+
+    def get_position_for_update(self, user_id: int, coin_symbol: str) -> Optional[Position]:
+        """Get a user's position in one coin with a row lock held until the caller commits"""
+        return self.db.query(Position).filter(
+            Position.user_id == user_id,
+            Position.coin_symbol == coin_symbol.upper()
+        ).populate_existing().with_for_update().first()
+
+    def get_positions(self, user_id: int, open_only: bool = True) -> List[Position]:
+        """Get a user's positions, by default only coins currently held"""
+        query = self.db.query(Position).filter(Position.user_id == user_id)
+        if open_only:
+            query = query.filter(Position.quantity > 0)
+        return query.order_by(Position.coin_symbol).all()
+
+    def get_holding(self, user_id: int, coin_symbol: str) -> Decimal:
+        """Get the quantity of a coin a user currently holds"""
+        position = self.get_position(user_id, coin_symbol)
+        return position.quantity if position else ZERO
+
+    def apply_trade(self, trade: Trade, position: Optional[Position] = None) -> Position:
+        """Apply a new trade to its position, or to `position` if the caller already loaded it.
+
+        Does not commit: the caller commits the trade row and the position together.
+        """
+        if position is None:
+            position = self.get_position(trade.user_id, trade.coin_symbol)
+        if not position:
+            position = self._new_position(trade.user_id, trade.coin_symbol)
+            self.db.add(position)
+        self._apply(position, trade.trade_type, Decimal(trade.quantity), Decimal(trade.price_at_trade))
+        return position
+
+    def rebuild_user_positions(self, user_id: int) -> int:
+        """Re-derive one user's positions from their trades (caller commits).
+
+        Rows already in the ledger are updated in place rather than deleted and
+        re-inserted, so the session never holds two objects for one position. The
+        user row is locked first, as TradeService.execute does, so the user's trades
+        wait for the rebuild to commit.
+        """
+        self.db.query(User.id).filter(User.id == user_id).with_for_update().first()
+        existing = {
+            (position.user_id, position.coin_symbol): position
+            for position in self.db.query(Position).filter(Position.user_id == user_id)
+        }
+        trades = self.db.query(Trade).filter(Trade.user_id == user_id).order_by(Trade.timestamp, Trade.id)
+        positions = self.replay_trades(trades.yield_per(1000))
+        for key, position in positions.items():
+            current = existing.pop(key, None)
+            if current is None:
+                self.db.add(position)
+                continue
+            for field in LEDGER_FIELDS:
+                setattr(current, field, getattr(position, field))
+        # Coins with no trades left (or stored under a legacy lower-case symbol)
+        for stale in existing.values():
+            self.db.delete(stale)
+        return len(positions)
+
+    def rebuild_all_positions(self, batch_size: int = 1000) -> int:
+        """Re-derive every position from the trades table and commit.
+
+        Trades and positions are locked against writes until the commit, so trades
+        executed meanwhile wait instead of being lost or applied twice. SQLite needs
+        no extra lock: the DELETE below makes this the only writer until the commit.
+        """
+        if self.db.get_bind().dialect.name == "postgresql":
+            self.db.execute(text("LOCK TABLE trades, positions IN EXCLUSIVE MODE"))
+        self.db.query(Position).delete(synchronize_session=False)
+        trades = self.db.query(Trade).order_by(Trade.user_id, Trade.timestamp, Trade.id).yield_per(batch_size)
+
+        rebuilt = 0
+        current_user_id = None
+        user_trades = []
+        for trade in trades:
+            if trade.user_id != current_user_id and user_trades:
+                rebuilt += self._flush_replay(user_trades)
+                user_trades = []
+            current_user_id = trade.user_id
+            user_trades.append(trade)
+        if user_trades:
+            rebuilt += self._flush_replay(user_trades)
+
+        self.db.commit()
+        return rebuilt
+
+    def _flush_replay(self, trades: List[Trade]) -> int:
+        positions = self.replay_trades(trades)
+        self.db.add_all(positions.values())
+        self.db.flush()
+        return len(positions)
+
+    @classmethod
+    def replay_trades(cls, trades) -> Dict[Tuple[int, str], Position]:
+        """Fold trades (ordered oldest first) into unsaved positions keyed by (user_id, coin_symbol).
+
+        Works on anything with the Trade attributes, e.g. rows selected in a migration.
+        """
+        positions = {}
+        for trade in trades:
+            # Positions are stored upper-case; older trades may not be
+            key = (trade.user_id, trade.coin_symbol.upper())
+            if key not in positions:
+                positions[key] = cls._new_position(trade.user_id, trade.coin_symbol)
+            cls._apply(positions[key], trade.trade_type, Decimal(trade.quantity), Decimal(trade.price_at_trade))
+        return positions
+
+    @staticmethod
+    def _new_position(user_id: int, coin_symbol: str) -> Position:
+        return Position(
+            user_id=user_id,
+            coin_symbol=coin_symbol.upper(),
+            quantity=ZERO,
+            cost_basis=ZERO,
+            realized_pnl=ZERO,
+            total_spent=ZERO,
+            total_received=ZERO,
+            trade_count=0
+        )
+
+    @staticmethod
+    def _apply(position: Position, trade_type: TradeType, quantity: Decimal, price: Decimal):
+        """Average-cost accounting for one buy or sell"""
+        value = quantity * price
+        held = Decimal(position.quantity or 0)
+        cost_basis = Decimal(position.cost_basis or 0)
+
+        if trade_type == TradeType.BUY:
+            position.quantity = held + quantity
+            position.cost_basis = cost_basis + value
+            position.total_spent = Decimal(position.total_spent or 0) + value
+        else:
+            # Cost of the coins sold, proportional to the average cost of what is held
+            if held > 0 and quantity < held:
+                cost_removed = cost_basis * quantity / held
+            else:
+                cost_removed = cost_basis
+            position.quantity = held - quantity
+            position.cost_basis = cost_basis - cost_removed
+            position.realized_pnl = Decimal(position.realized_pnl or 0) + value - cost_removed
+            position.total_received = Decimal(position.total_received or 0) + value
+
+        position.trade_count = (position.trade_count or 0) + 1
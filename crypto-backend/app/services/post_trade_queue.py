@@ -0,0 +1,219 @@
+from sqlalchemy import select, update, delete, func, and_, or_
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import uuid
+
+from app.db import AsyncSessionLocal
+from app.models.post_trade_job import PostTradeJob, utcnow
+from app.models.user import User
+from app.services.achievement_service import evaluate_trade_achievements_async
+from app.services.leaderboard_service import update_user_leaderboard_entry_async
+from app.services.scheduler import PeriodicJob
+from app.services.trade_service import TradeExecuted, add_trade_listener
+
+logger = logging.getLogger(__name__)
+
+POST_TRADE_WORKERS = int(os.getenv("POST_TRADE_WORKERS", "2"))
+POST_TRADE_MAX_ATTEMPTS = int(os.getenv("POST_TRADE_MAX_ATTEMPTS", "5"))
+POST_TRADE_POLL_SECONDS = float(os.getenv("POST_TRADE_POLL_SECONDS", "2"))
+# A job claimed longer ago than this is assumed orphaned by a dead worker and claimed again
+POST_TRADE_CLAIM_TIMEOUT_SECONDS = float(os.getenv("POST_TRADE_CLAIM_TIMEOUT_SECONDS", "120"))
+POST_TRADE_RETENTION_HOURS = float(os.getenv("POST_TRADE_RETENTION_HOURS", "24"))
+MAX_RETRY_DELAY_SECONDS = 300
+
+class PostTradeQueue:
+    """Consumes the post_trade_jobs table: leaderboard refresh and achievement checks for committed trades.
+
+    TradeService writes one job per trade in the trade's own transaction, so a committed trade
+    always has its job and the unique trade_id keeps it to one. Workers claim every due job of
+    one user with a guarded UPDATE (safe across processes), run both updates once for all of
+    them, and mark them done. Failures are retried with exponential backoff and marked failed
+    after POST_TRADE_MAX_ATTEMPTS. Trade events only wake the workers; the table is the queue.
+    """
+
+    def __init__(self, workers: int = POST_TRADE_WORKERS, max_attempts: int = POST_TRADE_MAX_ATTEMPTS,
+                 poll_seconds: float = POST_TRADE_POLL_SECONDS, session_factory=None):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker coroutines on the running event loop"""
+        if self.tasks:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        add_trade_listener(self.notify)
+        logger.info(f"Started post-trade queue with {self.workers} workers")
+
+    async def stop(self):
+        """Cancel the workers; jobs they had claimed are picked up again after the claim timeout"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.loop = None
+        logger.info("Stopped post-trade queue")
+
+    def notify(self, event: TradeExecuted):
+        """Trade listener: wake a worker now instead of at the next poll (callable from any thread)"""
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.claim()
+                if claimed:
+                    await self.process(*claimed)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Post-trade worker error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _due(self, now: datetime):
+        """Jobs that may be claimed: pending and due for a user nobody is working on, or orphaned"""
+        stale = now - timedelta(seconds=POST_TRADE_CLAIM_TIMEOUT_SECONDS)
+        busy_users = select(PostTradeJob.user_id).where(
+            PostTradeJob.status == 'running',
+            PostTradeJob.claimed_at >= stale
+        )
+        return or_(
+            and_(
+                PostTradeJob.status == 'pending',
+                PostTradeJob.next_attempt_at <= now,
+                PostTradeJob.user_id.notin_(busy_users)
+            ),
+            and_(PostTradeJob.status == 'running', PostTradeJob.claimed_at < stale)
+        )
+
+    async def claim(self) -> Optional[Tuple[str, int]]:
+        """Claim the due jobs of the user with the oldest one; returns (claim_token, user_id)"""
+        async with self.session_factory() as db:
+            now = utcnow()
+            user_id = await db.scalar(
+                select(PostTradeJob.user_id).where(self._due(now)).order_by(PostTradeJob.id).limit(1)
+            )
+            if user_id is None:
+                return None
+
+            token = uuid.uuid4().hex
+            result = await db.execute(
+                update(PostTradeJob)
+                .where(PostTradeJob.user_id == user_id, self._due(now))
+                .values(status='running', claim_token=token, claimed_at=now, attempts=PostTradeJob.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            # Another worker got there first
+            return (token, user_id) if result.rowcount else None
+
+    async def process(self, token: str, user_id: int):
+        """Run the post-trade updates for a claimed user and settle their jobs"""
+        try:
+            async with self.session_factory() as db:
+                user = await db.get(User, user_id)
+                if user:
+                    if await update_user_leaderboard_entry_async(db, user) is None:
+                        raise RuntimeError("leaderboard entry was not saved")
+                    await evaluate_trade_achievements_async(db, user)
+        except Exception as e:
+            logger.error(f"Post-trade updates failed for user {user_id}: {e}")
+            await self._retry(token, str(e))
+            return
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(PostTradeJob)
+                .where(PostTradeJob.claim_token == token, PostTradeJob.status == 'running')
+                .values(status='done', completed_at=utcnow(), last_error=None)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        self.processed += result.rowcount
+
+    async def _retry(self, token: str, error: str):
+        async with self.session_factory() as db:
+            attempts = await db.scalar(
+                select(func.max(PostTradeJob.attempts)).where(PostTradeJob.claim_token == token)
+            ) or 1
+            claimed = and_(PostTradeJob.claim_token == token, PostTradeJob.status == 'running')
+            failed = await db.execute(
+                update(PostTradeJob)
+                .where(claimed, PostTradeJob.attempts >= self.max_attempts)
+                .values(status='failed', last_error=error)
+                .execution_options(synchronize_session=False)
+            )
+            delay = min(self.poll_seconds * 2 ** attempts, MAX_RETRY_DELAY_SECONDS)
+            retried = await db.execute(
+                update(PostTradeJob)
+                .where(claimed)
+                .values(status='pending', next_attempt_at=utcnow() + timedelta(seconds=delay), last_error=error)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        self.failed += failed.rowcount
+        self.retried += retried.rowcount
+
+    async def purge_completed(self):
+        """Delete finished jobs past the retention window"""
+        async with self.session_factory() as db:
+            cutoff = utcnow() - timedelta(hours=POST_TRADE_RETENTION_HOURS)
+            result = await db.execute(
+                delete(PostTradeJob).where(PostTradeJob.status == 'done', PostTradeJob.completed_at < cutoff)
+            )
+            await db.commit()
+        logger.info(f"Purged {result.rowcount} completed post-trade jobs")
+
+    async def get_stats(self) -> Dict:
+        """Queue depth per status and lag: age of the oldest trade whose updates have not run yet"""
+        async with self.session_factory() as db:
+            counts = dict((await db.execute(
+                select(PostTradeJob.status, func.count(PostTradeJob.id)).group_by(PostTradeJob.status)
+            )).all())
+            oldest = await db.scalar(
+                select(func.min(PostTradeJob.created_at)).where(PostTradeJob.status.in_(['pending', 'running']))
+            )
+
+        lag_seconds = 0.0
+        if oldest is not None:
+            # SQLite hands the timestamps back naive
+            now = utcnow() if oldest.tzinfo else utcnow().replace(tzinfo=None)
+            lag_seconds = max((now - oldest).total_seconds(), 0.0)
+        return {
+            "workers": len(self.tasks),
+            "pending": counts.get('pending', 0),
+            "running": counts.get('running', 0),
+            "failed": counts.get('failed', 0),
+            "lag_seconds": round(lag_seconds, 3),
+            "processed": self.processed,
+            "retried": self.retried,
+            "gave_up": self.failed
+        }
+
+post_trade_queue = PostTradeQueue()
+
+# Background job that keeps the jobs table small
+post_trade_purge_job = PeriodicJob(
+    "post-trade-purge",
+    3600,
+    post_trade_queue.purge_completed,
+    initial_delay=60
+)
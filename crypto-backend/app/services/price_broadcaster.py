@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, Optional, Set
+from app.schemas.trade import PriceResponse
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_symbols(symbols: Optional[Iterable[str]]) -> Optional[Set[str]]:
+    """Turn a symbol list into an upper-case set; None or empty means every symbol"""
+    if not symbols:
+        return None
+    normalized = {symbol.strip().upper() for symbol in symbols if symbol and symbol.strip()}
+    return normalized or None
+
+
+class PriceSubscription:
+    """One client's view of the price stream.
+
+    Updates are conflated per symbol: a slow consumer only ever has the latest
+    tick waiting for it, never a growing backlog.
+    """
+
+    def __init__(self, symbols: Optional[Set[str]] = None):
+        self.symbols = symbols
+        self.pending: Dict[str, dict] = {}
+        self.event = asyncio.Event()
+        self.conflated = 0
+
+    def wants(self, symbol: str) -> bool:
+        return self.symbols is None or symbol in self.symbols
+
+    def offer(self, updates: Dict[str, dict]):
+        """Queue updates for this client, overwriting any it has not sent yet"""
+        if self.symbols is None:
+            matched = updates
+        else:
+            matched = {symbol: updates[symbol] for symbol in self.symbols if symbol in updates}
+        if not matched:
+            return
+        self.conflated += len(self.pending.keys() & matched.keys())
+        self.pending.update(matched)
+        self.event.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> Dict[str, dict]:
+        """Wait for pending updates and take all of them; returns {} on timeout"""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        batch, self.pending = self.pending, {}
+        self.event.clear()
+        return batch
+
+
+class PriceBroadcaster:
+    """Fans price ticks from CoinGeckoService out to WebSocket and SSE clients"""
+
+    def __init__(self):
+        self.subscriptions: Set[PriceSubscription] = set()
+        self.latest: Dict[str, dict] = {}
+        self.ticks = 0
+
+    @staticmethod
+    def _to_payload(price: PriceResponse) -> dict:
+        return {
+            "symbol": price.coin_symbol,
+            "price": float(price.price_usd),
+            "change_24h_percent": float(price.price_change_percentage_24h or 0),
+            "last_updated": price.timestamp.isoformat()
+        }
+
+    def subscribe(self, symbols: Optional[Iterable[str]] = None) -> PriceSubscription:
+        """Register a client and prime it with the latest known prices"""
+        subscription = PriceSubscription(normalize_symbols(symbols))
+        self.subscriptions.add(subscription)
+        subscription.offer(self.latest)
+        logger.info(f"Price stream subscriber added ({len(self.subscriptions)} active)")
+        return subscription
+
+    def update_symbols(self, subscription: PriceSubscription, symbols: Optional[Iterable[str]]):
+        """Change a client's symbol subset and send it prices for newly added symbols"""
+        previous = subscription.symbols
+        subscription.symbols = normalize_symbols(symbols)
+        if subscription.symbols is None:
+            added = self.latest
+        else:
+            added = {symbol: self.latest[symbol] for symbol in subscription.symbols
+                     if symbol in self.latest and (previous is None or symbol not in previous)}
+        subscription.pending = {symbol: payload for symbol, payload in subscription.pending.items()
+                                if subscription.wants(symbol)}
+        subscription.offer(added)
+
+    def unsubscribe(self, subscription: PriceSubscription):
+        self.subscriptions.discard(subscription)
+        logger.info(f"Price stream subscriber removed ({len(self.subscriptions)} active)")
+
+    def publish(self, prices: Dict[str, PriceResponse]):
+        """Push the symbols whose price changed since the last tick to every subscriber"""
+        deltas = {}
+        for symbol, price in prices.items():
+            payload = self._to_payload(price)
+            previous = self.latest.get(symbol)
+            if previous and previous["price"] == payload["price"] and previous["change_24h_percent"] == payload["change_24h_percent"]:
+                continue
+            self.latest[symbol] = payload
+            deltas[symbol] = payload
+
+        if not deltas:
+            return
+        self.ticks += 1
+        for subscription in list(self.subscriptions):
+            subscription.offer(deltas)
+
+    def get_stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscriptions),
+            "symbols_tracked": len(self.latest),
+            "ticks_published": self.ticks,
+            "conflated_updates": sum(subscription.conflated for subscription in self.subscriptions)
+        }
+
+
+# Global broadcaster instance, fed by price_service
+price_broadcaster = PriceBroadcaster()
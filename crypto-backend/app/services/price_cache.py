@@ -0,0 +1,416 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from app.schemas.trade import PriceResponse
+
+logger = logging.getLogger(__name__)
+
+# Cache tiers used by CoinGeckoService
+PRIMARY = "primary"
+FALLBACK = "fallback"
+DYNAMIC = "dynamic"
+TIERS = (PRIMARY, FALLBACK, DYNAMIC)
+
+
+class PriceCacheBackend(ABC):
+    """Storage interface behind CoinGeckoService's price cache tiers.
+
+    ``ttl`` is how long an entry is retained; freshness is still judged by the
+    service from ``PriceResponse.timestamp``. A backend missing any of the
+    methods below cannot be instantiated.
+
+    ``blocking`` backends do file or network I/O; CoinGeckoService calls them
+    from a worker thread so the event loop never waits on them.
+
+    ``acquire_lease`` lets the workers sharing a backend agree on which one
+    polls upstream: it takes or renews a named lease for ``holder`` and
+    returns False while another holder's lease is unexpired.
+    """
+
+    name = "base"
+    blocking = True
+
+    @abstractmethod
+    def get(self, tier: str, coin_symbol: str) -> Optional[PriceResponse]:
+        ...
+
+    @abstractmethod
+    def set(self, tier: str, coin_symbol: str, price: PriceResponse, ttl: timedelta):
+        ...
+
+    @abstractmethod
+    def delete(self, tier: str, coin_symbol: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def size(self, tier: str) -> int:
+        ...
+
+    @abstractmethod
+    def acquire_lease(self, name: str, holder: str, ttl: timedelta) -> bool:
+        ...
+
+    def set_many(self, tier: str, prices: Dict[str, PriceResponse], ttl: timedelta):
+        """Store a batch of prices; backends override this to write them in one round trip"""
+        for coin_symbol, price in prices.items():
+            self.set(tier, coin_symbol, price, ttl)
+
+    def get_many(self, tier: str, coin_symbols: List[str]) -> Dict[str, PriceResponse]:
+        """Read a batch of prices, leaving out misses; backends override this to read them in one round trip"""
+        prices = {}
+        for coin_symbol in coin_symbols:
+            price = self.get(tier, coin_symbol)
+            if price:
+                prices[coin_symbol] = price
+        return prices
+
+
+class InMemoryPriceCache(PriceCacheBackend):
+    """Per-process cache shared by every CoinGeckoService in the process"""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self):
+        self.tiers: Dict[str, Dict[str, tuple]] = {tier: {} for tier in TIERS}
+        self.leases: Dict[str, tuple] = {}
+
+    def get(self, tier: str, coin_symbol: str) -> Optional[PriceResponse]:
+        entry = self.tiers[tier].get(coin_symbol)
+        if not entry:
+            return None
+        price, expires_at = entry
+        if expires_at < time.time():
+            self.tiers[tier].pop(coin_symbol, None)
+            return None
+        return price
+
+    def set(self, tier: str, coin_symbol: str, price: PriceResponse, ttl: timedelta):
+        self.tiers[tier][coin_symbol] = (price, time.time() + ttl.total_seconds())
+
+    def delete(self, tier: str, coin_symbol: str):
+        self.tiers[tier].pop(coin_symbol, None)
+
+    def clear(self):
+        for entries in self.tiers.values():
+            entries.clear()
+
+    def size(self, tier: str) -> int:
+        return len(self.tiers[tier])
+
+    def acquire_lease(self, name: str, holder: str, ttl: timedelta) -> bool:
+        current = self.leases.get(name)
+        if current and current[0] != holder and current[1] >= time.time():
+            return False
+        self.leases[name] = (holder, time.time() + ttl.total_seconds())
+        return True
+
+
+class SQLitePriceCache(PriceCacheBackend):
+    """File-backed cache shared by every worker on the same host"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS price_cache ("
+            "tier TEXT NOT NULL, coin_symbol TEXT NOT NULL, payload TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, PRIMARY KEY (tier, coin_symbol))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS price_leases ("
+            "name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, tier: str, coin_symbol: str) -> Optional[PriceResponse]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT payload FROM price_cache WHERE tier = ? AND coin_symbol = ? AND expires_at >= ?",
+                (tier, coin_symbol, time.time())
+            ).fetchone()
+        return PriceResponse.parse_raw(row[0]) if row else None
+
+    def set(self, tier: str, coin_symbol: str, price: PriceResponse, ttl: timedelta):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO price_cache (tier, coin_symbol, payload, expires_at) VALUES (?, ?, ?, ?)",
+                (tier, coin_symbol, price.json(), time.time() + ttl.total_seconds())
+            )
+
+    def set_many(self, tier: str, prices: Dict[str, PriceResponse], ttl: timedelta):
+        expires_at = time.time() + ttl.total_seconds()
+        rows = [(tier, coin_symbol, price.json(), expires_at) for coin_symbol, price in prices.items()]
+        with self.lock:
+            # One transaction, so one fsync for the whole batch
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO price_cache (tier, coin_symbol, payload, expires_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+
+    def get_many(self, tier: str, coin_symbols: List[str]) -> Dict[str, PriceResponse]:
+        placeholders = ",".join("?" * len(coin_symbols))
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT coin_symbol, payload FROM price_cache WHERE tier = ? AND expires_at >= ? AND coin_symbol IN ({placeholders})",
+                (tier, time.time(), *coin_symbols)
+            ).fetchall()
+        return {coin_symbol: PriceResponse.parse_raw(payload) for coin_symbol, payload in rows}
+
+    def delete(self, tier: str, coin_symbol: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM price_cache WHERE tier = ? AND coin_symbol = ?", (tier, coin_symbol))
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM price_cache")
+
+    def size(self, tier: str) -> int:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM price_cache WHERE tier = ? AND expires_at >= ?", (tier, time.time())
+            ).fetchone()
+        return row[0]
+
+    def acquire_lease(self, name: str, holder: str, ttl: timedelta) -> bool:
+        now = time.time()
+        with self.lock:
+            # A single upsert, so two processes cannot both take the lease
+            cursor = self.conn.execute(
+                "INSERT INTO price_leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE price_leases.holder = excluded.holder OR price_leases.expires_at < ?",
+                (name, holder, now + ttl.total_seconds(), now)
+            )
+        return cursor.rowcount == 1
+
+
+class RedisPriceCache(PriceCacheBackend):
+    """Cache stored on any server speaking the Redis protocol (RESP)"""
+
+    name = "redis"
+
+    # Take the lease if it is free, extend it if the caller holds it; one atomic step on the server
+    LEASE_SCRIPT = (
+        "local holder = redis.call('GET', KEYS[1]) "
+        "if holder == false then redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2]) return 1 end "
+        "if holder == ARGV[1] then redis.call('PEXPIRE', KEYS[1], ARGV[2]) return 1 end "
+        "return 0"
+    )
+
+    def __init__(self, url: str, prefix: str = "prices", timeout: float = 1.0, retry_after: float = 5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.database = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        # After a failed reconnect, calls fail fast for this long instead of each waiting on a timeout
+        self.retry_after = retry_after
+        self.unavailable_until = 0.0
+        self.lock = threading.Lock()
+        self.sock = None
+        self.reader = None
+
+    def _key(self, tier: str, coin_symbol: str) -> str:
+        return f"{self.prefix}:{tier}:{coin_symbol}"
+
+    def _connect(self):
+        self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.reader = self.sock.makefile("rb")
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.database:
+            self._send("SELECT", str(self.database))
+
+    def _close(self):
+        try:
+            if self.sock:
+                self.sock.close()
+        finally:
+            self.sock = None
+            self.reader = None
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        payload = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode()
+            payload.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(payload)
+
+    def _send(self, *args: str):
+        self.sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RuntimeError(f"Redis error: {body.decode()}")
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            count = int(body)
+            if count == -1:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+    def _pipeline(self, commands: List[tuple]) -> list:
+        """Send several commands in one write and read their replies, reconnecting once if the connection dropped"""
+        with self.lock:
+            if time.time() < self.unavailable_until:
+                raise ConnectionError("Redis price cache unavailable, retrying later")
+            for attempt in range(2):
+                try:
+                    if not self.sock:
+                        self._connect()
+                    self.sock.sendall(b"".join(self._encode(args) for args in commands))
+                    replies = []
+                    for _ in commands:
+                        # Read every reply even after an error reply, so the stream stays in step
+                        try:
+                            replies.append(self._read_reply())
+                        except RuntimeError as e:
+                            replies.append(e)
+                    errors = [reply for reply in replies if isinstance(reply, RuntimeError)]
+                    if errors:
+                        raise errors[0]
+                    return replies
+                except (OSError, ConnectionError) as e:
+                    self._close()
+                    if attempt == 1:
+                        self.unavailable_until = time.time() + self.retry_after
+                        raise
+                    logger.warning(f"Redis price cache reconnecting after error: {e}")
+
+    def _command(self, *args: str):
+        return self._pipeline([args])[0]
+
+    def _scan(self, pattern: str) -> List[str]:
+        keys = []
+        cursor = "0"
+        while True:
+            cursor, batch = self._command("SCAN", cursor, "MATCH", pattern, "COUNT", "500")
+            keys.extend(batch)
+            if cursor == "0":
+                return keys
+
+    def get(self, tier: str, coin_symbol: str) -> Optional[PriceResponse]:
+        try:
+            payload = self._command("GET", self._key(tier, coin_symbol))
+        except Exception as e:
+            logger.error(f"Redis price cache get failed: {e}")
+            return None
+        return PriceResponse.parse_raw(payload) if payload else None
+
+    def set(self, tier: str, coin_symbol: str, price: PriceResponse, ttl: timedelta):
+        try:
+            self._command("SET", self._key(tier, coin_symbol), price.json(), "PX", str(int(ttl.total_seconds() * 1000)))
+        except Exception as e:
+            logger.error(f"Redis price cache set failed: {e}")
+
+    def set_many(self, tier: str, prices: Dict[str, PriceResponse], ttl: timedelta):
+        ttl_ms = str(int(ttl.total_seconds() * 1000))
+        try:
+            self._pipeline([
+                ("SET", self._key(tier, coin_symbol), price.json(), "PX", ttl_ms)
+                for coin_symbol, price in prices.items()
+            ])
+        except Exception as e:
+            logger.error(f"Redis price cache set failed: {e}")
+
+    def get_many(self, tier: str, coin_symbols: List[str]) -> Dict[str, PriceResponse]:
+        if not coin_symbols:
+            return {}
+        try:
+            payloads = self._command("MGET", *(self._key(tier, coin_symbol) for coin_symbol in coin_symbols))
+        except Exception as e:
+            logger.error(f"Redis price cache get failed: {e}")
+            return {}
+        return {
+            coin_symbol: PriceResponse.parse_raw(payload)
+            for coin_symbol, payload in zip(coin_symbols, payloads) if payload
+        }
+
+    def delete(self, tier: str, coin_symbol: str):
+        try:
+            self._command("DEL", self._key(tier, coin_symbol))
+        except Exception as e:
+            logger.error(f"Redis price cache delete failed: {e}")
+
+    def clear(self):
+        try:
+            keys = self._scan(f"{self.prefix}:*")
+            if keys:
+                self._command("DEL", *keys)
+        except Exception as e:
+            logger.error(f"Redis price cache clear failed: {e}")
+
+    def size(self, tier: str) -> int:
+        try:
+            return len(self._scan(f"{self.prefix}:{tier}:*"))
+        except Exception as e:
+            logger.error(f"Redis price cache size failed: {e}")
+            return 0
+
+    def acquire_lease(self, name: str, holder: str, ttl: timedelta) -> bool:
+        # Outside "<prefix>:*", so clear() and size() never touch leases
+        key = f"{self.prefix}-lease:{name}"
+        try:
+            return self._command(
+                "EVAL", self.LEASE_SCRIPT, "1", key, holder, str(int(ttl.total_seconds() * 1000))
+            ) == 1
+        except Exception as e:
+            # Without the shared store every worker polls for itself, as with the in-memory cache
+            logger.error(f"Redis price cache lease failed: {e}")
+            return True
+
+
+# Shared by every CoinGeckoService built in this process
+_memory_cache = InMemoryPriceCache()
+
+
+def create_price_cache() -> PriceCacheBackend:
+    """Build the cache backend selected by PRICE_CACHE_BACKEND (memory, sqlite or redis)"""
+    backend = os.getenv("PRICE_CACHE_BACKEND", "memory").lower()
+    try:
+        if backend == "sqlite":
+            return SQLitePriceCache(os.getenv("PRICE_CACHE_PATH", "./price_cache.db"))
+        if backend == "redis":
+            return RedisPriceCache(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    except Exception as e:
+        logger.error(f"Could not create {backend} price cache, using in-memory cache: {e}")
+        return _memory_cache
+    if backend != "memory":
+        logger.warning(f"Unknown PRICE_CACHE_BACKEND '{backend}', using in-memory cache")
+    return _memory_cache
+
@@ -1,11 +1,14 @@
 import httpx
 from decimal import Decimal
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from datetime import datetime, timedelta
 import asyncio
+import os
 import time
+import uuid
 import logging
 from app.schemas.trade import PriceResponse
+from app.services.price_cache import PriceCacheBackend, create_price_cache, PRIMARY, FALLBACK, DYNAMIC
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -359,17 +362,16 @@ class CoinGeckoService:
     # No hardcoded fallback prices - always try to get live prices from API
     # This ensures users always get current market prices
     
-    def __init__(self):
+    def __init__(self, cache_backend: Optional[PriceCacheBackend] = None):
         # Use a more robust HTTP client with better timeout and retry settings
         self.client = httpx.AsyncClient(
             timeout=httpx.Timeout(30.0, connect=10.0),
             limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
             http2=False  # Disable HTTP/2 for now to avoid import issues
         )
-        # Multi-tier caching system
-        self.cache = {}  # Primary cache for successful API responses
-        self.fallback_cache = {}  # Fallback cache for when APIs are rate-limited
-        self.dynamic_fallback = {}  # Dynamic fallback using recent prices (24 hours)
+        # Multi-tier caching system (primary, fallback and dynamic tiers) stored in a
+        # pluggable backend so every worker and service instance shares one cache
+        self.cache_backend = cache_backend or create_price_cache()
         self.cache_duration = timedelta(minutes=5)  # Cache successful responses for 5 minutes
         self.fallback_cache_duration = timedelta(minutes=15)  # Keep fallback data for 15 minutes
         self.dynamic_fallback_duration = timedelta(hours=24)  # Keep recent prices for 24 hours as fallback
@@ -380,6 +382,25 @@ class CoinGeckoService:
         self.rate_limit_reset = time.time()
         self.consecutive_failures = 0
         self.max_consecutive_failures = 5  # Increased tolerance for temporary API issues
+        # Background poller that keeps the whole coin universe warm in memory
+        self.poll_interval = float(os.getenv("PRICE_POLL_INTERVAL_SECONDS", "30"))
+        self.poll_batch_size = 250  # CoinGecko accepts many ids per /simple/price call
+        self.poller_task = None
+        self.last_poll_time = None
+        # Workers sharing a cache backend take turns through a lease, so only one polls upstream
+        self.instance_id = uuid.uuid4().hex
+        self.poll_lease_ttl = timedelta(seconds=self.poll_interval * 3)
+        self.poll_leader = False
+        self._shared_price_times: Dict[str, datetime] = {}  # Timestamp of each price a follower has passed on
+        self.trading_price_max_age = timedelta(seconds=60)
+        # Single-flight: one shared future per symbol currently being fetched upstream
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # Callbacks notified with every batch of freshly fetched prices (e.g. the price broadcaster)
+        self.price_listeners: List[Callable[[Dict[str, PriceResponse]], None]] = []
+        # Market snapshots answer within this budget; slower fetches finish in the background
+        self.snapshot_budget = float(os.getenv("PRICE_SNAPSHOT_BUDGET_SECONDS", "2"))
+        self.snapshot_timeouts = 0
+        self._background_fetches = set()
     
     async def _rate_limit(self):
         """Implement rate limiting to avoid 429 errors"""
@@ -407,78 +428,90 @@ class CoinGeckoService:
         self.last_request_time = time.time()
         self.request_count += 1
     
-    def _get_cached_price(self, coin_symbol: str) -> Optional[PriceResponse]:
+    async def _cache_call(self, method, *args):
+        """Call the cache backend; blocking backends (sqlite, redis) run in a worker thread"""
+        if self.cache_backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+    
+    async def _get_cached_price(self, coin_symbol: str) -> Optional[PriceResponse]:
         """Get cached price from primary cache if available and not expired"""
-        if coin_symbol in self.cache:
-            cached_data = self.cache[coin_symbol]
+        cached_data = await self._cache_call(self.cache_backend.get, PRIMARY, coin_symbol)
+        if cached_data:
             if datetime.utcnow() - cached_data.timestamp < self.cache_duration:
                 logger.info(f"Returning fresh cached price for {coin_symbol}")
                 return cached_data
             else:
                 # Move expired cache to fallback cache
-                self._move_to_fallback_cache(coin_symbol, cached_data)
-                del self.cache[coin_symbol]
+                await self._move_to_fallback_cache(coin_symbol, cached_data)
+                await self._cache_call(self.cache_backend.delete, PRIMARY, coin_symbol)
         return None
     
-    def _get_fallback_cached_price(self, coin_symbol: str) -> Optional[PriceResponse]:
+    async def _get_fallback_cached_price(self, coin_symbol: str) -> Optional[PriceResponse]:
         """Get cached price from fallback cache if available and not expired"""
-        if coin_symbol in self.fallback_cache:
-            cached_data = self.fallback_cache[coin_symbol]
+        cached_data = await self._cache_call(self.cache_backend.get, FALLBACK, coin_symbol)
+        if cached_data:
             if datetime.utcnow() - cached_data.timestamp < self.fallback_cache_duration:
                 logger.info(f"Returning fallback cached price for {coin_symbol}")
                 return cached_data
             else:
                 # Remove expired fallback cache entry
-                del self.fallback_cache[coin_symbol]
+                await self._cache_call(self.cache_backend.delete, FALLBACK, coin_symbol)
         return None
     
-    def _move_to_fallback_cache(self, coin_symbol: str, price_data: PriceResponse):
+    async def _move_to_fallback_cache(self, coin_symbol: str, price_data: PriceResponse):
         """Move price data to fallback cache"""
-        self.fallback_cache[coin_symbol] = price_data
+        await self._cache_call(self.cache_backend.set, FALLBACK, coin_symbol, price_data, self.fallback_cache_duration)
         logger.info(f"Moved {coin_symbol} to fallback cache")
     
-    def _update_dynamic_fallback(self, coin_symbol: str, price_data: PriceResponse):
-        """Update dynamic fallback with recent price data"""
-        self.dynamic_fallback[coin_symbol] = price_data
-        logger.info(f"Updated dynamic fallback for {coin_symbol} at ${price_data.price_usd}")
-    
-    def _get_dynamic_fallback_price(self, coin_symbol: str) -> Optional[PriceResponse]:
+    async def _get_dynamic_fallback_price(self, coin_symbol: str) -> Optional[PriceResponse]:
         """Get price from dynamic fallback if available and not expired"""
-        if coin_symbol in self.dynamic_fallback:
-            cached_data = self.dynamic_fallback[coin_symbol]
+        cached_data = await self._cache_call(self.cache_backend.get, DYNAMIC, coin_symbol)
+        if cached_data:
             if datetime.utcnow() - cached_data.timestamp < self.dynamic_fallback_duration:
                 logger.info(f"Using dynamic fallback price for {coin_symbol}: ${cached_data.price_usd}")
                 return cached_data
             else:
                 # Remove expired dynamic fallback entry
-                del self.dynamic_fallback[coin_symbol]
+                await self._cache_call(self.cache_backend.delete, DYNAMIC, coin_symbol)
         return None
     
-    def _cache_price(self, coin_symbol: str, price: PriceResponse):
+    async def _cache_price(self, coin_symbol: str, price: PriceResponse):
         """Cache a price response and update dynamic fallback"""
-        self.cache[coin_symbol] = price
-        # Also update dynamic fallback with fresh price data
-        self._update_dynamic_fallback(coin_symbol, price)
+        await self._cache_prices({coin_symbol: price})
+    
+    async def _cache_prices(self, prices: Dict[str, PriceResponse]):
+        """Cache a batch of prices in the primary and dynamic fallback tiers, one write per tier"""
+        if not prices:
+            return
+        
+        def write():
+            # Keep primary entries past their freshness window so they can move to the fallback tier
+            self.cache_backend.set_many(PRIMARY, prices, self.fallback_cache_duration)
+            # Also update dynamic fallback with fresh price data
+            self.cache_backend.set_many(DYNAMIC, prices, self.dynamic_fallback_duration)
+        
+        await self._cache_call(write)
     
-    def clear_cache(self, coin_symbol: str = None):
+    async def clear_cache(self, coin_symbol: str = None):
         """Clear cache for specific coin or all coins"""
         if coin_symbol:
-            if coin_symbol in self.cache:
-                del self.cache[coin_symbol]
-            if coin_symbol in self.fallback_cache:
-                del self.fallback_cache[coin_symbol]
-            if coin_symbol in self.dynamic_fallback:
-                del self.dynamic_fallback[coin_symbol]
+            for tier in (PRIMARY, FALLBACK, DYNAMIC):
+                await self._cache_call(self.cache_backend.delete, tier, coin_symbol)
         else:
-            self.cache.clear()
-            self.fallback_cache.clear()
-            self.dynamic_fallback.clear()
+            await self._cache_call(self.cache_backend.clear)
             logger.info("Cleared all caches")
     
     async def get_fresh_price_for_trading(self, coin_symbol: str) -> Optional[PriceResponse]:
         """Get fresh price for trading (bypasses cache) with backup API support"""
+        # The poller keeps prices fresh, so trading can use the in-memory snapshot
+        if self.is_snapshot_live():
+            cached_price = await self._get_cached_price(coin_symbol.upper())
+            if cached_price and datetime.utcnow() - cached_price.timestamp < self.trading_price_max_age:
+                return cached_price
+        
         # Clear cache for this coin to force fresh price
-        self.clear_cache(coin_symbol.upper())
+        await self.clear_cache(coin_symbol.upper())
         
         # Get fresh price from primary API (CoinGecko) with backup fallback
         price_response = await self.get_price(coin_symbol)
@@ -494,10 +527,10 @@ class CoinGeckoService:
         
         return price_response
     
-    def _get_fallback_price(self, coin_symbol: str) -> Optional[PriceResponse]:
+    async def _get_fallback_price(self, coin_symbol: str) -> Optional[PriceResponse]:
         """Legacy method - now uses dynamic fallback instead of hardcoded prices"""
         # This method is kept for compatibility but now redirects to dynamic fallback
-        return self._get_dynamic_fallback_price(coin_symbol)
+        return await self._get_dynamic_fallback_price(coin_symbol)
     
     async def _make_api_request(self, url: str, retries: int = 3) -> Optional[dict]:
         """Make API request with retry logic and better error handling"""
@@ -609,21 +642,76 @@ class CoinGeckoService:
         """Get current price for a single cryptocurrency with intelligent caching"""
         try:
             # Check primary cache first
-            cached_price = self._get_cached_price(coin_symbol)
+            cached_price = await self._get_cached_price(coin_symbol)
             if cached_price:
                 return cached_price
             
+            # While the poller is live, never wait on the upstream API
+            if self.is_snapshot_live():
+                return await self._get_fallback_cached_price(coin_symbol) or await self._get_dynamic_fallback_price(coin_symbol)
+            
+            # Concurrent misses for the same symbol share one upstream request
+            return await self._single_flight_price(coin_symbol.upper())
+        
+        except Exception as e:
+            logger.error(f"Error fetching price for {coin_symbol}: {e}")
+            return None
+    
+    async def _single_flight_price(self, coin_symbol: str) -> Optional[PriceResponse]:
+        """Fetch a price, joining an in-flight request for the same symbol if there is one"""
+        in_flight = self._in_flight.get(coin_symbol)
+        if in_flight:
+            logger.info(f"Joining in-flight price request for {coin_symbol}")
+            return await asyncio.shield(in_flight)
+        
+        futures = self._register_in_flight([coin_symbol])
+        result = None
+        try:
+            result = await self._fetch_price(coin_symbol)
+            return result
+        except Exception as e:
+            # Waiters fail with the same error instead of reading a missing price as None
+            self._resolve_in_flight(futures, {}, error=e)
+            raise
+        finally:
+            self._resolve_in_flight(futures, {coin_symbol: result} if result else {})
+    
+    def _register_in_flight(self, coin_symbols: List[str]) -> Dict[str, asyncio.Future]:
+        """Register shared futures for symbols this caller is about to fetch"""
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for symbol in coin_symbols:
+            futures[symbol] = loop.create_future()
+            self._in_flight[symbol] = futures[symbol]
+        return futures
+    
+    def _resolve_in_flight(self, futures: Dict[str, asyncio.Future], results: Dict[str, PriceResponse],
+                           error: Optional[Exception] = None):
+        """Hand fetched prices (or the fetch's error) to every waiter and clear the in-flight entries"""
+        for symbol, future in futures.items():
+            if not future.done():
+                if error is not None:
+                    future.set_exception(error)
+                    future.exception()  # Retrieved here, so a future nobody joined does not warn
+                else:
+                    future.set_result(results.get(symbol))
+            if self._in_flight.get(symbol) is future:
+                del self._in_flight[symbol]
+    
+    async def _fetch_price(self, coin_symbol: str) -> Optional[PriceResponse]:
+        """Fetch a single price from the upstream APIs with backup and cache fallbacks"""
+        try:
             # If too many consecutive failures, try fallback cache first
             if self.consecutive_failures >= self.max_consecutive_failures:
                 logger.warning(f"Too many consecutive failures ({self.consecutive_failures}), checking fallback cache for {coin_symbol}")
-                fallback_cached = self._get_fallback_cached_price(coin_symbol)
+                fallback_cached = await self._get_fallback_cached_price(coin_symbol)
                 if fallback_cached:
                     return fallback_cached
                 
                 # If no fallback cache, use hardcoded fallback
-                fallback_price = self._get_fallback_price(coin_symbol)
+                fallback_price = await self._get_fallback_price(coin_symbol)
                 if fallback_price:
-                    self._cache_price(coin_symbol, fallback_price)
+                    await self._cache_price(coin_symbol, fallback_price)
                     return fallback_price
             
             coin_id = self.COIN_ID_MAP.get(coin_symbol.upper())
@@ -635,20 +723,11 @@ class CoinGeckoService:
             
             data = await self._make_api_request(url)
             if data and coin_id in data:
-                price_data = data[coin_id]
-                price_usd = Decimal(str(price_data.get('usd', 0)))
-                change_24h = price_data.get('usd_24h_change', 0)
-                
-                price_response = PriceResponse(
-                    coin_symbol=coin_symbol.upper(),
-                    price_usd=price_usd,
-                    price_change_24h=Decimal(str(change_24h)),
-                    price_change_percentage_24h=Decimal(str(change_24h)),
-                    timestamp=datetime.utcnow()
-                )
-                
-                self._cache_price(coin_symbol, price_response)
-                logger.info(f"Successfully fetched price for {coin_symbol}: ${price_usd}")
+                price_response = self._build_price_response(coin_symbol, data[coin_id])
+                
+                await self._cache_price(coin_symbol, price_response)
+                self._notify_price_listeners({coin_symbol: price_response})
+                logger.info(f"Successfully fetched price for {coin_symbol}: ${price_response.price_usd}")
                 return price_response
             else:
                 logger.warning(f"CoinGecko API failed for {coin_symbol}, trying backup APIs...")
@@ -658,18 +737,18 @@ class CoinGeckoService:
                 for backup_api in backup_apis:
                     backup_price = await self._try_backup_api(coin_symbol, backup_api)
                     if backup_price:
-                        self._cache_price(coin_symbol, backup_price)
+                        await self._cache_price(coin_symbol, backup_price)
                         logger.info(f"Successfully got price from backup API {backup_api}: {coin_symbol} = ${backup_price.price_usd}")
                         return backup_price
                 
                 # If all APIs fail, try fallback cache
-                fallback_cached = self._get_fallback_cached_price(coin_symbol)
+                fallback_cached = await self._get_fallback_cached_price(coin_symbol)
                 if fallback_cached:
                     logger.info(f"Using fallback cached price for {coin_symbol}")
                     return fallback_cached
                 
                 # Try dynamic fallback (recent prices from last 24 hours)
-                dynamic_fallback_price = self._get_dynamic_fallback_price(coin_symbol)
+                dynamic_fallback_price = await self._get_dynamic_fallback_price(coin_symbol)
                 if dynamic_fallback_price:
                     logger.warning(f"Using dynamic fallback price for {coin_symbol}: ${dynamic_fallback_price.price_usd}")
                     return dynamic_fallback_price
@@ -689,17 +768,17 @@ class CoinGeckoService:
             
             # First, check primary cache for all symbols
             for symbol in coin_symbols:
-                cached_price = self._get_cached_price(symbol.upper())
+                cached_price = await self._get_cached_price(symbol.upper())
                 if cached_price:
                     results[symbol.upper()] = cached_price
                 else:
                     # Check fallback cache if primary cache is empty
-                    fallback_cached = self._get_fallback_cached_price(symbol.upper())
+                    fallback_cached = await self._get_fallback_cached_price(symbol.upper())
                     if fallback_cached:
                         results[symbol.upper()] = fallback_cached
                     else:
                         # Check dynamic fallback
-                        dynamic_fallback_price = self._get_dynamic_fallback_price(symbol.upper())
+                        dynamic_fallback_price = await self._get_dynamic_fallback_price(symbol.upper())
                         if dynamic_fallback_price:
                             results[symbol.upper()] = dynamic_fallback_price
                         else:
@@ -710,73 +789,34 @@ class CoinGeckoService:
                 logger.info("All prices retrieved from cache")
                 return results
             
-            # For uncached symbols, try to fetch from API
-            # But limit to avoid rate limits
-            batch_size = min(5, len(uncached_symbols))  # Process max 5 at a time
-            symbols_to_fetch = uncached_symbols[:batch_size]
+            # While the poller is live, serve what is in memory only
+            if self.is_snapshot_live():
+                logger.info(f"Poller snapshot has no price for {len(uncached_symbols)} symbols")
+                return results
             
-            # Convert symbols to CoinGecko IDs
-            coin_ids = []
-            symbol_to_id = {}
+            # Symbols another caller is already fetching are awaited, not re-fetched
+            uncached_symbols = list(dict.fromkeys(symbol.upper() for symbol in uncached_symbols))
+            waiting = {symbol: self._in_flight[symbol] for symbol in uncached_symbols if symbol in self._in_flight}
             
-            for symbol in symbols_to_fetch:
-                symbol_upper = symbol.upper()
-                coin_id = self.COIN_ID_MAP.get(symbol_upper)
-                if coin_id:
-                    coin_ids.append(coin_id)
-                    symbol_to_id[coin_id] = symbol_upper
+            # For the rest, try to fetch from API
+            # But limit to avoid rate limits
+            missing = [symbol for symbol in uncached_symbols if symbol not in waiting]
+            batch_size = min(5, len(missing))  # Process max 5 at a time
+            symbols_to_fetch = missing[:batch_size]
             
-            if coin_ids:
+            if symbols_to_fetch:
+                futures = self._register_in_flight(symbols_to_fetch)
+                fetched = {}
                 try:
-                    # Apply rate limiting
-                    await self._rate_limit()
-                    
-                    url = f"{self.COINGECKO_BASE_URL}/simple/price"
-                    params = {
-                        "ids": ",".join(coin_ids),
-                        "vs_currencies": "usd",
-                        "include_24hr_change": "true",
-                        "include_last_updated_at": "true"
-                    }
-                    
-                    response = await self.client.get(url, params=params)
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    # Process successful responses
-                    for coin_id, price_data in data.items():
-                        if "usd" in price_data:
-                            symbol = symbol_to_id[coin_id]
-                            price = PriceResponse(
-                                coin_symbol=symbol,
-                                price_usd=Decimal(str(price_data["usd"])),
-                                price_change_24h=Decimal(str(price_data.get("usd_24h_change", 0))),
-                                price_change_percentage_24h=Decimal(str(price_data.get("usd_24h_change", 0))),
-                                timestamp=datetime.utcnow()
-                            )
-                            results[symbol] = price
-                            self._cache_price(symbol, price)
-                
-                except httpx.HTTPStatusError as e:
-                    if e.response.status_code == 429:
-                        logger.warning("Rate limited by API - no fallback prices available")
-                    else:
-                        logger.error(f"HTTP error fetching multiple prices: {e}")
-                    
-                    # No fallback prices - log failed symbols
-                    for symbol in symbols_to_fetch:
-                        if symbol.upper() not in results:
-                            logger.warning(f"Failed to fetch price for {symbol} - no fallback available")
-                
-                except Exception as e:
-                    logger.error(f"Error fetching multiple prices: {e}")
-                    # No fallback prices - log failed symbols
-                    for symbol in symbols_to_fetch:
-                        if symbol.upper() not in results:
-                            logger.warning(f"Failed to fetch price for {symbol} - no fallback available")
-            else:
-                # No valid coin IDs found - log error
-                logger.error("No valid coin IDs found for symbols")
+                    fetched = await self._fetch_multiple_prices(symbols_to_fetch)
+                    results.update(fetched)
+                finally:
+                    self._resolve_in_flight(futures, fetched)
+            
+            for symbol, future in waiting.items():
+                price = await asyncio.shield(future)
+                if price:
+                    results[symbol] = price
             
             logger.info(f"Successfully fetched prices for {len(results)} symbols")
             return results
@@ -787,6 +827,263 @@ class CoinGeckoService:
             logger.warning("Returning empty results due to API failure - no fallback prices")
             return {}
     
+    async def get_market_snapshot(self, coin_symbols: List[str],
+                                  budget_seconds: Optional[float] = None) -> Dict[str, PriceResponse]:
+        """Current prices for several coins at once, within a latency budget
+        
+        Fresh cached prices are used as they are. The rest are fetched together: one
+        batched /simple/price request for the coins CoinGecko knows, the single-price
+        path (with its backup APIs) for the others, concurrently, joining any request
+        already in flight. What has not arrived when the budget runs out keeps loading
+        in the background for the next caller and is answered from the older cache
+        tiers meanwhile, or left out of the result.
+        """
+        budget = self.snapshot_budget if budget_seconds is None else budget_seconds
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in coin_symbols))
+        results = {}
+        missing = []
+        for symbol in symbols:
+            cached_price = await self._get_cached_price(symbol)
+            if cached_price:
+                results[symbol] = cached_price
+            else:
+                missing.append(symbol)
+        
+        # While the poller is live, what it has not fetched is not worth waiting for
+        if missing and not self.is_snapshot_live():
+            pending = {symbol: self._in_flight[symbol] for symbol in missing if symbol in self._in_flight}
+            batch = [symbol for symbol in missing if symbol not in pending and symbol in self.COIN_ID_MAP]
+            if batch:
+                futures = self._register_in_flight(batch)
+                self._run_in_background(self._fetch_snapshot_batch(batch, futures))
+                pending.update(futures)
+            for symbol in missing:
+                if symbol not in pending:
+                    pending[symbol] = self._run_in_background(self._single_flight_price(symbol))
+            
+            done, not_done = await asyncio.wait(pending.values(), timeout=budget)
+            for symbol, future in pending.items():
+                if future in done and not future.cancelled() and future.exception() is None and future.result():
+                    results[symbol] = future.result()
+            if not_done:
+                self.snapshot_timeouts += 1
+                logger.warning(f"Market snapshot budget of {budget}s spent with {len(not_done)} prices still loading")
+        
+        for symbol in symbols:
+            if symbol not in results:
+                stale_price = await self._get_fallback_cached_price(symbol) or await self._get_dynamic_fallback_price(symbol)
+                if stale_price:
+                    results[symbol] = stale_price
+        return {symbol: results[symbol] for symbol in symbols if symbol in results}
+    
+    async def _fetch_snapshot_batch(self, symbols: List[str], futures: Dict[str, asyncio.Future]):
+        fetched = {}
+        try:
+            fetched = await self._fetch_multiple_prices(symbols)
+        finally:
+            self._resolve_in_flight(futures, fetched)
+    
+    def _run_in_background(self, coroutine) -> asyncio.Task:
+        """Start a fetch that may outlive the request waiting on it"""
+        task = asyncio.create_task(coroutine)
+        self._background_fetches.add(task)
+        task.add_done_callback(self._background_fetches.discard)
+        return task
+    
+    async def _fetch_multiple_prices(self, symbols_to_fetch: List[str]) -> Dict[str, PriceResponse]:
+        """Fetch several prices in one batched CoinGecko request"""
+        results = {}
+        
+        # Convert symbols to CoinGecko IDs
+        coin_ids = []
+        symbol_to_id = {}
+
+        for symbol in symbols_to_fetch:
+            symbol_upper = symbol.upper()
+            coin_id = self.COIN_ID_MAP.get(symbol_upper)
+            if coin_id:
+                coin_ids.append(coin_id)
+                symbol_to_id[coin_id] = symbol_upper
+
+        if coin_ids:
+            try:
+                # Apply rate limiting
+                await self._rate_limit()
+
+                url = f"{self.COINGECKO_BASE_URL}/simple/price"
+                params = {
+                    "ids": ",".join(coin_ids),
+                    "vs_currencies": "usd",
+                    "include_24hr_change": "true",
+                    "include_last_updated_at": "true"
+                }
+
+                response = await self.client.get(url, params=params)
+                response.raise_for_status()
+                data = response.json()
+
+                # Process successful responses
+                for coin_id, price_data in data.items():
+                    if "usd" in price_data:
+                        symbol = symbol_to_id[coin_id]
+                        price = self._build_price_response(symbol, price_data)
+                        results[symbol] = price
+                await self._cache_prices(results)
+                self._notify_price_listeners(results)
+
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 429:
+                    logger.warning("Rate limited by API - no fallback prices available")
+                else:
+                    logger.error(f"HTTP error fetching multiple prices: {e}")
+
+                # No fallback prices - log failed symbols
+                for symbol in symbols_to_fetch:
+                    if symbol.upper() not in results:
+                        logger.warning(f"Failed to fetch price for {symbol} - no fallback available")
+
+            except Exception as e:
+                logger.error(f"Error fetching multiple prices: {e}")
+                # No fallback prices - log failed symbols
+                for symbol in symbols_to_fetch:
+                    if symbol.upper() not in results:
+                        logger.warning(f"Failed to fetch price for {symbol} - no fallback available")
+        else:
+            # No valid coin IDs found - log error
+            logger.error("No valid coin IDs found for symbols")
+        
+        return results
+    
+    def _build_price_response(self, coin_symbol: str, price_data: dict) -> PriceResponse:
+        """Build a PriceResponse from a CoinGecko /simple/price entry"""
+        change_24h = Decimal(str(price_data.get("usd_24h_change") or 0))
+        return PriceResponse(
+            coin_symbol=coin_symbol.upper(),
+            price_usd=Decimal(str(price_data.get("usd", 0))),
+            price_change_24h=change_24h,
+            price_change_percentage_24h=change_24h,
+            timestamp=datetime.utcnow()
+        )
+    
+    def _coin_ids_to_symbols(self) -> Dict[str, List[str]]:
+        """Group supported symbols by CoinGecko ID"""
+        id_to_symbols = {}
+        for symbol, coin_id in self.COIN_ID_MAP.items():
+            id_to_symbols.setdefault(coin_id, []).append(symbol)
+        return id_to_symbols
+    
+    async def refresh_all_prices(self) -> Dict[str, PriceResponse]:
+        """Refresh every supported coin using as few batched /simple/price requests as possible"""
+        id_to_symbols = self._coin_ids_to_symbols()
+        coin_ids = list(id_to_symbols.keys())
+        refreshed = {}
+        
+        for start in range(0, len(coin_ids), self.poll_batch_size):
+            batch = coin_ids[start:start + self.poll_batch_size]
+            url = f"{self.COINGECKO_BASE_URL}/simple/price?ids={','.join(batch)}&vs_currencies=usd&include_24hr_change=true"
+            
+            # The next tick retries, so a single attempt per batch is enough
+            data = await self._make_api_request(url, retries=1)
+            if not data:
+                logger.warning(f"Price poller got no data for batch of {len(batch)} coins")
+                continue
+            
+            batch_prices = {}
+            for coin_id, price_data in data.items():
+                if "usd" not in price_data:
+                    continue
+                for symbol in id_to_symbols.get(coin_id, []):
+                    batch_prices[symbol] = self._build_price_response(symbol, price_data)
+            # One pipelined write per tier for the whole batch
+            await self._cache_prices(batch_prices)
+            refreshed.update(batch_prices)
+        
+        if refreshed:
+            self.last_poll_time = datetime.utcnow()
+            self._notify_price_listeners(refreshed)
+        logger.info(f"Price poller refreshed {len(refreshed)}/{len(self.COIN_ID_MAP)} symbols")
+        return refreshed
+    
+    async def poll_once(self) -> Dict[str, PriceResponse]:
+        """Refresh all prices if this worker holds the poll lease, otherwise pick up the leader's writes"""
+        self.poll_leader = await self._cache_call(
+            self.cache_backend.acquire_lease, "price-poller", self.instance_id, self.poll_lease_ttl
+        )
+        if not self.poll_leader:
+            return await self._read_shared_prices()
+        return await self.refresh_all_prices()
+    
+    async def _read_shared_prices(self) -> Dict[str, PriceResponse]:
+        """Follower tick: read the shared cache and hand the prices the leader refreshed to the listeners.
+        
+        last_poll_time follows the newest cached timestamp, so if the leader stops
+        refreshing, this worker's snapshot goes stale and it falls back to upstream.
+        """
+        cached = await self._cache_call(self.cache_backend.get_many, PRIMARY, list(self.COIN_ID_MAP.keys()))
+        refreshed = {
+            symbol: price for symbol, price in cached.items()
+            if symbol not in self._shared_price_times or price.timestamp > self._shared_price_times[symbol]
+        }
+        if refreshed:
+            self._shared_price_times.update({symbol: price.timestamp for symbol, price in refreshed.items()})
+            newest = max(price.timestamp for price in refreshed.values())
+            if not self.last_poll_time or newest > self.last_poll_time:
+                self.last_poll_time = newest
+            self._notify_price_listeners(refreshed)
+        return refreshed
+    
+    async def _poll_prices(self):
+        """Refresh all prices on a fixed cadence until cancelled"""
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Price poller refresh failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+    
+    def start_poller(self):
+        """Start the background price poller on the running event loop"""
+        if self.poller_task and not self.poller_task.done():
+            return self.poller_task
+        self.poller_task = asyncio.create_task(self._poll_prices())
+        logger.info(f"Started price poller (every {self.poll_interval:.0f} seconds)")
+        return self.poller_task
+    
+    async def stop_poller(self):
+        """Stop the background price poller"""
+        if not self.poller_task:
+            return
+        self.poller_task.cancel()
+        try:
+            await self.poller_task
+        except asyncio.CancelledError:
+            pass
+        self.poller_task = None
+        logger.info("Stopped price poller")
+    
+    def add_price_listener(self, listener: Callable[[Dict[str, PriceResponse]], None]):
+        """Register a callback for freshly fetched prices"""
+        if listener not in self.price_listeners:
+            self.price_listeners.append(listener)
+    
+    def _notify_price_listeners(self, prices: Dict[str, PriceResponse]):
+        """Hand freshly fetched prices to every listener"""
+        if not prices:
+            return
+        for listener in self.price_listeners:
+            try:
+                listener(prices)
+            except Exception as e:
+                logger.error(f"Price listener failed: {e}")
+    
+    def is_snapshot_live(self) -> bool:
+        """Whether the poller is running and prices were refreshed recently, here or by the leader"""
+        if not self.poller_task or self.poller_task.done() or not self.last_poll_time:
+            return False
+        return datetime.utcnow() - self.last_poll_time < self.fallback_cache_duration
+    
     async def get_supported_coins(self) -> List[str]:
         """Get list of supported cryptocurrency symbols"""
         return list(self.COIN_ID_MAP.keys())
@@ -797,6 +1094,9 @@ class CoinGeckoService:
     
     async def get_api_status(self) -> dict:
         """Get status of all API providers"""
+        primary_size = await self._cache_call(self.cache_backend.size, PRIMARY)
+        fallback_size = await self._cache_call(self.cache_backend.size, FALLBACK)
+        dynamic_size = await self._cache_call(self.cache_backend.size, DYNAMIC)
         status = {
             "primary_api": "CoinGecko",
             "backup_apis": list(self.BACKUP_APIS.keys()),
@@ -806,10 +1106,18 @@ class CoinGeckoService:
             "dynamic_fallback_duration_seconds": self.dynamic_fallback_duration.total_seconds(),
             "rate_limit_requests_per_minute": 8,
             "consecutive_failures": self.consecutive_failures,
-            "primary_cache_size": len(self.cache),
-            "fallback_cache_size": len(self.fallback_cache),
-            "dynamic_fallback_size": len(self.dynamic_fallback),
-            "total_cached_coins": len(self.cache) + len(self.fallback_cache) + len(self.dynamic_fallback)
+            "in_flight_requests": len(self._in_flight),
+            "snapshot_budget_seconds": self.snapshot_budget,
+            "snapshot_timeouts": self.snapshot_timeouts,
+            "poller_running": bool(self.poller_task and not self.poller_task.done()),
+            "poll_interval_seconds": self.poll_interval,
+            "last_poll_time": self.last_poll_time.isoformat() if self.last_poll_time else None,
+            "poll_leader": self.poll_leader,
+            "cache_backend": self.cache_backend.name,
+            "primary_cache_size": primary_size,
+            "fallback_cache_size": fallback_size,
+            "dynamic_fallback_size": dynamic_size,
+            "total_cached_coins": primary_size + fallback_size + dynamic_size
         }
         
         # Test primary API
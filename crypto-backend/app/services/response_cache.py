@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Iterable, Optional, Tuple
+import os
+import time
+
+from app.schemas.trade import PriceResponse
+
+CHAT_REPLY_CACHE_TTL_SECONDS = float(os.getenv("CHAT_REPLY_CACHE_TTL_SECONDS", "60"))
+CHAT_REPLY_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_REPLY_CACHE_MAX_ENTRIES", "1024"))
+CHAT_COMPLETION_CACHE_ENABLED = os.getenv("CHAT_COMPLETION_CACHE_ENABLED", "false").lower() == "true"
+CHAT_COMPLETION_CACHE_TTL_SECONDS = float(os.getenv("CHAT_COMPLETION_CACHE_TTL_SECONDS", "3600"))
+CHAT_COMPLETION_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_COMPLETION_CACHE_MAX_ENTRIES", "4096"))
+
+class ResponseCache:
+    """LRU of chatbot replies with a per-entry TTL.
+
+    Keys are built by the caller from what the reply actually depends on: the
+    intent (or normalized message) plus a fingerprint of the context used. An
+    entry can also be tagged with the coins whose prices it quotes; a price
+    refresh for any of them drops it (price listener). Callers check `enabled`
+    before using a cache that is opt-in.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, FrozenSet[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, reply: str, tags: Iterable[str] = ()):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, reply, frozenset(tags))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[str]],
+                             tags: Iterable[str] = ()) -> str:
+        reply = self.get(key)
+        if reply is None:
+            reply = await compute()
+            self.put(key, reply, tags)
+        return reply
+
+    def invalidate(self, tags: Optional[Iterable[str]] = None):
+        """Drop the entries carrying any of `tags`, or every entry"""
+        if tags is None:
+            self._entries.clear()
+            return
+        tags = frozenset(tags)
+        for key in [key for key, entry in self._entries.items() if entry[2] & tags]:
+            del self._entries[key]
+
+    def on_prices(self, prices: Dict[str, PriceResponse]):
+        self.invalidate(prices)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+# Replies built by the chatbot's own formatters from market data and user state
+reply_cache = ResponseCache(CHAT_REPLY_CACHE_TTL_SECONDS, CHAT_REPLY_CACHE_MAX_ENTRIES)
+# Language model answers to questions that do not depend on who asks; off unless enabled
+completion_cache = ResponseCache(CHAT_COMPLETION_CACHE_TTL_SECONDS, CHAT_COMPLETION_CACHE_MAX_ENTRIES,
+                                 enabled=CHAT_COMPLETION_CACHE_ENABLED)
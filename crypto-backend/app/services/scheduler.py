@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from app.db import SessionLocal, dialect_insert
+from app.models.job_lease import JobLease
+
+logger = logging.getLogger(__name__)
+
+# Identifies this worker process as a job lease holder
+WORKER_ID = uuid.uuid4().hex
+
+def acquire_job_lease(session_factory, name: str, holder: str, ttl_seconds: float) -> bool:
+    """Take or renew the named lease for holder; False while another holder's lease is unexpired.
+    
+    One guarded upsert, so two workers can never both take the lease.
+    """
+    now = datetime.utcnow()
+    db = session_factory()
+    try:
+        insert = dialect_insert(db, JobLease).values(
+            name=name, holder=holder, expires_at=now + timedelta(seconds=ttl_seconds)
+        )
+        result = db.execute(insert.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'holder': insert.excluded.holder, 'expires_at': insert.excluded.expires_at},
+            where=(JobLease.holder == insert.excluded.holder) | (JobLease.expires_at < now)
+        ))
+        db.commit()
+        return result.rowcount == 1
+    finally:
+        db.close()
+
+class PeriodicJob:
+    """Runs an async function on a fixed cadence in the background.
+    
+    With ``exclusive=True`` every worker runs the loop but only the one holding the
+    job's lease in the job_leases table calls ``func``; the lease lasts two intervals,
+    so another worker takes over if the holder dies.
+    """
+    
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable[None]], initial_delay: float = 0,
+                 exclusive: bool = False, session_factory=SessionLocal, holder: str = WORKER_ID):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.initial_delay = initial_delay
+        self.exclusive = exclusive
+        self.session_factory = session_factory
+        self.holder = holder
+        self.task: Optional[asyncio.Task] = None
+        self.last_run = None
+        self.last_error = None
+        self.runs = 0
+        self.skipped = 0  # Ticks left to the worker holding the lease
+    
+    async def _holds_lease(self) -> bool:
+        if not self.exclusive:
+            return True
+        return await asyncio.to_thread(
+            acquire_job_lease, self.session_factory, self.name, self.holder, self.interval * 2
+        )
+    
+    async def _loop(self):
+        if self.initial_delay:
+            await asyncio.sleep(self.initial_delay)
+        while True:
+            try:
+                if await self._holds_lease():
+                    await self.func()
+                    self.runs += 1
+                else:
+                    self.skipped += 1
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Background job {self.name} failed: {e}")
+            self.last_run = datetime.utcnow()
+            await asyncio.sleep(self.interval)
+    
+    def start(self):
+        """Start the job on the running event loop"""
+        if self.task and not self.task.done():
+            return self.task
+        self.task = asyncio.create_task(self._loop())
+        logger.info(f"Started background job {self.name} (every {self.interval:.0f} seconds)")
+        return self.task
+    
+    async def stop(self):
+        """Cancel the job and wait for it to finish"""
+        if not self.task:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        logger.info(f"Stopped background job {self.name}")
+    
+    @property
+    def running(self) -> bool:
+        return bool(self.task and not self.task.done())
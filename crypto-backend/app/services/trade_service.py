@@ -0,0 +1,126 @@
+from sqlalchemy.orm import Session
+from decimal import Decimal
+from typing import Callable, List, Tuple
+import logging
+
+from app.models.post_trade_job import PostTradeJob
+from app.models.trade import Trade, TradeType
+from app.models.user import User
+from app.services.achievement_service import AchievementService
+from app.services.position_service import PositionService, ZERO
+from app.services.wallet_service import WalletService
+
+logger = logging.getLogger(__name__)
+
+TRADE_XP = 25
+
+class TradeExecuted:
+    """Post-commit notification for one executed trade"""
+
+    def __init__(self, trade: Trade):
+        self.trade_id = trade.id
+        self.user_id = trade.user_id
+        self.coin_symbol = trade.coin_symbol
+        self.trade_type = trade.trade_type
+        self.quantity = trade.quantity
+        self.price = trade.price_at_trade
+        self.total_cost = trade.total_cost
+        self.timestamp = trade.timestamp
+
+trade_listeners: List[Callable[[TradeExecuted], None]] = []
+
+def add_trade_listener(listener: Callable[[TradeExecuted], None]):
+    """Register a callback for trades once they are committed"""
+    if listener not in trade_listeners:
+        trade_listeners.append(listener)
+
+def _notify_trade_listeners(event: TradeExecuted):
+    for listener in trade_listeners:
+        try:
+            listener(event)
+        except Exception as e:
+            logger.error(f"Trade listener failed: {e}")
+
+class TradeService:
+    """Executes buys and sells: wallet, position, trade row, achievement counters and XP in one transaction"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def execute(self, user_id: int, coin_symbol: str, trade_type: TradeType,
+                quantity: Decimal, price: Decimal) -> Tuple[Trade, User, dict]:
+        """Lock the user's rows, validate, apply the trade and commit once.
+
+        Locks are taken user -> wallet -> position with SELECT ... FOR UPDATE, so concurrent
+        trades by one user run one after the other instead of both passing the balance or
+        holdings check. SQLite ignores FOR UPDATE, so there the transaction is opened with
+        BEGIN IMMEDIATE before anything is read (see _begin_write).
+        Raises LookupError for an unknown user and ValueError for short funds or holdings.
+        The post-trade job is written in the same transaction; listeners are notified after the commit.
+        """
+        coin_symbol = coin_symbol.upper()
+        wallet_service = WalletService(self.db)
+        position_service = PositionService(self.db)
+        total_cost = quantity * price
+
+        try:
+            self._begin_write()
+            user = self.db.query(User).filter(User.id == user_id).populate_existing().with_for_update().first()
+            if not user:
+                raise LookupError("User not found")
+            wallet = wallet_service.get_wallet_for_update(user_id) or wallet_service.create_wallet(user_id, commit=False)
+            position = position_service.get_position_for_update(user_id, coin_symbol)
+
+            if trade_type == TradeType.BUY:
+                if wallet.balance < total_cost:
+                    raise ValueError(f"Insufficient balance. Required: {total_cost}, Available: {wallet.balance}")
+                wallet_result = wallet_service.apply_balance_change(wallet, total_cost, 'subtract')
+            else:
+                current_holdings = position.quantity if position else ZERO
+                if current_holdings < quantity:
+                    raise ValueError(f"Insufficient {coin_symbol} balance. Required: {quantity}, Available: {current_holdings}")
+                wallet_result = wallet_service.apply_balance_change(wallet, total_cost, 'add')
+
+            trade = Trade(
+                user_id=user_id,
+                coin_symbol=coin_symbol,
+                trade_type=trade_type,
+                quantity=quantity,
+                price_at_trade=price,
+                total_cost=total_cost
+            )
+            self.db.add(trade)
+            position = position_service.apply_trade(trade, position)
+            AchievementService(self.db).record_trade(trade, position)
+            self._grant_xp(user, TRADE_XP)
+            # Leaderboard and achievement checks run later from this job (see post_trade_queue)
+            self.db.flush()
+            self.db.add(PostTradeJob(trade_id=trade.id, user_id=user_id))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        self.db.refresh(trade)
+        _notify_trade_listeners(TradeExecuted(trade))
+        return trade, user, wallet_result
+
+    def _begin_write(self):
+        """On SQLite, take the database write lock before the balance and holdings are read.
+
+        SQLite starts its implicit transaction only at the first write, so two trades could
+        both read the same holdings and both pass the check. If a write already ran in this
+        transaction the lock is held already.
+        """
+        connection = self.db.connection()
+        if connection.dialect.name == "sqlite" and not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    @staticmethod
+    def _grant_xp(user: User, amount: int):
+        def xp_needed(level):
+            return 100 + (level - 1) * 50
+        user.xp += amount
+        while user.xp >= xp_needed(user.level):
+            user.xp -= xp_needed(user.level)
+            user.level += 1
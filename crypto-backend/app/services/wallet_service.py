@@ -14,11 +14,15 @@ class WalletService:
         """Get user's wallet"""
         return self.db.query(Wallet).filter(Wallet.user_id == user_id).first()
     
-    def create_wallet(self, user_id: int, initial_balance: Decimal = None) -> Wallet:
-        """Create a new wallet for user with initial balance"""
+    def get_wallet_for_update(self, user_id: int) -> Optional[Wallet]:
+        """Get user's wallet with a row lock (SELECT ... FOR UPDATE) held until the caller commits"""
+        return self.db.query(Wallet).filter(Wallet.user_id == user_id).populate_existing().with_for_update().first()
+    
+    def create_wallet(self, user_id: int, initial_balance: Decimal = None, commit: bool = True) -> Wallet:
+        """Create a new wallet for user with initial balance (commit=False only flushes)"""
         # If no initial balance provided, use the user's demo_balance
         if initial_balance is None:
-            user = self.db.query(User).filter(User.id == user_id).first()
+            user = self.db.get(User, user_id)
             initial_balance = user.demo_balance if user else Decimal('100000.0')
         
         wallet = Wallet(
@@ -26,8 +30,11 @@ class WalletService:
             balance=initial_balance
         )
         self.db.add(wallet)
-        self.db.commit()
-        self.db.refresh(wallet)
+        if commit:
+            self.db.commit()
+            self.db.refresh(wallet)
+        else:
+            self.db.flush()
         return wallet
     
     def get_or_create_wallet(self, user_id: int) -> Wallet:
@@ -40,6 +47,13 @@ class WalletService:
     def update_balance(self, user_id: int, amount: Decimal, operation: str = 'add') -> dict:
         """Update wallet balance"""
         wallet = self.get_or_create_wallet(user_id)
+        result = self.apply_balance_change(wallet, amount, operation)
+        self.db.commit()
+        self.db.refresh(wallet)
+        return result
+    
+    def apply_balance_change(self, wallet: Wallet, amount: Decimal, operation: str = 'add') -> dict:
+        """Add to or subtract from a wallet without committing"""
         previous_balance = wallet.balance
         
         if operation == 'add':
@@ -52,8 +66,6 @@ class WalletService:
             raise ValueError("Invalid operation. Use 'add' or 'subtract'")
         
         wallet.updated_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(wallet)
         
         return {
             'success': True,
@@ -81,7 +93,7 @@ class WalletService:
     def get_wallet_summary(self, user_id: int) -> dict:
         """Get comprehensive wallet summary"""
         wallet = self.get_or_create_wallet(user_id)
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.db.get(User, user_id)
         
         # Only sync balances if this is the first time or if there's a significant mismatch
         # Don't override wallet balance changes from trades/top-ups
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark achievement evaluation per trade: the per-checker rescans against
+the counter-driven evaluator
+
+Runs against an in-memory SQLite database and counts the SQL statements
+issued for achievements after each trade. Profit achievements are left out
+of the catalog because both paths price them the same way.
+
+Usage:
+    python benchmark_achievement_queries.py                # 200 trades per user
+    python benchmark_achievement_queries.py --trades 1000  # longer trade history
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import os
+import time
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event, and_
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+from app.models import User, Trade, Achievement, UserAchievement
+from app.models.achievement import UserLoginStreak
+from app.models.trade import TradeType
+from app.services.achievement_service import AchievementService
+from app.services.catalog import catalog
+from app.services.position_service import PositionService
+
+COINS = ["BTC", "ETH", "SOL", "ADA", "DOT", "LINK", "AVAX", "XRP"]
+ACHIEVEMENTS = [
+    ("First Trade", "trading_milestone", 1, "trades"),
+    ("Trading Novice", "trading_milestone", 10, "trades"),
+    ("Active Trader", "trading_milestone", 50, "trades"),
+    ("Expert Trader", "trading_milestone", 100, "trades"),
+    ("Diversified Portfolio", "diversification", 5, "coins_held"),
+    ("High Volume", "volume_reward", 100000, "volume"),
+    ("Whale Trader", "volume_reward", 1000000, "volume"),
+]
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+def make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    for name, achievement_type, requirement, requirement_type in ACHIEVEMENTS:
+        db.add(Achievement(name=name, description=name, type=achievement_type, icon="*",
+                           requirement_value=requirement, requirement_type=requirement_type, reward_coins=100))
+    user = User(username="bench", email="bench@example.com", hashed_password="x", demo_balance=Decimal('100000'))
+    db.add(user)
+    db.commit()
+    catalog.invalidate()
+    return engine, db, user
+
+def make_trades(user_id: int, count: int, seed: int = 7):
+    rng = random.Random(seed)
+    held = {}
+    trades = []
+    for _ in range(count):
+        coin = rng.choice(COINS)
+        price = Decimal(rng.randint(1, 50000))
+        if held.get(coin, 0) > 0 and rng.random() < 0.4:
+            quantity, trade_type = held[coin], TradeType.SELL
+        else:
+            quantity, trade_type = Decimal(rng.randint(1, 100)) / 100, TradeType.BUY
+        held[coin] = held.get(coin, 0) + (quantity if trade_type == TradeType.BUY else -quantity)
+        trades.append(Trade(user_id=user_id, coin_symbol=coin, trade_type=trade_type, quantity=quantity,
+                            price_at_trade=price, total_cost=quantity * price))
+    return trades
+
+async def legacy_check(db, user):
+    """The per-checker path before counters: rescans trades, N+1 progress lookups, one commit per award"""
+    # initialize_user_achievements: catalog query plus one existence check per achievement
+    db.rollback()
+    for achievement in db.query(Achievement).filter(Achievement.is_active == True).all():
+        existing = db.query(UserAchievement).filter(and_(
+            UserAchievement.user_id == user.id,
+            UserAchievement.achievement_id == achievement.id
+        )).first()
+        if not existing:
+            db.add(UserAchievement(user_id=user.id, achievement_id=achievement.id, current_progress=0, is_completed=False))
+    if not db.query(UserLoginStreak).filter(UserLoginStreak.user_id == user.id).first():
+        db.add(UserLoginStreak(user_id=user.id, current_streak=1, longest_streak=1))
+    db.commit()
+
+    def user_trades():
+        return db.query(Trade).filter(Trade.user_id == user.id).all()
+
+    def coins_held():
+        holdings = {}
+        for trade in user_trades():
+            sign = 1 if trade.trade_type == TradeType.BUY else -1
+            holdings[trade.coin_symbol] = holdings.get(trade.coin_symbol, 0) + sign * trade.quantity
+        return sum(1 for quantity in holdings.values() if quantity > 0)
+
+    progress_by_type = {
+        "trading_milestone": lambda: db.query(Trade).filter(Trade.user_id == user.id).count(),
+        "diversification": coins_held,
+        "volume_reward": lambda: sum(trade.total_cost for trade in user_trades()),
+    }
+    for achievement_type, progress in progress_by_type.items():
+        value = progress()
+        for achievement in db.query(Achievement).filter(Achievement.type == achievement_type).all():
+            user_achievement = db.query(UserAchievement).filter(and_(
+                UserAchievement.user_id == user.id,
+                UserAchievement.achievement_id == achievement.id
+            )).first()
+            if user_achievement and not user_achievement.is_completed:
+                user_achievement.current_progress = value
+                if value >= achievement.requirement_value:
+                    user_achievement.is_completed = True
+                    user.demo_balance += achievement.reward_coins
+                    db.commit()
+
+async def run(path: str, trade_count: int):
+    engine, db, user = make_session()
+    counter = QueryCounter(engine)
+    service = AchievementService(db)
+    achievement_queries = 0
+    start = time.perf_counter()
+    for trade in make_trades(user.id, trade_count):
+        db.add(trade)
+        position = PositionService(db).apply_trade(trade)
+        if path == "counters":
+            before = counter.count
+            service.record_trade(trade, position)
+            achievement_queries += counter.count - before
+        db.commit()
+
+        before = counter.count
+        if path == "counters":
+            await service.evaluate_trade_achievements(user)
+        else:
+            await legacy_check(db, user)
+        achievement_queries += counter.count - before
+    elapsed = time.perf_counter() - start
+
+    completed = db.query(UserAchievement).filter(UserAchievement.is_completed == True).count()
+    db.close()
+    engine.dispose()
+    return achievement_queries / trade_count, elapsed / trade_count, completed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark achievement queries per trade")
+    parser.add_argument("--trades", type=int, nargs="+", default=[200])
+    args = parser.parse_args()
+
+    print(f"{'trades':>7} {'path':>9} {'queries/trade':>14} {'ms/trade':>9} {'awarded':>8}")
+    for trade_count in args.trades:
+        for path in ("legacy", "counters"):
+            queries, seconds, completed = asyncio.run(run(path, trade_count))
+            print(f"{trade_count:>7} {path:>9} {queries:>14.1f} {seconds * 1000:>9.2f} {completed:>8}")
+
+if __name__ == "__main__":
+    main()
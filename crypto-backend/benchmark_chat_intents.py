@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark chatbot intent routing: the compiled single-match classifier against
+the keyword cascade and per-message regex lists it replaced
+
+Both routers run over the golden corpus from test_chat_intents.py (and any
+extra messages given) and must agree on every message before timings are shown.
+
+Usage:
+    python benchmark_chat_intents.py                    # 20k messages
+    python benchmark_chat_intents.py --messages 100000
+"""
+
+import argparse
+import re
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.chat_intents import classify, Intent, KEYWORD_INTENTS, BUY_KEYWORDS, JOURNAL_STRONG, JOURNAL_CATEGORIES
+from test_chat_intents import GOLDEN_MESSAGES
+
+def legacy_extract(message, patterns):
+    """extract_trade_parameters / extract_position_sizing_parameters as they were"""
+    extracted = {}
+    message_lower = message.lower()
+    for param, pattern_list in patterns.items():
+        for pattern in pattern_list:
+            match = re.search(pattern, message_lower)
+            if match:
+                try:
+                    extracted[param] = float(match.group(1).replace(',', ''))
+                    break
+                except ValueError:
+                    continue
+    return extracted
+
+TRADE_PATTERNS = {
+    'entry_price': [r'entry[:\s]*\$?([0-9,]+\.?[0-9]*)', r'buy[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)',
+                    r'enter[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)', r'entry[:\s]*price[:\s]*\$?([0-9,]+\.?[0-9]*)'],
+    'exit_price': [r'exit[:\s]*\$?([0-9,]+\.?[0-9]*)', r'sell[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)',
+                   r'target[:\s]*\$?([0-9,]+\.?[0-9]*)', r'exit[:\s]*price[:\s]*\$?([0-9,]+\.?[0-9]*)'],
+    'position_size': [r'position[:\s]*size[:\s]*([0-9,]+\.?[0-9]*)', r'amount[:\s]*([0-9,]+\.?[0-9]*)',
+                      r'quantity[:\s]*([0-9,]+\.?[0-9]*)', r'([0-9,]+\.?[0-9]*)\s*(?:btc|bitcoin|eth|ethereum|coins?|tokens?)'],
+    'leverage': [r'leverage[:\s]*([0-9]+\.?[0-9]*)x?', r'([0-9]+\.?[0-9]*)x\s*leverage', r'([0-9]+\.?[0-9]*)x'],
+}
+SIZING_PATTERNS = {
+    'account_balance': [r'balance[:\s]*\$?([0-9,]+\.?[0-9]*)', r'account[:\s]*\$?([0-9,]+\.?[0-9]*)',
+                        r'portfolio[:\s]*\$?([0-9,]+\.?[0-9]*)', r'capital[:\s]*\$?([0-9,]+\.?[0-9]*)'],
+    'risk_percentage': [r'risk[:\s]*([0-9]+\.?[0-9]*)\s*%?', r'([0-9]+\.?[0-9]*)\s*%\s*risk',
+                        r'risk[:\s]*percentage[:\s]*([0-9]+\.?[0-9]*)', r'([0-9]+\.?[0-9]*)\s*percent[:\s]*risk'],
+    'entry_price': TRADE_PATTERNS['entry_price'],
+    'stop_loss_price': [r'stop[:\s]*loss[:\s]*\$?([0-9,]+\.?[0-9]*)', r'stop[:\s]*at[:\s]*\$?([0-9,]+\.?[0-9]*)',
+                        r'sl[:\s]*\$?([0-9,]+\.?[0-9]*)', r'stop[:\s]*loss[:\s]*price[:\s]*\$?([0-9,]+\.?[0-9]*)'],
+}
+
+def legacy_classify(message: str) -> Intent:
+    """The chatbot_endpoint routing cascade before chat_intents"""
+    lower = message.lower()
+    if any(keyword in lower for keyword in BUY_KEYWORDS):
+        amount_match = re.search(r'\$?(\d+(?:\.\d+)?)', message)
+        symbol, name = "BTC", "Bitcoin"
+        if any(coin in lower for coin in ['ethereum', 'eth']):
+            symbol, name = "ETH", "Ethereum"
+        elif any(coin in lower for coin in ['solana', 'sol']):
+            symbol, name = "SOL", "Solana"
+        return Intent("buy", {"amount_usd": float(amount_match.group(1)) if amount_match else 100.0,
+                              "symbol": symbol, "name": name})
+    if any(indicator in lower for indicator in JOURNAL_STRONG):
+        return Intent("journal")
+    categories = sum(any(word in lower for word in words) for words in JOURNAL_CATEGORIES.values())
+    if categories >= 2 and len(message) > 80:
+        return Intent("journal")
+    sizing = legacy_extract(message, SIZING_PATTERNS)
+    if all(param in sizing for param in SIZING_PATTERNS):
+        return Intent("position_sizing", sizing)
+    for name, keywords in KEYWORD_INTENTS:
+        if any(keyword in lower for keyword in keywords):
+            params = {}
+            if name == "onboarding":
+                params = {"first_trade": 'first trade' in lower or 'make trade' in lower,
+                          "risk_management": 'risk management' in lower}
+            return Intent(name, params)
+    trade = legacy_extract(message, TRADE_PATTERNS)
+    if 'entry_price' in trade and 'exit_price' in trade:
+        trade.setdefault('position_size', 1.0)
+        trade.setdefault('leverage', 1.0)
+        return Intent("trade_simulation", trade)
+    return Intent("general")
+
+def timed(router, messages):
+    start = time.perf_counter()
+    for message in messages:
+        router(message)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chatbot intent routing")
+    parser.add_argument("--messages", type=int, nargs="+", default=[20000])
+    args = parser.parse_args()
+
+    corpus = [message for message, _ in GOLDEN_MESSAGES]
+    for message in corpus:
+        assert classify(message) == legacy_classify(message), f"routers disagree on {message!r}"
+
+    print(f"{'messages':>9} {'cascade':>9} {'compiled':>9} {'per msg':>9} {'speedup':>8}")
+    for count in args.messages:
+        messages = (corpus * (count // len(corpus) + 1))[:count]
+        legacy_time = timed(legacy_classify, messages)
+        compiled_time = timed(classify, messages)
+        print(f"{count:>9} {legacy_time:>8.3f}s {compiled_time:>8.3f}s "
+              f"{compiled_time / count * 1e6:>7.1f}us {legacy_time / compiled_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent logins: bcrypt verified on the event loop against the
+bounded password hashing pool
+
+Each simulated login verifies one bcrypt hash. A heartbeat task ticks every
+10 ms alongside the logins; its worst lateness is how long a price or trade
+request on the same worker would have been stalled.
+
+Usage:
+    python benchmark_password_hashing.py                       # 1, 8 and 32 concurrent logins
+    python benchmark_password_hashing.py --concurrency 64 --rounds 10 --workers 8
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from passlib.context import CryptContext
+
+from app.services.password_hasher import PasswordHasher
+
+HEARTBEAT_SECONDS = 0.01
+
+async def heartbeat(stop: asyncio.Event) -> float:
+    """Worst delay beyond the expected tick, in seconds"""
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT_SECONDS
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        worst = max(worst, time.perf_counter() - expected)
+    return worst
+
+async def run(path: str, context: CryptContext, hasher: PasswordHasher, hashed: str, concurrency: int, logins: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            if path == "inline":
+                valid = context.verify("correct horse", hashed)
+            else:
+                valid, _ = await hasher.verify_and_update("correct horse", hashed)
+            assert valid
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return logins / elapsed, await ticker
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput under concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=args.rounds,
+                           bcrypt__min_rounds=args.rounds, bcrypt__max_rounds=args.rounds)
+    hashed = context.hash("correct horse")
+    print(f"bcrypt rounds={args.rounds}, pool workers={args.workers}, cpus={os.cpu_count()}")
+    print(f"{'concurrent':>10} {'path':>7} {'logins/s':>9} {'max loop stall':>15}")
+    for concurrency in args.concurrency:
+        logins = max(concurrency * 2, 8)
+        for path in ("inline", "pool"):
+            hasher = PasswordHasher(context, args.workers, max_queue=logins)
+            throughput, stall = asyncio.run(run(path, context, hasher, hashed, concurrency, logins))
+            hasher.executor.shutdown()
+            print(f"{concurrency:>10} {path:>7} {throughput:>9.1f} {stall * 1000:>12.1f} ms")
+
+if __name__ == "__main__":
+    main()
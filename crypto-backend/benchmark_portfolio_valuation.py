@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized portfolio valuation against the per-user database path
+
+Both sides read the same SQLite database: the per-user path queries each user's
+positions and sums them in Decimal, as calculate_user_portfolio_performance did;
+the vectorized path loads every position at once, values them and converts the
+results back to Decimal. Timings are end to end.
+
+Usage:
+    python benchmark_portfolio_valuation.py                 # 10k and 50k users
+    python benchmark_portfolio_valuation.py --users 5000    # custom user counts
+"""
+
+import argparse
+import random
+import sys
+import os
+import tempfile
+import time
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import User
+from app.models.position import Position
+from app.services.position_service import PositionService
+from app.services.portfolio_valuation import INITIAL_BALANCE, PositionArrays, value_portfolios
+
+COINS = [f"C{index:02d}" for index in range(60)]
+POSITIONS_PER_USER = 5
+
+def make_rows(users: int, seed: int = 42):
+    """Synthetic position rows shaped like the positions table"""
+    rng = random.Random(seed)
+    rows = []
+    for user_id in range(1, users + 1):
+        for coin in rng.sample(COINS, POSITIONS_PER_USER):
+            spent = Decimal(rng.randint(100, 50000_00000000)).scaleb(-8)
+            received = Decimal(rng.randint(0, 50000_00000000)).scaleb(-8) if rng.random() < 0.5 else Decimal('0')
+            quantity = Decimal(rng.randint(0, 10_00000000)).scaleb(-8)
+            cost_basis = (spent / 2).quantize(Decimal('0.00000001'))
+            realized = (received - spent / 2).quantize(Decimal('0.00000001')) if received else Decimal('0')
+            rows.append((user_id, coin, quantity, cost_basis, spent, received, realized, rng.randint(1, 20)))
+    prices = {coin: Decimal(rng.randint(1, 60000_000000)).scaleb(-6) for coin in COINS}
+    return rows, prices
+
+def build_database(path: str, users: int, rows):
+    """Write the synthetic users and positions to a SQLite file"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    columns = ('user_id', 'coin_symbol', 'quantity', 'cost_basis', 'total_spent', 'total_received', 'realized_pnl', 'trade_count')
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {'id': user_id, 'username': f"trader{user_id}", 'email': f"trader{user_id}@example.com", 'hashed_password': "x"}
+            for user_id in range(1, users + 1)
+        ])
+        connection.execute(insert(Position), [dict(zip(columns, row)) for row in rows])
+    return engine
+
+def per_user_valuation(session_factory, users: int, prices):
+    """One positions query and a Decimal loop per user, as the leaderboard did before vectorization"""
+    results = {}
+    with session_factory() as db:
+        positions_of = PositionService(db).get_positions
+        for user_id in range(1, users + 1):
+            total_value = Decimal('0')
+            total_invested = Decimal('0')
+            total_received = Decimal('0')
+            total_trades = winning = losing = 0
+            for position in positions_of(user_id, open_only=False):
+                if position.quantity > 0:
+                    total_value += position.quantity * prices.get(position.coin_symbol, Decimal('0'))
+                total_invested += position.total_spent
+                total_received += position.total_received
+                total_trades += position.trade_count
+                if position.total_received > 0:
+                    if position.realized_pnl > 0:
+                        winning += 1
+                    else:
+                        losing += 1
+            total_value += total_received
+            profit_loss = total_value - total_invested
+            results[user_id] = {
+                'total_portfolio_value': total_value,
+                'total_profit_loss': profit_loss,
+                'total_profit_loss_percent': (profit_loss / total_invested * 100) if total_invested > 0 else Decimal('0'),
+                'portfolio_performance_percent': (total_value - INITIAL_BALANCE) / INITIAL_BALANCE * 100,
+                'winning_trades': winning,
+                'losing_trades': losing
+            }
+    return results
+
+def load_positions(session_factory):
+    with session_factory() as db:
+        return PositionArrays.load(db)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def check(reference, results, samples: int = 200):
+    """Compare a sample of users; values may differ by at most 1e-8 per position"""
+    tolerance = Decimal('0.00000001') * POSITIONS_PER_USER
+    for user_id in list(reference)[:samples]:
+        expected, actual = reference[user_id], results[user_id]
+        assert abs(expected['total_portfolio_value'] - actual['total_portfolio_value']) <= tolerance, user_id
+        assert abs(expected['total_profit_loss'] - actual['total_profit_loss']) <= tolerance, user_id
+        assert expected['winning_trades'] == actual['winning_trades'], user_id
+        assert expected['losing_trades'] == actual['losing_trades'], user_id
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark portfolio valuation")
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 50000])
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'positions':>10} {'per-user':>10} {'load':>8} {'compute':>8} "
+          f"{'to Decimal':>11} {'vectorized':>11} {'speedup':>8}")
+    for users in args.users:
+        rows, prices = make_rows(users)
+        with tempfile.TemporaryDirectory() as directory:
+            engine = build_database(os.path.join(directory, "positions.db"), users, rows)
+            session_factory = sessionmaker(bind=engine)
+            reference, per_user_time = timed(per_user_valuation, session_factory, users, prices)
+            arrays, load_time = timed(load_positions, session_factory)
+            valuation, compute_time = timed(value_portfolios, arrays, prices)
+            results, convert_time = timed(valuation.by_user)
+            engine.dispose()
+        check(reference, results)
+        vector_time = load_time + compute_time + convert_time
+        print(f"{users:>8} {len(rows):>10} {per_user_time:>9.3f}s {load_time:>7.3f}s {compute_time:>7.3f}s "
+              f"{convert_time:>10.3f}s {vector_time:>10.3f}s {per_user_time / vector_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
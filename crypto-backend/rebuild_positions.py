@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Backfill/rebuild the positions table from the trades table
+
+Usage:
+    python rebuild_positions.py            # rebuild every user's positions
+    python rebuild_positions.py --user 42  # rebuild a single user's positions
+
+The migration that adds the table backfills it; this is for repairs. Trades
+can keep running: they wait on the rebuild's locks until it commits.
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db import SessionLocal
+from app.services.position_service import PositionService
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild positions from trades")
+    parser.add_argument("--user", type=int, help="Only rebuild this user's positions")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        position_service = PositionService(db)
+        if args.user:
+            count = position_service.rebuild_user_positions(args.user)
+            db.commit()
+            print(f"✅ Rebuilt {count} positions for user {args.user}")
+        else:
+            count = position_service.rebuild_all_positions()
+            print(f"✅ Rebuilt {count} positions from the trades table")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Failed to rebuild positions: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process achievement and package catalog: edits are
+served after invalidation, and callers only ever get their own copies
+"""
+
+import sys
+import os
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models.achievement import Achievement
+from app.models.purchase import DemoCoinPackage
+from app.services.catalog import CatalogCache
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Achievement(id=1, name="First Trade", description="Make a trade", type="trading_milestone", icon="🚀",
+                       requirement_value=Decimal("1"), requirement_type="trades", reward_coins=Decimal("100")))
+    db.add(Achievement(id=2, name="Retired", description="No longer offered", type="trading_milestone", icon="💤",
+                       requirement_value=Decimal("5"), requirement_type="trades", is_active=False))
+    db.add(DemoCoinPackage(id=1, name="Starter", price=Decimal("99"), coins_per_inr=Decimal("100")))
+    db.commit()
+    return db
+
+def test_edit_is_served_after_invalidation():
+    """An edit stays invisible until invalidate() bumps the version, then the next read reloads it"""
+    print("🧪 Testing catalog invalidation...")
+    db = make_session()
+    cache = CatalogCache()
+    assert [achievement.name for achievement in cache.achievements(db)] == ["First Trade"]
+    assert cache.achievement(2, db).name == "Retired"
+
+    db.get(Achievement, 1).reward_coins = Decimal("250")
+    db.get(DemoCoinPackage, 1).is_active = False
+    db.commit()
+    assert cache.achievement(1, db).reward_coins == Decimal("100") and len(cache.packages(db)) == 1
+
+    version = cache.version
+    cache.invalidate()
+    assert cache.version == version + 1
+    assert cache.achievement(1, db).reward_coins == Decimal("250")
+    assert cache.packages(db) == [] and cache.package(1, db).name == "Starter"
+    print("✅ Catalog invalidation OK")
+
+def test_callers_get_their_own_copies():
+    """Entries are transient, and changing one reaches neither the cache nor the database"""
+    print("🧪 Testing catalog copies...")
+    db = make_session()
+    cache = CatalogCache()
+    achievement, package = cache.achievement(1, db), cache.packages(db)[0]
+    assert inspect(achievement).transient and inspect(package).transient
+    assert achievement is not cache.achievement(1, db)
+
+    achievement.name, achievement.is_active = "Renamed", False
+    package.price = Decimal("1")
+    db.commit()
+    assert cache.achievement(1, db).name == "First Trade" and len(cache.achievements(db)) == 1
+    assert cache.package(1, db).price == Decimal("99")
+    assert db.get(Achievement, 1).name == "First Trade"
+    print("✅ Catalog copies OK")
+
+if __name__ == "__main__":
+    test_edit_is_served_after_invalidation()
+    test_callers_get_their_own_copies()
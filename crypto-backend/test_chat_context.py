@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for the chatbot context builder: one batched load per user,
+reused until it expires or the user trades
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import User
+from app.models.trade import Trade, TradeType
+from app.schemas.trade import PriceResponse
+from app.services.chat_context import ChatContextCache
+from app.services.price_service import price_service
+from app.services.trade_service import TradeService, add_trade_listener, trade_listeners
+from app.routes.chatbot import ChatMessage, chatbot_endpoint
+
+PRICES = {"BTC": Decimal("60000"), "ETH": Decimal("3000")}
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, username="trader", email="trader@example.com", hashed_password="x"))
+    db.commit()
+    for symbol, price in PRICES.items():
+        asyncio.run(price_service._cache_price(symbol, PriceResponse(
+            coin_symbol=symbol, price_usd=price, price_change_24h=Decimal("1.5"),
+            price_change_percentage_24h=Decimal("1.5"), timestamp=datetime.utcnow()
+        )))
+    return db, statements
+
+def test_context_is_loaded_once_and_dropped_on_trade():
+    """A second message reuses the context; a trade forces a reload"""
+    print("🧪 Testing chat context memoization...")
+    db, statements = make_session()
+    cache = ChatContextCache(ttl_seconds=60)
+    add_trade_listener(cache.on_trade)
+    try:
+        service = TradeService(db)
+        service.execute(1, "BTC", TradeType.BUY, Decimal("0.5"), PRICES["BTC"])
+        service.execute(1, "ETH", TradeType.BUY, Decimal("2"), PRICES["ETH"])
+        service.execute(1, "ETH", TradeType.SELL, Decimal("1"), PRICES["ETH"])
+
+        statements.clear()
+        context = asyncio.run(cache.get(1, db))
+        assert len(statements) == 4, f"expected 4 queries, ran {len(statements)}"
+        assert context.trades_count == 3 and context.trade_stats["buy_trades"] == 2
+        assert context.trade_stats["unique_coins_traded"] == 2
+        assert context.trade_stats["total_volume"] == 30000 + 6000 + 3000
+        assert context.holdings["BTC"]["quantity"] == 0.5 and context.holdings["BTC"]["current_price"] == 60000
+        assert context.holdings["ETH"]["quantity"] == 1
+        assert [trade["type"] for trade in context.recent_trades] == ["sell", "buy", "buy"]
+        assert context.recent_trades[0]["profit_loss"] == 0
+        assert context.balance == 100000 - 30000 - 6000 + 3000
+
+        statements.clear()
+        assert asyncio.run(cache.get(1, db)) is context
+        assert statements == []
+
+        service.execute(1, "BTC", TradeType.SELL, Decimal("0.5"), PRICES["BTC"])
+        reloaded = asyncio.run(cache.get(1, db))
+        assert reloaded is not context and "BTC" not in reloaded.holdings and reloaded.trades_count == 4
+        assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 2
+    finally:
+        trade_listeners.remove(cache.on_trade)
+    print("✅ Chat context memoization OK")
+
+def test_context_expires():
+    """Entries older than the TTL are loaded again"""
+    db, statements = make_session()
+    cache = ChatContextCache(ttl_seconds=0)
+    first = asyncio.run(cache.get(1, db))
+    assert asyncio.run(cache.get(1, db)) is not first
+    assert first.balance == 0.0 and first.holdings == {} and first.trades_count == 0
+
+def test_chatbot_buy_reports_executed_trade():
+    """A buy through the chatbot confirms the trade it committed"""
+    print("🧪 Testing a chatbot buy...")
+    db, _ = make_session()
+    TradeService(db).execute(1, "ETH", TradeType.BUY, Decimal("1"), PRICES["ETH"])
+    user = db.get(User, 1)
+    response = asyncio.run(chatbot_endpoint(ChatMessage(message="buy $600 of bitcoin"), user, db))
+    assert "Purchase Executed" in response.reply and "+1.50%" in response.reply, response.reply
+    assert db.query(Trade).filter(Trade.coin_symbol == "BTC").count() == 1
+    print("✅ Chatbot buy OK")
+
+if __name__ == "__main__":
+    test_context_is_loaded_once_and_dropped_on_trade()
+    test_context_expires()
+    test_chatbot_buy_reports_executed_trade()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Golden-message test for chatbot intent routing
+
+Every message is routed by app.services.chat_intents.classify and must land
+on the recorded intent with the recorded parameters. The corpus pins current
+behaviour, quirks included (keywords are plain substrings, so "this" greets and
+"$1,500" buys $1); change an entry only when routing is meant to change.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.chat_intents import classify, Intent, KEYWORD_PATTERN, KEYWORD_FEATURES
+
+def buy(amount, symbol, name):
+    return Intent("buy", {"amount_usd": amount, "symbol": symbol, "name": name})
+
+def simulation(entry, exit, size=1.0, leverage=1.0):
+    return Intent("trade_simulation", {"entry_price": entry, "exit_price": exit, "position_size": size, "leverage": leverage})
+
+def onboarding(first_trade=False, risk_management=False):
+    return Intent("onboarding", {"first_trade": first_trade, "risk_management": risk_management})
+
+GOLDEN_MESSAGES = [
+    ("Buy $200 of Bitcoin", buy(200.0, "BTC", "Bitcoin")),
+    ("buy eth", buy(100.0, "ETH", "Ethereum")),
+    ("Purchase 50 SOL please", buy(50.0, "SOL", "Solana")),
+    ("I want to buy ethereum for $1,500", buy(1.0, "ETH", "Ethereum")),
+    ("get btc", buy(100.0, "BTC", "Bitcoin")),
+    ("how to buy bitcoin", buy(100.0, "BTC", "Bitcoin")),
+    ("Today I sold my ETH too early and felt anxious", Intent("journal")),
+    ("Journal: patient entries pay off", Intent("journal")),
+    ("Felt nervous holding bitcoin through the dip, but the lesson is to size smaller and trust the plan I wrote down",
+     Intent("journal")),
+    ("Felt nervous all week", Intent("general")),
+    ("Balance $10,000, risk 2%, entry 50000, stop loss 48000", Intent("position_sizing", {
+        "account_balance": 10000.0, "risk_percentage": 2.0, "entry_price": 50000.0, "stop_loss_price": 48000.0})),
+    ("account: 5000 risk 1.5% entry: $3,200 sl 3100", Intent("position_sizing", {
+        "account_balance": 5000.0, "risk_percentage": 1.5, "entry_price": 3200.0, "stop_loss_price": 3100.0})),
+    ("hello", Intent("greeting")),
+    ("Hey there", Intent("greeting")),
+    ("this is great", Intent("greeting")),
+    ("What is Bitcoin", Intent("explain_bitcoin")),
+    ("explain bitcoin to me", Intent("explain_bitcoin")),
+    ("how to start trading", Intent("how_to_trade")),
+    ("recommendations please", Intent("recommendation")),
+    ("market timing", Intent("timing")),
+    ("tell me about timing", Intent("timing")),
+    ("risk management", Intent("risk_management")),
+    ("Stop loss at 90 entry 100 balance 1000 risk 2", Intent("risk_management")),
+    ("entry 100 exit 120 stop loss", Intent("risk_management")),
+    ("help", Intent("help")),
+    ("commands", Intent("help")),
+    ("What's up?", Intent("question")),
+    ("where do I click", Intent("question")),
+    ("best crypto right now", Intent("market_analysis")),
+    ("crypto education", Intent("market_analysis")),
+    ("Analyze my portfolio", Intent("portfolio_coaching")),
+    ("portfolio review", Intent("portfolio_coaching")),
+    ("mentor me", Intent("portfolio_coaching")),
+    ("I am new here", onboarding()),
+    ("first trade guide", onboarding(first_trade=True)),
+    ("onboarding", onboarding()),
+    ("getting started", onboarding()),
+    ("entry 100 exit 120", simulation(100.0, 120.0)),
+    ("Simulate entry $50,000 exit $55,000 position size 0.5 with 3x leverage", simulation(50000.0, 55000.0, 0.5, 3.0)),
+    ("entry 100 target 90 quantity 10", simulation(100.0, 90.0, 10.0)),
+    ("entry 100 exit 120 2.5 coins", simulation(100.0, 120.0, 2.5)),
+    ("sell at 500 entry 400", simulation(400.0, 500.0)),
+    ("entry , exit 5", Intent("general")),
+    ("", Intent("general")),
+    ("ok", Intent("general")),
+    ("tell me a joke", Intent("general")),
+]
+
+def test_golden_messages():
+    """Each corpus message routes to its recorded intent and parameters"""
+    print("🧪 Testing intent routing against the golden corpus...")
+    for message, expected in GOLDEN_MESSAGES:
+        assert classify(message) == expected, f"{message!r}: expected {expected}, got {classify(message)}"
+    print(f"✅ {len(GOLDEN_MESSAGES)} messages routed correctly")
+
+def test_overlapping_keywords():
+    """Keywords inside or sharing a prefix with longer keywords are all found"""
+    def features(message):
+        return {feature for word in KEYWORD_PATTERN.findall(message) for feature in KEYWORD_FEATURES[word]}
+    assert {"help", "onboarding", "portfolio_coaching"} <= features("help me learn")
+    assert {"question", "market_analysis"} <= features("which crypto")
+    assert {"greeting", "journal_strong"} <= features("this week i")
+
+def test_long_messages():
+    """The keyword scan covers the whole message, however long"""
+    assert classify("I felt calm. " * 2000 + "entry 100 exit 120") == Intent("journal")
+    assert classify("x" * 50000 + " entry 100 exit 120") == simulation(100.0, 120.0)
+
+if __name__ == "__main__":
+    test_golden_messages()
+    test_overlapping_keywords()
+    test_long_messages()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Test script for the period leaderboards: the baseline snapshot each user is
+ranked against, the hourly snapshot job, and running the leaderboard jobs
+from several workers
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import User
+from app.models.leaderboard import LeaderboardEntry
+from app.models.position import Position
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.services.leaderboard_service import LeaderboardService
+from app.services.portfolio_valuation import PositionArrays, value_portfolios
+from app.services.scheduler import PeriodicJob
+
+def make_session(users=3, engine=None):
+    engine = engine or create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    for user_id in range(1, users + 1):
+        db.add(User(id=user_id, username=f"trader{user_id}", email=f"trader{user_id}@example.com", hashed_password="x"))
+    db.commit()
+    return db
+
+def add_entry(db, user_id, total_profit_loss):
+    db.add(LeaderboardEntry(
+        user_id=user_id, username=f"trader{user_id}", total_portfolio_value=0, total_invested=0,
+        total_profit_loss=Decimal(total_profit_loss), total_profit_loss_percent=0,
+        current_demo_balance=0, portfolio_performance_percent=0
+    ))
+
+def add_snapshot(db, user_id, taken_at, total_profit_loss):
+    db.add(PortfolioSnapshot(
+        user_id=user_id, taken_at=taken_at, total_portfolio_value=0, total_invested=0,
+        total_profit_loss=Decimal(total_profit_loss)
+    ))
+
+def test_period_baselines():
+    """Each user is ranked from their last snapshot before the window, or their first inside it"""
+    print("🧪 Testing period leaderboard baselines...")
+    db = make_session()
+    start = LeaderboardService.get_period_start("weekly")
+    add_entry(db, 1, "2000")
+    add_snapshot(db, 1, start - timedelta(days=2), "100")
+    add_snapshot(db, 1, start - timedelta(hours=1), "1000")
+    add_snapshot(db, 1, start + timedelta(hours=1), "5000")
+    # Joined during the week: the first snapshot inside it is the baseline
+    add_entry(db, 2, "0")
+    add_snapshot(db, 2, start + timedelta(hours=2), "-500")
+    add_snapshot(db, 2, start + timedelta(hours=3), "-200")
+    # No snapshot at all: measured from zero
+    add_entry(db, 3, "300")
+    db.commit()
+
+    board = {row['user_id']: row for row in LeaderboardService(db).get_period_leaderboard("weekly")}
+    assert board[1]['period_profit_loss'] == Decimal("1000")
+    assert board[2]['period_profit_loss'] == Decimal("500")
+    assert board[3]['period_profit_loss'] == Decimal("300")
+    assert [board[user_id]['period_rank'] for user_id in (1, 2, 3)] == [1, 2, 3]
+    print("✅ Period baselines OK")
+
+def test_period_baseline_uses_index():
+    """The baseline is two index seeks per user, never a scan of the snapshot table"""
+    db = make_session()
+    query = LeaderboardService(db)._period_ranking_query("weekly").statement
+    compiled = query.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+    snapshot_steps = [step for step in plan if "portfolio_snapshots" in step]
+    assert snapshot_steps and all(
+        step.startswith("SEARCH") and "ix_portfolio_snapshots_user_taken_at" in step for step in snapshot_steps
+    ), plan
+
+def add_position(db, user_id, symbol, quantity, cost):
+    db.add(Position(user_id=user_id, coin_symbol=symbol, quantity=Decimal(quantity), cost_basis=Decimal(cost),
+                    realized_pnl=0, total_spent=Decimal(cost), total_received=0, trade_count=1))
+    db.commit()
+
+def test_snapshot_keeps_the_first_row_of_the_hour():
+    """A rerun within the hour adds users it missed but never rewrites a recorded baseline"""
+    print("🧪 Testing hourly portfolio snapshots...")
+    db = make_session(users=2)
+    midnight = datetime(2025, 3, 3)
+    add_position(db, 1, "BTC", "1", "50000")
+    add_snapshot(db, 1, midnight - timedelta(days=60), "0")
+    db.commit()
+    service = LeaderboardService(db)
+    service.snapshot_portfolios({"BTC": Decimal("60000")}, taken_at=midnight + timedelta(minutes=1))
+
+    # A restart (or a second worker) later in the same hour sees different prices
+    add_position(db, 2, "ETH", "2", "4000")
+    service.snapshot_portfolios({"BTC": Decimal("40000"), "ETH": Decimal("2500")}, taken_at=midnight + timedelta(minutes=40))
+
+    rows = {row.user_id: row for row in db.query(PortfolioSnapshot).filter(PortfolioSnapshot.taken_at == midnight)}
+    assert rows[1].total_profit_loss == Decimal("10000")
+    assert rows[2].total_profit_loss == Decimal("1000")
+    # Rows past the retention window are pruned
+    assert db.query(PortfolioSnapshot).count() == 2
+    print("✅ Hourly snapshots OK")
+
+def test_recompute_totals_in_sql():
+    """The SQL aggregate agrees with the valuation engine and ranks by performance"""
+    print("🧪 Testing the leaderboard recompute...")
+    db = make_session(users=4)
+    add_position(db, 1, "BTC", "1", "50000")
+    add_position(db, 2, "ETH", "3", "6000")
+    add_position(db, 3, "SOL", "0", "1000")
+    position = db.query(Position).filter(Position.user_id == 3).one()
+    position.total_received, position.realized_pnl, position.trade_count = Decimal("1500"), Decimal("500"), 2
+    db.commit()
+    prices = {"BTC": Decimal("60000"), "ETH": Decimal("1500.5")}
+
+    assert LeaderboardService(db).recompute_rankings(prices) == 4
+    valuation = value_portfolios(PositionArrays.load(db), prices)
+    entries = {entry.user_id: entry for entry in db.query(LeaderboardEntry)}
+    for user_id, entry in entries.items():
+        expected = valuation.for_user(user_id)
+        for column in ('total_portfolio_value', 'total_invested', 'total_profit_loss', 'total_profit_loss_percent',
+                       'portfolio_performance_percent', 'win_rate_percent'):
+            assert abs(getattr(entry, column) - expected[column]) < Decimal("0.0001"), (user_id, column)
+        assert (entry.total_trades, entry.winning_trades, entry.losing_trades) == (
+            expected['total_trades'], expected['winning_trades'], expected['losing_trades'])
+    # Ranked by portfolio value against the starting balance; user 4 has not traded and sits at 0%
+    assert [entries[user_id].global_rank for user_id in (4, 1, 2, 3)] == [1, 2, 3, 4]
+    assert {entry.weekly_rank for entry in entries.values()} == {1, 2, 3, 4}
+    print("✅ Leaderboard recompute OK")
+
+def test_recompute_survives_a_concurrent_insert():
+    """An entry another worker inserts between our read and our write is updated, not duplicated"""
+    print("🧪 Testing concurrent leaderboard recomputes...")
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'leaderboard.db')}")
+        db = make_session(users=2, engine=engine)
+        add_position(db, 1, "BTC", "1", "50000")
+        other_worker = sessionmaker(bind=engine)()
+
+        def race(conn, cursor, statement, *args):
+            if statement.startswith("INSERT INTO leaderboard_entries") and not other_worker.info.get("raced"):
+                other_worker.info["raced"] = True
+                add_entry(other_worker, 1, "0")
+                other_worker.commit()
+
+        event.listen(engine, "before_cursor_execute", race)
+        assert LeaderboardService(db).recompute_rankings({"BTC": Decimal("60000")}) == 2
+        event.remove(engine, "before_cursor_execute", race)
+        assert other_worker.info["raced"]
+        entries = {entry.user_id: entry for entry in db.query(LeaderboardEntry)}
+        assert len(entries) == 2 and entries[1].total_profit_loss == Decimal("10000")
+        assert sorted(entry.global_rank for entry in entries.values()) == [1, 2]
+        other_worker.close()
+        db.close()
+        engine.dispose()
+    print("✅ Concurrent recomputes OK")
+
+def test_exclusive_job_runs_on_one_worker():
+    """Only the lease holder runs an exclusive job; another worker takes over once it stops"""
+    print("🧪 Testing exclusive background jobs...")
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'jobs.db')}")
+        Base.metadata.create_all(engine)
+        calls = []
+
+        async def run():
+            workers = {}
+            for holder in ("first", "second"):
+                async def record(holder=holder):
+                    calls.append(holder)
+                workers[holder] = PeriodicJob("recompute", 0.05, record, exclusive=True,
+                                              session_factory=sessionmaker(bind=engine), holder=holder)
+            workers["first"].start()
+            await asyncio.sleep(0.02)
+            workers["second"].start()
+            await asyncio.sleep(0.3)
+            await workers["first"].stop()
+            ran_while_first_held = list(calls)
+            # The lease lasts two intervals, then the second worker takes over
+            await asyncio.sleep(0.4)
+            await workers["second"].stop()
+            return workers, ran_while_first_held
+
+        workers, ran_while_first_held = asyncio.run(run())
+        engine.dispose()
+    assert set(ran_while_first_held) == {"first"} and workers["second"].skipped > 0
+    assert "second" in calls[len(ran_while_first_held):]
+    print("✅ Exclusive jobs OK")
+
+if __name__ == "__main__":
+    test_period_baselines()
+    test_period_baseline_uses_index()
+    test_snapshot_keeps_the_first_row_of_the_hour()
+    test_recompute_totals_in_sql()
+    test_recompute_survives_a_concurrent_insert()
+    test_exclusive_job_runs_on_one_worker()
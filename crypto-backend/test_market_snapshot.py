@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Test script for batched market snapshots, run against a local stub of
+CoinGecko's /simple/price endpoint
+"""
+
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.schemas.trade import PriceResponse
+from app.services.price_cache import InMemoryPriceCache, SQLitePriceCache, DYNAMIC, PRIMARY
+from app.services.price_service import CoinGeckoService
+
+TOP_COINS = ["BTC", "ETH", "BNB", "XRP", "ADA", "SOL", "DOGE", "AVAX", "DOT", "MATIC"]
+
+class StubSimplePriceHandler(BaseHTTPRequestHandler):
+    """Answers /simple/price for every requested id except the ones it is told to drop"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        ids = parse_qs(urlparse(self.path).query)["ids"][0].split(",")
+        self.server.requests.append(ids)
+        time.sleep(self.server.delay)
+        body = json.dumps({
+            coin_id: {"usd": 100.0 + index, "usd_24h_change": 1.25}
+            for index, coin_id in enumerate(ids) if coin_id not in self.server.drop
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_stub_coingecko(delay: float = 0.0, drop=()):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSimplePriceHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.delay = delay
+    server.drop = set(drop)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def stub_service(server, cache_backend=None) -> CoinGeckoService:
+    service = CoinGeckoService(cache_backend or InMemoryPriceCache())
+    service.COINGECKO_BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    service.min_request_interval = 0
+    return service
+
+def test_snapshot_is_one_request():
+    """Ten uncached coins cost one upstream request; the second snapshot costs none"""
+    print("🧪 Testing batched market snapshot...")
+    server = start_stub_coingecko()
+
+    async def run():
+        service = stub_service(server)
+        try:
+            first = await service.get_market_snapshot(TOP_COINS + ["btc"])
+            second = await service.get_market_snapshot(TOP_COINS)
+        finally:
+            await service.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert list(first) == TOP_COINS and list(second) == TOP_COINS
+    assert first["ETH"].price_change_percentage_24h == Decimal("1.25")
+    assert len(server.requests) == 1 and len(server.requests[0]) == len(TOP_COINS)
+    server.shutdown()
+    print("✅ Batched market snapshot OK")
+
+def test_budget_returns_partial_results():
+    """A slow upstream is not waited on past the budget; the late prices still land in the cache"""
+    print("🧪 Testing the snapshot latency budget...")
+    server = start_stub_coingecko(delay=0.5)
+
+    async def run():
+        service = stub_service(server)
+        stale = PriceResponse(coin_symbol="BTC", price_usd=Decimal("50000"), price_change_24h=Decimal("0"),
+                              price_change_percentage_24h=Decimal("0"), timestamp=datetime.utcnow())
+        service.cache_backend.set(DYNAMIC, "BTC", stale, timedelta(hours=1))
+        try:
+            started = time.perf_counter()
+            partial = await service.get_market_snapshot(["BTC", "ETH", "SOL"], budget_seconds=0.1)
+            elapsed = time.perf_counter() - started
+            await asyncio.sleep(0.6)
+            complete = await service.get_market_snapshot(["BTC", "ETH", "SOL"], budget_seconds=0.1)
+        finally:
+            await service.close()
+        return partial, elapsed, complete, service.snapshot_timeouts
+
+    partial, elapsed, complete, timeouts = asyncio.run(run())
+    assert elapsed < 0.3, f"snapshot took {elapsed:.2f}s"
+    assert list(partial) == ["BTC"] and partial["BTC"].price_usd == Decimal("50000")
+    assert list(complete) == ["BTC", "ETH", "SOL"] and complete["BTC"].price_usd != Decimal("50000")
+    assert len(server.requests) == 1 and timeouts == 1
+    server.shutdown()
+    print(f"✅ Snapshot budget OK ({elapsed * 1000:.0f} ms)")
+
+def test_missing_coins_are_left_out():
+    """Coins the upstream does not return are simply absent"""
+    server = start_stub_coingecko(drop={"solana"})
+
+    async def run():
+        service = stub_service(server)
+        try:
+            return await service.get_market_snapshot(["BTC", "SOL", "ETH"])
+        finally:
+            await service.close()
+
+    assert list(asyncio.run(run())) == ["BTC", "ETH"]
+    server.shutdown()
+
+def test_one_worker_polls_a_shared_cache():
+    """Workers sharing a cache poll upstream once between them; the others pass the leader's prices on"""
+    print("🧪 Testing the poll lease across workers...")
+    server = start_stub_coingecko()
+    ticks = []
+
+    async def run(path):
+        workers = [stub_service(server, SQLitePriceCache(path)) for _ in range(3)]
+        try:
+            for worker in workers:
+                worker.poll_interval = 0.2
+                worker.add_price_listener(lambda prices, worker=worker: ticks.append((worker, prices)))
+                worker.start_poller()
+            await asyncio.sleep(0.5)
+            # A follower's snapshot is live, so this is answered from the shared cache
+            followers = [worker for worker in workers if not worker.poll_leader]
+            requests = len(server.requests)
+            price = await followers[0].get_price("ETH")
+            assert len(server.requests) == requests
+            live = [worker.is_snapshot_live() for worker in workers]
+        finally:
+            for worker in workers:
+                await worker.stop_poller()
+                await worker.close()
+        return workers, followers, price, live
+
+    with tempfile.TemporaryDirectory() as directory:
+        workers, followers, price, live = asyncio.run(run(os.path.join(directory, "prices.db")))
+    batches = -(-len(workers[0]._coin_ids_to_symbols()) // 250)
+    leader_ticks = sum(1 for worker, _ in ticks if worker not in followers)
+    assert len(followers) == 2 and all(live)
+    # Upstream only ever saw the leader's ticks
+    assert leader_ticks and len(server.requests) == leader_ticks * batches
+    assert price is not None and price.price_change_percentage_24h == Decimal("1.25")
+    # Followers' listeners (the broadcaster, the reply cache) hear every leader tick
+    for follower in followers:
+        heard = [prices for worker, prices in ticks if worker is follower]
+        assert heard and "ETH" in heard[0]
+    server.shutdown()
+    print(f"✅ Poll lease OK ({len(server.requests)} upstream requests for 3 workers)")
+
+def test_follower_notices_a_stalled_leader():
+    """A follower whose leader stopped refreshing goes back to upstream once the shared prices are stale"""
+    print("🧪 Testing a follower behind a stalled leader...")
+    server = start_stub_coingecko()
+
+    async def run(path):
+        cache = SQLitePriceCache(path)
+        # A leader that holds the lease but last wrote prices 20 minutes ago
+        assert cache.acquire_lease("price-poller", "stalled-leader", timedelta(hours=1))
+        stale = PriceResponse(coin_symbol="ETH", price_usd=Decimal("2000"), price_change_24h=Decimal("0"),
+                              price_change_percentage_24h=Decimal("0"),
+                              timestamp=datetime.utcnow() - timedelta(minutes=20))
+        cache.set(PRIMARY, "ETH", stale, timedelta(hours=1))
+        follower = stub_service(server, SQLitePriceCache(path))
+        follower.poll_interval = 60
+        try:
+            follower.start_poller()
+            await asyncio.sleep(0.2)
+            live = follower.is_snapshot_live()
+            price = await follower.get_price("ETH")
+        finally:
+            await follower.stop_poller()
+            await follower.close()
+        return follower.poll_leader, live, price
+
+    with tempfile.TemporaryDirectory() as directory:
+        leader, live, price = asyncio.run(run(os.path.join(directory, "prices.db")))
+    assert not leader and not live
+    assert price.price_usd != Decimal("2000") and len(server.requests) == 1
+    server.shutdown()
+    print("✅ Stalled leader OK")
+
+if __name__ == "__main__":
+    test_snapshot_is_one_request()
+    test_budget_returns_partial_results()
+    test_missing_coins_are_left_out()
+    test_one_worker_polls_a_shared_cache()
+    test_follower_notices_a_stalled_leader()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled chat completions client and the chatbot SSE relay,
+run against a local stub server that mimics the completions API
+"""
+
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.openai_client import OpenAIClient, OpenAIError
+from app.routes.chatbot import stream_coaching_reply
+
+TOKENS = ["Diversify", " across", " three", " coins", "."]
+
+class StubCompletionsHandler(BaseHTTPRequestHandler):
+    """Answers POST /v1/chat/completions like the real API, streamed or not"""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(request)
+        time.sleep(self.server.delay)
+        if self.headers.get("Authorization") != "Bearer test-key":
+            return self.send_body(401, "application/json", b'{"error": {"message": "bad key"}}')
+        if not request["stream"]:
+            content = "".join(TOKENS)
+            body = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}]}).encode()
+            return self.send_body(200, "application/json", body)
+        chunks = [
+            f"data: {json.dumps({'choices': [{'delta': {'content': token}}]})}\n\n".encode() for token in TOKENS
+        ] + [b"data: [DONE]\n\n"]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(sum(len(chunk) for chunk in chunks)))
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(chunk)
+            self.wfile.flush()
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_stub_server(delay: float = 0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCompletionsHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.requests = []
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def stub_client(server, **kwargs) -> OpenAIClient:
+    return OpenAIClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", api_key="test-key", **kwargs)
+
+def test_complete_reuses_connection():
+    """Sequential completions share one pooled connection"""
+    print("🧪 Testing completions over the pooled client...")
+    server = start_stub_server()
+
+    async def run():
+        client = stub_client(server)
+        client.start()
+        try:
+            replies = [await client.complete([{"role": "user", "content": "hi"}]) for _ in range(3)]
+        finally:
+            await client.close()
+        return replies
+
+    assert asyncio.run(run()) == ["".join(TOKENS)] * 3
+    assert server.connections == 1, f"expected one connection, got {server.connections}"
+    assert server.requests[0]["model"] == "gpt-4" and server.requests[0]["stream"] is False
+    server.shutdown()
+    print("✅ Pooled completions OK")
+
+def test_stream_yields_tokens():
+    """A streamed completion arrives as its separate tokens"""
+    server = start_stub_server()
+
+    async def run():
+        client = stub_client(server)
+        try:
+            return [token async for token in client.stream([{"role": "user", "content": "hi"}])]
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == TOKENS
+    assert server.requests[0]["stream"] is True
+    server.shutdown()
+
+def test_concurrency_limit_records_queue_time():
+    """Completions beyond the limit wait for a slot, and the wait is measured"""
+    print("🧪 Testing the completion concurrency limit...")
+    server = start_stub_server(delay=0.1)
+
+    async def run():
+        client = stub_client(server, max_concurrency=2)
+        peak = 0
+
+        async def one():
+            return await client.complete([{"role": "user", "content": "hi"}])
+
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, client.in_flight)
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await asyncio.gather(*(one() for _ in range(6)))
+        finally:
+            watcher.cancel()
+            await client.close()
+        return peak, client.get_stats()
+
+    peak, stats = asyncio.run(run())
+    assert peak == 2, f"expected 2 completions in flight at most, saw {peak}"
+    assert stats["requests"] == 6 and stats["waiting"] == 0 and stats["in_flight"] == 0
+    assert stats["max_queue_ms"] >= 150, stats
+    server.shutdown()
+    print(f"✅ Concurrency limit OK (max queue {stats['max_queue_ms']} ms)")
+
+def test_api_error_raises():
+    """An error status surfaces as OpenAIError and counts as a failure"""
+    server = start_stub_server()
+
+    async def run():
+        client = OpenAIClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", api_key="wrong")
+        try:
+            await client.complete([{"role": "user", "content": "hi"}])
+        except OpenAIError as e:
+            return str(e), client.get_stats()
+        finally:
+            await client.close()
+
+    message, stats = asyncio.run(run())
+    assert message.startswith("401") and stats["failures"] == 1
+    server.shutdown()
+
+def test_chatbot_sse_relay():
+    """The chatbot relays completion tokens as SSE delta events, then done"""
+    print("🧪 Testing the chatbot SSE relay...")
+    server = start_stub_server()
+
+    async def run():
+        client = stub_client(server)
+        try:
+            return [event async for event in stream_coaching_reply("How do I diversify?", "COACHING LEVEL: beginner", client)]
+        finally:
+            await client.close()
+
+    events = asyncio.run(run())
+    deltas = [json.loads(event[len("data: "):])["delta"] for event in events[:-1]]
+    assert deltas == TOKENS
+    assert events[-1] == 'event: done\ndata: {}\n\n'
+    messages = server.requests[0]["messages"]
+    assert messages[0]["role"] == "system" and "COACHING LEVEL: beginner" in messages[1]["content"]
+    server.shutdown()
+    print("✅ SSE relay OK")
+
+if __name__ == "__main__":
+    test_complete_reuses_connection()
+    test_stream_yields_tokens()
+    test_concurrency_limit_records_queue_time()
+    test_api_error_raises()
+    test_chatbot_sse_relay()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for the columnar portfolio valuation used by the leaderboards
+"""
+
+import sys
+import os
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import User
+from app.models.position import Position
+from app.services.portfolio_valuation import PositionArrays, value_portfolios
+
+def position_row(user_id, symbol, quantity, cost_basis, total_received="0", realized_pnl="0", trades=1):
+    return (user_id, symbol, Decimal(quantity), Decimal(cost_basis), Decimal(cost_basis),
+            Decimal(total_received), Decimal(realized_pnl), trades)
+
+def test_valuation_is_exact_in_money():
+    """Values, costs and P&L sum to exact cents per user"""
+    print("🧪 Testing portfolio valuation...")
+    arrays = PositionArrays([
+        position_row(1, "BTC", "0.5", "30000"),
+        position_row(1, "ETH", "2", "4000", total_received="1500", realized_pnl="500", trades=3),
+        position_row(2, "SOL", "10", "1000"),
+    ])
+    valuation = value_portfolios(arrays, {"BTC": Decimal("60000"), "ETH": Decimal("2500"), "SOL": Decimal("90.1")})
+    first = valuation.for_user(1)
+    assert first["holdings_value"] == Decimal("35000") and first["total_portfolio_value"] == Decimal("36500")
+    assert first["unrealized_pnl"] == Decimal("1000") and first["winning_trades"] == 1
+    assert valuation.for_user(2)["holdings_value"] == Decimal("901")
+    assert valuation.for_user(3)["total_trades"] == 0
+    print("✅ Portfolio valuation OK")
+
+def test_huge_coin_position():
+    """Meme-coin positions near the Numeric(20, 8) limit load and value exactly"""
+    print("🧪 Testing a near-1e12-coin position...")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, username="holder", email="holder@example.com", hashed_password="x"))
+    # Numeric(20, 8) stores at most 12 integer digits
+    db.add(Position(user_id=1, coin_symbol="BABYDOGE", quantity=Decimal("999999999999.99999999"),
+                    cost_basis=Decimal("1000"), realized_pnl=0, total_spent=Decimal("1000"),
+                    total_received=0, trade_count=1))
+    db.add(Position(user_id=1, coin_symbol="SHIB", quantity=Decimal("666666666666.12345678"),
+                    cost_basis=Decimal("500"), realized_pnl=0, total_spent=Decimal("500"),
+                    total_received=0, trade_count=1))
+    db.commit()
+
+    valuation = value_portfolios(PositionArrays.load(db), {
+        "BABYDOGE": Decimal("0.0000000012"),
+        "SHIB": Decimal("0.0000000009")
+    })
+    metrics = valuation.for_user(1)
+    assert metrics["holdings_value"] == Decimal("1800"), metrics["holdings_value"]
+    assert metrics["unrealized_pnl"] == Decimal("300") and metrics["total_invested"] == Decimal("1500")
+
+    # Worth about 1.5e9, where a float64 product is off by several 1e-8 units (SQLite would
+    # round the quantity itself, so this one skips the database)
+    quantity, price = Decimal("123456789012.34567891"), Decimal("0.0123456789")
+    valuation = value_portfolios(PositionArrays([position_row(1, "PEPE", quantity, "1000")]), {"PEPE": price})
+    assert valuation.for_user(1)["holdings_value"] == (quantity * price).quantize(Decimal("0.00000001"))
+    print("✅ Near-1e12-coin position OK")
+
+if __name__ == "__main__":
+    test_valuation_is_exact_in_money()
+    test_huge_coin_position()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the position ledger: average-cost accounting and rebuilding
+positions from the trades table
+"""
+
+import sys
+import os
+import importlib.util
+import warnings
+from datetime import datetime, timedelta
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import SAWarning
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import User
+from app.models.position import Position
+from app.models.trade import Trade, TradeType
+from app.services.position_service import PositionService
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, username="trader", email="trader@example.com", hashed_password="x"))
+    db.commit()
+    return db
+
+def add_trades(db, trades):
+    """Insert historic trades, one minute apart, as (symbol, type, quantity, price)"""
+    started = datetime(2025, 1, 1)
+    for minute, (symbol, trade_type, quantity, price) in enumerate(trades):
+        db.add(Trade(
+            user_id=1, coin_symbol=symbol, trade_type=trade_type, quantity=Decimal(quantity),
+            price_at_trade=Decimal(price), total_cost=Decimal(quantity) * Decimal(price),
+            timestamp=started + timedelta(minutes=minute)
+        ))
+    db.commit()
+
+def test_average_cost():
+    """Sells remove cost at the average price paid; the rest is realized P&L"""
+    print("🧪 Testing average-cost accounting...")
+    db = make_session()
+    add_trades(db, [
+        ("BTC", TradeType.BUY, "1", "100"),
+        ("BTC", TradeType.BUY, "1", "200"),
+        ("BTC", TradeType.SELL, "1", "300"),
+    ])
+    assert PositionService(db).rebuild_user_positions(1) == 1
+    db.commit()
+    position = PositionService(db).get_position(1, "btc")
+    assert position.quantity == Decimal("1") and position.cost_basis == Decimal("150")
+    assert position.realized_pnl == Decimal("150") and position.trade_count == 3
+    assert position.total_spent == Decimal("300") and position.total_received == Decimal("300")
+    print("✅ Average-cost accounting OK")
+
+def test_rebuild_merges_symbol_case():
+    """Historic trades in mixed case rebuild into one upper-case position"""
+    print("🧪 Testing position rebuild with mixed-case symbols...")
+    db = make_session()
+    add_trades(db, [
+        ("btc", TradeType.BUY, "2", "100"),
+        ("BTC", TradeType.BUY, "2", "300"),
+        ("Btc", TradeType.SELL, "1", "400"),
+        ("eth", TradeType.BUY, "5", "10"),
+    ])
+    assert PositionService(db).rebuild_all_positions() == 2
+    positions = {position.coin_symbol: position for position in db.query(Position).all()}
+    assert sorted(positions) == ["BTC", "ETH"]
+    assert positions["BTC"].quantity == Decimal("3") and positions["BTC"].cost_basis == Decimal("600")
+    assert positions["BTC"].trade_count == 3
+
+    # Rebuilding over the loaded rows updates them in place
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", SAWarning)
+        assert PositionService(db).rebuild_user_positions(1) == 2
+        db.commit()
+    assert db.query(Position).count() == 2 and positions["BTC"].quantity == Decimal("3")
+    print("✅ Mixed-case rebuild OK")
+
+def load_positions_migration():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic", "versions", "4c1f9a7d2e10_add_positions_table.py")
+    spec = importlib.util.spec_from_file_location("add_positions_table", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+def test_migration_backfills_positions():
+    """The positions migration replays existing trades into the ledger, as rebuild_all_positions would"""
+    print("🧪 Testing the positions migration backfill...")
+    db = make_session()
+    db.add(User(id=2, username="other", email="other@example.com", hashed_password="x"))
+    db.commit()
+    add_trades(db, [
+        ("BTC", TradeType.BUY, "1", "100"),
+        ("eth", TradeType.BUY, "4", "10"),
+        ("BTC", TradeType.BUY, "1", "200"),
+        ("BTC", TradeType.SELL, "1", "300"),
+    ])
+    db.add(Trade(user_id=2, coin_symbol="SOL", trade_type=TradeType.BUY, quantity=Decimal("3"),
+                 price_at_trade=Decimal("50"), total_cost=Decimal("150")))
+    db.commit()
+
+    with db.get_bind().begin() as conn:
+        assert load_positions_migration().backfill_positions(conn, batch_size=1) == 3
+    backfilled = {(p.user_id, p.coin_symbol): (p.quantity, p.cost_basis, p.realized_pnl, p.trade_count)
+                  for p in db.query(Position)}
+    PositionService(db).rebuild_all_positions()
+    rebuilt = {(p.user_id, p.coin_symbol): (p.quantity, p.cost_basis, p.realized_pnl, p.trade_count)
+               for p in db.query(Position)}
+    assert backfilled == rebuilt and backfilled[(1, "BTC")] == (Decimal("1"), Decimal("150"), Decimal("150"), 3)
+    print("✅ Positions migration backfill OK")
+
+if __name__ == "__main__":
+    test_average_cost()
+    test_rebuild_merges_symbol_case()
+    test_migration_backfills_positions()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test script for the post-trade jobs queue: every committed trade has its job,
+failed jobs come back with backoff, and no job is processed twice
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from contextlib import contextmanager
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.services.post_trade_queue as queue_module
+from app.db import Base
+from app.models import User
+from app.models.post_trade_job import PostTradeJob
+from app.models.trade import Trade, TradeType
+from app.services.post_trade_queue import PostTradeQueue
+from app.services.trade_service import TradeService
+
+def make_database(directory, users=1):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'queue.db')}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    for user_id in range(1, users + 1):
+        db.add(User(id=user_id, username=f"trader{user_id}", email=f"trader{user_id}@example.com", hashed_password="x"))
+    db.commit()
+    return engine, db
+
+def buy(db, user_id=1):
+    return TradeService(db).execute(user_id, "BTC", TradeType.BUY, Decimal("0.01"), Decimal("60000"))[0]
+
+def async_sessions(directory):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'queue.db')}")
+    return engine, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+def jobs(db):
+    db.expire_all()
+    return db.query(PostTradeJob).order_by(PostTradeJob.id).all()
+
+@contextmanager
+def stub_updates(failures=0, delay=0.0):
+    """Stand in for the leaderboard and achievement updates; the first `failures` calls raise"""
+    calls, running = [], set()
+
+    async def update_entry(db, user):
+        calls.append(user.id)
+        if user.id in running:
+            raise AssertionError(f"user {user.id} is being processed twice at once")
+        running.add(user.id)
+        try:
+            await asyncio.sleep(delay)
+            if len(calls) <= failures:
+                raise RuntimeError("leaderboard unavailable")
+            return user
+        finally:
+            running.discard(user.id)
+
+    async def evaluate_achievements(db, user):
+        return []
+
+    originals = (queue_module.update_user_leaderboard_entry_async, queue_module.evaluate_trade_achievements_async)
+    queue_module.update_user_leaderboard_entry_async = update_entry
+    queue_module.evaluate_trade_achievements_async = evaluate_achievements
+    try:
+        yield calls
+    finally:
+        queue_module.update_user_leaderboard_entry_async, queue_module.evaluate_trade_achievements_async = originals
+
+def test_committed_trade_has_its_job():
+    """A trade and its job commit together: if the job cannot be written, the trade is rolled back"""
+    print("🧪 Testing post-trade job durability...")
+    with tempfile.TemporaryDirectory() as directory:
+        engine, db = make_database(directory)
+        trades = [buy(db) for _ in range(3)]
+        assert [job.trade_id for job in jobs(db)] == [trade.id for trade in trades]
+        assert all(job.status == 'pending' and job.attempts == 0 for job in jobs(db))
+
+        def fail_job_insert(conn, cursor, statement, *args):
+            if statement.startswith("INSERT INTO post_trade_jobs"):
+                raise RuntimeError("jobs table unavailable")
+
+        event.listen(engine, "before_cursor_execute", fail_job_insert)
+        try:
+            buy(db)
+            assert False, "trade committed without its job"
+        except RuntimeError as e:
+            assert "jobs table unavailable" in str(e)
+        event.remove(engine, "before_cursor_execute", fail_job_insert)
+        assert db.query(Trade).count() == 3 and len(jobs(db)) == 3
+        db.close()
+        engine.dispose()
+    print("✅ Post-trade job durability OK")
+
+def test_failed_job_retries_with_backoff():
+    """A failure puts the job back with a doubled delay; it is not claimable before then"""
+    print("🧪 Testing post-trade retries...")
+    with tempfile.TemporaryDirectory() as directory:
+        engine, db = make_database(directory, users=2)
+        buy(db, user_id=1)
+
+        async def run():
+            async_engine, session_factory = async_sessions(directory)
+            queue = PostTradeQueue(workers=1, max_attempts=2, poll_seconds=0.1, session_factory=session_factory)
+            try:
+                with stub_updates(failures=1):
+                    await queue.process(*await queue.claim())
+                    job = jobs(db)[0]
+                    assert (job.status, job.attempts, job.last_error) == ('pending', 1, "leaderboard unavailable")
+                    # First retry waits poll_seconds * 2 ** attempts
+                    backoff = (job.next_attempt_at - job.claimed_at).total_seconds()
+                    assert 0.2 <= backoff < 0.5, backoff
+                    assert await queue.claim() is None
+
+                    await asyncio.sleep(backoff)
+                    await queue.process(*await queue.claim())
+                    job = jobs(db)[0]
+                    assert (job.status, job.attempts, job.last_error) == ('done', 2, None)
+
+                # Past max_attempts the job is marked failed instead of coming back
+                buy(db, user_id=2)
+                with stub_updates(failures=10):
+                    await queue.process(*await queue.claim())
+                    await asyncio.sleep(0.25)
+                    await queue.process(*await queue.claim())
+                    job = jobs(db)[1]
+                    assert (job.status, job.attempts) == ('failed', 2)
+                    assert await queue.claim() is None
+                return queue.processed, queue.retried, queue.failed
+            finally:
+                await async_engine.dispose()
+
+        assert asyncio.run(run()) == (1, 2, 1)
+        db.close()
+        engine.dispose()
+    print("✅ Post-trade retries OK")
+
+def test_claimed_job_is_processed_once():
+    """Two queues with two workers each drain the table without running any job twice"""
+    print("🧪 Testing post-trade claims across workers...")
+    with tempfile.TemporaryDirectory() as directory:
+        engine, db = make_database(directory, users=5)
+        for _ in range(4):
+            for user_id in range(1, 6):
+                buy(db, user_id)
+
+        async def run():
+            async_engine, session_factory = async_sessions(directory)
+            queues = [PostTradeQueue(workers=2, poll_seconds=0.05, session_factory=session_factory) for _ in range(2)]
+            try:
+                with stub_updates(delay=0.05) as calls:
+                    for queue in queues:
+                        queue.start()
+                    for _ in range(100):
+                        stats = await queues[0].get_stats()
+                        if not stats["pending"] and not stats["running"]:
+                            break
+                        await asyncio.sleep(0.05)
+                    for queue in queues:
+                        await queue.stop()
+                return calls, sum(queue.processed for queue in queues), sum(queue.retried for queue in queues)
+            finally:
+                await async_engine.dispose()
+
+        calls, processed, retried = asyncio.run(run())
+        assert processed == 20 and retried == 0
+        # Each claim takes all of a user's due jobs, so there is at most one call per job
+        assert len(calls) <= 20
+        assert all(job.status == 'done' and job.attempts == 1 for job in jobs(db))
+        db.close()
+        engine.dispose()
+    print("✅ Post-trade claims OK")
+
+if __name__ == "__main__":
+    test_committed_trade_has_its_job()
+    test_failed_job_retries_with_backoff()
+    test_claimed_job_is_processed_once()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared price cache backends (in-memory, SQLite and Redis protocol)
+"""
+
+import sys
+import os
+import asyncio
+import time
+import socketserver
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+from fnmatch import fnmatchcase
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.schemas.trade import PriceResponse
+from app.services.price_cache import PriceCacheBackend, InMemoryPriceCache, SQLitePriceCache, RedisPriceCache, PRIMARY, DYNAMIC
+from app.services.price_service import CoinGeckoService
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough RESP (GET/MGET/SET PX/DEL/SCAN, and EVAL of the lease script) for the price cache"""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode())
+        return args
+
+    def write_bulk(self, value):
+        if value is None:
+            self.wfile.write(b"$-1\r\n")
+        else:
+            data = value.encode()
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(data), data))
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            self.server.commands.append(command)
+            if command in ("GET", "MGET"):
+                values = []
+                for key in args[1:]:
+                    value, expires_at = store.get(key, (None, None))
+                    if expires_at is not None and expires_at < time.time():
+                        store.pop(key, None)
+                        value = None
+                    values.append(value)
+                if command == "MGET":
+                    self.wfile.write(b"*%d\r\n" % len(values))
+                for value in values:
+                    self.write_bulk(value)
+            elif command == "SET":
+                expires_at = time.time() + int(args[4]) / 1000 if len(args) > 4 and args[3].upper() == "PX" else None
+                store[args[1]] = (args[2], expires_at)
+                self.wfile.write(b"+OK\r\n")
+            elif command == "EVAL" and args[1] == RedisPriceCache.LEASE_SCRIPT:
+                # Stands in for the Lua script: take a free lease or extend our own
+                key, holder, ttl_ms = args[3], args[4], int(args[5])
+                current, expires_at = store.get(key, (None, None))
+                if current is not None and expires_at < time.time():
+                    current = None
+                taken = current in (None, holder)
+                if taken:
+                    store[key] = (holder, time.time() + ttl_ms / 1000)
+                self.wfile.write(b":%d\r\n" % taken)
+            elif command == "DEL":
+                removed = sum(1 for key in args[1:] if store.pop(key, None))
+                self.wfile.write(b":%d\r\n" % removed)
+            elif command == "SCAN":
+                keys = [key for key in store if fnmatchcase(key, args[3])]
+                self.wfile.write(b"*2\r\n")
+                self.write_bulk("0")
+                self.wfile.write(b"*%d\r\n" % len(keys))
+                for key in keys:
+                    self.write_bulk(key)
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+def start_fake_redis():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeRedisHandler)
+    server.daemon_threads = True
+    server.store = {}
+    server.commands = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def sample_price(symbol="BTC", price="65000.12345678"):
+    return PriceResponse(
+        coin_symbol=symbol,
+        price_usd=Decimal(price),
+        price_change_24h=Decimal("1.5"),
+        price_change_percentage_24h=Decimal("1.5"),
+        timestamp=datetime.utcnow()
+    )
+
+
+def check_backend(backend):
+    price = sample_price()
+    backend.set(PRIMARY, "BTC", price, timedelta(minutes=5))
+    cached = backend.get(PRIMARY, "BTC")
+    assert cached is not None and cached.price_usd == price.price_usd
+    assert backend.get(DYNAMIC, "BTC") is None
+    assert backend.size(PRIMARY) == 1
+
+    backend.set(PRIMARY, "ETH", sample_price("ETH", "3000"), timedelta(milliseconds=1))
+    time.sleep(0.01)
+    assert backend.get(PRIMARY, "ETH") is None
+
+    backend.delete(PRIMARY, "BTC")
+    assert backend.get(PRIMARY, "BTC") is None
+
+    backend.set_many(DYNAMIC, {"SOL": sample_price("SOL", "150"), "ADA": sample_price("ADA", "0.5")}, timedelta(hours=1))
+    assert backend.get(DYNAMIC, "ADA").price_usd == Decimal("0.5") and backend.size(DYNAMIC) == 2
+    batch = backend.get_many(DYNAMIC, ["SOL", "BTC", "ADA"])
+    assert sorted(batch) == ["ADA", "SOL"] and batch["SOL"].price_usd == Decimal("150")
+    backend.clear()
+    assert backend.size(DYNAMIC) == 0
+
+    # The holder renews its lease; anyone else waits until it lapses
+    assert backend.acquire_lease("poller", "a", timedelta(milliseconds=50))
+    assert not backend.acquire_lease("poller", "b", timedelta(milliseconds=50))
+    assert backend.acquire_lease("poller", "a", timedelta(milliseconds=50))
+    time.sleep(0.06)
+    assert backend.acquire_lease("poller", "b", timedelta(minutes=1))
+    assert not backend.acquire_lease("poller", "a", timedelta(minutes=1))
+
+
+def test_memory_backend():
+    """In-memory backend round-trips and expires entries"""
+    print("🧪 Testing in-memory price cache...")
+    check_backend(InMemoryPriceCache())
+    print("✅ In-memory price cache working")
+
+
+def test_sqlite_backend():
+    """SQLite backend is shared between instances pointing at the same file"""
+    print("🧪 Testing SQLite price cache...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prices.db")
+        check_backend(SQLitePriceCache(path))
+
+        writer, reader = SQLitePriceCache(path), SQLitePriceCache(path)
+        writer.set(PRIMARY, "BTC", sample_price(), timedelta(minutes=5))
+        assert reader.get(PRIMARY, "BTC").price_usd == Decimal("65000.12345678")
+    print("✅ SQLite price cache working")
+
+
+def test_redis_backend():
+    """Redis-protocol backend works against a local fake server"""
+    print("🧪 Testing Redis price cache against a fake server...")
+    server = start_fake_redis()
+    try:
+        url = f"redis://127.0.0.1:{server.server_address[1]}/0"
+        check_backend(RedisPriceCache(url))
+
+        # Two "workers" share one cache, so the second never needs an upstream fetch
+        first, second = CoinGeckoService(RedisPriceCache(url)), CoinGeckoService(RedisPriceCache(url))
+        asyncio.run(first._cache_price("BTC", sample_price()))
+        assert asyncio.run(second._get_cached_price("BTC")).price_usd == Decimal("65000.12345678")
+        assert "SET" in server.commands and "GET" in server.commands
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✅ Redis price cache working")
+
+
+def test_redis_clear_keeps_leases():
+    """Clearing the price cache leaves the poll lease with its holder"""
+    server = start_fake_redis()
+    try:
+        backend = RedisPriceCache(f"redis://127.0.0.1:{server.server_address[1]}/0")
+        assert backend.acquire_lease("poller", "a", timedelta(minutes=1))
+        backend.set(PRIMARY, "BTC", sample_price(), timedelta(minutes=5))
+        backend.clear()
+        assert backend.get(PRIMARY, "BTC") is None and backend.size(PRIMARY) == 0
+        assert not backend.acquire_lease("poller", "b", timedelta(minutes=1))
+        # Taking or renewing is one round trip
+        assert server.commands.count("EVAL") == 2 and "PEXPIRE" not in server.commands
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_redis_backend_unavailable():
+    """An unreachable Redis server degrades to cache misses instead of errors"""
+    backend = RedisPriceCache("redis://127.0.0.1:1/0", timeout=0.2)
+    backend.set(PRIMARY, "BTC", sample_price(), timedelta(minutes=5))
+    assert backend.get(PRIMARY, "BTC") is None
+    # Later calls fail fast instead of each waiting on a reconnect
+    assert backend.unavailable_until > time.time()
+
+
+def test_batch_writes_are_pipelined():
+    """A batch of prices is written with one pipelined round trip per tier"""
+    print("🧪 Testing pipelined price writes...")
+    server = start_fake_redis()
+    try:
+        backend = RedisPriceCache(f"redis://127.0.0.1:{server.server_address[1]}/0")
+        service = CoinGeckoService(backend)
+        sends = []
+        original_send = backend._pipeline
+        backend._pipeline = lambda commands: sends.append(len(commands)) or original_send(commands)
+        prices = {symbol: sample_price(symbol, price) for symbol, price in (("BTC", "65000"), ("ETH", "3000"), ("SOL", "150"))}
+        asyncio.run(service._cache_prices(prices))
+        assert sends == [3, 3], sends
+        assert backend.get(DYNAMIC, "SOL").price_usd == Decimal("150")
+        assert server.commands.count("SET") == 6
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✅ Pipelined price writes OK")
+
+
+class SlowPriceCache(InMemoryPriceCache):
+    """Stands in for a backend whose I/O blocks (a slow disk or network)"""
+
+    blocking = True
+
+    def get(self, tier, coin_symbol):
+        time.sleep(0.2)
+        return super().get(tier, coin_symbol)
+
+
+def test_blocking_backend_runs_off_the_event_loop():
+    """Waiting on a blocking backend does not stall other coroutines"""
+    print("🧪 Testing that cache I/O stays off the event loop...")
+    service = CoinGeckoService(SlowPriceCache())
+
+    async def run():
+        await service._cache_price("BTC", sample_price())
+        gaps = []
+
+        async def heartbeat():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            cached = await asyncio.gather(*(service._get_cached_price("BTC") for _ in range(3)))
+        finally:
+            beat.cancel()
+        return cached, max(gaps)
+
+    cached, longest_gap = asyncio.run(run())
+    assert all(price.price_usd == Decimal("65000.12345678") for price in cached)
+    assert longest_gap < 0.1, f"event loop stalled for {longest_gap:.2f}s"
+    print("✅ Cache I/O off the event loop OK")
+
+
+def test_incomplete_backend_is_rejected():
+    """A backend missing part of the interface fails when built, not mid-request"""
+    class GetOnlyCache(PriceCacheBackend):
+        def get(self, tier, coin_symbol):
+            return None
+
+    try:
+        GetOnlyCache()
+        assert False, "incomplete backend was instantiated"
+    except TypeError as e:
+        assert "set" in str(e)
+
+
+if __name__ == "__main__":
+    test_memory_backend()
+    test_sqlite_backend()
+    test_redis_backend()
+    test_redis_clear_keeps_leases()
+    test_redis_backend_unavailable()
+    test_batch_writes_are_pipelined()
+    test_blocking_backend_runs_off_the_event_loop()
+    test_incomplete_backend_is_rejected()
+    print("\n🎉 All price cache tests passed!")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script for the price stream: conflation for slow subscribers, symbol
+subsets, heartbeats, and cleanup when a WebSocket or SSE client goes away
+"""
+
+import sys
+import os
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.routes.prices as prices_routes
+from app.schemas.trade import PriceResponse
+from app.services.price_broadcaster import PriceBroadcaster
+
+def tick(symbol, price):
+    return PriceResponse(coin_symbol=symbol, price_usd=Decimal(price), price_change_24h=Decimal("0"),
+                         price_change_percentage_24h=Decimal("1.5"), timestamp=datetime.utcnow())
+
+@contextmanager
+def stream_app(broadcaster, heartbeat=0.05):
+    """The prices router on its own app, fed by `broadcaster`, with a short heartbeat"""
+    originals = (prices_routes.price_broadcaster, prices_routes.HEARTBEAT_SECONDS)
+    prices_routes.price_broadcaster, prices_routes.HEARTBEAT_SECONDS = broadcaster, heartbeat
+    app = FastAPI()
+    app.include_router(prices_routes.router)
+    try:
+        yield app
+    finally:
+        prices_routes.price_broadcaster, prices_routes.HEARTBEAT_SECONDS = originals
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_slow_subscriber_gets_only_the_latest_tick():
+    """Ticks a subscriber has not taken yet are overwritten, not queued"""
+    print("🧪 Testing price conflation...")
+
+    async def run():
+        broadcaster = PriceBroadcaster()
+        subscription = broadcaster.subscribe(["BTC", "ETH"])
+        for price in ("60000", "60100", "60200"):
+            broadcaster.publish({"BTC": tick("BTC", price)})
+        broadcaster.publish({"ETH": tick("ETH", "3000")})
+        return subscription, await subscription.next_batch(timeout=1)
+
+    subscription, batch = asyncio.run(run())
+    assert set(batch) == {"BTC", "ETH"} and batch["BTC"]["price"] == 60200.0
+    assert subscription.conflated == 2 and not subscription.pending
+    print("✅ Price conflation OK")
+
+def test_subscribers_get_only_their_symbols():
+    """A subset subscriber sees its symbols only, unchanged prices are not resent, and a new subset is primed"""
+    print("🧪 Testing symbol subsets...")
+
+    async def run():
+        broadcaster = PriceBroadcaster()
+        broadcaster.publish({"SOL": tick("SOL", "150")})
+        subscription = broadcaster.subscribe(["btc", " eth "])
+        everything = broadcaster.subscribe()
+        broadcaster.publish({"BTC": tick("BTC", "60000"), "ETH": tick("ETH", "3000"), "SOL": tick("SOL", "151")})
+        first = await subscription.next_batch(timeout=1)
+        everyone = await everything.next_batch(timeout=1)
+
+        # A repeat of the same prices is not a delta
+        broadcaster.publish({"BTC": tick("BTC", "60000")})
+        repeat = await subscription.next_batch(timeout=0.05)
+
+        broadcaster.publish({"BTC": tick("BTC", "60500")})
+        broadcaster.update_symbols(subscription, ["SOL"])
+        switched = await subscription.next_batch(timeout=1)
+        return first, everyone, repeat, switched
+
+    first, everyone, repeat, switched = asyncio.run(run())
+    assert set(first) == {"BTC", "ETH"} and set(everyone) == {"BTC", "ETH", "SOL"}
+    assert repeat == {}
+    # The pending BTC tick is dropped with the old subset; SOL arrives at its latest price
+    assert set(switched) == {"SOL"} and switched["SOL"]["price"] == 151.0
+    print("✅ Symbol subsets OK")
+
+def test_websocket_heartbeat_and_unsubscribe():
+    """An idle WebSocket gets heartbeats, can switch symbols, and is unsubscribed when it closes"""
+    print("🧪 Testing the price WebSocket...")
+    broadcaster = PriceBroadcaster()
+    broadcaster.publish({"BTC": tick("BTC", "60000"), "SOL": tick("SOL", "150")})
+    with stream_app(broadcaster) as app, TestClient(app).websocket_connect("/ws/prices?symbols=btc") as websocket:
+        first = websocket.receive_json()
+        assert first["type"] == "prices" and [row["symbol"] for row in first["data"]] == ["BTC"]
+        assert websocket.receive_json() == {"type": "heartbeat"}
+        assert len(broadcaster.subscriptions) == 1
+
+        websocket.send_json({"action": "subscribe", "symbols": ["SOL"]})
+        messages = [websocket.receive_json() for _ in range(5)]
+        switched = next(message for message in messages if message["type"] == "prices")
+        assert [row["symbol"] for row in switched["data"]] == ["SOL"]
+        websocket.close()
+        assert wait_until(lambda: not broadcaster.subscriptions), broadcaster.subscriptions
+    print("✅ Price WebSocket OK")
+
+def test_sse_heartbeat_and_unsubscribe():
+    """The SSE stream sends prices, then heartbeats while idle, and unsubscribes when the client leaves"""
+    print("🧪 Testing the price event stream...")
+    broadcaster = PriceBroadcaster()
+    broadcaster.publish({"ETH": tick("ETH", "3000"), "SOL": tick("SOL", "150")})
+
+    class Client:
+        """Stands in for the Request: connected until `left` is set"""
+        left = False
+
+        async def is_disconnected(self):
+            return self.left
+
+    async def run():
+        client = Client()
+        response = await prices_routes.price_event_stream(client, symbols="ETH")
+        stream = response.body_iterator
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        subscribed = len(broadcaster.subscriptions)
+        client.left = True
+        remaining = [chunk async for chunk in stream]
+        return chunks, subscribed, remaining
+
+    with stream_app(broadcaster):
+        chunks, subscribed, remaining = asyncio.run(run())
+    assert chunks[0].startswith("event: prices\n") and '"ETH"' in chunks[0] and '"SOL"' not in chunks[0]
+    assert chunks[1] == ": heartbeat\n\n"
+    assert subscribed == 1 and remaining == [] and not broadcaster.subscriptions
+    print("✅ Price event stream OK")
+
+if __name__ == "__main__":
+    test_slow_subscriber_gets_only_the_latest_tick()
+    test_subscribers_get_only_their_symbols()
+    test_websocket_heartbeat_and_unsubscribe()
+    test_sse_heartbeat_and_unsubscribe()
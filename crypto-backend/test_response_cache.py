@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for the chatbot response caches: formatted market and onboarding
+replies, and shared language model answers to context-free questions
+"""
+
+import sys
+import os
+import asyncio
+import time
+from datetime import datetime
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.schemas.trade import PriceResponse
+from app.services.chat_intents import classify
+from app.services.price_service import price_service
+from app.services.response_cache import ResponseCache, reply_cache, completion_cache
+from app.routes.chatbot import market_overview_reply, onboarding_reply, shared_completion_key, stream_coaching_reply
+from test_openai_client import TOKENS, start_stub_server, stub_client
+
+def set_price(symbol: str, price: str) -> PriceResponse:
+    response = PriceResponse(
+        coin_symbol=symbol, price_usd=Decimal(price), price_change_24h=Decimal("2"),
+        price_change_percentage_24h=Decimal("2"), timestamp=datetime.utcnow()
+    )
+    asyncio.run(price_service._cache_price(symbol, response))
+    return response
+
+def test_lru_and_ttl():
+    """Least recently used entries go first; expired entries are misses"""
+    print("🧪 Testing response cache eviction...")
+    cache = ResponseCache(ttl_seconds=60, max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+    assert cache.get("b") is None and cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.get_stats()["evictions"] == 1
+
+    short = ResponseCache(ttl_seconds=0.05, max_entries=2)
+    short.put("a", "A")
+    time.sleep(0.06)
+    assert short.get("a") is None and short.get_stats()["entries"] == 0
+    print("✅ Response cache eviction OK")
+
+def test_market_overview_cached_until_price_refresh():
+    """The overview is built once per stage and rebuilt when a quoted price is refreshed"""
+    print("🧪 Testing cached market overview...")
+    reply_cache.invalidate()
+    for symbol, price in (("BTC", "60000"), ("ETH", "3000"), ("SOL", "150")):
+        set_price(symbol, price)
+
+    first = asyncio.run(market_overview_reply("funded"))
+    assert "$60,000" in first and "You're ready to start!" in first
+    assert asyncio.run(market_overview_reply("holding")) != first
+
+    # A price cached without a refresh notification does not change the reply...
+    set_price("BTC", "65000")
+    assert asyncio.run(market_overview_reply("funded")) == first
+    # ...a refresh of BTC drops every overview quoting it
+    reply_cache.on_prices({"BTC": set_price("BTC", "65000")})
+    refreshed = asyncio.run(market_overview_reply("funded"))
+    assert "$65,000" in refreshed and reply_cache.get_stats()["hits"] >= 1
+    print("✅ Cached market overview OK")
+
+def test_onboarding_reply_cached_per_step():
+    """Users at the same onboarding step share one reply"""
+    reply_cache.invalidate()
+    status = {"onboarding_step": "trading", "is_new_user": False, "trades_count": 2}
+    intent = classify("guide me through my first trade")
+    assert intent.name == "onboarding" and intent.params["first_trade"]
+    reply = onboarding_reply(status, intent)
+    assert "2 trade(s)" in reply and "First Trade Guide" in reply
+    hits = reply_cache.hits
+    assert onboarding_reply(dict(status), intent) is reply and reply_cache.hits == hits + 1
+    assert "3 trade(s)" in onboarding_reply(dict(status, trades_count=3), intent)
+
+def test_shared_completions():
+    """Context-free questions reach the language model once; personal ones are never shared"""
+    print("🧪 Testing the shared completion cache...")
+    server = start_stub_server()
+    enabled = completion_cache.enabled
+    completion_cache.invalidate()
+    try:
+        completion_cache.enabled = False
+        assert shared_completion_key("Explain staking") is None
+        completion_cache.enabled = True
+        assert shared_completion_key("Should I sell my ETH") is None
+        key = shared_completion_key("Explain   staking!")
+        assert key is not None and key == shared_completion_key("explain staking")
+
+        async def run():
+            client = stub_client(server)
+            try:
+                events = [event async for event in stream_coaching_reply("Explain staking", "", client, key)]
+                started = time.perf_counter()
+                again = await completion_cache.get_or_compute(key, lambda: client.complete([]))
+                return events, again, time.perf_counter() - started
+            finally:
+                await client.close()
+
+        events, again, elapsed = asyncio.run(run())
+        assert events[-1] == 'event: done\ndata: {}\n\n'
+        assert again == "".join(TOKENS) and len(server.requests) == 1
+        assert elapsed < 0.001, f"cached answer took {elapsed * 1000:.3f} ms"
+    finally:
+        completion_cache.enabled = enabled
+        completion_cache.invalidate()
+        server.shutdown()
+    print("✅ Shared completion cache OK")
+
+if __name__ == "__main__":
+    test_lru_and_ttl()
+    test_market_overview_cached_until_price_refresh()
+    test_onboarding_reply_cached_per_step()
+    test_shared_completions()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for single-flight price lookups: concurrent misses for one
+symbol share a single upstream fetch, including its failure
+"""
+
+import sys
+import os
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.schemas.trade import PriceResponse
+from app.services.price_cache import InMemoryPriceCache
+from app.services.price_service import CoinGeckoService
+
+def stub_fetcher(service, release: asyncio.Event, error: Exception = None):
+    """Replace the upstream fetch with one that waits for `release`, then answers or raises"""
+    calls = []
+
+    async def fetch(coin_symbol):
+        calls.append(coin_symbol)
+        await release.wait()
+        if error:
+            raise error
+        return PriceResponse(coin_symbol=coin_symbol, price_usd=Decimal("65000"), price_change_24h=Decimal("0"),
+                             price_change_percentage_24h=Decimal("0"), timestamp=datetime.utcnow())
+
+    service._fetch_price = fetch
+    return calls
+
+def test_concurrent_lookups_share_one_fetch():
+    """Ten concurrent misses for BTC make one upstream request and all get its price"""
+    print("🧪 Testing single-flight price lookups...")
+
+    async def run():
+        service = CoinGeckoService(InMemoryPriceCache())
+        release = asyncio.Event()
+        calls = stub_fetcher(service, release)
+        try:
+            lookups = asyncio.gather(*(service.get_price("btc") for _ in range(10)))
+            await asyncio.sleep(0.01)
+            in_flight = set(service._in_flight)
+            release.set()
+            prices = await lookups
+        finally:
+            await service.close()
+        return calls, in_flight, prices, service._in_flight
+
+    calls, in_flight, prices, left_in_flight = asyncio.run(run())
+    assert calls == ["BTC"] and in_flight == {"BTC"}
+    assert all(price is prices[0] for price in prices) and prices[0].price_usd == Decimal("65000")
+    assert left_in_flight == {}
+    print("✅ Single-flight lookups OK")
+
+def test_failure_reaches_every_waiter():
+    """An upstream error is raised to every joined caller and the next lookup fetches again"""
+    print("🧪 Testing single-flight failures...")
+    error = RuntimeError("upstream down")
+
+    async def run():
+        service = CoinGeckoService(InMemoryPriceCache())
+        release = asyncio.Event()
+        calls = stub_fetcher(service, release, error)
+        try:
+            lookups = asyncio.gather(*(service._single_flight_price("ETH") for _ in range(5)), return_exceptions=True)
+            await asyncio.sleep(0.01)
+            release.set()
+            outcomes = await lookups
+            left_in_flight = dict(service._in_flight)
+            # get_price reports the failure as a missing price, and does not reuse the failed fetch
+            retried = await service.get_price("ETH")
+        finally:
+            await service.close()
+        return calls, outcomes, left_in_flight, retried
+
+    calls, outcomes, left_in_flight, retried = asyncio.run(run())
+    assert all(outcome is error for outcome in outcomes), outcomes
+    assert left_in_flight == {}
+    assert retried is None and calls == ["ETH", "ETH"]
+    print("✅ Single-flight failures OK")
+
+if __name__ == "__main__":
+    test_concurrent_lookups_share_one_fetch()
+    test_failure_reaches_every_waiter()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test script for trade execution: wallet balance, position and trade rows
+change together, and rejected trades change nothing
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import User
+from app.models.position import Position
+from app.models.trade import Trade, TradeType
+from app.models.wallet import Wallet
+from app.services.trade_service import TradeService
+
+STARTING_BALANCE = Decimal("100000")
+
+def make_session(engine=None):
+    engine = engine or create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, username="trader", email="trader@example.com", hashed_password="x"))
+    db.commit()
+    return db
+
+def balance(db) -> Decimal:
+    return db.query(Wallet.balance).filter(Wallet.user_id == 1).scalar()
+
+def position(db, symbol="BTC") -> Position:
+    return db.query(Position).filter(Position.user_id == 1, Position.coin_symbol == symbol).one()
+
+def test_buy():
+    """A buy debits the wallet and opens the position at its cost"""
+    print("🧪 Testing a buy...")
+    db = make_session()
+    trade, _, _ = TradeService(db).execute(1, "btc", TradeType.BUY, Decimal("0.5"), Decimal("60000"))
+    assert trade.coin_symbol == "BTC" and trade.total_cost == Decimal("30000")
+    assert balance(db) == STARTING_BALANCE - 30000
+    btc = position(db)
+    assert btc.quantity == Decimal("0.5") and btc.cost_basis == Decimal("30000") and btc.trade_count == 1
+    print("✅ Buy OK")
+
+def test_partial_sell_at_average_cost():
+    """A partial sell credits the proceeds and removes cost at the average price"""
+    print("🧪 Testing average-cost sells...")
+    db = make_session()
+    service = TradeService(db)
+    service.execute(1, "ETH", TradeType.BUY, Decimal("2"), Decimal("1000"))
+    service.execute(1, "ETH", TradeType.BUY, Decimal("2"), Decimal("2000"))
+    service.execute(1, "ETH", TradeType.SELL, Decimal("1"), Decimal("3000"))
+    assert balance(db) == STARTING_BALANCE - 6000 + 3000
+    eth = position(db, "ETH")
+    # Average cost 1500: one coin sold removes 1500 of the 6000 basis
+    assert eth.quantity == Decimal("3") and eth.cost_basis == Decimal("4500")
+    assert eth.realized_pnl == Decimal("1500")
+    assert eth.total_spent == Decimal("6000") and eth.total_received == Decimal("3000")
+    print("✅ Average-cost sells OK")
+
+def test_full_sell_closes_position():
+    """Selling everything leaves an empty position with no cost left over"""
+    db = make_session()
+    service = TradeService(db)
+    service.execute(1, "SOL", TradeType.BUY, Decimal("3"), Decimal("100"))
+    service.execute(1, "SOL", TradeType.SELL, Decimal("3"), Decimal("120"))
+    sol = position(db, "SOL")
+    assert sol.quantity == 0 and sol.cost_basis == 0 and sol.realized_pnl == Decimal("60")
+    assert balance(db) == STARTING_BALANCE + 60
+
+def test_oversell_is_rejected():
+    """Selling more than is held raises and leaves wallet, position and trades untouched"""
+    print("🧪 Testing rejected trades...")
+    db = make_session()
+    service = TradeService(db)
+    service.execute(1, "BTC", TradeType.BUY, Decimal("1"), Decimal("50000"))
+    try:
+        service.execute(1, "BTC", TradeType.SELL, Decimal("1.5"), Decimal("50000"))
+        assert False, "oversell was accepted"
+    except ValueError as e:
+        assert "Insufficient BTC" in str(e)
+    assert balance(db) == STARTING_BALANCE - 50000
+    assert position(db).quantity == Decimal("1") and db.query(Trade).count() == 1
+
+    try:
+        service.execute(1, "DOGE", TradeType.SELL, Decimal("1"), Decimal("0.1"))
+        assert False, "sell without a position was accepted"
+    except ValueError:
+        pass
+    assert db.query(Position).filter(Position.coin_symbol == "DOGE").count() == 0
+
+def test_insufficient_funds_is_rejected():
+    """A buy costing more than the balance raises and changes nothing"""
+    db = make_session()
+    service = TradeService(db)
+    service.execute(1, "BTC", TradeType.BUY, Decimal("1"), Decimal("60000"))
+    try:
+        service.execute(1, "BTC", TradeType.BUY, Decimal("1"), Decimal("60000"))
+        assert False, "buy beyond the balance was accepted"
+    except ValueError as e:
+        assert "Insufficient balance" in str(e)
+    assert balance(db) == STARTING_BALANCE - 60000
+    assert position(db).quantity == Decimal("1") and db.query(Trade).count() == 1
+    print("✅ Rejected trades OK")
+
+def test_unknown_user():
+    db = make_session()
+    try:
+        TradeService(db).execute(2, "BTC", TradeType.BUY, Decimal("1"), Decimal("1"))
+        assert False, "trade for an unknown user was accepted"
+    except LookupError:
+        pass
+
+def test_concurrent_sells_cannot_oversell():
+    """A sell that starts while another is between its holdings check and its commit cannot pass the check too"""
+    print("🧪 Testing concurrent sells on SQLite...")
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'trades.db')}", connect_args={"timeout": 0.2})
+        db = make_session(engine)
+        TradeService(db).execute(1, "BTC", TradeType.BUY, Decimal("1"), Decimal("50000"))
+        outcome = {}
+
+        def second_sell(conn, cursor, statement, *args):
+            # The first sell has passed its holdings check and is about to write; a second worker sells the same coin
+            if statement.startswith(("INSERT", "UPDATE", "DELETE")) and "second" not in outcome:
+                outcome["second"] = None
+                other = sessionmaker(bind=engine)()
+                try:
+                    TradeService(other).execute(1, "BTC", TradeType.SELL, Decimal("1"), Decimal("50000"))
+                    outcome["second"] = "sold"
+                except OperationalError:
+                    outcome["second"] = "waited"
+                finally:
+                    other.close()
+
+        event.listen(engine, "before_cursor_execute", second_sell)
+        try:
+            TradeService(db).execute(1, "BTC", TradeType.SELL, Decimal("1"), Decimal("50000"))
+        finally:
+            event.remove(engine, "before_cursor_execute", second_sell)
+        # The second sell could not start while the first held the write lock
+        assert outcome["second"] == "waited"
+        assert position(db).quantity == 0
+        assert db.query(Trade).filter(Trade.trade_type == TradeType.SELL).count() == 1
+        assert balance(db) == STARTING_BALANCE
+        db.close()
+        engine.dispose()
+    print("✅ Concurrent sells OK")
+
+def test_execute_through_an_async_session():
+    """The trade routes run execute on an aiosqlite session via run_sync"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trades.db")
+        make_session(create_engine(f"sqlite:///{path}")).close()
+
+        async def run():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            try:
+                async with sessionmaker(bind=engine, class_=AsyncSession)() as db:
+                    trade, _, _ = await db.run_sync(
+                        lambda session: TradeService(session).execute(1, "ETH", TradeType.BUY, Decimal("2"), Decimal("3000"))
+                    )
+                    return trade.total_cost
+            finally:
+                await engine.dispose()
+
+        assert asyncio.run(run()) == Decimal("6000")
+
+if __name__ == "__main__":
+    test_buy()
+    test_partial_sell_at_average_cost()
+    test_full_sell_closes_position()
+    test_oversell_is_rejected()
+    test_insufficient_funds_is_rejected()
+    test_unknown_user()
+    test_concurrent_sells_cannot_oversell()
+    test_execute_through_an_async_session()